@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC Batch Benchmark
+
+Starts a server against a throwaway database, seeds a project with a number
+of documents and reads all of them, either as one JSON-RPC request per
+document or as a single batch, and reports documents read per second and
+per-round latency for each mode.
+
+Usage:
+    python benchmarks/bench_batch.py [--documents 20] [--rounds 50] [--servers flask,asgi]
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_transports import SERVERS, free_port, start_server
+
+DOCUMENT_BODY = "\\section{Body}\n" + ("Lorem ipsum dolor sit amet. " * 40 + "\n") * 20
+
+def wait_ready(client: httpx.Client, timeout: float = 20) -> None:
+    """Wait until the health endpoint answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.get("/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+def message(request_id, method: str, params: dict) -> dict:
+    return {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+
+def seed(client: httpx.Client, documents: int) -> list:
+    """Create a project with documents and return their resource URIs."""
+    created = client.post("/rpc/jsonrpc", json=message(1, 'tools/call', {
+        'name': 'create_project',
+        'arguments': {'title': 'Batch benchmark', 'document_type': 'article'}
+    })).json()
+    text = created['result']['content'][0]['text']
+    project_id = json.loads(text[text.index('{'):])['id']
+
+    client.post("/rpc/jsonrpc", json=message(2, 'tools/call', {
+        'name': 'update_documents',
+        'arguments': {
+            'project_id': project_id,
+            'changes': [{'filename': f"chapter{i}.tex", 'content': DOCUMENT_BODY} for i in range(documents)]
+        }
+    })).raise_for_status()
+
+    return [f"overleaf-remote:///projects/{project_id}/documents/chapter{i}.tex" for i in range(documents)]
+
+def run(name: str, args) -> dict:
+    """Benchmark sequential and batched reads against one server."""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        process = start_server(SERVERS[name], port, tmp)
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+                wait_ready(client)
+                uris = seed(client, args.documents)
+                requests = [message(i, 'resources/read', {'uri': uri}) for i, uri in enumerate(uris)]
+
+                def sequential():
+                    for request in requests:
+                        assert 'result' in client.post("/rpc/jsonrpc", json=request).json()
+
+                def batch():
+                    responses = client.post("/rpc/jsonrpc", json=requests).json()
+                    assert len(responses) == len(requests) and all('result' in r for r in responses)
+
+                results = {}
+                for mode, func in (('sequential', sequential), ('batch', batch)):
+                    func()  # warm up
+                    timings = []
+                    for _ in range(args.rounds):
+                        start = time.perf_counter()
+                        func()
+                        timings.append((time.perf_counter() - start) * 1000)
+                    results[mode] = {
+                        'docs_per_s': args.documents * args.rounds / (sum(timings) / 1000),
+                        'p50': statistics.median(timings)
+                    }
+                return results
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=20, help='documents read per round')
+    parser.add_argument('--rounds', type=int, default=50, help='rounds per mode')
+    parser.add_argument('--servers', default='flask,asgi', help='comma-separated transports to test')
+    args = parser.parse_args()
+
+    print(f"{args.documents} resources/read calls per round, {args.rounds} rounds")
+    print(f"\n{'server':<8}{'mode':<12}{'docs/s':>10}{'round p50 ms':>14}")
+    print("-" * 44)
+
+    for name in args.servers.split(','):
+        results = run(name, args)
+        for mode, result in results.items():
+            print(f"{name:<8}{mode:<12}{result['docs_per_s']:>10.0f}{result['p50']:>14.2f}")
+        print(f"{name:<8}{'speedup':<12}{results['batch']['docs_per_s'] / results['sequential']['docs_per_s']:>10.1f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Document Service Connection Benchmark
+
+Compares per-call latency of the original connect-per-call access pattern
+(rollback journal, fresh sqlite3.connect for every method) against the pooled
+WAL connections used by DocumentService, on a database with 10k documents.
+
+Usage:
+    python benchmarks/bench_document_service.py [--documents 10000] [--calls 2000]
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.utils.config import Config
+from src.services.document_service import DocumentService
+
+DOCUMENT_BODY = "\\section{Body}\n" + ("Lorem ipsum dolor sit amet. " * 40 + "\n") * 20
+
+def seed(service: DocumentService, documents: int, per_project: int = 50) -> List[Tuple[str, str]]:
+    """Insert projects and documents directly and return (project_id, filename) keys."""
+    keys = []
+    with service.db.writer() as conn:
+        for p in range(documents // per_project):
+            project_id = str(uuid.uuid4())
+            conn.execute(
+                "INSERT INTO projects (id, title, type) VALUES (?, ?, 'article')",
+                (project_id, f"Project {p}")
+            )
+            for d in range(per_project):
+                filename = f"section{d}.tex"
+                conn.execute(
+                    "INSERT INTO documents (id, project_id, filename, content) VALUES (?, ?, ?, ?)",
+                    (str(uuid.uuid4()), project_id, filename, DOCUMENT_BODY)
+                )
+                keys.append((project_id, filename))
+    return keys
+
+# Original access pattern: one connection per call in rollback-journal mode
+
+def legacy_get_document(db_path: str, project_id: str, filename: str):
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, content, created_at, updated_at
+            FROM documents
+            WHERE project_id = ? AND filename = ?
+        ''', (project_id, filename))
+        return cursor.fetchone()
+
+def legacy_list_documents(db_path: str, project_id: str):
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, filename, created_at, updated_at
+            FROM documents
+            WHERE project_id = ?
+            ORDER BY filename
+        ''', (project_id,))
+        return cursor.fetchall()
+
+def legacy_update_document(db_path: str, project_id: str, filename: str, content: str):
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, content FROM documents
+            WHERE project_id = ? AND filename = ?
+        ''', (project_id, filename))
+        document_id, old_content = cursor.fetchone()
+        cursor.execute('''
+            SELECT COALESCE(MAX(version_number), 0) + 1
+            FROM versions
+            WHERE document_id = ?
+        ''', (document_id,))
+        version_number = cursor.fetchone()[0]
+        cursor.execute('''
+            INSERT INTO versions (id, document_id, version_number, content, commit_message)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (str(uuid.uuid4()), document_id, version_number, old_content, ''))
+        cursor.execute('''
+            UPDATE documents
+            SET content = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (content, document_id))
+        cursor.execute('''
+            UPDATE projects
+            SET updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (project_id,))
+        conn.commit()
+
+def measure(fn: Callable[[], object], calls: int) -> Dict[str, float]:
+    """Run fn repeatedly and return latency statistics in microseconds."""
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p99': samples[int(len(samples) * 0.99) - 1]
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=10000)
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.STORAGE_PATH = os.path.join(tmp, 'projects')
+
+        service = DocumentService(config)
+        service.db_path = os.path.join(tmp, 'pooled.db')
+        service.initialize()
+
+        print(f"Seeding {args.documents} documents...")
+        keys = seed(service, args.documents)
+
+        # Build the legacy database as a rollback-journal copy of the same data
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        source = sqlite3.connect(service.db_path)
+        source.execute("VACUUM INTO ?", (legacy_path,))
+        source.close()
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute("PRAGMA journal_mode = DELETE")
+
+        for project_id, _ in keys[::50]:
+            os.makedirs(os.path.join(config.STORAGE_PATH, project_id, 'documents'), exist_ok=True)
+
+        rng = random.Random(42)
+        pick = lambda: keys[rng.randrange(len(keys))]
+        write_calls = max(1, args.calls // 10)
+
+        scenarios = [
+            ("get_document",
+             lambda: legacy_get_document(legacy_path, *pick()),
+             lambda: service.get_document(*pick()), args.calls),
+            ("list_documents",
+             lambda: legacy_list_documents(legacy_path, pick()[0]),
+             lambda: service.list_documents(pick()[0]), args.calls),
+            ("update_document",
+             lambda: legacy_update_document(legacy_path, *pick(), DOCUMENT_BODY + "%"),
+             lambda: service.update_document(*pick(), DOCUMENT_BODY + "%"), write_calls)
+        ]
+
+        print(f"\n{'operation':<18}{'mode':<10}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+        print("-" * 58)
+        for name, legacy_fn, pooled_fn, calls in scenarios:
+            before = measure(legacy_fn, calls)
+            after = measure(pooled_fn, calls)
+            for mode, stats in (("before", before), ("after", after)):
+                print(f"{name:<18}{mode:<10}{stats['mean']:>10.1f}{stats['p50']:>10.1f}{stats['p99']:>10.1f}")
+            print(f"{'':<18}{'speedup':<10}{before['mean'] / after['mean']:>10.1f}x")
+
+        service.shutdown()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Metrics Overhead Benchmark
+
+Measures what the instrumentation adds to a call on the hot path: a bare
+function call against the same call through the timed() decorator, a single
+histogram observe(), and an uninstrumented Document Service read against the
+instrumented one. Also times rendering /metrics once many series exist.
+
+Usage:
+    python benchmarks/bench_metrics.py [--calls 200000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import Config
+from src.utils.metrics import Registry, timed
+from src.services.document_service import DocumentService
+
+def per_call_ns(func, calls: int) -> float:
+    """Return the mean nanoseconds per call of a zero-argument function."""
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) * 1e9 / calls
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200000, help='calls per case')
+    args = parser.parse_args()
+
+    registry = Registry()
+    histogram = registry.histogram('bench_seconds', 'Benchmark latency', ['operation'])
+    errors = registry.counter('bench_errors_total', 'Benchmark errors', ['operation'])
+    series = histogram.labels('noop')
+
+    def noop():
+        return None
+
+    instrumented = timed(histogram, errors, 'noop')(noop)
+
+    print(f"{'case':<36}{'ns/call':>10}")
+    print("-" * 46)
+    bare = per_call_ns(noop, args.calls)
+    print(f"{'bare call':<36}{bare:>10.0f}")
+    print(f"{'timed() call':<36}{per_call_ns(instrumented, args.calls):>10.0f}")
+    print(f"{'histogram observe()':<36}{per_call_ns(lambda: series.observe(0.001), args.calls):>10.0f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.DATABASE_PATH = os.path.join(tmp, 'app.db')
+        config.STORAGE_PATH = os.path.join(tmp, 'projects')
+        service = DocumentService(config)
+        service.initialize()
+        project = service.create_project('Bench', 'article')
+        reads = max(1, args.calls // 10)
+
+        # get_document is served from the read cache after the first call
+        raw = DocumentService.get_document.__wrapped__
+        uninstrumented = per_call_ns(lambda: raw(service, project['id'], 'main.tex'), reads)
+        measured = per_call_ns(lambda: service.get_document(project['id'], 'main.tex'), reads)
+        print(f"{'get_document (cached, bare)':<36}{uninstrumented:>10.0f}")
+        print(f"{'get_document (cached, instrumented)':<36}{measured:>10.0f}")
+        service.shutdown()
+
+    for i in range(200):
+        histogram.observe(0.01, f'operation{i}')
+        errors.inc(f'operation{i}')
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"\nrender 200 histogram series: {(time.perf_counter() - start) * 1000:.1f} ms, {len(text)} bytes")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
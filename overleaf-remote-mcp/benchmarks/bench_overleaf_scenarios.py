@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Overleaf Scenario Benchmark
+
+Runs the Overleaf integration end to end at scale against a local fake
+Overleaf server: the Overleaf Service is pointed at it through
+OVERLEAF_API_URL exactly as in production. Scenarios:
+
+    list       list the user's projects (--projects seeded)
+    push       first push of a local project with --files documents
+    push-edit  incremental push after editing 1% of the documents
+    push-noop  push with nothing changed
+    pull       import a seeded project of the same size into a new local project
+    pull-noop  pull it again with nothing changed remotely
+    compile    compile the pushed project and stream its PDF to disk
+
+Each reports wall time, requests the server received and bytes moved.
+
+Usage:
+    python benchmarks/bench_overleaf_scenarios.py [--files 200] [--file-size 4096]
+        [--projects 50] [--latency-ms 40] [--bandwidth-kbps 0] [--error-rate 0.01]
+        [--compile-ms 500] [--concurrency 8]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import Config
+from src.fake_overleaf import FakeOverleaf, FakeOverleafServer
+from src.services.document_service import DocumentService
+from src.services.overleaf_service import OverleafService
+from src.services.project_sync import ProjectSync
+
+def measure(fake: FakeOverleaf, func):
+    """Run func; return its result, seconds, requests and bytes moved."""
+    requests, moved = fake.request_count(), fake.bytes_sent + fake.bytes_received
+    start = time.perf_counter()
+    result = func()
+    return (result, time.perf_counter() - start, fake.request_count() - requests,
+            fake.bytes_sent + fake.bytes_received - moved)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=200, help='documents per project')
+    parser.add_argument('--file-size', type=int, default=4096, help='bytes per document')
+    parser.add_argument('--projects', type=int, default=50, help='remote projects to list')
+    parser.add_argument('--latency-ms', type=float, default=40, help='delay added to every request')
+    parser.add_argument('--bandwidth-kbps', type=float, default=0, help='body throughput in KiB/s (0: unlimited)')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='share of requests failing with 503')
+    parser.add_argument('--compile-ms', type=float, default=500, help='time a compile takes')
+    parser.add_argument('--concurrency', type=int, default=8, help='parallel transfers (OVERLEAF_CONCURRENCY)')
+    args = parser.parse_args()
+
+    fake = FakeOverleaf(error_rate=args.error_rate, seed=1, compile_time=args.compile_ms / 1000)
+    seeded = fake.seed_projects(args.projects, args.files, args.file_size)
+
+    print(f"{args.files} files of {args.file_size} bytes, {args.latency_ms:.0f} ms latency, "
+          f"{args.bandwidth_kbps or 'unlimited'} KiB/s, {args.error_rate:.0%} injected errors, "
+          f"concurrency {args.concurrency}\n")
+    print(f"{'scenario':<12}{'seconds':>9}{'requests':>10}{'KiB moved':>11}  outcome")
+    print("-" * 64)
+
+    with tempfile.TemporaryDirectory() as tmp, FakeOverleafServer(fake) as server:
+        config = Config()
+        config.DATABASE_PATH = os.path.join(tmp, 'app.db')
+        config.STORAGE_PATH = os.path.join(tmp, 'projects')
+        config.OVERLEAF_EMAIL = 'bench@example.com'
+        config.OVERLEAF_PASSWORD = 'secret'
+        config.OVERLEAF_API_URL = server.url
+        config.OVERLEAF_CONCURRENCY = args.concurrency
+        config.OVERLEAF_MAX_CONNECTIONS = max(args.concurrency, 1)
+
+        documents = DocumentService(config)
+        documents.initialize()
+        overleaf = OverleafService(config)
+        overleaf.initialize()
+        sync = ProjectSync(documents, overleaf)
+
+        # Latency and bandwidth apply from here on, not to seeding or login
+        fake.latency = args.latency_ms / 1000
+        fake.bandwidth = int(args.bandwidth_kbps * 1024)
+
+        project = documents.create_project('Bench', 'article')
+        body = ('Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n' * (args.file_size // 57 + 1))
+        inputs = ''.join(f'\\input{{sections/s{i:04d}}}\n' for i in range(args.files))
+        documents.update_documents(project['id'], [
+            {'filename': f'sections/s{i:04d}.tex', 'content': body[:args.file_size - 8] + f'{i:08d}'}
+            for i in range(args.files)
+        ] + [{'filename': 'main.tex',
+              'content': f'\\documentclass{{article}}\n\\begin{{document}}\n{inputs}\\end{{document}}\n'}])
+        edits = max(1, args.files // 100)
+
+        overleaf_id = [None]
+
+        def push():
+            report = sync.push(project['id'])
+            overleaf_id[0] = report['overleaf_id']
+            return report
+
+        def edit():
+            documents.update_documents(project['id'], [
+                {'filename': f'sections/s{i:04d}.tex', 'content': body[:args.file_size - 8] + 'revised!'}
+                for i in range(edits)
+            ])
+            return sync.push(project['id'])
+
+        def push_outcome(report):
+            return (f"{len(report['added']) + len(report['changed'])} sent, {report['unchanged']} unchanged, "
+                    f"{len(report['failed'])} failed")
+
+        def pull_outcome(report):
+            return (f"{len(report['added']) + len(report['changed'])} imported, {report['unchanged']} unchanged, "
+                    f"{len(report['failed'])} failed")
+
+        def compile_and_download():
+            compiled = overleaf.compile_project(overleaf_id[0])
+            size = overleaf.download_output(overleaf_id[0], os.path.join(tmp, 'output.pdf'))
+            return compiled, size
+
+        scenarios = [
+            ('list', lambda: overleaf.list_projects(), lambda r: f"{len(r)} projects"),
+            ('push', push, push_outcome),
+            ('push-edit', edit, push_outcome),
+            ('push-noop', lambda: sync.push(project['id']), push_outcome),
+            ('pull', lambda: sync.pull(seeded[0]['id']), pull_outcome),
+            ('pull-noop', lambda: sync.pull(seeded[0]['id']), pull_outcome),
+            ('compile', compile_and_download,
+             lambda r: f"{'success' if r[0]['success'] else 'failed'}, PDF {r[1]} bytes"),
+        ]
+        for name, func, outcome in scenarios:
+            result, seconds, requests, moved = measure(fake, func)
+            print(f"{name:<12}{seconds:>9.2f}{requests:>10}{moved / 1024:>11.0f}  {outcome(result)}")
+
+        stats = overleaf.stats()
+        print(f"\nclient: {stats['requests']} requests, {stats['retries']} retries, "
+              f"{stats['failures']} failures, circuit opened {stats['circuit_opens']} times")
+        overleaf.shutdown()
+        documents.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Serialization Benchmark
+
+Compares the previous response encoding (walking MCP models into dicts by
+hand, then json.dumps on the whole envelope) with the serialization layer
+(pydantic's compiled serializer, spliced into the envelope), for a large
+resources/list and for tools/call results carrying large documents.
+
+Usage:
+    python benchmarks/bench_serialization.py [--resources 50000] [--document-mb 1,4] [--rounds 5]
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp import types
+
+from src.utils.serialization import encode_response
+
+def convert_to_dict(obj):
+    """The conversion MCPServer used before the serialization layer."""
+    if hasattr(obj, '__dict__'):
+        result = {}
+        for key, value in obj.__dict__.items():
+            if isinstance(value, list):
+                result[key] = [convert_to_dict(item) for item in value]
+            elif hasattr(value, '__dict__'):
+                result[key] = convert_to_dict(value)
+            else:
+                result[key] = value
+        return result
+    elif isinstance(obj, list):
+        return [convert_to_dict(item) for item in obj]
+    else:
+        return obj
+
+def legacy_encode(request_id, result) -> bytes:
+    """Encode a response the old way; URIs had to be stringified by hand."""
+    return json.dumps({'jsonrpc': '2.0', 'id': request_id, 'result': result}, default=str).encode('utf-8')
+
+def resources_list(count: int) -> types.ListResourcesResult:
+    return types.ListResourcesResult(resources=[
+        types.Resource(
+            uri=f"overleaf-remote:///projects/p{i // 20}/documents/chapter{i % 20}.tex",
+            name=f"chapter{i % 20}.tex",
+            description=f"Document chapter{i % 20}.tex in project p{i // 20}",
+            mimeType="text/x-tex"
+        )
+        for i in range(count)
+    ])
+
+def tools_call(megabytes: int) -> types.CallToolResult:
+    line = "Lorem ipsum dolor sit amet, consectetur adipiscing elit éè.\n"
+    text = line * (megabytes * 1024 * 1024 // len(line.encode('utf-8')))
+    return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
+
+def measure(func, rounds: int):
+    """Return (median ms, peak MiB) for a zero-argument encoder."""
+    func()  # warm up
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resources', type=int, default=50000, help='entries in resources/list')
+    parser.add_argument('--document-mb', default='1,4', help='comma-separated tools/call document sizes in MiB')
+    parser.add_argument('--rounds', type=int, default=5, help='timed rounds per case')
+    args = parser.parse_args()
+
+    cases = [(f"resources/list x{args.resources}", resources_list(args.resources))]
+    cases += [(f"tools/call {mb} MiB", tools_call(int(mb))) for mb in args.document_mb.split(',')]
+
+    print(f"{'case':<28}{'encoder':<10}{'p50 ms':>10}{'peak MiB':>10}{'bytes':>12}")
+    print("-" * 70)
+
+    for name, result in cases:
+        encoders = (
+            ('legacy', lambda: legacy_encode(1, convert_to_dict(result))),
+            ('pydantic', lambda: encode_response(1, result))
+        )
+        timings = {}
+        for encoder, func in encoders:
+            p50, peak = measure(func, args.rounds)
+            timings[encoder] = p50
+            print(f"{name:<28}{encoder:<10}{p50:>10.1f}{peak:>10.1f}{len(func()):>12}")
+        print(f"{name:<28}{'speedup':<10}{timings['legacy'] / timings['pydantic']:>9.1f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Stdio Startup Benchmark
+
+Claude Desktop launches the stdio server (src/main_stdio.py) for every
+session, so its cold start is on the critical path. This launches the server
+repeatedly, sends an initialize request as soon as the process starts and
+measures the time until the response arrives, then completes the handshake
+and measures the time until a tools/list response (which needs the server
+components). Both are measured against a fresh database and against one
+left behind by an earlier launch (the common case).
+
+The initialize response cannot come sooner than Python can import the MCP
+SDK, so that floor is measured too, interleaved with the launches, by an
+interpreter that only imports it. Setting up the server components costs
+less than the run-to-run noise of a launch, so whether they stay off the
+handshake path is checked by test_stdio_concurrency rather than by a timing
+threshold here.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10]
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Tuple
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+INITIALIZE = json.dumps({
+    'jsonrpc': '2.0',
+    'id': 1,
+    'method': 'initialize',
+    'params': {
+        'protocolVersion': '2024-11-05',
+        'capabilities': {},
+        'clientInfo': {'name': 'bench-startup', 'version': '1.0.0'}
+    }
+}) + '\n'
+
+INITIALIZED = json.dumps({'jsonrpc': '2.0', 'method': 'notifications/initialized'}) + '\n'
+
+LIST_TOOLS = json.dumps({'jsonrpc': '2.0', 'id': 2, 'method': 'tools/list'}) + '\n'
+
+SDK_IMPORT = 'import mcp.server.stdio, mcp.types; print("ready", flush=True)'
+
+def sdk_floor() -> float:
+    """Return milliseconds until a fresh interpreter has imported the MCP SDK."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', SDK_IMPORT], cwd=ROOT, text=True, stdout=subprocess.PIPE)
+    process.stdout.readline()
+    elapsed = (time.perf_counter() - start) * 1000
+    process.wait()
+    return elapsed
+
+def launch(data_dir: str) -> Tuple[float, float]:
+    """Start the stdio server once; return milliseconds to the initialize and tools/list responses."""
+    env = {
+        **os.environ,
+        'MCP_DATABASE_PATH': os.path.join(data_dir, 'app.db'),
+        'MCP_STORAGE_PATH': os.path.join(data_dir, 'projects'),
+        'MCP_LOG_FILE': os.path.join(data_dir, 'server.log'),
+        'MCP_LOG_LEVEL': 'WARNING'
+    }
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'src.main_stdio'], cwd=ROOT, env=env, text=True,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        process.stdin.write(INITIALIZE)
+        process.stdin.flush()
+        response = json.loads(process.stdout.readline())
+        initialized = (time.perf_counter() - start) * 1000
+        if 'result' not in response:
+            raise RuntimeError(f"initialize failed: {response}")
+
+        process.stdin.write(INITIALIZED + LIST_TOOLS)
+        process.stdin.flush()
+        response = json.loads(process.stdout.readline())
+        ready = (time.perf_counter() - start) * 1000
+        if 'result' not in response:
+            raise RuntimeError(f"tools/list failed: {response}")
+        return initialized, ready
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='launches per case')
+    args = parser.parse_args()
+
+    results = {}
+    floors = []
+    with tempfile.TemporaryDirectory() as tmp:
+        results['fresh database'] = [launch(os.path.join(tmp, f'fresh{i}')) for i in range(args.runs)]
+
+        existing_dir = os.path.join(tmp, 'existing')
+        launch(existing_dir)  # creates the database
+        results['existing database'] = []
+        # Interleaved, so both see the same machine load and file cache
+        for _ in range(args.runs):
+            floors.append(sdk_floor())
+            results['existing database'].append(launch(existing_dir))
+    floor = statistics.median(floors)
+
+    print(f"Median milliseconds over {args.runs} launches; MCP SDK import floor {floor:.0f} ms")
+    print(f"\n{'case':<20}{'initialize':>12}{'min':>8}{'tools/list':>12}{'min':>8}")
+    print("-" * 60)
+    for name, timings in results.items():
+        initialize = [t[0] for t in timings]
+        ready = [t[1] for t in timings]
+        print(f"{name:<20}{statistics.median(initialize):>12.0f}{min(initialize):>8.0f}"
+              f"{statistics.median(ready):>12.0f}{min(ready):>8.0f}")
+
+    overhead = statistics.median(t[0] for t in results['existing database']) - floor
+    print(f"\ninitialize answered {overhead:.0f} ms after the SDK import floor")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Transport Load Test
+
+Starts the Flask server (src/main.py) and the ASGI server (src/main_asgi.py)
+against throwaway databases, opens many idle SSE connections to each, and
+measures JSON-RPC latency while those connections are held: how many SSE
+clients were accepted, requests per second, and p50/p99 latency.
+
+Usage:
+    python benchmarks/bench_transports.py [--connections 200] [--requests 2000] [--concurrency 50]
+"""
+
+import os
+import sys
+import time
+import json
+import socket
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+SERVERS = {
+    'flask': 'src.main',
+    'asgi': 'src.main_asgi'
+}
+
+def free_port() -> int:
+    """Pick an unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(module: str, port: int, tmp: str) -> subprocess.Popen:
+    """Start a server module on port with its own database and storage."""
+    env = {
+        **os.environ,
+        'MCP_SERVER_HOST': '127.0.0.1',
+        'MCP_SERVER_PORT': str(port),
+        'MCP_DATABASE_PATH': os.path.join(tmp, 'app.db'),
+        'MCP_STORAGE_PATH': os.path.join(tmp, 'projects'),
+        'MCP_LOG_FILE': os.path.join(tmp, 'server.log'),
+        'MCP_LOG_LEVEL': 'WARNING',
+        'MCP_DEBUG': 'false',
+        # Measure the transports, not the per-client rate limit
+        'MCP_RATE_LIMIT': '0',
+        'MCP_MAX_INFLIGHT': '0'
+    }
+    return subprocess.Popen([sys.executable, '-m', module], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+async def wait_ready(client: httpx.AsyncClient, base_url: str, timeout: float = 20) -> None:
+    """Wait until the health endpoint answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{base_url}/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+async def rpc(client: httpx.AsyncClient, base_url: str, method: str, params: dict) -> dict:
+    """Send one JSON-RPC request and return the decoded response."""
+    response = await client.post(f"{base_url}/rpc/jsonrpc", json={
+        'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params
+    })
+    return response.json()
+
+async def hold_sse(client: httpx.AsyncClient, base_url: str, accepted: list, release: asyncio.Event) -> None:
+    """Open an SSE stream, record it once the first event arrives, then idle."""
+    try:
+        async with client.stream('GET', f"{base_url}/sse/") as response:
+            async for line in response.aiter_lines():
+                if line.startswith('data:'):
+                    accepted.append(1)
+                    break
+            await release.wait()
+    except (httpx.TransportError, asyncio.CancelledError):
+        pass
+
+async def run(name: str, args) -> dict:
+    """Load-test one transport and return its measurements."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = start_server(SERVERS[name], port, tmp)
+        limits = httpx.Limits(max_connections=args.connections + args.concurrency + 10)
+        timeout = httpx.Timeout(args.timeout)
+        try:
+            async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+                await wait_ready(client, base_url)
+
+                # Seed a project whose main document the load reads back
+                created = await rpc(client, base_url, 'tools/call', {
+                    'name': 'create_project',
+                    'arguments': {'title': 'Load test', 'document_type': 'article'}
+                })
+                text = created['result']['content'][0]['text']
+                project_id = json.loads(text[text.index('{'):])['id']
+
+                # Hold idle SSE clients open for the duration of the run
+                release = asyncio.Event()
+                accepted = []
+                holders = []
+                for _ in range(args.connections):
+                    holders.append(asyncio.create_task(hold_sse(client, base_url, accepted, release)))
+                await asyncio.sleep(args.settle)
+
+                latencies = []
+                errors = 0
+                queue = asyncio.Queue()
+                for i in range(args.requests):
+                    queue.put_nowait(i)
+
+                params = {'uri': f"overleaf-remote:///projects/{project_id}/documents/main.tex"}
+
+                async def worker(worker_client: httpx.AsyncClient) -> None:
+                    nonlocal errors
+                    while True:
+                        try:
+                            queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            return
+                        start = time.perf_counter()
+                        try:
+                            result = await rpc(worker_client, base_url, 'resources/read', params)
+                            if 'result' not in result:
+                                errors += 1
+                        except (httpx.TransportError, ValueError):
+                            errors += 1
+                        latencies.append((time.perf_counter() - start) * 1000)
+
+                # One warmed-up client per worker: a single shared httpx pool
+                # serves concurrent requests unfairly and skews the tail
+                workers = [httpx.AsyncClient(timeout=timeout) for _ in range(args.concurrency)]
+                try:
+                    await asyncio.gather(*(rpc(c, base_url, 'ping', {}) for c in workers))
+                    started = time.perf_counter()
+                    await asyncio.gather(*(worker(c) for c in workers))
+                    elapsed = time.perf_counter() - started
+                finally:
+                    await asyncio.gather(*(c.aclose() for c in workers))
+
+                release.set()
+                for task in holders:
+                    task.cancel()
+                await asyncio.gather(*holders, return_exceptions=True)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    latencies.sort()
+    return {
+        'sse': len(accepted),
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        'errors': errors
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=200, help='idle SSE clients to hold open')
+    parser.add_argument('--requests', type=int, default=2000, help='JSON-RPC requests to send')
+    parser.add_argument('--concurrency', type=int, default=50, help='concurrent JSON-RPC clients')
+    parser.add_argument('--settle', type=float, default=2.0, help='seconds to wait for SSE clients to connect')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout in seconds')
+    parser.add_argument('--servers', default='flask,asgi', help='comma-separated transports to test')
+    args = parser.parse_args()
+
+    print(f"{args.connections} idle SSE clients, {args.requests} resources/read requests, "
+          f"concurrency {args.concurrency}")
+    print(f"\n{'server':<8}{'SSE held':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    print("-" * 56)
+
+    for name in args.servers.split(','):
+        result = asyncio.run(run(name, args))
+        print(f"{name:<8}{result['sse']:>10}{result['rps']:>10.0f}{result['p50']:>10.2f}"
+              f"{result['p99']:>10.2f}{result['errors']:>8}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
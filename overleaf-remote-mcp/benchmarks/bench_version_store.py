@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Version History Storage Benchmark
+
+Simulates an agent editing one large chapter many times and compares the
+original full-copy version rows against reverse-delta storage with keyframes:
+database size, write latency per save, and reconstruction latency for the
+oldest and a mid-history version.
+
+Usage:
+    python benchmarks/bench_version_store.py [--size-kb 200] [--edits 500] [--keyframe 50]
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.services.blob_store import BlobStore
+from src.services.version_store import VersionStore
+
+SCHEMA = '''
+    CREATE TABLE documents (id TEXT PRIMARY KEY, content TEXT);
+    CREATE TABLE versions (
+        id TEXT PRIMARY KEY,
+        document_id TEXT NOT NULL,
+        version_number INTEGER NOT NULL,
+        content TEXT,
+        content_hash TEXT,
+        delta BLOB,
+        is_keyframe INTEGER DEFAULT 0,
+        commit_message TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX idx_versions_document ON versions (document_id, version_number);
+    CREATE TABLE blobs (
+        hash TEXT PRIMARY KEY,
+        data BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+def make_chapter(size_kb: int, rng: random.Random) -> list:
+    """Build a chapter as a list of LaTeX-ish lines of roughly size_kb."""
+    words = "the of model results we show that equation figure table data analysis".split()
+    lines = []
+    size = 0
+    while size < size_kb * 1024:
+        line = " ".join(rng.choice(words) for _ in range(12)) + ".\n"
+        lines.append(line)
+        size += len(line)
+    return lines
+
+def edit(lines: list, rng: random.Random) -> list:
+    """Apply a small agent-style edit: rewrite, insert or delete a line."""
+    lines = list(lines)
+    index = rng.randrange(len(lines))
+    action = rng.random()
+    if action < 0.6:
+        lines[index] = lines[index].rstrip("\n") + " (revised)\n"
+    elif action < 0.85:
+        lines.insert(index, "\\label{eq:%d} new sentence added.\n" % rng.randrange(10000))
+    else:
+        del lines[index]
+    return lines
+
+def run(mode: str, db_path: str, history: list, keyframe: int) -> dict:
+    """Write the history in the given mode and return measurements."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    store = VersionStore(BlobStore(), keyframe)
+    document_id = 'doc'
+    conn.execute("INSERT INTO documents (id, content) VALUES (?, ?)", (document_id, history[0]))
+
+    write_samples = []
+    for number, new_content in enumerate(history[1:], start=1):
+        old_content = history[number - 1]
+        start = time.perf_counter()
+        conn.execute("BEGIN")
+        if mode == 'full':
+            conn.execute('''
+                INSERT INTO versions (id, document_id, version_number, content, is_keyframe)
+                VALUES (?, ?, ?, ?, 1)
+            ''', (str(uuid.uuid4()), document_id, number, old_content))
+        else:
+            store.record(conn, document_id, old_content, new_content)
+        conn.execute("UPDATE documents SET content = ? WHERE id = ?", (new_content, document_id))
+        conn.execute("COMMIT")
+        write_samples.append((time.perf_counter() - start) * 1000)
+
+    current = history[-1]
+    reconstruct = {}
+    for label, number in (("oldest", 1), ("middle", len(history) // 2)):
+        samples = []
+        for _ in range(20):
+            start = time.perf_counter()
+            content = store.reconstruct(conn, document_id, number, current)
+            samples.append((time.perf_counter() - start) * 1000)
+        assert content == history[number - 1], f"{mode}: version {number} mismatch"
+        reconstruct[label] = statistics.median(samples)
+
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.close()
+
+    return {
+        'db_mb': os.path.getsize(db_path) / (1024 * 1024),
+        'write_ms': statistics.median(write_samples),
+        'write_p99_ms': sorted(write_samples)[int(len(write_samples) * 0.99) - 1],
+        'reconstruct': reconstruct
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-kb', type=int, default=200)
+    parser.add_argument('--edits', type=int, default=500)
+    parser.add_argument('--keyframe', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    lines = make_chapter(args.size_kb, rng)
+    history = ["".join(lines)]
+    for _ in range(args.edits):
+        lines = edit(lines, rng)
+        history.append("".join(lines))
+
+    print(f"Document: {len(history[0]) // 1024} KB, {args.edits} edits, keyframe every {args.keyframe}")
+    print(f"\n{'storage':<10}{'db MB':>10}{'write ms':>10}{'p99 ms':>10}{'oldest ms':>11}{'middle ms':>11}")
+    print("-" * 62)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ('full', 'delta'):
+            result = run(mode, os.path.join(tmp, f"{mode}.db"), history, args.keyframe)
+            print(f"{mode:<10}{result['db_mb']:>10.2f}{result['write_ms']:>10.2f}{result['write_p99_ms']:>10.2f}"
+                  f"{result['reconstruct']['oldest']:>11.2f}{result['reconstruct']['middle']:>11.2f}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
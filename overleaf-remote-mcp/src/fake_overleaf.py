@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Fake Overleaf Server
+
+A self-contained, in-memory stand-in for the Overleaf HTTP API spoken by
+src.services.overleaf_client, for integration tests and benchmarks. Point
+the MCP server at it with OVERLEAF_API_URL. Every request can be delayed,
+bodies can be throttled to a bandwidth, and a share of requests can fail
+with 503, to exercise timeouts, retries and the circuit breaker. Compiles
+take a configurable time and produce a PDF sized after the project, and
+projects of a given size can be seeded at startup. Run with:
+
+    python -m src.fake_overleaf --port 8090 [--latency-ms 50] [--error-rate 0.05]
+        [--bandwidth-kbps 1024] [--compile-ms 500] [--projects 5 --files 200 --file-size 4096]
+
+API (all routes require HTTP Basic credentials):
+
+    GET    /api/user                               -> {id, email, name}
+    GET    /api/projects                           -> {projects: [...]}
+    POST   /api/projects          {name, template} -> project (201)
+    GET    /api/projects/{id}                      -> project with its files
+    GET    /api/projects/{id}/files/{path}         -> file content, ETag: revision
+    PUT    /api/projects/{id}/files/{path}  body   -> {revision}
+    DELETE /api/projects/{id}/files/{path}         -> 204
+    POST   /api/projects/{id}/compile              -> compile result with output files
+    GET    /api/projects/{id}/compile              -> status of the last compile
+    GET    /api/projects/{id}/output/{name}        -> output.pdf or output.log
+"""
+
+import time
+import base64
+import socket
+import random
+import asyncio
+import argparse
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# File types by extension, as reported in project listings
+FILE_TYPES = {'tex': 'tex', 'bib': 'bib', 'txt': 'txt', 'cls': 'tex', 'sty': 'tex',
+              'png': 'image', 'jpg': 'image', 'jpeg': 'image', 'pdf': 'image'}
+
+def file_type(path: str) -> str:
+    """Get the Overleaf file type of a path."""
+    extension = path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+    return FILE_TYPES.get(extension, 'other')
+
+class FakeOverleaf:
+    """
+    In-memory Overleaf projects behind a Starlette app.
+
+    Attributes may be changed while the server runs: latency (seconds added
+    to every request), bandwidth (bytes per second for each request and
+    response body, like a per-connection link; 0 for unlimited), error_rate (share of requests answered with
+    503), fail_next (number of upcoming requests that fail with 503) and
+    compile_time (seconds a compile takes).
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None,
+                 bandwidth: int = 0, compile_time: float = 0.0):
+        """
+        Initialize the fake service.
+
+        Args:
+            latency: Seconds added to every request
+            error_rate: Share of requests (0..1) answered with 503
+            seed: Seed for the failure injection, for repeatable runs
+            bandwidth: Bytes per second for each body (0: unlimited)
+            compile_time: Seconds a compile takes
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.bandwidth = bandwidth
+        self.compile_time = compile_time
+        self.fail_next = 0
+        self.random = random.Random(seed)
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        self.revision = 0
+
+        # Request accounting
+        self.requests: Dict[str, int] = {}
+        self.failures = 0
+        self.inflight = 0
+        self.max_inflight = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.compiles = 0
+
+        self.app = Starlette(routes=[
+            Route('/api/user', self.get_user, methods=['GET']),
+            Route('/api/projects', self.list_projects, methods=['GET']),
+            Route('/api/projects', self.create_project, methods=['POST']),
+            Route('/api/projects/{project_id}', self.get_project, methods=['GET']),
+            Route('/api/projects/{project_id}/files/{path:path}', self.get_file, methods=['GET']),
+            Route('/api/projects/{project_id}/files/{path:path}', self.put_file, methods=['PUT']),
+            Route('/api/projects/{project_id}/files/{path:path}', self.delete_file, methods=['DELETE']),
+            Route('/api/projects/{project_id}/compile', self.compile, methods=['POST']),
+            Route('/api/projects/{project_id}/compile', self.compile_status, methods=['GET']),
+            Route('/api/projects/{project_id}/output/{name}', self.get_output, methods=['GET']),
+        ])
+        self.app.add_middleware(_Injector, fake=self)
+
+    def request_count(self, method: str = '*') -> int:
+        """Number of requests received, in total or for one HTTP method."""
+        if method == '*':
+            return sum(self.requests.values())
+        return self.requests.get(method, 0)
+
+    def next_revision(self) -> str:
+        """Allocate a file revision."""
+        self.revision += 1
+        return str(self.revision)
+
+    def add_project(self, name: str, files: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Create a project directly, e.g. to seed a pull.
+
+        Args:
+            name: Project name
+            files: Content by path
+
+        Returns:
+            The project record
+        """
+        project_id = f"ol{len(self.projects) + 1:06d}"
+        now = datetime.utcnow().isoformat()
+        project = {'id': project_id, 'name': name, 'created': now, 'modified': now,
+                   'owner': 'fake_user', 'collaborators': [], 'files': {}, 'output': None}
+        for path, content in (files or {}).items():
+            project['files'][path] = {'content': content, 'revision': self.next_revision()}
+        self.projects[project_id] = project
+        return project
+
+    def seed_projects(self, count: int, files: int, file_size: int) -> List[Dict[str, Any]]:
+        """
+        Create projects of a given size: a main.tex that inputs every section.
+
+        Args:
+            count: Number of projects
+            files: Section files per project
+            file_size: Bytes per section file
+
+        Returns:
+            The project records
+        """
+        projects = []
+        line = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n'
+        body = (line * (file_size // len(line) + 1))[:file_size]
+        for n in range(count):
+            sections = {f'sections/s{i:04d}.tex': f'\\section{{Section {i}}}\n{body}'[:max(file_size, 1)]
+                        for i in range(files)}
+            inputs = ''.join(f'\\input{{{path[:-4]}}}\n' for path in sections)
+            sections['main.tex'] = ('\\documentclass{article}\n\\begin{document}\n' + inputs +
+                                    '\\end{document}\n')
+            projects.append(self.add_project(f'Seeded project {n + 1}', sections))
+        return projects
+
+    def describe(self, project: Dict[str, Any], with_files: bool = True) -> Dict[str, Any]:
+        """Get the JSON representation of a project."""
+        result = {key: value for key, value in project.items() if key not in ('files', 'output')}
+        if with_files:
+            result['files'] = [
+                {'name': path, 'type': file_type(path), 'size': len(entry['content'].encode('utf-8')),
+                 'revision': entry['revision']}
+                for path, entry in sorted(project['files'].items())
+            ]
+        return result
+
+    def _project(self, request: Request) -> Optional[Dict[str, Any]]:
+        return self.projects.get(request.path_params['project_id'])
+
+    # Routes
+
+    async def get_user(self, request: Request) -> Response:
+        return JSONResponse({'id': 'fake_user', 'email': request.state.user, 'name': 'Fake User'})
+
+    async def list_projects(self, request: Request) -> Response:
+        return JSONResponse({'projects': [self.describe(p, with_files=False) for p in self.projects.values()]})
+
+    async def create_project(self, request: Request) -> Response:
+        body = await request.json()
+        if not isinstance(body, dict) or not body.get('name'):
+            return JSONResponse({'error': 'name is required'}, status_code=400)
+        project = self.add_project(body['name'])
+        project['template'] = body.get('template')
+        return JSONResponse(self.describe(project), status_code=201)
+
+    async def get_project(self, request: Request) -> Response:
+        project = self._project(request)
+        if project is None:
+            return JSONResponse({'error': 'project not found'}, status_code=404)
+        return JSONResponse(self.describe(project))
+
+    async def get_file(self, request: Request) -> Response:
+        project = self._project(request)
+        entry = project['files'].get(request.path_params['path']) if project else None
+        if entry is None:
+            return JSONResponse({'error': 'file not found'}, status_code=404)
+        return Response(entry['content'], media_type='text/plain; charset=utf-8',
+                        headers={'ETag': f'"{entry["revision"]}"'})
+
+    async def put_file(self, request: Request) -> Response:
+        project = self._project(request)
+        if project is None:
+            return JSONResponse({'error': 'project not found'}, status_code=404)
+        content = (await request.body()).decode('utf-8')
+        revision = self.next_revision()
+        project['files'][request.path_params['path']] = {'content': content, 'revision': revision}
+        project['modified'] = datetime.utcnow().isoformat()
+        return JSONResponse({'revision': revision})
+
+    async def delete_file(self, request: Request) -> Response:
+        project = self._project(request)
+        if project is None or project['files'].pop(request.path_params['path'], None) is None:
+            return JSONResponse({'error': 'file not found'}, status_code=404)
+        return Response(status_code=204)
+
+    async def compile(self, request: Request) -> Response:
+        project = self._project(request)
+        if project is None:
+            return JSONResponse({'error': 'project not found'}, status_code=404)
+        if self.compile_time:
+            await asyncio.sleep(self.compile_time)
+        self.compiles += 1
+
+        main = project['files'].get('main.tex')
+        source_bytes = sum(len(entry['content'].encode('utf-8')) for entry in project['files'].values())
+        if main is None:
+            errors = ['! LaTeX Error: File `main.tex\' not found.']
+        elif '\\begin{document}' not in main['content']:
+            errors = ['! LaTeX Error: Missing \\begin{document}.']
+        else:
+            errors = []
+
+        log = '\n'.join([f"This is pdfTeX (fake Overleaf), {len(project['files'])} files, {source_bytes} bytes"]
+                        + errors + ['Output written on output.pdf.' if not errors else 'No pages of output.'])
+        outputs = {'output.log': log.encode('utf-8')}
+        if not errors:
+            # Roughly one page per 3 KB of source
+            pages = max(1, source_bytes // 3000)
+            outputs['output.pdf'] = (b'%PDF-1.5\n' + b'% fake page\n' * (pages * 64) + b'%%EOF\n')
+
+        project['output'] = {
+            'status': 'failure' if errors else 'success',
+            'compile_id': str(self.compiles),
+            'compiled_at': datetime.utcnow().isoformat(),
+            'files': outputs,
+            'errors': errors
+        }
+        return JSONResponse(self._compile_result(project))
+
+    def _compile_result(self, project: Dict[str, Any]) -> Dict[str, Any]:
+        output = project['output']
+        return {
+            'status': output['status'],
+            'compile_id': output['compile_id'],
+            'compiled_at': output['compiled_at'],
+            'output_files': [
+                {'name': name, 'size': len(data), 'url': f"/api/projects/{project['id']}/output/{name}"}
+                for name, data in sorted(output['files'].items())
+            ],
+            'warnings': [],
+            'errors': output['errors']
+        }
+
+    async def compile_status(self, request: Request) -> Response:
+        project = self._project(request)
+        if project is None:
+            return JSONResponse({'error': 'project not found'}, status_code=404)
+        if project['output'] is None:
+            return JSONResponse({'status': 'never_compiled', 'pdf_available': False, 'log_available': False})
+        result = self._compile_result(project)
+        files = project['output']['files']
+        result.update({'pdf_available': 'output.pdf' in files, 'log_available': 'output.log' in files})
+        return JSONResponse(result)
+
+    async def get_output(self, request: Request) -> Response:
+        project = self._project(request)
+        name = request.path_params['name']
+        data = project['output']['files'].get(name) if project and project['output'] else None
+        if data is None:
+            return JSONResponse({'error': 'output not found'}, status_code=404)
+        media_type = 'application/pdf' if name.endswith('.pdf') else 'text/plain; charset=utf-8'
+        return Response(data, media_type=media_type)
+
+class _Injector:
+    """ASGI middleware that authenticates, counts, delays and fails requests."""
+
+    def __init__(self, app, fake: FakeOverleaf):
+        self.app = app
+        self.fake = fake
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        fake = self.fake
+        method = scope['method']
+        fake.requests[method] = fake.requests.get(method, 0) + 1
+        fake.inflight += 1
+        fake.max_inflight = max(fake.max_inflight, fake.inflight)
+        try:
+            if fake.latency:
+                await asyncio.sleep(fake.latency)
+
+            headers = dict(scope['headers'])
+            authorization = headers.get(b'authorization', b'').decode('latin-1')
+            if not authorization.startswith('Basic '):
+                response = JSONResponse({'error': 'authentication required'}, status_code=401)
+                return await response(scope, receive, send)
+
+            if fake.fail_next > 0 or (fake.error_rate and fake.random.random() < fake.error_rate):
+                fake.fail_next = max(0, fake.fail_next - 1)
+                fake.failures += 1
+                response = JSONResponse({'error': 'injected failure'}, status_code=503)
+                return await response(scope, receive, send)
+
+            scope.setdefault('state', {})['user'] = base64.b64decode(authorization[6:]).decode().split(':')[0]
+            await self.app(scope, self._throttled(receive, 'bytes_received'),
+                           self._throttled(send, 'bytes_sent', outbound=True))
+        finally:
+            fake.inflight -= 1
+
+    def _throttled(self, channel, counter: str, outbound: bool = False):
+        """Wrap receive or send to count body bytes and hold them to the bandwidth."""
+        fake = self.fake
+
+        async def throttled(message=None):
+            if not outbound:
+                message = await channel()
+            size = len(message.get('body', b''))
+            setattr(fake, counter, getattr(fake, counter) + size)
+            if size and fake.bandwidth:
+                await asyncio.sleep(size / fake.bandwidth)
+            return await channel(message) if outbound else message
+
+        return throttled
+
+class FakeOverleafServer:
+    """
+    Serve a FakeOverleaf on a local port from a background thread.
+
+    Use as a context manager; url is the value for OVERLEAF_API_URL.
+    """
+
+    def __init__(self, fake: Optional[FakeOverleaf] = None, host: str = '127.0.0.1', port: int = 0):
+        self.fake = fake or FakeOverleaf()
+        self.host = host
+        if not port:
+            with socket.socket() as sock:
+                sock.bind((host, 0))
+                port = sock.getsockname()[1]
+        self.port = port
+        self.url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(self.fake.app, host=host, port=port,
+                                                     log_level='warning', access_log=False))
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'FakeOverleafServer':
+        """Start serving and wait until the port accepts connections."""
+        self._thread = threading.Thread(target=self._server.run, name='fake-overleaf', daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake Overleaf server did not start")
+            time.sleep(0.02)
+        return self
+
+    def stop(self) -> None:
+        """Stop serving."""
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def __enter__(self) -> 'FakeOverleafServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency-ms', type=float, default=0, help='delay added to every request')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of requests failing with 503')
+    parser.add_argument('--seed', type=int, default=None, help='seed for failure injection')
+    parser.add_argument('--bandwidth-kbps', type=float, default=0, help='body throughput in KiB/s (0: unlimited)')
+    parser.add_argument('--compile-ms', type=float, default=0, help='time a compile takes')
+    parser.add_argument('--projects', type=int, default=0, help='projects to seed')
+    parser.add_argument('--files', type=int, default=20, help='section files per seeded project')
+    parser.add_argument('--file-size', type=int, default=2048, help='bytes per seeded section file')
+    args = parser.parse_args()
+
+    fake = FakeOverleaf(latency=args.latency_ms / 1000, error_rate=args.error_rate, seed=args.seed,
+                        bandwidth=int(args.bandwidth_kbps * 1024), compile_time=args.compile_ms / 1000)
+    for project in fake.seed_projects(args.projects, args.files, args.file_size):
+        print(f"Seeded {project['id']} with {len(project['files'])} files")
+    print(f"Fake Overleaf serving on http://{args.host}:{args.port} (OVERLEAF_API_URL)")
+    uvicorn.run(fake.app, host=args.host, port=args.port, log_level='warning')
+
+if __name__ == '__main__':
+    main()
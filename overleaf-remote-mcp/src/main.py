@@ -15,7 +15,9 @@ from flask_cors import CORS
 
 from src.utils.config import Config
 from src.utils.logger import setup_logging
+from src.utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
 from src.services.mcp_server import MCPServer
+from src.services.admission import AdmissionController
 from src.routes.mcp import mcp_bp
 from src.routes.sse import sse_bp
 
@@ -48,6 +50,11 @@ app.register_blueprint(sse_bp, url_prefix='/sse')
 # Make sure mcp_server is available to blueprints
 app.mcp_server = mcp_server
 
+# Admission control for the JSON-RPC routes; Flask also caps chunked bodies
+app.admission = AdmissionController.from_config(config)
+app.config['MAX_CONTENT_LENGTH'] = config.MAX_REQUEST_SIZE or None
+mcp_server.add_metrics_source('mcp_admission', lambda: app.admission.stats())
+
 # --- Authentication Middleware ---
 @app.before_request
 def handle_auth():
@@ -80,6 +87,11 @@ def health_check():
         "server_version": "1.0.0"
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Metrics endpoint in the Prometheus text format."""
+    return Response(mcp_server.render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
 # OAuth endpoints removed for authless configuration
 
 @app.route('/.well-known/model-context-protocol', methods=['GET'])
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Overleaf Remote MCP Server - ASGI Entry Point
+
+This module serves the MCP JSON-RPC and SSE endpoints with Starlette on
+uvicorn. Requests are handled asynchronously and blocking document work runs
+on a bounded thread pool, so idle SSE clients cost a coroutine rather than a
+thread. Run with:
+
+    python -m src.main_asgi
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+from src.utils.config import Config
+from src.utils.logger import setup_logging
+from src.utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from src.services.mcp_server import MCPServer
+from src.services.admission import AdmissionController
+from src.services.session_manager import SessionManager
+from src.services.subscriptions import ResourceNotifier
+from src.routes.asgi import AdmissionMiddleware, rpc_routes, sse_routes
+
+# --- Configuration and Logging Setup ---
+config = Config()
+setup_logging(config.LOG_LEVEL, config.LOG_FILE)
+logger = logging.getLogger(__name__)
+
+# --- MCP Server Initialization ---
+mcp_server = MCPServer(config)
+
+# Seconds between idle SSE session sweeps
+REAP_INTERVAL = 60
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    """Start the worker pool, SSE sessions and MCP server, and shut them down on exit."""
+    executor = ThreadPoolExecutor(max_workers=config.WORKER_THREADS, thread_name_prefix='mcp-worker')
+    app.state.executor = executor
+    sessions = SessionManager(
+        queue_size=config.SSE_QUEUE_SIZE,
+        send_timeout=config.SSE_SEND_TIMEOUT,
+        idle_timeout=config.SSE_IDLE_TIMEOUT,
+        max_sessions=config.SSE_MAX_SESSIONS
+    )
+    app.state.sessions = sessions
+    app.state.admission = AdmissionController.from_config(config)
+    loop = asyncio.get_running_loop()
+
+    logger.info("Initializing Overleaf Remote MCP Server...")
+    await loop.run_in_executor(executor, mcp_server.initialize)
+    logger.info(f"Server initialization completed successfully ({config.WORKER_THREADS} worker threads)")
+
+    # Push resources/updated notifications for subscribed sessions
+    def deliver(session_id, message):
+        session = sessions.get(session_id)
+        return session.offer(message) if session is not None else True
+
+    notifier = ResourceNotifier(
+        mcp_server.subscriptions,
+        mcp_server.resource_manager.change_uris,
+        deliver,
+        debounce=config.NOTIFY_DEBOUNCE_MS / 1000,
+        max_delay=config.NOTIFY_MAX_DELAY_MS / 1000
+    )
+    notifier.start(loop)
+    app.state.notifier = notifier
+    mcp_server.document_service.events.subscribe(notifier.on_change)
+    sessions.on_close.append(mcp_server.subscriptions.remove_session)
+
+    mcp_server.add_metrics_source('mcp_admission', app.state.admission.stats)
+    mcp_server.add_metrics_source('mcp_sse_sessions', sessions.stats)
+    mcp_server.add_metrics_source('mcp_notifications', notifier.stats)
+
+    reaper = asyncio.create_task(sessions.run_reaper(REAP_INTERVAL))
+    try:
+        yield
+    finally:
+        reaper.cancel()
+        mcp_server.document_service.events.unsubscribe(notifier.on_change)
+        notifier.stop()
+        sessions.close_all()
+        await loop.run_in_executor(executor, mcp_server.shutdown)
+        executor.shutdown(wait=True)
+
+# --- Routes ---
+async def health_check(request: Request) -> JSONResponse:
+    """Health check endpoint."""
+    return JSONResponse({
+        "status": "ok",
+        "timestamp": datetime.now().isoformat(),
+        "server_version": "1.0.0"
+    })
+
+async def metrics(request: Request) -> Response:
+    """Metrics endpoint in the Prometheus text format."""
+    return Response(mcp_server.render_metrics(), headers={'Content-Type': METRICS_CONTENT_TYPE})
+
+async def mcp_discovery(request: Request) -> JSONResponse:
+    """MCP discovery endpoint - authless version."""
+    scheme = request.headers.get('x-forwarded-proto', request.url.scheme)
+    host = request.headers.get('x-forwarded-host', request.headers.get('host', request.url.netloc))
+    base_url = f"{scheme}://{host}"
+
+    return JSONResponse({
+        "protocolVersion": "2024-11-05",
+        "capabilities": {
+            "resources": {"subscribe": True, "listChanged": True},
+            "tools": {"listChanged": True},
+            "prompts": {"listChanged": True}
+        },
+        "serverInfo": {
+            "name": "overleaf-remote-mcp",
+            "version": "1.0.0",
+            "description": "Overleaf Remote MCP Server"
+        },
+        "instructions": f"Connect to {base_url}/sse/ for SSE transport"
+    })
+
+static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+app = Starlette(
+    routes=[
+        Route('/health', health_check, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/.well-known/model-context-protocol', mcp_discovery, methods=['GET']),
+        *rpc_routes,
+        *sse_routes,
+        Mount('/', StaticFiles(directory=static_folder, html=True, check_dir=False))
+    ],
+    middleware=[
+        # Enable CORS for all origins, allowing Claude.ai to connect
+        Middleware(
+            CORSMiddleware,
+            allow_origins=["*"],
+            allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            allow_headers=["Content-Type", "Authorization", "X-Requested-With", "Accept", "Origin"],
+            expose_headers=["Content-Range", "X-Content-Range"]
+        ),
+        # Size limit, load shedding and rate limits for JSON-RPC POSTs
+        Middleware(AdmissionMiddleware)
+    ],
+    lifespan=lifespan
+)
+app.state.mcp_server = mcp_server
+
+# --- Main Execution ---
+if __name__ == '__main__':
+    logger.info(f"Starting Overleaf Remote MCP Server (ASGI) on {config.SERVER_HOST}:{config.SERVER_PORT}")
+    uvicorn.run(app, host=config.SERVER_HOST, port=config.SERVER_PORT,
+                log_level=config.LOG_LEVEL.lower(), access_log=config.DEBUG)
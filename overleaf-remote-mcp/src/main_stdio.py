@@ -4,80 +4,202 @@ Overleaf Remote MCP Server - Stdio Transport for Claude Desktop
 
 This module provides stdio transport for the Overleaf Remote MCP Server,
 compatible with Claude Desktop's MCP configuration.
+
+The MCP SDK handles every request in its own task, so blocking service calls
+are run on a pool of MCP_WORKER_THREADS threads to keep one slow request
+(a large listing, a sync) from stalling the others. A request cancelled with
+notifications/cancelled is dropped if its call has not started yet.
+
+Only the MCP SDK is loaded before the initialize request is answered. The
+server components (managers, services, the database and catalogs) are
+imported and set up on a worker thread once the client confirms the
+handshake with notifications/initialized, or by the first request that
+needs them, whichever comes first.
 """
 
 import asyncio
-import json
 import logging
 import sys
-from typing import Any, Dict, Optional, Union
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Optional
 
+import anyio
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
+from mcp.shared.session import RequestResponder
 from mcp.types import (
-    Resource, Tool, Prompt, TextContent, ImageContent, EmbeddedResource,
-    CallToolResult, GetPromptResult, ListResourcesResult, ListToolsResult, 
-    ListPromptsResult, ReadResourceResult
+    ResourceTemplate, Tool, Prompt, TextContent, ImageContent, EmbeddedResource,
+    GetPromptResult, InitializedNotification, ListResourcesResult, ListResourcesRequest, ServerResult
 )
 
 from src.utils.config import Config
 from src.utils.logger import setup_logging
-from src.services.mcp_server import MCPServer
+from src.utils.metrics import REQUEST_ERRORS, REQUEST_SECONDS, async_timed
+
+if TYPE_CHECKING:
+    from src.services.mcp_server import MCPServer
 
 # Configuration and Logging Setup
 config = Config()
 setup_logging(config.LOG_LEVEL, config.LOG_FILE)
 logger = logging.getLogger(__name__)
 
+class CancellableServer(Server):
+    """
+    MCP server that survives notifications/cancelled.
+
+    The SDK cancels a request by cancelling the scope of its responder, but
+    the responder does not suppress the resulting cancellation, which then
+    escapes the request's task and takes down the whole session. Absorb it
+    here when it belongs to a request the client cancelled.
+
+    This overrides a private method of the SDK's Server; the SDK is pinned in
+    requirements, and test_stdio_concurrency checks that the method still
+    exists with this signature and is what Server.run dispatches to.
+    """
+
+    async def _handle_message(self, message, session, lifespan_context, raise_exceptions=False):
+        try:
+            await super()._handle_message(message, session, lifespan_context, raise_exceptions)
+        except anyio.get_cancelled_exc_class():
+            if isinstance(message, RequestResponder) and message.cancelled:
+                logger.info(f"Request {message.request_id} cancelled by client")
+                return
+            raise
+
 # Create MCP Server instance
-server = Server("overleaf-remote-mcp")
+server = CancellableServer("overleaf-remote-mcp")
+
+# Our MCP server components, set once initialized (see load_services)
+mcp_server: Optional['MCPServer'] = None
+_services_lock = threading.Lock()
 
-# Initialize our MCP server components
-mcp_server = MCPServer(config)
+# Worker threads for blocking service calls
+executor = ThreadPoolExecutor(max_workers=config.WORKER_THREADS, thread_name_prefix='mcp-worker')
 
-@server.list_resources()
-async def handle_list_resources() -> list[Resource]:
-    """Handle resources/list requests."""
+def load_services() -> 'MCPServer':
+    """
+    Import, create and initialize the MCP server components, once.
+
+    Blocking: opens the database and builds the catalogs, so it runs on a
+    worker thread.
+
+    Returns:
+        The initialized MCP server components
+    """
+    global mcp_server
+    with _services_lock:
+        if mcp_server is None:
+            from src.services.mcp_server import MCPServer
+            
+            components = MCPServer(config)
+            components.initialize()
+            mcp_server = components
+            logger.info("MCP server components initialized successfully")
+    return mcp_server
+
+async def run_blocking(func, *args, **kwargs) -> Any:
+    """
+    Run a blocking service call on the worker pool.
+
+    If the request is cancelled while the call is still queued, the call never
+    runs; a call that already started finishes in its thread and its result
+    is discarded.
+
+    Args:
+        func: Synchronous function to call
+        *args: Positional arguments
+        **kwargs: Keyword arguments
+
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+    except asyncio.CancelledError:
+        logger.debug(f"Cancelled blocking call: {getattr(func, '__name__', func)}")
+        raise
+
+async def services() -> 'MCPServer':
+    """Get the MCP server components, waiting for their initialization if needed."""
+    if mcp_server is not None:
+        return mcp_server
+    return await run_blocking(load_services)
+
+async def handle_initialized(notification: InitializedNotification) -> None:
+    """Set up the server components once the handshake is complete."""
+    try:
+        await services()
+    except Exception as e:
+        logger.error(f"Failed to initialize MCP server components: {e}")
+
+server.notification_handlers[InitializedNotification] = handle_initialized
+
+@async_timed(REQUEST_SECONDS, REQUEST_ERRORS, 'resources/list')
+async def handle_list_resources(request: ListResourcesRequest) -> ServerResult:
+    """Handle resources/list requests, one cursor page at a time."""
     try:
         logger.debug("Handling list_resources request")
-        # Call the sync method and return the resources
-        result = mcp_server.resource_manager.list_resources()
-        return result
+        # The list_resources() decorator drops the cursor, so register directly
+        cursor = request.params.cursor if request.params else None
+        components = await services()
+        resources, next_cursor = await run_blocking(components.resource_manager.list_resources_page, cursor)
+        return ServerResult(ListResourcesResult(resources=resources, nextCursor=next_cursor))
     except Exception as e:
         logger.error(f"Error in list_resources: {e}")
         raise
 
+server.request_handlers[ListResourcesRequest] = handle_list_resources
+
+@server.list_resource_templates()
+@async_timed(REQUEST_SECONDS, REQUEST_ERRORS, 'resources/templates/list')
+async def handle_list_resource_templates() -> list[ResourceTemplate]:
+    """Handle resources/templates/list requests."""
+    try:
+        logger.debug("Handling list_resource_templates request")
+        components = await services()
+        return await run_blocking(components.resource_manager.list_resource_templates)
+    except Exception as e:
+        logger.error(f"Error in list_resource_templates: {e}")
+        raise
+
 @server.read_resource()
+@async_timed(REQUEST_SECONDS, REQUEST_ERRORS, 'resources/read')
 async def handle_read_resource(uri: str) -> str:
     """Handle resources/read requests."""
     try:
         logger.debug(f"Handling read_resource request for URI: {uri}")
-        # Call the sync method
-        result = mcp_server.resource_manager.read_resource(uri)
+        components = await services()
+        result = await run_blocking(components.resource_manager.read_resource, uri)
         return result
     except Exception as e:
         logger.error(f"Error in read_resource: {e}")
         raise
 
 @server.list_tools()
+@async_timed(REQUEST_SECONDS, REQUEST_ERRORS, 'tools/list')
 async def handle_list_tools() -> list[Tool]:
     """Handle tools/list requests."""
     try:
         logger.debug("Handling list_tools request")
-        # Call the sync method
-        result = mcp_server.tool_manager.list_tools()
+        # Served from the tool manager's in-memory cache
+        result = (await services()).tool_manager.list_tools()
         return result
     except Exception as e:
         logger.error(f"Error in list_tools: {e}")
         raise
 
 @server.call_tool()
+@async_timed(REQUEST_SECONDS, REQUEST_ERRORS, 'tools/call')
 async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | ImageContent | EmbeddedResource]:
     """Handle tools/call requests."""
     try:
         logger.debug(f"Handling call_tool request for tool: {name}")
-        # Call the sync method
-        result = mcp_server.tool_manager.call_tool(name, arguments)
+        components = await services()
+        result = await run_blocking(components.tool_manager.call_tool, name, arguments)
         
         # Convert result to proper MCP types
         content_list = []
@@ -96,24 +218,26 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
         raise
 
 @server.list_prompts()
+@async_timed(REQUEST_SECONDS, REQUEST_ERRORS, 'prompts/list')
 async def handle_list_prompts() -> list[Prompt]:
     """Handle prompts/list requests."""
     try:
         logger.debug("Handling list_prompts request")
-        # Call the sync method
-        result = mcp_server.prompt_manager.list_prompts()
+        # Served from the prompt manager's in-memory cache
+        result = (await services()).prompt_manager.list_prompts()
         return result
     except Exception as e:
         logger.error(f"Error in list_prompts: {e}")
         raise
 
 @server.get_prompt()
+@async_timed(REQUEST_SECONDS, REQUEST_ERRORS, 'prompts/get')
 async def handle_get_prompt(name: str, arguments: Optional[dict] = None) -> GetPromptResult:
     """Handle prompts/get requests."""
     try:
         logger.debug(f"Handling get_prompt request for prompt: {name}")
-        # Call the sync method
-        result = mcp_server.prompt_manager.get_prompt(name, arguments or {})
+        components = await services()
+        result = await run_blocking(components.prompt_manager.get_prompt, name, arguments or {})
         
         # Convert result to GetPromptResult if needed
         if isinstance(result, dict):
@@ -143,13 +267,7 @@ async def handle_get_prompt(name: str, arguments: Optional[dict] = None) -> GetP
 async def main():
     """Main function to run the MCP server with stdio transport."""
     try:
-        logger.info("Initializing Overleaf Remote MCP Server (stdio transport)...")
-        
-        # Initialize MCP server components
-        mcp_server.initialize()
-        logger.info("MCP server components initialized successfully")
-        
-        # Run the server with stdio transport
+        # The server components are set up after the handshake
         logger.info("Starting MCP server with stdio transport...")
         async with stdio_server() as (read_stream, write_stream):
             await server.run(
@@ -161,6 +279,8 @@ async def main():
     except Exception as e:
         logger.error(f"Error running MCP server: {e}")
         sys.exit(1)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
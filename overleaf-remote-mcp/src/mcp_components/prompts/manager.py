@@ -6,7 +6,7 @@ It provides pre-defined prompts for various academic writing tasks.
 """
 
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from mcp import types
 
@@ -22,6 +22,10 @@ class PromptManager:
     
     def __init__(self):
         """Initialize the prompt manager."""
+        # Prompt definitions are built once; bump catalog_version when they change
+        self._prompts: Optional[List[types.Prompt]] = None
+        self.catalog_version = 0
+        
         logger.info("Prompt Manager initialized")
     
     def list_prompts_metadata(self) -> Dict[str, Any]:
@@ -42,6 +46,18 @@ class PromptManager:
         Returns:
             List of MCP prompts
         """
+        if self._prompts is None:
+            self._prompts = self._build_prompts()
+            logger.info(f"Built {len(self._prompts)} prompt definitions")
+        return list(self._prompts)
+    
+    def invalidate_prompts(self) -> None:
+        """Drop the built prompt definitions after the set of prompts changed."""
+        self._prompts = None
+        self.catalog_version += 1
+    
+    def _build_prompts(self) -> List[types.Prompt]:
+        """Build the prompt definitions."""
         prompts = [
             types.Prompt(
                 name="write_abstract",
@@ -326,7 +342,6 @@ class PromptManager:
             )
         ]
         
-        logger.info(f"Listed {len(prompts)} prompts")
         return prompts
     
     def get_prompt(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
@@ -5,13 +5,18 @@ This module implements MCP resource management for the Overleaf Remote MCP Serve
 It provides access to projects, documents, templates, and other resources.
 """
 
+import json
+import time
+import base64
 import logging
-from typing import List, Dict, Any, Optional
-from urllib.parse import urlparse
+from typing import Callable, List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse, parse_qs, urlencode, ParseResult
 
 from mcp import types
+from src.utils.metrics import REGISTRY, RESOURCE_ERRORS, RESOURCE_SECONDS, RESOURCE_SIZE
 from src.services.document_service import DocumentService
 from src.services.overleaf_service import OverleafService
+from src.services.sync_queue import SyncQueue
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +30,12 @@ class ResourceManager:
     
     OVERLEAF_SCHEME = "overleaf-remote"
     
+    # Server metrics in the Prometheus text format
+    METRICS_URI = f"{OVERLEAF_SCHEME}:///metrics"
+    
+    # Kinds of project resource, used to label read metrics
+    PROJECT_RESOURCE_TYPES = frozenset({'metadata', 'documents', 'history', 'compilation', 'sync'})
+    
     def __init__(self, document_service: DocumentService, overleaf_service: OverleafService):
         """
         Initialize the resource manager.
@@ -35,6 +46,13 @@ class ResourceManager:
         """
         self.document_service = document_service
         self.overleaf_service = overleaf_service
+        self.page_size = document_service.config.RESOURCE_PAGE_SIZE
+        
+        # Renders the metrics resource; set by the MCP server to include its gauges
+        self.metrics_source: Optional[Callable[[], str]] = None
+        
+        # Background sync jobs; set by the MCP server
+        self.sync_queue: Optional[SyncQueue] = None
         
         logger.info("Resource Manager initialized")
     
@@ -57,107 +75,231 @@ class ResourceManager:
         Returns:
             List of MCP resources
         """
+        resources, cursor = self.list_resources_page()
+        while cursor:
+            page, cursor = self.list_resources_page(cursor)
+            resources.extend(page)
+        return resources
+    
+    def list_resources_page(self, cursor: Optional[str] = None,
+                            limit: Optional[int] = None) -> Tuple[List[types.Resource], Optional[str]]:
+        """
+        List one page of resources.
+        
+        Only one metadata resource per project is listed; documents, history
+        and compilation status are addressed through the resource templates.
+        Templates (and the metrics resource, when the server exports metrics)
+        are listed on the first page. Pages are keyed by the last
+        project returned, so they stay consistent while projects are added.
+        
+        Args:
+            cursor: nextCursor from the previous page, or None for the first page
+            limit: Maximum number of projects (default: configured page size)
+            
+        Returns:
+            Tuple of (resources, next cursor or None when this is the last page)
+        """
         try:
+            limit = max(1, limit or self.page_size)
+            after = self._decode_cursor(cursor) if cursor else None
             resources = []
             
-            # Get all projects from document service
-            projects = self.document_service.list_projects()
-            
-            for project in projects:
-                # Add project metadata resource
-                project_uri = f"{self.OVERLEAF_SCHEME}:///projects/{project['id']}/metadata"
-                resources.append(types.Resource(
-                    uri=project_uri,
-                    name=f"Project: {project['title']}",
-                    description=f"Metadata for project '{project['title']}'",
-                    mimeType="application/json"
-                ))
-                
-                # Add document resources for each file in the project
-                documents = self.document_service.list_documents(project['id'])
-                for doc in documents:
-                    doc_uri = f"{self.OVERLEAF_SCHEME}:///projects/{project['id']}/documents/{doc['filename']}"
-                    
-                    # Determine MIME type based on file extension
-                    mime_type = self._get_mime_type(doc['filename'])
-                    
+            if after is None:
+                if self.metrics_source is not None:
                     resources.append(types.Resource(
-                        uri=doc_uri,
-                        name=f"Document: {doc['filename']}",
-                        description=f"LaTeX document '{doc['filename']}' in project '{project['title']}'",
-                        mimeType=mime_type
+                        uri=self.METRICS_URI,
+                        name="Server Metrics",
+                        description="Request latency histograms, error counts, payload sizes "
+                                    "and SQLite time in the Prometheus text format",
+                        mimeType="text/plain"
                     ))
-                
-                # Add version history resource
-                history_uri = f"{self.OVERLEAF_SCHEME}:///projects/{project['id']}/history"
-                resources.append(types.Resource(
-                    uri=history_uri,
-                    name=f"Version History: {project['title']}",
-                    description=f"Version history for project '{project['title']}'",
-                    mimeType="application/json"
-                ))
-                
-                # Add compilation status resource
-                compilation_uri = f"{self.OVERLEAF_SCHEME}:///projects/{project['id']}/compilation"
+                for template in self.document_service.list_templates():
+                    resources.append(types.Resource(
+                        uri=f"{self.OVERLEAF_SCHEME}:///templates/{template['id']}",
+                        name=f"Template: {template['name']}",
+                        description=f"LaTeX template for {template['document_type']}",
+                        mimeType="text/x-latex"
+                    ))
+            
+            projects = self.document_service.list_projects_page(after, limit + 1)
+            for project in projects[:limit]:
                 resources.append(types.Resource(
-                    uri=compilation_uri,
-                    name=f"Compilation Status: {project['title']}",
-                    description=f"Compilation status and results for project '{project['title']}'",
+                    uri=f"{self.OVERLEAF_SCHEME}:///projects/{project['id']}/metadata",
+                    name=f"Project: {project['title']}",
+                    description=f"Metadata for project '{project['title']}' "
+                                f"({project['document_count']} documents)",
                     mimeType="application/json"
                 ))
             
-            # Add template resources
-            templates = self.document_service.list_templates()
-            for template in templates:
-                template_uri = f"{self.OVERLEAF_SCHEME}:///templates/{template['id']}"
-                resources.append(types.Resource(
-                    uri=template_uri,
-                    name=f"Template: {template['name']}",
-                    description=f"LaTeX template for {template['document_type']}",
-                    mimeType="text/x-latex"
-                ))
+            next_cursor = None
+            if len(projects) > limit:
+                next_cursor = self._encode_cursor(projects[limit - 1]['id'])
             
             logger.info(f"Listed {len(resources)} resources")
-            return resources
+            return resources, next_cursor
             
         except Exception as e:
             logger.error(f"Error listing resources: {e}")
             raise
     
+    def list_resource_templates(self) -> List[types.ResourceTemplate]:
+        """
+        List URI templates for per-project resources.
+        
+        Returns:
+            List of MCP resource templates
+        """
+        base_uri = f"{self.OVERLEAF_SCHEME}:///projects/{{project_id}}"
+        
+        return [
+            types.ResourceTemplate(
+                uriTemplate=f"{base_uri}/documents/{{filename}}{{?start_line,end_line,offset,length}}",
+                name="Project Document",
+                description="LaTeX source file in a project; filename may include subdirectories "
+                            "(e.g. chapters/intro.tex). List filenames via the project metadata resource. "
+                            "With start_line/end_line or offset/length, only that range is returned, as "
+                            "JSON with the total line count and the URI of the next range.",
+                mimeType="text/x-latex"
+            ),
+            types.ResourceTemplate(
+                uriTemplate=f"{base_uri}/metadata",
+                name="Project Metadata",
+                description="Project details and the list of its documents",
+                mimeType="application/json"
+            ),
+            types.ResourceTemplate(
+                uriTemplate=f"{base_uri}/history",
+                name="Project Version History",
+                description="Version history for a project",
+                mimeType="application/json"
+            ),
+            types.ResourceTemplate(
+                uriTemplate=f"{base_uri}/compilation",
+                name="Project Compilation Status",
+                description="Compilation status and results for a project",
+                mimeType="application/json"
+            ),
+            types.ResourceTemplate(
+                uriTemplate=f"{base_uri}/sync",
+                name="Project Sync Jobs",
+                description="Recent background syncs of a project to Overleaf, newest first, "
+                            "with their status, attempts and reports",
+                mimeType="application/json"
+            ),
+            types.ResourceTemplate(
+                uriTemplate=f"{self.OVERLEAF_SCHEME}:///templates/{{template_id}}",
+                name="LaTeX Template",
+                description="Content of a LaTeX template",
+                mimeType="text/x-latex"
+            )
+        ]
+    
+    def _encode_cursor(self, project_id: str) -> str:
+        """Encode a listing position as an opaque cursor."""
+        return base64.urlsafe_b64encode(json.dumps([project_id]).encode('utf-8')).decode('ascii')
+    
+    def _decode_cursor(self, cursor: str) -> str:
+        """Decode a cursor produced by _encode_cursor."""
+        try:
+            project_id, = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return str(project_id)
+        except Exception:
+            raise ValueError(f"Invalid cursor: {cursor}")
+    
     def read_resource(self, uri: str) -> str:
         """
         Read the content of a specific resource.
         
+        The read's latency, content size and any failure are recorded in the
+        resource metrics, labelled with the kind of resource.
+        
         Args:
             uri: Resource URI
             
         Returns:
             Resource content as string
         """
+        uri_str = str(uri)
+        parsed_uri = urlparse(uri_str)
+        kind = self.resource_kind(parsed_uri)
+        start = time.perf_counter()
         try:
-            uri_str = str(uri)
-            parsed_uri = urlparse(uri_str)
-            
-            if parsed_uri.scheme != self.OVERLEAF_SCHEME:
-                raise ValueError(f"Unsupported URI scheme: {parsed_uri.scheme}")
-            
-            path_parts = parsed_uri.path.strip('/').split('/')
-            
-            if len(path_parts) < 2:
-                raise ValueError(f"Invalid URI format: {uri_str}")
-            
-            resource_type = path_parts[0]
-            
-            if resource_type == "projects":
-                return self._read_project_resource(path_parts[1:], parsed_uri.query)
-            elif resource_type == "templates":
-                return self._read_template_resource(path_parts[1:])
-            else:
-                raise ValueError(f"Unknown resource type: {resource_type}")
-                
+            content = self._read_resource(uri_str, parsed_uri)
         except Exception as e:
             logger.error(f"Failed to read resource {uri}: {e}")
+            RESOURCE_ERRORS.inc(kind)
             raise
+        finally:
+            RESOURCE_SECONDS.observe(time.perf_counter() - start, kind)
+        RESOURCE_SIZE.observe(len(content), kind)
+        return content
+    
+    def _read_resource(self, uri_str: str, parsed_uri: ParseResult) -> str:
+        """Read a resource by its parsed URI."""
+        if parsed_uri.scheme != self.OVERLEAF_SCHEME:
+            raise ValueError(f"Unsupported URI scheme: {parsed_uri.scheme}")
+        
+        if uri_str == self.METRICS_URI:
+            return self.metrics_source() if self.metrics_source else REGISTRY.render()
+        
+        path_parts = parsed_uri.path.strip('/').split('/')
+        
+        if len(path_parts) < 2:
+            raise ValueError(f"Invalid URI format: {uri_str}")
+        
+        resource_type = path_parts[0]
+        
+        if resource_type == "projects":
+            return self._read_project_resource(path_parts[1:], parsed_uri.query)
+        elif resource_type == "templates":
+            return self._read_template_resource(path_parts[1:])
+        else:
+            raise ValueError(f"Unknown resource type: {resource_type}")
+    
+    def resource_kind(self, parsed_uri: ParseResult) -> str:
+        """
+        Get the kind of resource a URI addresses, for labelling metrics.
+        
+        Returns:
+            'templates', 'metrics', a project resource type such as
+            'documents', or 'unknown'
+        """
+        path_parts = parsed_uri.path.strip('/').split('/')
+        if path_parts[0] == 'templates':
+            return 'templates'
+        if path_parts[0] == 'metrics':
+            return 'metrics'
+        if path_parts[0] == 'projects' and len(path_parts) >= 3 and path_parts[2] in self.PROJECT_RESOURCE_TYPES:
+            return path_parts[2]
+        return 'unknown'
+    
+    def change_uris(self, change: Tuple) -> List[str]:
+        """
+        Map a Document Service change event to the resource URIs it affects.
+        
+        Args:
+            change: Change key, e.g. ('document', project_id, filename)
+            
+        Returns:
+            URIs (without query) whose content changed
+        """
+        kind = change[0]
+        if kind == 'document':
+            _, project_id, filename = change
+            return [f"{self.OVERLEAF_SCHEME}:///projects/{project_id}/documents/{filename}"]
+        if kind == 'documents':
+            project_id = change[1]
+            return [
+                f"{self.OVERLEAF_SCHEME}:///projects/{project_id}/metadata",
+                f"{self.OVERLEAF_SCHEME}:///projects/{project_id}/history"
+            ]
+        if kind == 'project':
+            return [f"{self.OVERLEAF_SCHEME}:///projects/{change[1]}/metadata"]
+        if kind == 'template':
+            return [f"{self.OVERLEAF_SCHEME}:///templates/{change[1]}"]
+        if kind == 'sync':
+            return [f"{self.OVERLEAF_SCHEME}:///projects/{change[1]}/sync"]
+        return []
     
     def _read_project_resource(self, path_parts: List[str], query: str) -> str:
         """Read project-related resource."""
@@ -176,12 +318,14 @@ class ResourceManager:
         elif resource_type == "documents":
             if len(path_parts) < 3:
                 raise ValueError("Document filename required")
-            filename = path_parts[2]
-            return self._get_document_content(project_id, filename)
+            filename = '/'.join(path_parts[2:])
+            return self._get_document_content(project_id, filename, query)
         elif resource_type == "history":
             return self._get_project_history(project_id)
         elif resource_type == "compilation":
             return self._get_compilation_status(project_id)
+        elif resource_type == "sync" and self.sync_queue is not None:
+            return json.dumps({'project_id': project_id, 'jobs': self.sync_queue.list_jobs(project_id)}, indent=2)
         else:
             raise ValueError(f"Unknown project resource type: {resource_type}")
     
@@ -221,13 +365,50 @@ class ResourceManager:
         
         return json.dumps(metadata, indent=2)
     
-    def _get_document_content(self, project_id: str, filename: str) -> str:
-        """Get document content."""
-        document = self.document_service.get_document(project_id, filename)
-        if not document:
+    def _get_document_content(self, project_id: str, filename: str, query: str = '') -> str:
+        """
+        Get document content.
+        
+        A query such as ?start_line=400&end_line=460 or ?offset=0&length=4096
+        returns only that range, as JSON with the total line count and the
+        URI of the next range.
+        """
+        range_args = self._parse_range_query(query)
+        if not range_args:
+            document = self.document_service.get_document(project_id, filename)
+            if not document:
+                raise ValueError(f"Document not found: {filename}")
+            
+            return document['content'] or ''
+        
+        part = self.document_service.read_document_range(project_id, filename, **range_args)
+        if not part:
             raise ValueError(f"Document not found: {filename}")
         
-        return document['content'] or ''
+        doc_uri = f"{self.OVERLEAF_SCHEME}:///projects/{project_id}/documents/{filename}"
+        if part['next']:
+            next_args = dict(part['next'])
+            if 'length' in part and range_args.get('length') is not None:
+                next_args['length'] = range_args['length']
+            elif 'start_line' in part and range_args.get('end_line') is not None:
+                next_args['end_line'] = part['end_line'] + part['end_line'] - part['start_line'] + 1
+            part['next_uri'] = f"{doc_uri}?{urlencode(next_args)}"
+        else:
+            part['next_uri'] = None
+        
+        return json.dumps(part, indent=2)
+    
+    def _parse_range_query(self, query: str) -> Dict[str, int]:
+        """Parse line/byte range parameters from a resource URI query."""
+        params = parse_qs(query or '')
+        range_args = {}
+        for key in ("start_line", "end_line", "offset", "length"):
+            if key in params:
+                try:
+                    range_args[key] = int(params[key][0])
+                except ValueError:
+                    raise ValueError(f"Invalid {key}: {params[key][0]}")
+        return range_args
     
     def _get_project_history(self, project_id: str) -> str:
         """Get project version history as JSON."""
@@ -306,11 +487,15 @@ class ResourceManager:
             path_parts = parsed_uri.path.strip('/').split('/')
             
             if len(path_parts) >= 3 and path_parts[0] == "projects" and path_parts[2] == "documents":
+                if self._parse_range_query(parsed_uri.query):
+                    return "application/json"
                 if len(path_parts) >= 4:
-                    filename = path_parts[3]
+                    filename = path_parts[-1]
                     return self._get_mime_type(filename)
             elif len(path_parts) >= 2 and path_parts[0] == "templates":
                 return "text/x-latex"
+            elif str(uri) == self.METRICS_URI:
+                return "text/plain"
             
             return "application/json"
             
@@ -5,13 +5,17 @@ This module implements MCP tools for Overleaf operations.
 It provides tools for creating, editing, and managing documents and projects.
 """
 
+import time
 import logging
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, FrozenSet
 
 from mcp import types
+from src.utils.metrics import TOOL_ERRORS, TOOL_RESULT_SIZE, TOOL_SECONDS
 from src.services.document_service import DocumentService
 from src.services.overleaf_service import OverleafService
+from src.services.project_sync import ProjectSync
+from src.services.sync_queue import SyncQueue
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +27,12 @@ class ToolManager:
     providing functionality for document and project operations.
     """
     
+    # Tools that do not change any state; safe to run concurrently
+    READ_ONLY_TOOLS = frozenset({
+        'list_projects', 'get_project', 'get_document', 'list_documents', 'search_documents',
+        'generate_section', 'improve_content', 'list_templates', 'get_template', 'get_sync_status'
+    })
+    
     def __init__(self, document_service: DocumentService, overleaf_service: OverleafService):
         """
         Initialize the tool manager.
@@ -33,6 +43,20 @@ class ToolManager:
         """
         self.document_service = document_service
         self.overleaf_service = overleaf_service
+        self.project_sync = ProjectSync(document_service, overleaf_service)
+        config = document_service.config
+        self.sync_queue = SyncQueue(
+            document_service,
+            self.project_sync,
+            workers=config.OVERLEAF_SYNC_WORKERS,
+            max_attempts=config.OVERLEAF_SYNC_MAX_ATTEMPTS,
+            backoff_base=config.OVERLEAF_SYNC_RETRY_BACKOFF
+        )
+        
+        # Tool definitions are built once; bump catalog_version when they change
+        self._tools: Optional[List[types.Tool]] = None
+        self._tool_names: Optional[FrozenSet[str]] = None
+        self.catalog_version = 0
         
         logger.info("Tool Manager initialized")
     
@@ -54,6 +78,25 @@ class ToolManager:
         Returns:
             List of MCP tools
         """
+        if self._tools is None:
+            self._tools = self._build_tools()
+            logger.info(f"Built {len(self._tools)} tool definitions")
+        return list(self._tools)
+    
+    def invalidate_tools(self) -> None:
+        """Drop the built tool definitions after the set of tools changed."""
+        self._tools = None
+        self._tool_names = None
+        self.catalog_version += 1
+    
+    def tool_names(self) -> FrozenSet[str]:
+        """Get the names of all available tools."""
+        if self._tool_names is None:
+            self._tool_names = frozenset(tool.name for tool in self.list_tools())
+        return self._tool_names
+    
+    def _build_tools(self) -> List[types.Tool]:
+        """Build the tool definitions."""
         tools = [
             # Project management tools
             types.Tool(
@@ -156,9 +199,103 @@ class ToolManager:
                 }
             ),
             
+            types.Tool(
+                name="update_documents",
+                description="Update or create several documents in one transaction (all changes apply or none do)",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "project_id": {
+                            "type": "string",
+                            "description": "Project ID"
+                        },
+                        "changes": {
+                            "type": "array",
+                            "description": "Document changes to apply",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "filename": {
+                                        "type": "string",
+                                        "description": "Document filename"
+                                    },
+                                    "content": {
+                                        "type": "string",
+                                        "description": "New document content"
+                                    },
+                                    "commit_message": {
+                                        "type": "string",
+                                        "description": "Optional commit message for this file"
+                                    }
+                                },
+                                "required": ["filename", "content"]
+                            }
+                        },
+                        "commit_message": {
+                            "type": "string",
+                            "description": "Optional commit message for all changes"
+                        },
+                        "create_missing": {
+                            "type": "boolean",
+                            "description": "Create documents that do not exist yet (default: true)"
+                        }
+                    },
+                    "required": ["project_id", "changes"]
+                }
+            ),
+            
+            types.Tool(
+                name="patch_document",
+                description="Edit part of a document with line/offset range edits or a unified diff instead of sending the whole file",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "project_id": {
+                            "type": "string",
+                            "description": "Project ID"
+                        },
+                        "filename": {
+                            "type": "string",
+                            "description": "Document filename"
+                        },
+                        "edits": {
+                            "type": "array",
+                            "description": "Non-overlapping edits against the current content. Use start_line/end_line (1-based, inclusive; end_line = start_line - 1 inserts) or offset/length (UTF-8 bytes, as in get_document byte ranges).",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "start_line": {"type": "integer", "minimum": 1},
+                                    "end_line": {"type": "integer", "minimum": 0},
+                                    "offset": {"type": "integer", "minimum": 0},
+                                    "length": {"type": "integer", "minimum": 0},
+                                    "text": {
+                                        "type": "string",
+                                        "description": "Replacement text"
+                                    }
+                                },
+                                "required": ["text"]
+                            }
+                        },
+                        "diff": {
+                            "type": "string",
+                            "description": "Unified diff to apply (alternative to edits)"
+                        },
+                        "base_hash": {
+                            "type": "string",
+                            "description": "Content hash the edits were made against (from get_document); the patch is rejected if the document has changed"
+                        },
+                        "commit_message": {
+                            "type": "string",
+                            "description": "Optional commit message for version control"
+                        }
+                    },
+                    "required": ["project_id", "filename"]
+                }
+            ),
+            
             types.Tool(
                 name="get_document",
-                description="Get document content",
+                description="Get document content, optionally only a line or byte range",
                 inputSchema={
                     "type": "object",
                     "properties": {
@@ -169,6 +306,26 @@ class ToolManager:
                         "filename": {
                             "type": "string",
                             "description": "Document filename"
+                        },
+                        "start_line": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "First line to return (1-based)"
+                        },
+                        "end_line": {
+                            "type": "integer",
+                            "minimum": 0,
+                            "description": "Last line to return, inclusive (default: end of document)"
+                        },
+                        "offset": {
+                            "type": "integer",
+                            "minimum": 0,
+                            "description": "First byte to return, if no line range is given"
+                        },
+                        "length": {
+                            "type": "integer",
+                            "minimum": 0,
+                            "description": "Number of bytes to return (default: to the end)"
                         }
                     },
                     "required": ["project_id", "filename"]
@@ -190,6 +347,42 @@ class ToolManager:
                 }
             ),
             
+            types.Tool(
+                name="search_documents",
+                description="Full-text search across project documents with ranked, highlighted snippets",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string",
+                            "description": "Words, phrase or label to search for (e.g., 'eq:energy')"
+                        },
+                        "project_ids": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Optional project IDs to restrict the search to"
+                        },
+                        "match": {
+                            "type": "string",
+                            "enum": ["all", "any", "phrase", "raw"],
+                            "description": "Match all terms, any term, the exact phrase, or raw FTS5 syntax (default: all)"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 100,
+                            "description": "Maximum number of results to return (default: 20)"
+                        },
+                        "offset": {
+                            "type": "integer",
+                            "minimum": 0,
+                            "description": "Number of ranked results to skip, for paging"
+                        }
+                    },
+                    "required": ["query"]
+                }
+            ),
+            
             # Content generation tools
             types.Tool(
                 name="generate_section",
@@ -273,19 +466,67 @@ class ToolManager:
             # Overleaf integration tools
             types.Tool(
                 name="sync_to_overleaf",
-                description="Synchronize project to Overleaf",
+                description="Synchronize project to Overleaf in the background and return a job ID "
+                            "to follow with get_sync_status. Only files added, changed or deleted "
+                            "since the last sync are transferred; a sync requested while another one "
+                            "for the project is queued is merged into it.",
                 inputSchema={
                     "type": "object",
                     "properties": {
                         "project_id": {
                             "type": "string",
                             "description": "Local project ID to sync"
+                        },
+                        "full": {
+                            "type": "boolean",
+                            "description": "Upload every file, even if unchanged since the last sync",
+                            "default": False
                         }
                     },
                     "required": ["project_id"]
                 }
             ),
             
+            types.Tool(
+                name="get_sync_status",
+                description="Get the status of a sync job, or the recent sync jobs of a project",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "Job ID returned by sync_to_overleaf"
+                        },
+                        "project_id": {
+                            "type": "string",
+                            "description": "Local project ID, to list its recent sync jobs"
+                        }
+                    }
+                }
+            ),
+            
+            types.Tool(
+                name="pull_from_overleaf",
+                description="Pull the text files of an Overleaf project into a local project. Files "
+                            "unchanged since the last sync are skipped; overwritten documents keep "
+                            "their previous content as a version.",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "overleaf_id": {
+                            "type": "string",
+                            "description": "Overleaf project ID to pull"
+                        },
+                        "project_id": {
+                            "type": "string",
+                            "description": "Local project to pull into (default: the project linked "
+                                           "to the Overleaf project, or a new one)"
+                        }
+                    },
+                    "required": ["overleaf_id"]
+                }
+            ),
+            
             types.Tool(
                 name="compile_project",
                 description="Compile LaTeX project to PDF",
@@ -302,13 +543,15 @@ class ToolManager:
             )
         ]
         
-        logger.info(f"Listed {len(tools)} tools")
         return tools
     
     def call_tool(self, name: str, arguments: Dict[str, Any]) -> List[types.TextContent]:
         """
         Call a specific tool with given arguments.
         
+        Failures are returned as an error text rather than raised. The call's
+        latency, result size and any failure are recorded in the tool metrics.
+        
         Args:
             name: Tool name
             arguments: Tool arguments
@@ -316,44 +559,63 @@ class ToolManager:
         Returns:
             List of content results
         """
+        # Unknown names share one series so clients cannot create new ones
+        label = name if isinstance(name, str) and name in self.tool_names() else 'unknown'
+        start = time.perf_counter()
         try:
             logger.info(f"Calling tool: {name}")
-            
-            if name == "create_project":
-                return self._create_project(arguments)
-            elif name == "list_projects":
-                return self._list_projects(arguments)
-            elif name == "get_project":
-                return self._get_project(arguments)
-            elif name == "create_document":
-                return self._create_document(arguments)
-            elif name == "update_document":
-                return self._update_document(arguments)
-            elif name == "get_document":
-                return self._get_document(arguments)
-            elif name == "list_documents":
-                return self._list_documents(arguments)
-            elif name == "generate_section":
-                return self._generate_section(arguments)
-            elif name == "improve_content":
-                return self._improve_content(arguments)
-            elif name == "list_templates":
-                return self._list_templates(arguments)
-            elif name == "get_template":
-                return self._get_template(arguments)
-            elif name == "sync_to_overleaf":
-                return self._sync_to_overleaf(arguments)
-            elif name == "compile_project":
-                return self._compile_project(arguments)
-            else:
-                raise ValueError(f"Unknown tool: {name}")
-                
+            result = self._dispatch_tool(name, arguments)
         except Exception as e:
             logger.error(f"Error calling tool {name}: {e}")
-            return [types.TextContent(
+            TOOL_ERRORS.inc(label)
+            result = [types.TextContent(
                 type="text",
                 text=f"Error: {str(e)}"
             )]
+        TOOL_SECONDS.observe(time.perf_counter() - start, label)
+        TOOL_RESULT_SIZE.observe(sum(len(getattr(item, 'text', '')) for item in result), label)
+        return result
+    
+    def _dispatch_tool(self, name: str, arguments: Dict[str, Any]) -> List[types.TextContent]:
+        """Run the implementation of a tool."""
+        if name == "create_project":
+            return self._create_project(arguments)
+        elif name == "list_projects":
+            return self._list_projects(arguments)
+        elif name == "get_project":
+            return self._get_project(arguments)
+        elif name == "create_document":
+            return self._create_document(arguments)
+        elif name == "update_document":
+            return self._update_document(arguments)
+        elif name == "update_documents":
+            return self._update_documents(arguments)
+        elif name == "patch_document":
+            return self._patch_document(arguments)
+        elif name == "get_document":
+            return self._get_document(arguments)
+        elif name == "list_documents":
+            return self._list_documents(arguments)
+        elif name == "search_documents":
+            return self._search_documents(arguments)
+        elif name == "generate_section":
+            return self._generate_section(arguments)
+        elif name == "improve_content":
+            return self._improve_content(arguments)
+        elif name == "list_templates":
+            return self._list_templates(arguments)
+        elif name == "get_template":
+            return self._get_template(arguments)
+        elif name == "sync_to_overleaf":
+            return self._sync_to_overleaf(arguments)
+        elif name == "get_sync_status":
+            return self._get_sync_status(arguments)
+        elif name == "pull_from_overleaf":
+            return self._pull_from_overleaf(arguments)
+        elif name == "compile_project":
+            return self._compile_project(arguments)
+        else:
+            raise ValueError(f"Unknown tool: {name}")
     
     # Tool implementations
     
@@ -449,11 +711,52 @@ class ToolManager:
                 text=f"Failed to update document '{filename}' in project {project_id}"
             )]
     
+    def _update_documents(self, args: Dict[str, Any]) -> List[types.TextContent]:
+        """Apply a batch of document changes."""
+        project_id = args["project_id"]
+        changes = args["changes"]
+        commit_message = args.get("commit_message", "Updated via MCP")
+        create_missing = args.get("create_missing", True)
+        
+        result = self.document_service.update_documents(
+            project_id, changes, commit_message, create_missing
+        )
+        
+        return [types.TextContent(
+            type="text",
+            text=f"Applied {len(changes)} changes in project {project_id}: "
+                 f"{len(result['created'])} created, {len(result['updated'])} updated, "
+                 f"{len(result['unchanged'])} unchanged\n\n" +
+                 json.dumps(result, indent=2)
+        )]
+    
+    def _patch_document(self, args: Dict[str, Any]) -> List[types.TextContent]:
+        """Apply range edits or a unified diff to a document."""
+        project_id = args["project_id"]
+        filename = args["filename"]
+        
+        result = self.document_service.patch_document(
+            project_id, filename,
+            edits=args.get("edits"),
+            diff=args.get("diff"),
+            base_hash=args.get("base_hash"),
+            commit_message=args.get("commit_message", "Patched via MCP")
+        )
+        
+        return [types.TextContent(
+            type="text",
+            text=f"Patched document '{filename}' in project {project_id} ({result['status']})\n\n" +
+                 json.dumps(result, indent=2)
+        )]
+    
     def _get_document(self, args: Dict[str, Any]) -> List[types.TextContent]:
         """Get document content."""
         project_id = args["project_id"]
         filename = args["filename"]
         
+        if any(args.get(key) is not None for key in ("start_line", "end_line", "offset", "length")):
+            return self._get_document_range(args)
+        
         document = self.document_service.get_document(project_id, filename)
         
         if not document:
@@ -464,7 +767,45 @@ class ToolManager:
         
         return [types.TextContent(
             type="text",
-            text=f"Document: {filename}\n\n{document['content']}"
+            text=f"Document: {filename}\nContent hash: {document['content_hash']}\n\n{document['content']}"
+        )]
+    
+    def _get_document_range(self, args: Dict[str, Any]) -> List[types.TextContent]:
+        """Get a line or byte range of a document."""
+        project_id = args["project_id"]
+        filename = args["filename"]
+        
+        part = self.document_service.read_document_range(
+            project_id, filename,
+            start_line=args.get("start_line"),
+            end_line=args.get("end_line"),
+            offset=args.get("offset"),
+            length=args.get("length")
+        )
+        
+        if not part:
+            return [types.TextContent(
+                type="text",
+                text=f"Document not found: {filename} in project {project_id}"
+            )]
+        
+        if 'start_line' in part:
+            span = f"Lines {part['start_line']}-{part['end_line']} of {part['total_lines']}"
+        else:
+            span = (f"Bytes {part['offset']}-{part['offset'] + part['length']} of {part['total_bytes']} "
+                    f"({part['total_lines']} lines)")
+        
+        text = f"Document: {filename}\nContent hash: {part['content_hash']}\n{span}\n\n{part['content']}"
+        if part['next']:
+            next_args = dict(part['next'])
+            if 'offset' in next_args and args.get("length") is not None:
+                next_args['length'] = args["length"]
+            hint = ", ".join(f"{key}={value}" for key, value in next_args.items())
+            text += f"\n\nMore content available: call again with {hint}"
+        
+        return [types.TextContent(
+            type="text",
+            text=text
         )]
     
     def _list_documents(self, args: Dict[str, Any]) -> List[types.TextContent]:
@@ -488,6 +829,39 @@ class ToolManager:
             text=f"Documents in project {project_id}:\n\n{doc_list}"
         )]
     
+    def _search_documents(self, args: Dict[str, Any]) -> List[types.TextContent]:
+        """Full-text search across documents."""
+        query = args["query"]
+        
+        page = self.document_service.search_documents(
+            query,
+            project_ids=args.get("project_ids"),
+            mode=args.get("match", "all"),
+            limit=args.get("limit", 20),
+            offset=args.get("offset", 0)
+        )
+        
+        if not page['results']:
+            return [types.TextContent(
+                type="text",
+                text=f"No documents match '{query}'."
+            )]
+        
+        matches = "\n\n".join([
+            f"{page['offset'] + i + 1}. {r['project_title']} / {r['filename']} (project ID: {r['project_id']})\n"
+            f"   {r['snippet']}"
+            for i, r in enumerate(page['results'])
+        ])
+        
+        text = f"Matches for '{query}':\n\n{matches}"
+        if page['next_offset'] is not None:
+            text += f"\n\nMore results available: call again with offset={page['next_offset']}"
+        
+        return [types.TextContent(
+            type="text",
+            text=text
+        )]
+    
     def _generate_section(self, args: Dict[str, Any]) -> List[types.TextContent]:
         """Generate LaTeX content for a section."""
         section_type = args["section_type"]
@@ -621,35 +995,102 @@ Future research directions include extending the current framework and exploring
         )]
     
     def _sync_to_overleaf(self, args: Dict[str, Any]) -> List[types.TextContent]:
-        """Sync project to Overleaf."""
+        """Queue a sync of the project to Overleaf."""
         project_id = args["project_id"]
         
-        project = self.document_service.get_project(project_id)
-        if not project:
+        try:
+            job, coalesced = self.sync_queue.submit(project_id, full=bool(args.get("full", False)))
+        except ValueError:
             return [types.TextContent(
                 type="text",
                 text=f"Project not found: {project_id}"
             )]
         
-        documents = self.document_service.list_documents(project_id)
-        doc_contents = []
-        for doc in documents:
-            doc_data = self.document_service.get_document(project_id, doc['filename'])
-            if doc_data:
-                doc_contents.append(doc_data)
+        if coalesced:
+            heading = (f"A sync of this project is already queued; merged into job {job['id']} "
+                       f"({job['coalesced']} requests merged)")
+        else:
+            heading = f"Sync to Overleaf queued. Job ID: {job['id']}"
         
-        overleaf_id = self.overleaf_service.sync_project_to_overleaf(project, doc_contents)
+        return [types.TextContent(
+            type="text",
+            text=f"{heading}\nUse get_sync_status with this job ID to follow its progress.\n\n" +
+                 json.dumps(job, indent=2)
+        )]
+    
+    def _get_sync_status(self, args: Dict[str, Any]) -> List[types.TextContent]:
+        """Get a sync job, or the recent sync jobs of a project."""
+        job_id = args.get("job_id")
+        project_id = args.get("project_id")
         
-        if overleaf_id:
+        if job_id:
+            job = self.sync_queue.get_job(job_id)
+            if not job:
+                return [types.TextContent(
+                    type="text",
+                    text=f"Sync job not found: {job_id}"
+                )]
             return [types.TextContent(
                 type="text",
-                text=f"Successfully synced project to Overleaf. Overleaf ID: {overleaf_id}"
+                text=f"Sync job {job_id}: {self._describe_sync_job(job)}\n\n" + json.dumps(job, indent=2)
             )]
-        else:
+        
+        if project_id:
+            jobs = self.sync_queue.list_jobs(project_id)
+            if not jobs:
+                return [types.TextContent(
+                    type="text",
+                    text=f"No sync jobs for project: {project_id}"
+                )]
+            lines = [f"- {job['id']}: {self._describe_sync_job(job)}" for job in jobs]
+            return [types.TextContent(
+                type="text",
+                text=f"Recent sync jobs of project {project_id}:\n" + "\n".join(lines) +
+                     "\n\n" + json.dumps(jobs, indent=2)
+            )]
+        
+        return [types.TextContent(
+            type="text",
+            text="Either job_id or project_id is required"
+        )]
+    
+    def _describe_sync_job(self, job: Dict[str, Any]) -> str:
+        """Summarize a sync job in one line."""
+        status = job['status']
+        if status == 'queued' and job['attempts']:
+            return f"waiting to retry (attempt {job['attempts']} of {job['max_attempts']} failed: {job['error']})"
+        if status == 'running':
+            return f"running (attempt {job['attempts']} of {job['max_attempts']})"
+        if status == 'succeeded':
+            report = job['result']
+            return (f"succeeded; {len(report['added'])} added, {len(report['changed'])} changed, "
+                    f"{len(report['deleted'])} deleted, {report['unchanged']} unchanged; "
+                    f"Overleaf ID: {report['overleaf_id']}")
+        if status == 'failed':
+            return f"failed after {job['attempts']} attempts: {job['error']}"
+        return status
+    
+    def _pull_from_overleaf(self, args: Dict[str, Any]) -> List[types.TextContent]:
+        """Pull an Overleaf project into a local project."""
+        overleaf_id = args["overleaf_id"]
+        project_id = args.get("project_id")
+        
+        if project_id is not None and not self.document_service.get_project(project_id):
             return [types.TextContent(
                 type="text",
-                text="Failed to sync project to Overleaf. Check Overleaf service configuration."
+                text=f"Project not found: {project_id}"
             )]
+        
+        report = self.project_sync.pull(overleaf_id, project_id)
+        
+        target = 'new project' if report['created'] else 'project'
+        heading = f"Pulled Overleaf project {overleaf_id} into {target} {report['project_id']}"
+        return [types.TextContent(
+            type="text",
+            text=f"{heading}: {len(report['added'])} added, {len(report['changed'])} changed, "
+                 f"{report['unchanged']} unchanged, {len(report['failed'])} failed\n\n" +
+                 json.dumps(report, indent=2)
+        )]
     
     def _compile_project(self, args: Dict[str, Any]) -> List[types.TextContent]:
         """Compile project to PDF."""
@@ -0,0 +1,461 @@
+"""
+ASGI Routes
+
+This module implements the MCP JSON-RPC and SSE endpoints as async Starlette
+handlers. Blocking MCPServer work runs on the application's bounded thread
+pool, so the event loop stays free to hold many idle SSE connections.
+
+SSE streams are session based: GET /sse opens a session and announces its
+message endpoint, and responses to messages POSTed there are delivered on
+the session's stream rather than in the POST response.
+"""
+
+import json
+import asyncio
+import logging
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from sse_starlette.sse import EventSourceResponse
+
+from src.services.admission import Rejection
+from src.services.mcp_server import MethodNotFoundError
+from src.services.session_manager import CLOSED, SessionClosedError, SessionLimitError
+from src.utils.serialization import encode_batch, encode_message, encode_response
+
+logger = logging.getLogger(__name__)
+
+# Seconds between SSE heartbeat notifications
+HEARTBEAT_INTERVAL = 30
+
+async def run_blocking(request: Request, func, *args, **kwargs) -> Any:
+    """
+    Run a blocking call on the application's worker pool.
+
+    Args:
+        request: Current request (used to find the executor)
+        func: Callable to run
+        *args: Positional arguments
+        **kwargs: Keyword arguments
+
+    Returns:
+        The callable's result
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app.state.executor, partial(func, *args, **kwargs))
+
+async def read_json(request: Request) -> Optional[Any]:
+    """Parse the request body as JSON, returning None if it is not valid."""
+    # Already parsed by AdmissionMiddleware
+    state = request.scope.get('state', {})
+    if 'json_body' in state:
+        return state['json_body']
+    try:
+        return json.loads(await request.body())
+    except ValueError:
+        return None
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying admission control to JSON-RPC POSTs.
+
+    The body is read here, counting bytes, so an oversized request is refused
+    without being buffered in full or parsed. Admitted requests get the
+    parsed body through the request state, and the raw body is replayed to
+    the route. Requests count as in flight until their response is sent. A
+    route that answers later, as session messages do, takes over the slot by
+    setting request.state.admission_deferred and releases it itself.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'POST':
+            await self.app(scope, receive, send)
+            return
+
+        admission = scope['app'].state.admission
+        content_length = None
+        for name, value in scope['headers']:
+            if name == b'content-length' and value.isdigit():
+                content_length = int(value)
+        rejection = admission.check_size(content_length)
+
+        chunks = []
+        size = 0
+        more_body = rejection is None
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            rejection = admission.check_size(size)
+            if rejection is not None:
+                break
+            chunks.append(chunk)
+            more_body = message.get('more_body', False)
+        body = b''.join(chunks)
+
+        data = None
+        if rejection is None:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                pass
+            client = scope['client'][0] if scope.get('client') else ''
+            rejection = admission.admit(client, data if isinstance(data, list) else [data])
+
+        if rejection is not None:
+            request_id = data.get('id') if isinstance(data, dict) else None
+            await rejection_response(request_id, rejection)(scope, receive, send)
+            return
+
+        scope.setdefault('state', {})['json_body'] = data
+
+        async def replay():
+            nonlocal body
+            if body is None:
+                return await receive()
+            message = {'type': 'http.request', 'body': body, 'more_body': False}
+            body = None
+            return message
+
+        try:
+            await self.app(scope, replay, send)
+        finally:
+            if not scope['state'].get('admission_deferred'):
+                admission.release()
+
+def error_message(request_id: Optional[Any], code: int, message: str) -> Dict[str, Any]:
+    """Build a JSON-RPC error message."""
+    return {
+        'jsonrpc': '2.0',
+        'id': request_id,
+        'error': {
+            'code': code,
+            'message': message
+        }
+    }
+
+def rejection_response(request_id: Optional[Any], rejection: Rejection) -> JSONResponse:
+    """Create the JSON-RPC error response for a refused request, with Retry-After if set."""
+    headers = {'Retry-After': str(rejection.retry_after)} if rejection.retry_after is not None else None
+    return JSONResponse(error_message(request_id, rejection.code, rejection.message),
+                        status_code=rejection.status, headers=headers)
+
+def message_response(message: Dict[str, Any]) -> Response:
+    """Create a response for a JSON-RPC message, encoding its result once."""
+    return Response(encode_message(message), media_type='application/json')
+
+def jsonrpc_error(request_id: Optional[Any], code: int, message: str, status_code: int = 200) -> JSONResponse:
+    """Create a JSON-RPC error response."""
+    return JSONResponse(error_message(request_id, code, message), status_code=status_code)
+
+async def call_method(request: Request, method: str, params: Any, request_id: Optional[Any],
+                      session_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Dispatch a JSON-RPC method on the worker pool.
+
+    Args:
+        request: Current request
+        method: JSON-RPC method name
+        params: Request parameters
+        request_id: JSON-RPC request ID
+        session_id: SSE session the request arrived on, if any
+
+    Returns:
+        JSON-RPC response message (result or error)
+    """
+    logger.debug(f"Handling MCP request: {method}")
+
+    mcp_server = request.app.state.mcp_server
+    try:
+        result = await run_blocking(request, mcp_server.dispatch, method, params, session_id)
+    except MethodNotFoundError as e:
+        return error_message(request_id, -32601, str(e))
+    except Exception as e:
+        logger.error(f"Error handling MCP request {method}: {e}")
+        return error_message(request_id, -32603, f"Internal error: {str(e)}")
+
+    return {
+        'jsonrpc': '2.0',
+        'id': request_id,
+        'result': result
+    }
+
+async def call_batch(request: Request, messages: List[Any],
+                     session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Run a JSON-RPC batch on the worker pool.
+
+    Each stage of consecutive read-only calls runs concurrently; other
+    calls run one at a time in batch order (see MCPServer.batch_stages).
+
+    Args:
+        request: Current request
+        messages: Non-empty list of batch entries
+        session_id: SSE session the batch arrived on, if any
+
+    Returns:
+        Responses in batch order, without entries for notifications
+    """
+    mcp_server = request.app.state.mcp_server
+    logger.debug(f"Handling MCP batch of {len(messages)} messages")
+
+    responses: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+    for stage in mcp_server.batch_stages(messages):
+        results = await asyncio.gather(*(
+            run_blocking(request, mcp_server.handle_message, message, session_id)
+            for _, message in stage
+        ))
+        for (index, _), response in zip(stage, results):
+            responses[index] = response
+
+    return [response for response in responses if response is not None]
+
+async def batch_response(request: Request, messages: List[Any], empty_status: int = 200) -> Response:
+    """
+    Answer a batch POST; a batch of only notifications gets an empty 202.
+
+    An empty batch is answered with a single Invalid Request error, sent
+    with the HTTP status empty_status.
+    """
+    if not messages:
+        return jsonrpc_error(None, -32600, "Invalid Request", status_code=empty_status)
+
+    responses = await call_batch(request, messages)
+    if not responses:
+        return Response(status_code=202)
+    return Response(encode_batch(responses), media_type='application/json')
+
+def catalog_response(request: Request, request_id: Optional[Any], catalog) -> Response:
+    """
+    Create a JSON-RPC response from a pre-serialized catalog.
+
+    Answers 304 Not Modified when the request's If-None-Match matches the
+    catalog's ETag.
+    """
+    headers = {'ETag': catalog.etag}
+    if catalog.matches(request.headers.get('if-none-match')):
+        return Response(status_code=304, headers=headers)
+    return Response(catalog.response_bytes(request_id), media_type='application/json', headers=headers)
+
+# --- /rpc ---
+
+async def handle_jsonrpc(request: Request) -> Response:
+    """Handle JSON-RPC requests (single or batch) for MCP protocol."""
+    data = await read_json(request)
+    if data is None:
+        return jsonrpc_error(None, -32700, "Parse error")
+
+    if isinstance(data, list):
+        return await batch_response(request, data)
+
+    if not isinstance(data, dict) or data.get('jsonrpc') != '2.0':
+        return jsonrpc_error(data.get('id') if isinstance(data, dict) else None, -32600, "Invalid Request")
+
+    method = data.get('method')
+    params = data.get('params', {})
+    request_id = data.get('id')
+
+    if not method:
+        return jsonrpc_error(request_id, -32600, "Invalid Request")
+
+    # Notifications get no response
+    if 'id' not in data:
+        await run_blocking(request, request.app.state.mcp_server.handle_message, data)
+        return Response(status_code=202)
+
+    # Static listings are served pre-serialized, with an ETag
+    catalog = request.app.state.mcp_server.get_catalog(method)
+    if catalog is not None:
+        return catalog_response(request, request_id, catalog)
+
+    return message_response(await call_method(request, method, params, request_id))
+
+async def get_capabilities(request: Request) -> JSONResponse:
+    """Get server capabilities."""
+    return JSONResponse(request.app.state.mcp_server.get_capabilities())
+
+async def get_status(request: Request) -> JSONResponse:
+    """Get server status."""
+    try:
+        status = await run_blocking(request, request.app.state.mcp_server.get_status)
+        status['sse_sessions'] = request.app.state.sessions.stats()
+        status['notifications'] = request.app.state.notifier.stats()
+        status['admission'] = request.app.state.admission.stats()
+        return JSONResponse(status)
+    except Exception as e:
+        logger.error(f"Error getting status: {e}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+# --- /sse ---
+
+async def sse_connect(request: Request) -> Response:
+    """
+    MCP-compliant SSE endpoint.
+
+    Opens a session, announces its message endpoint in an `endpoint` event,
+    then streams the session's outbound messages, with a heartbeat whenever
+    the stream has been quiet for HEARTBEAT_INTERVAL seconds.
+    """
+    sessions = request.app.state.sessions
+    try:
+        session = sessions.create()
+    except SessionLimitError as e:
+        logger.warning(f"Rejected SSE connection: {e}")
+        return jsonrpc_error(None, -32000, str(e), status_code=503)
+
+    root_path = request.scope.get('root_path', '')
+    endpoint = f"{root_path}/sse/messages?session_id={session.id}"
+
+    async def event_stream():
+        try:
+            yield {'event': 'endpoint', 'data': endpoint}
+
+            # Send MCP initialization
+            yield {'data': json.dumps({
+                "jsonrpc": "2.0",
+                "method": "notifications/initialized",
+                "params": {}
+            })}
+
+            while True:
+                try:
+                    message = await session.receive(HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    message = {
+                        "jsonrpc": "2.0",
+                        "method": "notifications/heartbeat",
+                        "params": {"timestamp": datetime.now().isoformat()}
+                    }
+                if message is CLOSED:
+                    logger.info(f"SSE session {session.id} closed: {session.close_reason}")
+                    break
+                yield {'data': encode_message(message).decode('utf-8')}
+                # The event reached the client, heartbeats included: a session
+                # that is only listening is not idle while its stream drains
+                session.touch()
+
+        except asyncio.CancelledError:
+            logger.info("SSE connection closed")
+            raise
+        finally:
+            sessions.close(session.id, "disconnected")
+
+    return EventSourceResponse(event_stream(), headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Disable nginx buffering
+    })
+
+async def respond_on_stream(request: Request, session, data: Any) -> None:
+    """Process a session message or batch and queue its response on the session's stream."""
+    try:
+        if isinstance(data, list):
+            response = await call_batch(request, data, session.id)
+            if not response:
+                return
+        else:
+            response = await call_method(request, data.get('method'), data.get('params', {}), data.get('id'),
+                                         session.id)
+        await session.send(response)
+    except SessionClosedError:
+        logger.debug(f"Dropped response for closed SSE session {session.id}")
+    finally:
+        session.inflight.release()
+
+async def sse_message(request: Request) -> Response:
+    """
+    Accept a JSON-RPC message for an SSE session.
+
+    Requests are acknowledged with 202 Accepted and answered on the session's
+    stream. Once the session has a full queue's worth of unanswered requests,
+    this waits for responses to drain before accepting more. A request stays
+    in flight for admission control until its response is queued.
+    """
+    session = request.app.state.sessions.get(request.query_params.get('session_id'))
+    if session is None:
+        return jsonrpc_error(None, -32001, "Session not found", status_code=404)
+
+    data = await read_json(request)
+    if isinstance(data, list):
+        if not data:
+            return jsonrpc_error(None, -32600, "Invalid Request", status_code=400)
+    elif not isinstance(data, dict) or data.get('jsonrpc') != '2.0' or not data.get('method'):
+        return jsonrpc_error(data.get('id') if isinstance(data, dict) else None,
+                             -32600, "Invalid Request", status_code=400)
+
+    session.touch()
+
+    # Notifications get no response
+    if isinstance(data, dict) and 'id' not in data:
+        await run_blocking(request, request.app.state.mcp_server.handle_message, data, session.id)
+        return Response(status_code=202)
+
+    await session.inflight.acquire()
+    if session.closed:
+        session.inflight.release()
+        return jsonrpc_error(None, -32001, "Session closed", status_code=404)
+
+    # The admission slot is released when the task is done, even if it is
+    # cancelled before it starts
+    request.state.admission_deferred = True
+    task = asyncio.create_task(respond_on_stream(request, session, data))
+    task.add_done_callback(lambda _: request.app.state.admission.release())
+    session.track(task)
+    return Response(status_code=202)
+
+async def sse_post(request: Request) -> Response:
+    """Handle MCP JSON-RPC messages (single or batch) via POST to SSE endpoint."""
+    data = await read_json(request)
+    if isinstance(data, list):
+        return await batch_response(request, data, empty_status=400)
+    if not data or not isinstance(data, dict):
+        return jsonrpc_error(None, -32600, "Invalid Request", status_code=400)
+
+    # Notifications get no response
+    if 'id' not in data:
+        await run_blocking(request, request.app.state.mcp_server.handle_message, data)
+        return Response(status_code=202)
+
+    method = data.get("method")
+    params = data.get("params", {})
+    request_id = data.get("id")
+
+    logger.debug(f"Handling MCP method: {method}")
+
+    catalog = request.app.state.mcp_server.get_catalog(method)
+    if catalog is not None:
+        return catalog_response(request, request_id, catalog)
+
+    mcp_server = request.app.state.mcp_server
+    try:
+        result = await run_blocking(request, mcp_server.dispatch, method, params)
+    except MethodNotFoundError as e:
+        return jsonrpc_error(request_id, -32601, str(e), status_code=404)
+    except Exception as e:
+        logger.error(f"Error handling MCP request: {e}")
+        return jsonrpc_error(request_id, -32603, f"Internal Error: {str(e)}", status_code=500)
+
+    return Response(encode_response(request_id, result), media_type='application/json')
+
+rpc_routes = [
+    Route('/rpc/jsonrpc', handle_jsonrpc, methods=['POST']),
+    Route('/rpc/capabilities', get_capabilities, methods=['GET']),
+    Route('/rpc/status', get_status, methods=['GET'])
+]
+
+sse_routes = [
+    Route(path, endpoint, methods=[method])
+    for path in ('/sse', '/sse/')
+    for endpoint, method in ((sse_connect, 'GET'), (sse_post, 'POST'))
+] + [
+    Route(path, sse_message, methods=['POST'])
+    for path in ('/sse/messages', '/sse/messages/')
+]
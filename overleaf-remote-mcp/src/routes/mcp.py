@@ -7,22 +7,69 @@ It handles MCP requests and routes them to the appropriate handlers.
 
 import json
 import logging
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, g
 from typing import Dict, Any, Optional
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from src.services.admission import Rejection
+from src.services.mcp_server import MethodNotFoundError
+from src.utils.serialization import encode_batch, encode_response
 
 logger = logging.getLogger(__name__)
 
 mcp_bp = Blueprint('mcp', __name__)
 
+def admit_request():
+    """
+    Admission control for JSON-RPC POSTs, run before the route.
+    
+    Refuses oversized bodies before they are parsed, sheds load when too many
+    requests are in flight, and applies the client's rate limits. The parsed
+    body is cached by Flask, so the route does not parse it again.
+    """
+    if request.method != 'POST':
+        return None
+    
+    admission = current_app.admission
+    rejection = admission.check_size(request.content_length)
+    data = None
+    if rejection is None:
+        try:
+            data = request.get_json(silent=True)
+        except RequestEntityTooLarge:
+            # Chunked body that grew past MAX_CONTENT_LENGTH while reading
+            rejection = admission.reject_too_large()
+    
+    if rejection is None:
+        rejection = admission.admit(request.remote_addr or '', data if isinstance(data, list) else [data])
+    
+    if rejection is not None:
+        request_id = data.get('id') if isinstance(data, dict) else None
+        return create_rejection_response(request_id, rejection)
+    
+    g.admitted = True
+    return None
+
+def release_request(exc=None) -> None:
+    """Release an admitted request's in-flight slot once it has been handled."""
+    if g.pop('admitted', False):
+        current_app.admission.release()
+
+mcp_bp.before_request(admit_request)
+mcp_bp.teardown_request(release_request)
+
 @mcp_bp.route('/jsonrpc', methods=['POST'])
 def handle_jsonrpc():
     """Handle JSON-RPC requests for MCP protocol."""
     try:
         # Parse JSON-RPC request
         data = request.get_json()
-        if not data:
+        if data is None:
             return create_error_response(None, -32700, "Parse error")
         
+        if isinstance(data, list):
+            return handle_batch(data)
+        
         # Validate JSON-RPC format
         if not isinstance(data, dict) or data.get('jsonrpc') != '2.0':
             return create_error_response(data.get('id'), -32600, "Invalid Request")
@@ -41,35 +88,23 @@ def handle_jsonrpc():
         if not mcp_server:
             return create_error_response(request_id, -32603, "MCP server not initialized")
         
+        # Notifications get no response
+        if 'id' not in data:
+            mcp_server.handle_message(data)
+            return '', 202
+        
+        # Static listings are served pre-serialized, with an ETag
+        catalog = mcp_server.get_catalog(method)
+        if catalog is not None:
+            return create_catalog_response(request_id, catalog)
+        
         # Route to appropriate handler
         try:
-            if method == 'initialize':
-                result = await_if_needed(mcp_server.handle_initialize(params))
-            elif method == 'resources/list':
-                result = await_if_needed(mcp_server.handle_list_resources(params))
-            elif method == 'resources/read':
-                result = await_if_needed(mcp_server.handle_read_resource(params))
-            elif method == 'resources/subscribe':
-                result = await_if_needed(mcp_server.handle_subscribe_resource(params))
-            elif method == 'resources/unsubscribe':
-                result = await_if_needed(mcp_server.handle_unsubscribe_resource(params))
-            elif method == 'tools/list':
-                result = await_if_needed(mcp_server.handle_list_tools(params))
-            elif method == 'tools/call':
-                result = await_if_needed(mcp_server.handle_call_tool(params))
-            elif method == 'prompts/list':
-                result = await_if_needed(mcp_server.handle_list_prompts(params))
-            elif method == 'prompts/get':
-                result = await_if_needed(mcp_server.handle_get_prompt(params))
-            elif method == 'logging/setLevel':
-                result = await_if_needed(mcp_server.handle_set_log_level(params))
-            elif method == 'ping':
-                result = {'status': 'pong', 'timestamp': str(datetime.utcnow())}
-            else:
-                return create_error_response(request_id, -32601, f"Method not found: {method}")
-            
+            result = mcp_server.dispatch(method, params)
             return create_success_response(request_id, result)
             
+        except MethodNotFoundError as e:
+            return create_error_response(request_id, -32601, str(e))
         except Exception as e:
             logger.error(f"Error handling MCP request {method}: {e}")
             return create_error_response(request_id, -32603, f"Internal error: {str(e)}")
@@ -78,6 +113,29 @@ def handle_jsonrpc():
         logger.error(f"Error processing JSON-RPC request: {e}")
         return create_error_response(None, -32700, "Parse error")
 
+def handle_batch(messages: list):
+    """
+    Handle a JSON-RPC batch request.
+    
+    Independent read-only calls run concurrently on the MCP server's worker
+    pool and writes run in batch order. Responses are returned in batch
+    order; notifications get none, and a batch of only notifications gets
+    an empty 202 response.
+    """
+    if not messages:
+        return create_error_response(None, -32600, "Invalid Request")
+    
+    mcp_server = current_app.mcp_server
+    if not mcp_server:
+        return create_error_response(None, -32603, "MCP server not initialized")
+    
+    logger.debug(f"Handling MCP batch of {len(messages)} messages")
+    
+    responses = mcp_server.handle_batch(messages)
+    if not responses:
+        return '', 202
+    return Response(encode_batch(responses), mimetype='application/json')
+
 @mcp_bp.route('/capabilities', methods=['GET'])
 def get_capabilities():
     """Get server capabilities."""
@@ -102,20 +160,38 @@ def get_status():
             return jsonify({'status': 'error', 'message': 'MCP server not initialized'}), 500
         
         status = mcp_server.get_status()
+        status['admission'] = current_app.admission.stats()
         return jsonify(status)
     
     except Exception as e:
         logger.error(f"Error getting status: {e}")
         return jsonify({'error': str(e)}), 500
 
-def create_success_response(request_id: Optional[Any], result: Any) -> Dict[str, Any]:
-    """Create a JSON-RPC success response."""
-    response = {
-        'jsonrpc': '2.0',
-        'id': request_id,
-        'result': result
-    }
-    return jsonify(response)
+def create_success_response(request_id: Optional[Any], result: Any) -> Response:
+    """Create a JSON-RPC success response, encoding the result once."""
+    return Response(encode_response(request_id, result), mimetype='application/json')
+
+def create_catalog_response(request_id: Optional[Any], catalog) -> Response:
+    """
+    Create a JSON-RPC response from a pre-serialized catalog.
+    
+    Answers 304 Not Modified when the request's If-None-Match matches the
+    catalog's ETag.
+    """
+    if catalog.matches(request.headers.get('If-None-Match')):
+        response = Response(status=304)
+    else:
+        response = Response(catalog.response_bytes(request_id), mimetype='application/json')
+    response.headers['ETag'] = catalog.etag
+    return response
+
+def create_rejection_response(request_id: Optional[Any], rejection: Rejection) -> Response:
+    """Create the JSON-RPC error response for a refused request, with Retry-After if set."""
+    response = create_error_response(request_id, rejection.code, rejection.message)
+    response.status_code = rejection.status
+    if rejection.retry_after is not None:
+        response.headers['Retry-After'] = str(rejection.retry_after)
+    return response
 
 def create_error_response(request_id: Optional[Any], code: int, message: str, data: Optional[Any] = None) -> Dict[str, Any]:
     """Create a JSON-RPC error response."""
@@ -132,11 +208,3 @@ def create_error_response(request_id: Optional[Any], code: int, message: str, da
         'error': error
     }
     return jsonify(response)
-
-def await_if_needed(result):
-    """Handle both sync and async results."""
-    return result  # Your methods are actually sync, not async
-
-# Import datetime for ping response
-from datetime import datetime
-
@@ -2,11 +2,18 @@ import json
 import time
 import logging
 from datetime import datetime
-from flask import Blueprint, Response, stream_with_context, request, jsonify
+from flask import Blueprint, Response, current_app, stream_with_context, request, jsonify
+
+from src.services.mcp_server import MethodNotFoundError
+from src.routes.mcp import admit_request, create_catalog_response, create_success_response, release_request
+from src.utils.serialization import encode_batch
 
 logger = logging.getLogger(__name__)
 sse_bp = Blueprint("sse", __name__)
 
+sse_bp.before_request(admit_request)
+sse_bp.teardown_request(release_request)
+
 @sse_bp.route("/", methods=['GET'], strict_slashes=False)
 def sse_connect():
     """MCP-compliant SSE endpoint."""
@@ -54,12 +61,12 @@ def sse_connect():
 @sse_bp.route("/", methods=['POST'], strict_slashes=False)
 def sse_post():
     """Handle MCP JSON-RPC messages via POST to SSE endpoint."""
-    from flask import current_app
-    
     try:
         # Get JSON-RPC request
         data = request.get_json()
-        if not data:
+        if isinstance(data, list) and data:
+            return sse_batch(data)
+        if not data or not isinstance(data, dict):
             return jsonify({
                 "jsonrpc": "2.0",
                 "id": None,
@@ -81,6 +88,13 @@ def sse_post():
                 }
             }), 500
         
+        # Notifications get no response
+        if "id" not in data:
+            mcp_server.handle_message(data)
+            response = Response(status=202)
+            response.headers['Access-Control-Allow-Origin'] = '*'
+            return response
+        
         # Route MCP method to appropriate handler
         method = data.get("method")
         params = data.get("params", {})
@@ -88,43 +102,27 @@ def sse_post():
         
         logger.debug(f"Handling MCP method: {method}")
         
-        # Handle different MCP methods
-        if method == "initialize":
-            result = mcp_server.handle_initialize(params)
-        elif method == "resources/list":
-            result = mcp_server.handle_list_resources(params)
-        elif method == "resources/read":
-            result = mcp_server.handle_read_resource(params)
-        elif method == "resources/subscribe":
-            result = mcp_server.handle_subscribe_resource(params)
-        elif method == "resources/unsubscribe":
-            result = mcp_server.handle_unsubscribe_resource(params)
-        elif method == "tools/list":
-            result = mcp_server.handle_list_tools(params)
-        elif method == "tools/call":
-            result = mcp_server.handle_call_tool(params)
-        elif method == "prompts/list":
-            result = mcp_server.handle_list_prompts(params)
-        elif method == "prompts/get":
-            result = mcp_server.handle_get_prompt(params)
-        elif method == "logging/setLevel":
-            result = mcp_server.handle_set_log_level(params)
-        else:
+        # Static listings are served pre-serialized, with an ETag
+        catalog = mcp_server.get_catalog(method)
+        if catalog is not None:
+            response = create_catalog_response(request_id, catalog)
+            response.headers['Access-Control-Allow-Origin'] = '*'
+            return response
+        
+        try:
+            result = mcp_server.dispatch(method, params)
+        except MethodNotFoundError as e:
             return jsonify({
                 "jsonrpc": "2.0",
                 "id": request_id,
                 "error": {
                     "code": -32601,
-                    "message": f"Method not found: {method}"
+                    "message": str(e)
                 }
             }), 404
         
         # Return successful response
-        response = jsonify({
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "result": result
-        })
+        response = create_success_response(request_id, result)
         
         # Add CORS headers
         response.headers['Access-Control-Allow-Origin'] = '*'
@@ -144,6 +142,34 @@ def sse_post():
             }
         }), 500
 
+def sse_batch(messages):
+    """Handle a JSON-RPC batch POSTed to the SSE endpoint."""
+    mcp_server = current_app.mcp_server
+    if not mcp_server:
+        return jsonify({
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {
+                "code": -32603,
+                "message": "Internal Error: MCP server not initialized"
+            }
+        }), 500
+    
+    logger.debug(f"Handling MCP batch of {len(messages)} messages")
+    
+    responses = mcp_server.handle_batch(messages)
+    if responses:
+        response = Response(encode_batch(responses), mimetype='application/json')
+    else:
+        response = Response(status=202)
+    
+    # Add CORS headers
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, Accept'
+    
+    return response
+
 # Add OPTIONS handler for CORS preflight
 @sse_bp.route("/", methods=['OPTIONS'], strict_slashes=False)
 def sse_options():
@@ -0,0 +1,267 @@
+"""
+Admission Control
+
+This module decides whether a JSON-RPC request is accepted before any work
+is done for it. Requests are refused when their body exceeds the size limit,
+when the server already has too many requests in flight (load shedding), or
+when the client has run out of tokens in its rate-limit buckets.
+
+Every client has a token bucket for all of its messages, refilled at
+MCP_RATE_LIMIT per minute, and optionally one bucket per configured method,
+so that expensive calls such as a sync can be limited more tightly than
+reads. A tools/call message counts against both 'tools/call' and
+'tools/call:<tool name>'.
+"""
+
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from src.utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+# JSON-RPC error codes (implementation-defined server error range)
+RATE_LIMITED = -32029
+OVERLOADED = -32030
+REQUEST_TOO_LARGE = -32031
+
+# Seconds a client is asked to wait when requests are shed
+SHED_RETRY_AFTER = 1
+
+# Buckets kept before the least recently used are dropped
+DEFAULT_MAX_BUCKETS = 10000
+
+class Rejection(NamedTuple):
+    """Why a request was refused, and how to tell the client."""
+    status: int
+    code: int
+    message: str
+    retry_after: Optional[int] = None
+
+class TokenBucket:
+    """A token bucket refilled continuously at a fixed rate."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens held (the allowed burst)
+            now: Current monotonic time
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def wait_time(self, now: float, cost: float) -> float:
+        """
+        Refill the bucket and get how long until cost tokens are available.
+
+        Returns:
+            0.0 if the tokens are available now, otherwise seconds to wait
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        cost = min(cost, self.capacity)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, cost: float) -> None:
+        """Remove tokens after wait_time reported them available."""
+        self.tokens -= min(cost, self.capacity)
+
+def parse_method_limits(spec: str) -> Dict[str, int]:
+    """
+    Parse per-method rate limits.
+
+    Args:
+        spec: Comma-separated 'method=per_minute' pairs, e.g.
+            'tools/call:sync_to_overleaf=10,resources/read=600'
+
+    Returns:
+        Requests per minute by method key
+
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    limits = {}
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        method, sep, value = entry.rpartition('=')
+        if not sep or not method.strip():
+            raise ValueError(f"Invalid method rate limit: {entry!r}")
+        limits[method.strip()] = int(value)
+    return limits
+
+def method_keys(messages: List[Any]) -> Dict[str, int]:
+    """
+    Count the rate-limit keys used by a request's messages.
+
+    Args:
+        messages: Parsed JSON-RPC messages (entries that are not messages are ignored)
+
+    Returns:
+        Number of messages per method key
+    """
+    keys: Dict[str, int] = {}
+    for message in messages:
+        if not isinstance(message, dict):
+            continue
+        method = message.get('method')
+        if not isinstance(method, str):
+            continue
+        keys[method] = keys.get(method, 0) + 1
+        if method == 'tools/call':
+            params = message.get('params')
+            name = params.get('name') if isinstance(params, dict) else None
+            if isinstance(name, str):
+                key = f"tools/call:{name}"
+                keys[key] = keys.get(key, 0) + 1
+    return keys
+
+class AdmissionController:
+    """
+    Thread-safe admission control shared by all JSON-RPC routes.
+
+    A request admitted with admit() counts as in flight until release().
+    """
+
+    def __init__(self, rate_limit: int, method_limits: Optional[Dict[str, int]] = None,
+                 max_inflight: int = 0, max_request_size: int = 0,
+                 max_buckets: int = DEFAULT_MAX_BUCKETS):
+        """
+        Initialize the controller.
+
+        Args:
+            rate_limit: Messages per minute per client (0 disables)
+            method_limits: Messages per minute per client for specific method keys
+            max_inflight: Requests processed at once before shedding (0 disables)
+            max_request_size: Largest accepted request body in bytes (0 disables)
+            max_buckets: Buckets kept before the least recently used are dropped
+        """
+        self.rate_limit = rate_limit
+        self.method_limits = dict(method_limits or {})
+        self.max_inflight = max_inflight
+        self.max_request_size = max_request_size
+        self.max_buckets = max_buckets
+
+        self._buckets: 'OrderedDict[Tuple[str, str], TokenBucket]' = OrderedDict()
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+        self._admitted = 0
+        self._rate_limited = 0
+        self._shed = 0
+        self._too_large = 0
+
+    @classmethod
+    def from_config(cls, config: Config) -> 'AdmissionController':
+        """Create a controller from MCP_RATE_LIMIT, MCP_METHOD_RATE_LIMITS, MCP_MAX_INFLIGHT and MCP_MAX_REQUEST_SIZE."""
+        return cls(
+            rate_limit=config.RATE_LIMIT,
+            method_limits=parse_method_limits(config.METHOD_RATE_LIMITS),
+            max_inflight=config.MAX_INFLIGHT,
+            max_request_size=config.MAX_REQUEST_SIZE
+        )
+
+    def check_size(self, size: Optional[int]) -> Optional[Rejection]:
+        """
+        Check a request body size (from Content-Length or bytes read so far).
+
+        Returns:
+            A rejection if the body is too large, otherwise None
+        """
+        if not self.max_request_size or size is None or size <= self.max_request_size:
+            return None
+        return self.reject_too_large()
+
+    def reject_too_large(self) -> Rejection:
+        """Count and build the rejection for an oversized body."""
+        with self._lock:
+            self._too_large += 1
+        return Rejection(413, REQUEST_TOO_LARGE,
+                         f"Request body exceeds {self.max_request_size} bytes")
+
+    def admit(self, client: str, messages: List[Any]) -> Optional[Rejection]:
+        """
+        Admit a request, or refuse it without consuming any tokens.
+
+        Args:
+            client: Client identity (remote address)
+            messages: Parsed JSON-RPC messages of the request
+
+        Returns:
+            None if admitted (call release() when done), otherwise a rejection
+        """
+        keys = method_keys(messages)
+        now = time.monotonic()
+
+        with self._lock:
+            if self.max_inflight and self._inflight >= self.max_inflight:
+                self._shed += 1
+                return Rejection(503, OVERLOADED, "Server overloaded, retry later", SHED_RETRY_AFTER)
+
+            costs = []
+            if self.rate_limit:
+                # Every request costs at least one token, even if it holds no valid message
+                count = max(1, sum(1 for message in messages if isinstance(message, dict)))
+                costs.append((self._bucket(client, '*', self.rate_limit, now), count))
+            for key, count in keys.items():
+                limit = self.method_limits.get(key)
+                if limit:
+                    costs.append((self._bucket(client, key, limit, now), count))
+
+            wait = max((bucket.wait_time(now, cost) for bucket, cost in costs), default=0.0)
+            if wait > 0:
+                self._rate_limited += 1
+                return Rejection(429, RATE_LIMITED, "Rate limit exceeded", max(1, math.ceil(wait)))
+
+            for bucket, cost in costs:
+                bucket.take(cost)
+            self._inflight += 1
+            self._admitted += 1
+            return None
+
+    def release(self) -> None:
+        """Mark an admitted request as finished."""
+        with self._lock:
+            self._inflight -= 1
+
+    def _bucket(self, client: str, key: str, per_minute: int, now: float) -> TokenBucket:
+        """Get or create a client's bucket for a key; call with the lock held."""
+        bucket = self._buckets.get((client, key))
+        if bucket is None:
+            # A full minute's allowance may be used as a burst
+            bucket = TokenBucket(per_minute / 60.0, per_minute, now)
+            self._buckets[(client, key)] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end((client, key))
+        return bucket
+
+    def stats(self) -> Dict[str, Any]:
+        """Get admission counters and limiter state."""
+        with self._lock:
+            return {
+                'inflight': self._inflight,
+                'max_inflight': self.max_inflight,
+                'admitted': self._admitted,
+                'rate_limited': self._rate_limited,
+                'shed': self._shed,
+                'too_large': self._too_large,
+                'buckets': len(self._buckets),
+                'rate_limit': self.rate_limit,
+                'method_limits': dict(self.method_limits)
+            }
@@ -0,0 +1,153 @@
+"""
+Blob Store
+
+This module provides content-addressed storage for document text.
+Content is keyed by its SHA-256 hash and stored once, compressed, no matter
+how many documents, versions or templates reference it. Blobs are reference
+counted and unreferenced blobs are removed by garbage collection.
+"""
+
+import zlib
+import hashlib
+import sqlite3
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# zlib level used for stored blobs
+COMPRESSION_LEVEL = 6
+
+def hash_content(content: str) -> str:
+    """Return the content address (SHA-256 hex digest) of a text."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+class BlobStore:
+    """
+    Reference-counted, compressed blob storage on top of the blobs table.
+
+    All methods take an open connection so they join the caller's
+    transaction.
+    """
+
+    def put(self, conn: sqlite3.Connection, content: str, content_hash: Optional[str] = None) -> str:
+        """
+        Store content and take a reference to it.
+
+        Args:
+            conn: Connection inside a write transaction
+            content: Text to store
+            content_hash: Precomputed hash of content, if known
+
+        Returns:
+            Content hash
+        """
+        content = content or ''
+        content_hash = content_hash or hash_content(content)
+
+        cursor = conn.execute('''
+            UPDATE blobs SET refcount = refcount + 1
+            WHERE hash = ?
+        ''', (content_hash,))
+
+        if cursor.rowcount == 0:
+            data = content.encode('utf-8')
+            conn.execute('''
+                INSERT INTO blobs (hash, data, size, refcount)
+                VALUES (?, ?, ?, 1)
+            ''', (content_hash, zlib.compress(data, COMPRESSION_LEVEL), len(data)))
+
+        return content_hash
+
+    def release(self, conn: sqlite3.Connection, content_hash: Optional[str]) -> None:
+        """
+        Drop a reference to a blob.
+
+        Blobs whose count reaches zero are kept until the next garbage
+        collection, so content that comes back (for example a revert) is
+        reused without being stored again.
+
+        Args:
+            conn: Connection inside a write transaction
+            content_hash: Hash to release
+        """
+        if content_hash:
+            conn.execute('''
+                UPDATE blobs SET refcount = refcount - 1
+                WHERE hash = ?
+            ''', (content_hash,))
+
+    def get(self, conn: sqlite3.Connection, content_hash: Optional[str]) -> Optional[str]:
+        """
+        Load blob content by hash.
+
+        Args:
+            conn: Open connection
+            content_hash: Hash to load
+
+        Returns:
+            Content, or None if the blob does not exist
+        """
+        if not content_hash:
+            return None
+
+        row = conn.execute('''
+            SELECT data FROM blobs
+            WHERE hash = ?
+        ''', (content_hash,)).fetchone()
+
+        return self.decode(row[0]) if row else None
+
+    @staticmethod
+    def decode(data: Optional[bytes]) -> Optional[str]:
+        """Decompress stored blob data."""
+        if data is None:
+            return None
+        return zlib.decompress(data).decode('utf-8')
+
+    def has_garbage(self, conn: sqlite3.Connection) -> bool:
+        """Check whether any blob is unreferenced."""
+        return conn.execute('SELECT 1 FROM blobs WHERE refcount <= 0 LIMIT 1').fetchone() is not None
+
+    def collect_garbage(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        """
+        Delete blobs that are no longer referenced.
+
+        Args:
+            conn: Connection inside a write transaction
+
+        Returns:
+            Number of blobs and stored bytes reclaimed
+        """
+        row = conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0)
+            FROM blobs
+            WHERE refcount <= 0
+        ''').fetchone()
+
+        if row[0]:
+            conn.execute('DELETE FROM blobs WHERE refcount <= 0')
+            logger.info(f"Garbage collected {row[0]} blobs ({row[1]} bytes)")
+
+        return {'blobs': row[0], 'bytes': row[1]}
+
+    def stats(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        """
+        Get blob storage statistics.
+
+        Returns:
+            Blob count, unique and stored sizes, and total references
+        """
+        row = conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0),
+                   COALESCE(SUM(refcount), 0), COALESCE(SUM(size * refcount), 0)
+            FROM blobs
+        ''').fetchone()
+
+        return {
+            'blobs': row[0],
+            'unique_bytes': row[1],
+            'stored_bytes': row[2],
+            'references': row[3],
+            'logical_bytes': row[4]
+        }
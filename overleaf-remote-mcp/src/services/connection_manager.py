@@ -0,0 +1,220 @@
+"""
+Connection Manager
+
+This module provides pooled SQLite connections for the Document Service.
+Readers check warm connections out of an idle pool, while all writes go
+through a single serialized writer connection. The database runs in WAL mode so that
+readers never block the writer and vice versa.
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from src.utils.metrics import SQLITE_SECONDS, SQLITE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Series for the time connections are held and the writer is waited for
+READ_SECONDS = SQLITE_SECONDS.labels('read')
+WRITE_SECONDS = SQLITE_SECONDS.labels('write')
+WRITER_WAIT_SECONDS = SQLITE_WAIT_SECONDS.labels()
+
+# Pragmas applied to every connection opened by the manager
+DEFAULT_PRAGMAS = {
+    'synchronous': 'NORMAL',     # Safe with WAL, avoids an fsync per commit
+    'cache_size': -16000,        # 16 MB page cache per connection
+    'mmap_size': 268435456,      # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000
+}
+
+# Number of compiled statements kept per connection
+STATEMENT_CACHE_SIZE = 256
+
+# Idle read connections kept open for reuse
+DEFAULT_MAX_IDLE_READERS = 16
+
+class ConnectionManager:
+    """
+    SQLite connection manager with pooled readers and a single writer.
+
+    Connections are opened lazily and kept for the lifetime of the manager,
+    so the per-call cost of a query is just statement execution. Each
+    connection keeps a cache of prepared statements keyed by SQL text.
+    """
+
+    def __init__(self, db_path: str, pragmas: Dict[str, object] = None,
+                 max_idle_readers: int = DEFAULT_MAX_IDLE_READERS):
+        """
+        Initialize the connection manager.
+
+        Args:
+            db_path: Path to the SQLite database file
+            pragmas: Optional pragma overrides
+            max_idle_readers: Maximum number of idle read connections kept open
+        """
+        self.db_path = db_path
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+
+        self.max_idle_readers = max_idle_readers
+
+        self._local = threading.local()
+        self._idle_readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._writer: sqlite3.Connection = None
+        self._writer_lock = threading.RLock()
+        self._after_transaction: List[Tuple[Callable[[], None], bool]] = []
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection."""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            isolation_level=None  # Transactions are managed explicitly
+        )
+        conn.execute('PRAGMA journal_mode = WAL')
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Get a read connection for the current thread.
+
+        Connections are checked out of an idle pool and returned to it when
+        the block exits, so short-lived request threads reuse warm
+        connections. Nested use from the same thread gets the same
+        connection, and a thread holding the writer reads through it so it
+        sees its own uncommitted changes.
+
+        Yields:
+            SQLite connection for read-only queries
+        """
+        if self._closed:
+            raise RuntimeError("Connection manager is closed")
+
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+
+        start = time.perf_counter()
+        with self._readers_lock:
+            conn = self._idle_readers.pop() if self._idle_readers else None
+        if conn is None:
+            conn = self._connect()
+            conn.execute('PRAGMA query_only = ON')
+
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            with self._readers_lock:
+                if not self._closed and len(self._idle_readers) < self.max_idle_readers:
+                    self._idle_readers.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+            READ_SECONDS.observe(time.perf_counter() - start)
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Get the writer connection inside an immediate transaction.
+
+        Only one thread can hold the writer at a time. The transaction is
+        committed when the block exits normally and rolled back on error.
+        Nested use from the same thread joins the outer transaction.
+
+        Yields:
+            SQLite connection for write queries
+        """
+        start = time.perf_counter()
+        with self._writer_lock:
+            if self._closed:
+                raise RuntimeError("Connection manager is closed")
+
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+
+            if conn.in_transaction:
+                yield conn
+                return
+
+            acquired = time.perf_counter()
+            WRITER_WAIT_SECONDS.observe(acquired - start)
+
+            previous = getattr(self._local, 'conn', None)
+            committed = False
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Only mark the thread as in a transaction once BEGIN succeeded
+                self._local.conn = conn
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            else:
+                conn.execute('COMMIT')
+                committed = True
+            finally:
+                self._local.conn = previous
+                callbacks, self._after_transaction = self._after_transaction, []
+                for callback, commit_only in callbacks:
+                    if committed or not commit_only:
+                        callback()
+                WRITE_SECONDS.observe(time.perf_counter() - acquired)
+
+    def in_write_transaction(self) -> bool:
+        """Whether the current thread holds the writer inside a transaction."""
+        conn = getattr(self._local, 'conn', None)
+        return conn is not None and conn is self._writer
+
+    def after_transaction(self, callback: Callable[[], None], commit_only: bool = False) -> None:
+        """
+        Run a callback once the current write transaction ends.
+
+        Callbacks run after COMMIT or ROLLBACK, while the writer is still
+        held. Outside a transaction the callback runs immediately.
+
+        Args:
+            callback: Function to call
+            commit_only: Skip the callback if the transaction rolls back
+        """
+        with self._writer_lock:
+            if self._writer is not None and self._writer.in_transaction:
+                self._after_transaction.append((callback, commit_only))
+                return
+        callback()
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        with self._writer_lock:
+            self._closed = True
+            if self._writer is not None:
+                try:
+                    self._writer.execute('PRAGMA optimize')
+                except sqlite3.Error as e:
+                    logger.debug(f"PRAGMA optimize failed: {e}")
+                self._writer.close()
+                self._writer = None
+
+        with self._readers_lock:
+            for conn in self._idle_readers:
+                conn.close()
+            self._idle_readers.clear()
+
+        logger.info("Connection manager closed")
@@ -6,15 +6,29 @@ It handles local document storage, version control, and project management.
 """
 
 import os
+import copy
 import json
 import uuid
-import sqlite3
 import logging
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
 from src.utils.config import Config
+from src.utils.cache import LRUCache, MISSING
+from src.utils.metrics import QUERY_ERRORS, QUERY_SECONDS, timed
+from src.services.connection_manager import ConnectionManager
+from src.services.event_bus import LocalEventBus, create_event_bus
+from src.services.blob_store import BlobStore, hash_content
+from src.services.version_store import VersionStore
+from src.services.search_index import SearchIndex
+from src.services.sync_manifest import SyncManifestStore
+from src.services.sync_jobs import SyncJobStore
+from src.services.range_reader import MirrorIndex, read_range, build_line_index
+from src.services.patching import PatchError, PatchConflictError, apply_edits, apply_unified_diff, count_lines
+
+# Bump when the schema changes and add a step to _migrate_schema
+SCHEMA_VERSION = 8
 
 logger = logging.getLogger(__name__)
 
@@ -34,8 +48,19 @@ class DocumentService:
             config: Configuration instance
         """
         self.config = config
-        self.db_path = os.path.join(os.path.dirname(__file__), '..', 'database', 'app.db')
+        # Relative database paths are resolved against the repository root
+        self.db_path = os.path.join(os.path.dirname(__file__), '..', '..', config.DATABASE_PATH)
         self.storage_path = config.get_storage_path()
+        self.db: Optional[ConnectionManager] = None
+        self.blobs = BlobStore()
+        self.versions = VersionStore(self.blobs, config.VERSION_KEYFRAME_INTERVAL)
+        self.search_index = SearchIndex()
+        self.sync_manifest = SyncManifestStore()
+        self.sync_jobs = SyncJobStore()
+        self.mirror = MirrorIndex()
+        self.cache = LRUCache(config.CACHE_MAX_BYTES)
+        # Change events for resource subscriptions (replaced in initialize)
+        self.events: LocalEventBus = LocalEventBus()
         self.initialized = False
         
         logger.info("Document Service initialized")
@@ -46,8 +71,11 @@ class DocumentService:
             # Ensure storage directory exists
             os.makedirs(self.storage_path, exist_ok=True)
             
-            # Initialize database
+            # Open pooled connections and initialize database
+            self.db = ConnectionManager(self.db_path)
             self._init_database()
+            self.events = create_event_bus(self.config.EVENT_BUS_URL)
+            self.collect_garbage()
             
             self.initialized = True
             logger.info("Document Service database initialized")
@@ -57,8 +85,16 @@ class DocumentService:
             raise
     
     def _init_database(self) -> None:
-        """Initialize the database schema."""
-        with sqlite3.connect(self.db_path) as conn:
+        """Initialize the database schema, unless it is already current."""
+        # Every launch of the stdio server starts here; on an up-to-date
+        # database, skip the DDL and the write lock it would take
+        with self.db.reader() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version == SCHEMA_VERSION:
+            logger.debug(f"Database schema is current (version {version})")
+            return
+        
+        with self.db.writer() as conn:
             cursor = conn.cursor()
             
             # Projects table
@@ -83,6 +119,8 @@ class DocumentService:
                     project_id TEXT NOT NULL,
                     filename TEXT NOT NULL,
                     content TEXT,
+                    content_hash TEXT,
+                    search_id INTEGER,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (project_id) REFERENCES projects (id),
@@ -97,6 +135,9 @@ class DocumentService:
                     document_id TEXT NOT NULL,
                     version_number INTEGER NOT NULL,
                     content TEXT,
+                    content_hash TEXT,
+                    delta BLOB,
+                    is_keyframe INTEGER DEFAULT 0,
                     commit_message TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (document_id) REFERENCES documents (id)
@@ -110,16 +151,116 @@ class DocumentService:
                     name TEXT NOT NULL,
                     document_type TEXT NOT NULL,
                     content TEXT NOT NULL,
+                    content_hash TEXT,
                     description TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
             
-            conn.commit()
+            # Content-addressed blobs shared by documents, versions and templates
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    refcount INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Full-text index over document content
+            self.search_index.create(conn)
+            
+            # What was last pushed to Overleaf, per project and path
+            self.sync_manifest.create(conn)
+            
+            # Background syncs to Overleaf
+            self.sync_jobs.create(conn)
+            
+            self._migrate_schema(conn)
             
             # Insert default templates if they don't exist
             self._insert_default_templates(cursor)
-            conn.commit()
+    
+    def _migrate_schema(self, conn) -> None:
+        """Bring an existing database up to SCHEMA_VERSION."""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        
+        # Add missing columns first so data migrations see the final layout
+        self._add_column(conn, 'versions', 'delta', 'BLOB')
+        self._add_column(conn, 'versions', 'is_keyframe', 'INTEGER DEFAULT 0')
+        for table in ('documents', 'versions', 'templates'):
+            self._add_column(conn, table, 'content_hash', 'TEXT')
+        self._add_column(conn, 'documents', 'search_id', 'INTEGER')
+        
+        if version < 1:
+            # Version history moves from full copies to reverse deltas
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_versions_document
+                ON versions (document_id, version_number)
+            ''')
+            self.versions.migrate(conn)
+        
+        if version < 2:
+            # Inline content moves into the content-addressed blob store
+            rows = conn.execute('''
+                SELECT id, content FROM documents
+                WHERE content_hash IS NULL
+            ''').fetchall()
+            for document_id, content in rows:
+                conn.execute('''
+                    UPDATE documents SET content = NULL, content_hash = ?
+                    WHERE id = ?
+                ''', (self.blobs.put(conn, content), document_id))
+            
+            rows = conn.execute('''
+                SELECT id, content FROM templates
+                WHERE content_hash IS NULL
+            ''').fetchall()
+            for template_id, content in rows:
+                conn.execute('''
+                    UPDATE templates SET content = '', content_hash = ?
+                    WHERE id = ?
+                ''', (self.blobs.put(conn, content), template_id))
+            
+            rows = conn.execute('''
+                SELECT id, content FROM versions
+                WHERE is_keyframe = 1 AND content_hash IS NULL
+            ''').fetchall()
+            for version_id, content in rows:
+                conn.execute('''
+                    UPDATE versions SET content = NULL, content_hash = ?
+                    WHERE id = ?
+                ''', (self.blobs.put(conn, content), version_id))
+        
+        if version < 7:
+            # Backfill the full-text index, keyed by the stable search_id
+            # rather than the documents rowid, and without the copy of the
+            # text it used to keep
+            conn.execute('DROP TABLE IF EXISTS documents_fts')
+            self.search_index.create(conn)
+            self.search_index.rebuild(conn, lambda content_hash: self.blobs.get(conn, content_hash))
+            conn.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_search
+                ON documents (search_id)
+            ''')
+        
+        if version < 8:
+            # Pulls find the project linked to an Overleaf project
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_projects_overleaf
+                ON projects (overleaf_id)
+            ''')
+        
+        if version != SCHEMA_VERSION:
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            logger.info(f"Database schema migrated from version {version} to {SCHEMA_VERSION}")
+    
+    def _add_column(self, conn, table: str, column: str, definition: str) -> None:
+        """Add a column to a table if it does not exist yet."""
+        columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if column not in columns:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
     
     def _insert_default_templates(self, cursor) -> None:
         """Insert default LaTeX templates."""
@@ -213,15 +354,22 @@ Your conclusion goes here.
         ]
         
         for template in templates:
+            cursor.execute('SELECT 1 FROM templates WHERE id = ?', (template['id'],))
+            if cursor.fetchone():
+                continue
+            
+            content_hash = self.blobs.put(cursor.connection, template['content'])
             cursor.execute('''
-                INSERT OR IGNORE INTO templates (id, name, document_type, content, description)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO templates (id, name, document_type, content, content_hash, description)
+                VALUES (?, ?, ?, '', ?, ?)
             ''', (template['id'], template['name'], template['document_type'], 
-                  template['content'], template['description']))
+                  content_hash, template['description']))
     
     # Project operations
     
-    def create_project(self, title: str, document_type: str, template_id: Optional[str] = None) -> Dict[str, Any]:
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def create_project(self, title: str, document_type: str, template_id: Optional[str] = None,
+                       main_document: bool = True) -> Dict[str, Any]:
         """
         Create a new project.
         
@@ -229,21 +377,21 @@ Your conclusion goes here.
             title: Project title
             document_type: Type of document (article, report, etc.)
             template_id: Optional template ID to use
+            main_document: Create main.tex, from the template or empty; off
+                for projects whose documents are imported
             
         Returns:
             Project information
         """
         project_id = str(uuid.uuid4())
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self.db.writer() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
                 INSERT INTO projects (id, title, type, template_id)
                 VALUES (?, ?, ?, ?)
             ''', (project_id, title, document_type, template_id))
-            
-            conn.commit()
         
         # Create project directory
         project_dir = os.path.join(self.storage_path, project_id)
@@ -253,11 +401,11 @@ Your conclusion goes here.
         os.makedirs(os.path.join(project_dir, 'compiled'), exist_ok=True)
         
         # Create main document from template
-        if template_id:
+        if main_document and template_id:
             template = self.get_template(template_id)
             if template:
                 self.create_document(project_id, 'main.tex', template['content'])
-        else:
+        elif main_document:
             # Create empty main document
             self.create_document(project_id, 'main.tex', '% Main document\n')
         
@@ -271,9 +419,10 @@ Your conclusion goes here.
             'created_at': datetime.utcnow().isoformat()
         }
     
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
     def list_projects(self) -> List[Dict[str, Any]]:
         """List all projects."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.db.reader() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -298,9 +447,47 @@ Your conclusion goes here.
             
             return projects
     
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def list_projects_page(self, after: Optional[str] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        List active projects in project ID order, one keyset page at a time.
+        
+        Args:
+            after: Last project ID of the previous page
+            limit: Maximum number of projects to return
+            
+        Returns:
+            Project summaries with their document count
+        """
+        with self.db.reader() as conn:
+            cursor = conn.execute('''
+                SELECT p.id, p.title, p.type, p.updated_at,
+                       (SELECT COUNT(*) FROM documents d WHERE d.project_id = p.id)
+                FROM projects p
+                WHERE p.status = 'active' AND p.id > ?
+                ORDER BY p.id
+                LIMIT ?
+            ''', (after or '', limit))
+            
+            return [
+                {
+                    'id': row[0],
+                    'title': row[1],
+                    'type': row[2],
+                    'updated_at': row[3],
+                    'document_count': row[4]
+                }
+                for row in cursor
+            ]
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
     def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
         """Get project by ID."""
-        with sqlite3.connect(self.db_path) as conn:
+        return self._cached(('project', project_id), lambda: self._load_project(project_id))
+    
+    def _load_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Load a project row."""
+        with self.db.reader() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -325,8 +512,21 @@ Your conclusion goes here.
             
             return None
     
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def get_project_by_overleaf_id(self, overleaf_id: str) -> Optional[Dict[str, Any]]:
+        """Get the active project linked to an Overleaf project, the most recently updated if several are."""
+        with self.db.reader() as conn:
+            row = conn.execute('''
+                SELECT id FROM projects
+                WHERE overleaf_id = ? AND status = 'active'
+                ORDER BY updated_at DESC
+                LIMIT 1
+            ''', (overleaf_id,)).fetchone()
+        return self.get_project(row[0]) if row else None
+    
     # Document operations
     
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
     def create_document(self, project_id: str, filename: str, content: str = '') -> Dict[str, Any]:
         """
         Create a new document in a project.
@@ -339,24 +539,11 @@ Your conclusion goes here.
         Returns:
             Document information
         """
-        document_id = str(uuid.uuid4())
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO documents (id, project_id, filename, content)
-                VALUES (?, ?, ?, ?)
-            ''', (document_id, project_id, filename, content))
-            
-            conn.commit()
+        with self.db.writer() as conn:
+            document_id = self._insert_document(conn, project_id, filename, content)
         
         # Save to file system
-        project_dir = os.path.join(self.storage_path, project_id, 'documents')
-        file_path = os.path.join(project_dir, filename)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_files(project_id, {filename: content})
         
         logger.info(f"Created document: {filename} in project {project_id}")
         
@@ -368,9 +555,14 @@ Your conclusion goes here.
             'created_at': datetime.utcnow().isoformat()
         }
     
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
     def list_documents(self, project_id: str) -> List[Dict[str, Any]]:
         """List all documents in a project."""
-        with sqlite3.connect(self.db_path) as conn:
+        return self._cached(('documents', project_id), lambda: self._load_documents(project_id))
+    
+    def _load_documents(self, project_id: str) -> List[Dict[str, Any]]:
+        """Load the document list of a project."""
+        with self.db.reader() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -391,15 +583,22 @@ Your conclusion goes here.
             
             return documents
     
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
     def get_document(self, project_id: str, filename: str) -> Optional[Dict[str, Any]]:
         """Get document content."""
-        with sqlite3.connect(self.db_path) as conn:
+        return self._cached(('document', project_id, filename),
+                            lambda: self._load_document(project_id, filename))
+    
+    def _load_document(self, project_id: str, filename: str) -> Optional[Dict[str, Any]]:
+        """Load a document row and its content."""
+        with self.db.reader() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT id, content, created_at, updated_at
-                FROM documents
-                WHERE project_id = ? AND filename = ?
+                SELECT d.id, b.data, d.content_hash, d.created_at, d.updated_at
+                FROM documents d
+                LEFT JOIN blobs b ON b.hash = d.content_hash
+                WHERE d.project_id = ? AND d.filename = ?
             ''', (project_id, filename))
             
             row = cursor.fetchone()
@@ -408,80 +607,459 @@ Your conclusion goes here.
                     'id': row[0],
                     'project_id': project_id,
                     'filename': filename,
-                    'content': row[1],
-                    'created_at': row[2],
-                    'updated_at': row[3]
+                    'content': self.blobs.decode(row[1]),
+                    'content_hash': row[2],
+                    'created_at': row[3],
+                    'updated_at': row[4]
                 }
             
             return None
     
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def read_document_range(self, project_id: str, filename: str, start_line: Optional[int] = None,
+                            end_line: Optional[int] = None, offset: Optional[int] = None,
+                            length: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Read a line range or byte range of a document.
+        
+        The range is served from a memory map of the on-disk mirror when the
+        mirror holds the current content, falling back to the stored blob.
+        
+        Args:
+            project_id: Project ID
+            filename: Document filename
+            start_line: First line (1-based)
+            end_line: Last line, inclusive (default: last line)
+            offset: First byte, used when no line range is given
+            length: Number of bytes (default: to the end)
+            
+        Returns:
+            Range content with total_lines, total_bytes and a "next" hint
+            holding the arguments for the following range, or None if the
+            document does not exist
+        """
+        range_args = {'start_line': start_line, 'end_line': end_line, 'offset': offset, 'length': length}
+        
+        with self.db.reader() as conn:
+            row = conn.execute('''
+                SELECT d.content_hash, b.size
+                FROM documents d
+                LEFT JOIN blobs b ON b.hash = d.content_hash
+                WHERE d.project_id = ? AND d.filename = ?
+            ''', (project_id, filename)).fetchone()
+            if not row:
+                return None
+            content_hash, size = row[0], row[1] or 0
+            
+            file_path = os.path.join(self.storage_path, project_id, 'documents', filename)
+            result = self.mirror.read(file_path, content_hash, size, **range_args)
+            if result is None:
+                data = (self.blobs.get(conn, content_hash) or '').encode('utf-8')
+                result = read_range(data, build_line_index(data), **range_args)
+        
+        result.update({'project_id': project_id, 'filename': filename, 'content_hash': content_hash})
+        return result
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
     def update_document(self, project_id: str, filename: str, content: str, commit_message: str = '') -> bool:
         """Update document content."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Get current document
-                cursor.execute('''
-                    SELECT id, content FROM documents
-                    WHERE project_id = ? AND filename = ?
-                ''', (project_id, filename))
-                
-                row = cursor.fetchone()
-                if not row:
+            with self.db.writer() as conn:
+                status = self._apply_change(conn, project_id, filename, content, commit_message)
+                if status == 'missing':
                     return False
                 
-                document_id, old_content = row
-                
-                # Create version entry
-                cursor.execute('''
-                    SELECT COALESCE(MAX(version_number), 0) + 1
-                    FROM versions
-                    WHERE document_id = ?
-                ''', (document_id,))
-                
-                version_number = cursor.fetchone()[0]
-                
-                cursor.execute('''
-                    INSERT INTO versions (id, document_id, version_number, content, commit_message)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (str(uuid.uuid4()), document_id, version_number, old_content, commit_message))
-                
-                # Update document
-                cursor.execute('''
-                    UPDATE documents
-                    SET content = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (content, document_id))
-                
-                # Update project timestamp
-                cursor.execute('''
-                    UPDATE projects
-                    SET updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (project_id,))
-                
-                conn.commit()
+                if status == 'updated':
+                    self._touch_project(conn, project_id)
             
-            # Save to file system
-            project_dir = os.path.join(self.storage_path, project_id, 'documents')
-            file_path = os.path.join(project_dir, filename)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            if status == 'updated':
+                # Save to file system
+                self._write_files(project_id, {filename: content})
+                logger.info(f"Updated document: {filename} in project {project_id}")
             
-            logger.info(f"Updated document: {filename} in project {project_id}")
             return True
             
         except Exception as e:
             logger.error(f"Error updating document {filename}: {e}")
             return False
     
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def update_documents(self, project_id: str, changes: List[Dict[str, Any]],
+                         commit_message: str = '', create_missing: bool = True) -> Dict[str, Any]:
+        """
+        Apply many document changes in a single transaction.
+        
+        Either every change is applied or none is. The project timestamp is
+        bumped once, and changed files are written to disk after the commit.
+        
+        Args:
+            project_id: Project ID
+            changes: List of {'filename', 'content', optional 'commit_message'}
+            commit_message: Default commit message for changes without one
+            create_missing: Create documents that do not exist yet
+            
+        Returns:
+            Filenames grouped by outcome (created, updated, unchanged)
+        """
+        filenames = [change.get('filename') for change in changes]
+        if not all(filenames):
+            raise ValueError("Every change needs a filename")
+        if len(set(filenames)) != len(filenames):
+            raise ValueError("Each filename may appear only once per batch")
+        
+        result = {'project_id': project_id, 'created': [], 'updated': [], 'unchanged': []}
+        written = {}
+        
+        with self.db.writer() as conn:
+            if not conn.execute('SELECT 1 FROM projects WHERE id = ?', (project_id,)).fetchone():
+                raise ValueError(f"Project not found: {project_id}")
+            
+            for change in changes:
+                filename = change['filename']
+                content = change.get('content', '')
+                status = self._apply_change(
+                    conn, project_id, filename, content,
+                    change.get('commit_message', commit_message), create=create_missing
+                )
+                if status == 'missing':
+                    raise ValueError(f"Document not found: {filename}")
+                
+                result[status].append(filename)
+                if status != 'unchanged':
+                    written[filename] = content
+            
+            if written:
+                self._touch_project(conn, project_id)
+        
+        self._write_files(project_id, written)
+        
+        logger.info(f"Applied {len(written)} document changes in project {project_id}")
+        return result
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def import_documents(self, project_id: str, files: Dict[str, str], commit_message: str = '',
+                         overleaf_id: Optional[str] = None,
+                         revisions: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, Any]:
+        """
+        Import documents from files on disk in a single transaction.
+        
+        Documents are created or overwritten; overwritten content is kept as a
+        version, and files whose hash matches the current content are
+        skipped. Imported files are then moved into the on-disk project
+        mirror rather than rewritten, so they should be on the same file
+        system as STORAGE_PATH.
+        
+        Args:
+            project_id: Project ID
+            files: File holding each document's content, by filename
+            commit_message: Commit message of the versions created
+            overleaf_id: Overleaf project the files came from; the project is
+                linked to it and the files recorded in its sync manifest
+            revisions: Remote revision of each file, for the sync manifest
+            
+        Returns:
+            Filenames grouped by outcome (created, updated, unchanged, and
+            failed for files that are not UTF-8 text or not a valid path)
+        """
+        revisions = revisions or {}
+        result = {'project_id': project_id, 'created': [], 'updated': [], 'unchanged': [], 'failed': []}
+        project_dir = os.path.join(self.storage_path, project_id, 'documents')
+        
+        # Read and hash everything before taking the write lock
+        contents = {}
+        for filename in sorted(files):
+            target = os.path.normpath(os.path.join(project_dir, filename))
+            if os.path.isabs(filename) or not target.startswith(os.path.normpath(project_dir) + os.sep):
+                logger.warning(f"Not importing {filename}: path outside the project")
+                result['failed'].append(filename)
+                continue
+            try:
+                with open(files[filename], 'rb') as f:
+                    contents[filename] = f.read().decode('utf-8')
+            except (OSError, UnicodeDecodeError) as e:
+                logger.warning(f"Not importing {filename}: {e}")
+                result['failed'].append(filename)
+        hashes = {filename: hash_content(content) for filename, content in contents.items()}
+        
+        with self.db.writer() as conn:
+            if not conn.execute('SELECT 1 FROM projects WHERE id = ?', (project_id,)).fetchone():
+                raise ValueError(f"Project not found: {project_id}")
+            
+            current = dict(conn.execute(
+                'SELECT filename, content_hash FROM documents WHERE project_id = ?', (project_id,)
+            ).fetchall())
+            for filename, content in contents.items():
+                if current.get(filename) == hashes[filename]:
+                    result['unchanged'].append(filename)
+                else:
+                    status = self._apply_change(conn, project_id, filename, content, commit_message, create=True)
+                    result[status].append(filename)
+            
+            if result['created'] or result['updated']:
+                self._touch_project(conn, project_id)
+            if overleaf_id:
+                self._link_overleaf(conn, project_id, overleaf_id)
+                self.sync_manifest.record(conn, project_id, overleaf_id, {
+                    filename: (hashes[filename], revisions.get(filename)) for filename in contents
+                }, [])
+        
+        # The downloaded bytes are the content, so the files become the mirror as they are
+        for filename in result['created'] + result['updated']:
+            file_path = os.path.join(project_dir, filename)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.replace(files[filename], file_path)
+            self.mirror.record(file_path, hashes[filename])
+        
+        logger.info(f"Imported {len(result['created'])} new and {len(result['updated'])} changed documents "
+                    f"into project {project_id}, {len(result['unchanged'])} unchanged, "
+                    f"{len(result['failed'])} failed")
+        return result
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def patch_document(self, project_id: str, filename: str, edits: Optional[List[Dict[str, Any]]] = None,
+                       diff: Optional[str] = None, base_hash: Optional[str] = None,
+                       commit_message: str = '') -> Dict[str, Any]:
+        """
+        Apply range edits or a unified diff to a document.
+        
+        Args:
+            project_id: Project ID
+            filename: Document filename
+            edits: Line or offset range edits (see patching.apply_edits)
+            diff: Unified diff hunks (see patching.apply_unified_diff)
+            base_hash: Expected content hash of the current document; the
+                patch is rejected if the document has changed since
+            commit_message: Commit message for the version
+            
+        Returns:
+            Patch result with the new content hash and line count
+        """
+        if bool(edits) == bool(diff):
+            raise PatchError("Provide either edits or diff")
+        
+        with self.db.writer() as conn:
+            row = conn.execute('''
+                SELECT content_hash FROM documents
+                WHERE project_id = ? AND filename = ?
+            ''', (project_id, filename)).fetchone()
+            if not row:
+                raise ValueError(f"Document not found: {filename}")
+            
+            old_hash = row[0]
+            if base_hash and base_hash != old_hash:
+                raise PatchConflictError(
+                    f"Document {filename} has changed (expected {base_hash}, current {old_hash})"
+                )
+            
+            old_content = self.blobs.get(conn, old_hash) or ''
+            if edits:
+                content = apply_edits(old_content, edits)
+            else:
+                content = apply_unified_diff(old_content, diff)
+            
+            status = self._apply_change(conn, project_id, filename, content, commit_message)
+            if status == 'updated':
+                self._touch_project(conn, project_id)
+        
+        if status == 'updated':
+            self._write_files(project_id, {filename: content})
+            logger.info(f"Patched document: {filename} in project {project_id}")
+        
+        return {
+            'project_id': project_id,
+            'filename': filename,
+            'status': status,
+            'base_hash': old_hash,
+            'content_hash': hash_content(content),
+            'total_lines': count_lines(content)
+        }
+    
+    def _insert_document(self, conn, project_id: str, filename: str, content: str) -> str:
+        """Insert a document row, its content blob and its search entry."""
+        document_id = str(uuid.uuid4())
+        
+        content_hash = self.blobs.put(conn, content)
+        search_id = self.search_index.index(conn, None, filename, content)
+        conn.execute('''
+            INSERT INTO documents (id, project_id, filename, content_hash, search_id)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (document_id, project_id, filename, content_hash, search_id))
+        self._invalidate(('document', project_id, filename), ('documents', project_id))
+        
+        return document_id
+    
+    def _apply_change(self, conn, project_id: str, filename: str, content: str,
+                      commit_message: str = '', create: bool = False) -> str:
+        """
+        Write new content for a document inside an open transaction.
+        
+        Returns:
+            'created', 'updated', 'unchanged' or 'missing'
+        """
+        cursor = conn.cursor()
+        
+        # Get current document
+        cursor.execute('''
+            SELECT id, content_hash, search_id FROM documents
+            WHERE project_id = ? AND filename = ?
+        ''', (project_id, filename))
+        
+        row = cursor.fetchone()
+        if not row:
+            if not create:
+                return 'missing'
+            self._insert_document(conn, project_id, filename, content)
+            return 'created'
+        
+        document_id, old_hash, search_id = row
+        new_hash = hash_content(content)
+        if new_hash == old_hash:
+            # Identical content: nothing to version or rewrite
+            return 'unchanged'
+        
+        # Create version entry as a reverse delta against the new content
+        old_content = self.blobs.get(conn, old_hash)
+        self.versions.record(conn, document_id, old_content, content, commit_message, old_hash)
+        
+        # Point the document at the new content
+        self.blobs.release(conn, old_hash)
+        self.blobs.put(conn, content, new_hash)
+        cursor.execute('''
+            UPDATE documents
+            SET content_hash = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (new_hash, document_id))
+        self.search_index.index(conn, search_id, filename, content, old_content)
+        self._invalidate(('document', project_id, filename), ('documents', project_id))
+        
+        return 'updated'
+    
+    def _touch_project(self, conn, project_id: str) -> None:
+        """Update the project timestamp."""
+        conn.execute('''
+            UPDATE projects
+            SET updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (project_id,))
+        self._invalidate(('project', project_id))
+    
+    def _invalidate(self, *keys) -> None:
+        """
+        Evict cache keys once the current write transaction ends, and
+        publish them as change events if it commits.
+        """
+        self.db.after_transaction(lambda: self.cache.invalidate(*keys))
+        self.db.after_transaction(lambda: self.events.publish(list(keys)), commit_only=True)
+    
+    def _cached(self, key, load):
+        """
+        Read through the cache.
+        
+        Misses are loaded and stored unless a write invalidated the cache
+        while loading. Callers get a copy, so they cannot change the cached
+        value. Missing rows (None) are not cached, and reads inside a write
+        transaction bypass the cache so they see uncommitted changes.
+        """
+        if self.db.in_write_transaction():
+            return load()
+        
+        value = self.cache.get(key)
+        if value is MISSING:
+            token = self.cache.begin()
+            value = load()
+            if value is None:
+                return None
+            self.cache.put(key, value, token)
+        return copy.deepcopy(value)
+    
+    def _write_files(self, project_id: str, files: Dict[str, str]) -> None:
+        """
+        Write documents to the on-disk project mirror.
+        
+        Each file is written to a temporary name and renamed into place, so
+        readers never see a partially written file.
+        """
+        if not files:
+            return
+        
+        project_dir = os.path.join(self.storage_path, project_id, 'documents')
+        os.makedirs(project_dir, exist_ok=True)
+        
+        for filename, content in files.items():
+            file_path = os.path.join(project_dir, filename)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            temp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+            
+            with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            os.replace(temp_path, file_path)
+            self.mirror.record(file_path, hash_content(content))
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def list_versions(self, project_id: str, filename: str) -> Optional[List[Dict[str, Any]]]:
+        """List the version history of a document, newest first."""
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id FROM documents
+                WHERE project_id = ? AND filename = ?
+            ''', (project_id, filename))
+            
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            return self.versions.list_versions(conn, row[0])
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def get_version(self, project_id: str, filename: str, version_number: int) -> Optional[str]:
+        """Get the content of a stored document version."""
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id, content_hash FROM documents
+                WHERE project_id = ? AND filename = ?
+            ''', (project_id, filename))
+            
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            current_content = self.blobs.get(conn, row[1])
+            return self.versions.reconstruct(conn, row[0], version_number, current_content)
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def search_documents(self, query: str, project_ids: Optional[List[str]] = None,
+                         mode: str = 'all', limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """
+        Full-text search across documents.
+        
+        Args:
+            query: Search text
+            project_ids: Optional project IDs to restrict the search to
+            mode: 'all', 'any', 'phrase' or 'raw' FTS5 syntax
+            limit: Page size
+            offset: Number of ranked results to skip
+            
+        Returns:
+            Ranked page of matches with highlighted snippets
+        """
+        with self.db.reader() as conn:
+            return self.search_index.search(conn, query, project_ids, mode, limit, offset,
+                                            load_content=lambda content_hash: self.blobs.get(conn, content_hash))
+    
     # Template operations
     
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
     def list_templates(self) -> List[Dict[str, Any]]:
         """List all available templates."""
-        with sqlite3.connect(self.db_path) as conn:
+        return self._cached(('templates',), self._load_templates)
+    
+    def _load_templates(self) -> List[Dict[str, Any]]:
+        """Load the template list."""
+        with self.db.reader() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -502,15 +1080,21 @@ Your conclusion goes here.
             
             return templates
     
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
     def get_template(self, template_id: str) -> Optional[Dict[str, Any]]:
         """Get template by ID."""
-        with sqlite3.connect(self.db_path) as conn:
+        return self._cached(('template', template_id), lambda: self._load_template(template_id))
+    
+    def _load_template(self, template_id: str) -> Optional[Dict[str, Any]]:
+        """Load a template row and its content."""
+        with self.db.reader() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT id, name, document_type, content, description, created_at
-                FROM templates
-                WHERE id = ?
+                SELECT t.id, t.name, t.document_type, b.data, t.description, t.created_at
+                FROM templates t
+                LEFT JOIN blobs b ON b.hash = t.content_hash
+                WHERE t.id = ?
             ''', (template_id,))
             
             row = cursor.fetchone()
@@ -519,14 +1103,125 @@ Your conclusion goes here.
                     'id': row[0],
                     'name': row[1],
                     'document_type': row[2],
-                    'content': row[3],
+                    'content': self.blobs.decode(row[3]),
                     'description': row[4],
                     'created_at': row[5]
                 }
             
             return None
     
+    # Sync operations
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def get_sync_state(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get what a push to Overleaf has to compare, without loading content.
+        
+        Args:
+            project_id: Project ID
+            
+        Returns:
+            The linked 'overleaf_id', (content hash, size) of every document
+            by filename, and the sync manifest for the linked project; None
+            if the project does not exist
+        """
+        with self.db.reader() as conn:
+            row = conn.execute('SELECT overleaf_id FROM projects WHERE id = ?', (project_id,)).fetchone()
+            if not row:
+                return None
+            overleaf_id = row[0]
+            
+            rows = conn.execute('''
+                SELECT d.filename, d.content_hash, COALESCE(b.size, 0)
+                FROM documents d
+                LEFT JOIN blobs b ON b.hash = d.content_hash
+                WHERE d.project_id = ?
+            ''', (project_id,)).fetchall()
+            
+            return {
+                'overleaf_id': overleaf_id,
+                'documents': {filename: (content_hash, size) for filename, content_hash, size in rows},
+                'manifest': self.sync_manifest.load(conn, project_id, overleaf_id)
+            }
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def get_document_contents(self, project_id: str, filenames: List[str]) -> Dict[str, str]:
+        """
+        Load the content of several documents at once.
+        
+        Args:
+            project_id: Project ID
+            filenames: Documents to load
+            
+        Returns:
+            Content by filename, for the documents that exist
+        """
+        contents = {}
+        with self.db.reader() as conn:
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(filenames), 500):
+                chunk = filenames[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(f'''
+                    SELECT d.filename, b.data
+                    FROM documents d
+                    LEFT JOIN blobs b ON b.hash = d.content_hash
+                    WHERE d.project_id = ? AND d.filename IN ({placeholders})
+                ''', (project_id, *chunk)).fetchall()
+                for filename, data in rows:
+                    contents[filename] = self.blobs.decode(data) or ''
+        return contents
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def record_sync(self, project_id: str, overleaf_id: str,
+                    uploaded: Dict[str, Tuple[str, Optional[str]]], deleted: List[str]) -> None:
+        """
+        Link a project to its Overleaf project and record a push in its manifest.
+        
+        Args:
+            project_id: Project ID
+            overleaf_id: Overleaf project the documents were pushed to
+            uploaded: (content hash, remote revision) by filename, for files sent
+            deleted: Filenames deleted from the Overleaf project
+        """
+        with self.db.writer() as conn:
+            self._link_overleaf(conn, project_id, overleaf_id)
+            self.sync_manifest.record(conn, project_id, overleaf_id, uploaded, deleted)
+    
+    def _link_overleaf(self, conn, project_id: str, overleaf_id: str) -> None:
+        """Link a project to an Overleaf project inside an open transaction."""
+        cursor = conn.execute('''
+            UPDATE projects SET overleaf_id = ?
+            WHERE id = ? AND overleaf_id IS NOT ?
+        ''', (overleaf_id, project_id, overleaf_id))
+        if cursor.rowcount:
+            self._invalidate(('project', project_id))
+    
+    # Storage operations
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def collect_garbage(self) -> Dict[str, int]:
+        """Delete content blobs that are no longer referenced."""
+        # Only take the write lock when there is something to delete
+        with self.db.reader() as conn:
+            if not self.blobs.has_garbage(conn):
+                return {'blobs': 0, 'bytes': 0}
+        with self.db.writer() as conn:
+            return self.blobs.collect_garbage(conn)
+    
+    @timed(QUERY_SECONDS, QUERY_ERRORS)
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """Get content storage statistics."""
+        with self.db.reader() as conn:
+            return self.blobs.stats(conn)
+    
     def shutdown(self) -> None:
         """Shutdown the document service."""
+        if self.db:
+            self.collect_garbage()
+            self.db.close()
+        self.events.close()
+        self.cache.clear()
+        
         logger.info("Document Service shutdown completed")
 
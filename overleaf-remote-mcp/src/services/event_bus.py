@@ -0,0 +1,169 @@
+"""
+Event Bus
+
+This module provides the publish/subscribe bus that carries change events
+from the Document Service to resource subscriptions. An event is a change
+key such as ('document', project_id, filename), the same keys used for
+cache invalidation.
+
+LocalEventBus delivers events to listeners in the same process. For
+multi-process deployments RedisEventBus relays events over a redis pub/sub
+channel, so a write in any process reaches subscribers in every process.
+"""
+
+import json
+import queue
+import logging
+import threading
+from typing import Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+ChangeKey = Tuple
+Listener = Callable[[List[ChangeKey]], None]
+
+# Redis channel carrying change events
+DEFAULT_CHANNEL = 'overleaf-remote-mcp:changes'
+
+class LocalEventBus:
+    """In-process event bus."""
+
+    def __init__(self):
+        """Initialize the event bus."""
+        self._listeners: List[Listener] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: Listener) -> None:
+        """
+        Register a listener for change events.
+
+        Listeners are called on the publishing thread (or the bus thread for
+        redis), so they must be quick and thread-safe.
+
+        Args:
+            listener: Callable taking a list of change keys
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        """Remove a listener."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def publish(self, events: List[ChangeKey]) -> None:
+        """
+        Publish change events.
+
+        Args:
+            events: Change keys
+        """
+        self._deliver(events)
+
+    def _deliver(self, events: List[ChangeKey]) -> None:
+        """Hand events to every listener; a failing listener does not affect the others."""
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(events)
+            except Exception as e:
+                logger.error(f"Event listener failed: {e}")
+
+    def close(self) -> None:
+        """Release bus resources."""
+
+class RedisEventBus(LocalEventBus):
+    """
+    Event bus relayed through a redis pub/sub channel.
+
+    Events are delivered to local listeners only when they come back from
+    redis, so every process sees each event exactly once. Publishing never
+    blocks the caller: events are queued and a publisher thread sends each
+    queued batch as one message.
+    """
+
+    def __init__(self, url: str, channel: str = DEFAULT_CHANNEL):
+        """
+        Connect to redis and start listening.
+
+        Args:
+            url: redis:// URL
+            channel: Pub/sub channel name
+        """
+        super().__init__()
+        import redis
+
+        self.channel = channel
+        self._client = redis.Redis.from_url(url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{channel: self._on_message})
+        self._listener_thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+        self._outbox: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._publisher_thread = threading.Thread(target=self._publish_loop, name='event-bus-publisher',
+                                                  daemon=True)
+        self._publisher_thread.start()
+
+        logger.info(f"Event bus connected to redis channel {channel}")
+
+    def publish(self, events: List[ChangeKey]) -> None:
+        """Queue change events for publishing."""
+        self._outbox.put(events)
+
+    def _publish_loop(self) -> None:
+        """Send queued events, one redis message per batch."""
+        while True:
+            events = self._outbox.get()
+            if events is None:
+                return
+            batch = list(events)
+            while not self._outbox.empty():
+                more = self._outbox.get()
+                if more is None:
+                    self._send(batch)
+                    return
+                batch.extend(more)
+            self._send(batch)
+
+    def _send(self, events: List[ChangeKey]) -> None:
+        """Publish one batch; errors are logged since writes must not fail on the bus."""
+        try:
+            self._client.publish(self.channel, json.dumps(events))
+        except Exception as e:
+            logger.error(f"Failed to publish {len(events)} change events: {e}")
+
+    def _on_message(self, message) -> None:
+        """Deliver a batch received from redis."""
+        try:
+            events = [tuple(event) for event in json.loads(message['data'])]
+        except (TypeError, ValueError) as e:
+            logger.error(f"Ignoring malformed change event message: {e}")
+            return
+        self._deliver(events)
+
+    def close(self) -> None:
+        """Flush pending events and disconnect."""
+        self._outbox.put(None)
+        self._publisher_thread.join(timeout=5)
+        self._listener_thread.stop()
+        self._listener_thread.join(timeout=5)
+        self._pubsub.close()
+        self._client.close()
+
+def create_event_bus(url: str = '') -> LocalEventBus:
+    """
+    Create the event bus for a configured URL.
+
+    Args:
+        url: redis:// or rediss:// URL, or empty for an in-process bus
+
+    Returns:
+        Event bus instance
+    """
+    if not url:
+        return LocalEventBus()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisEventBus(url)
+    raise ValueError(f"Unsupported event bus URL: {url}")
@@ -5,21 +5,30 @@ This module implements the core MCP server that handles all MCP protocol operati
 It coordinates between resources, tools, and prompts to provide Overleaf integration.
 """
 
+import time
 import logging
 import asyncio
+import threading
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
 from mcp import types
 from src.utils.config import Config
+from src.utils.catalog import Catalog
+from src.utils.metrics import REGISTRY, REQUEST_ERRORS, REQUEST_SECONDS, render_stats
 from src.services.document_service import DocumentService
 from src.services.overleaf_service import OverleafService
+from src.services.subscriptions import SubscriptionRegistry
 from src.mcp_components.resources.manager import ResourceManager
 from src.mcp_components.tools.manager import ToolManager
 from src.mcp_components.prompts.manager import PromptManager
 
 logger = logging.getLogger(__name__)
 
+class MethodNotFoundError(LookupError):
+    """Raised when a JSON-RPC method has no handler."""
+
 class MCPServer:
     """
     Main MCP Server implementation for Overleaf Remote MCP.
@@ -48,6 +57,20 @@ class MCPServer:
         self.tool_manager: Optional[ToolManager] = None
         self.prompt_manager: Optional[PromptManager] = None
         
+        # Resource subscriptions of connected sessions
+        self.subscriptions = SubscriptionRegistry()
+        
+        # Pre-serialized tools/list and prompts/list results
+        self._catalogs: Dict[str, Catalog] = {}
+        self._catalog_lock = threading.Lock()
+        
+        # Worker pool for concurrent reads in JSON-RPC batches (created on first use)
+        self._batch_executor: Optional[ThreadPoolExecutor] = None
+        self._batch_executor_lock = threading.Lock()
+        
+        # Statistics of transport components exported as gauges, by metric prefix
+        self._metrics_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        
         logger.info("MCP Server instance created")
     
     def initialize(self) -> None:
@@ -59,8 +82,9 @@ class MCPServer:
             self.document_service = DocumentService(self.config)
             self.document_service.initialize()
             
+            # Connects to Overleaf on first use
             self.overleaf_service = OverleafService(self.config)
-            self.overleaf_service.initialize()
+            self.add_metrics_source('mcp_overleaf', self.overleaf_service.stats)
             
             # Initialize MCP components
             self.resource_manager = ResourceManager(
@@ -75,6 +99,19 @@ class MCPServer:
             
             self.prompt_manager = PromptManager()
             
+            # The metrics resource includes this server's gauges
+            self.resource_manager.metrics_source = self.render_metrics
+            
+            # Sync jobs are queued by the tool and read back as a resource;
+            # jobs left over from an earlier run are picked up again
+            self.resource_manager.sync_queue = self.tool_manager.sync_queue
+            self.add_metrics_source('mcp_sync_queue', self.tool_manager.sync_queue.stats)
+            self.tool_manager.sync_queue.resume()
+            
+            # Serialize the static catalogs up front
+            self.tools_catalog()
+            self.prompts_catalog()
+            
             self.initialized = True
             logger.info("MCP Server initialization completed successfully")
             
@@ -121,6 +158,8 @@ class MCPServer:
                 'tool_manager': self.tool_manager is not None,
                 'prompt_manager': self.prompt_manager is not None
             },
+            'cache': self.document_service.cache.stats() if self.document_service else None,
+            'subscriptions': self.subscriptions.stats(),
             'config': {
                 'overleaf_configured': self.config.is_overleaf_configured(),
                 'storage_path': self.config.get_storage_path(),
@@ -128,8 +167,257 @@ class MCPServer:
             }
         }
     
+    def add_metrics_source(self, prefix: str, stats: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Export a component's statistics as gauges in render_metrics().
+        
+        Args:
+            prefix: Metric name prefix, e.g. 'mcp_admission'
+            stats: Returns the component's statistics dict; replaces any
+                source registered under the same prefix
+        """
+        self._metrics_sources[prefix] = stats
+    
+    def render_metrics(self) -> str:
+        """
+        Render all metrics in the Prometheus text format.
+        
+        Returns:
+            Request, tool, resource and SQLite metrics, followed by gauges for
+            the cache, subscriptions and any registered metrics sources
+        """
+        parts = [
+            REGISTRY.render(),
+            render_stats('mcp_server', {
+                'uptime_seconds': (datetime.utcnow() - self.start_time).total_seconds(),
+                'initialized': self.initialized
+            }),
+            render_stats('mcp_subscriptions', self.subscriptions.stats())
+        ]
+        if self.document_service:
+            parts.append(render_stats('mcp_cache', self.document_service.cache.stats()))
+        for prefix, stats in list(self._metrics_sources.items()):
+            parts.append(render_stats(prefix, stats()))
+        return ''.join(parts)
+    
     # MCP Protocol Handlers
     
+    # JSON-RPC method name -> handler method name
+    METHODS = {
+        'initialize': 'handle_initialize',
+        'resources/list': 'handle_list_resources',
+        'resources/templates/list': 'handle_list_resource_templates',
+        'resources/read': 'handle_read_resource',
+        'resources/subscribe': 'handle_subscribe_resource',
+        'resources/unsubscribe': 'handle_unsubscribe_resource',
+        'tools/list': 'handle_list_tools',
+        'tools/call': 'handle_call_tool',
+        'prompts/list': 'handle_list_prompts',
+        'prompts/get': 'handle_get_prompt',
+        'logging/setLevel': 'handle_set_log_level',
+        'ping': 'handle_ping'
+    }
+    
+    # Methods whose handlers also take the calling session's ID
+    SESSION_METHODS = {'resources/subscribe', 'resources/unsubscribe'}
+    
+    # Methods answered from a pre-serialized Catalog
+    CATALOG_METHODS = {
+        'tools/list': 'tools_catalog',
+        'prompts/list': 'prompts_catalog'
+    }
+    
+    # Methods that do not change any state (tools/call depends on the tool)
+    READ_ONLY_METHODS = {
+        'resources/list', 'resources/templates/list', 'resources/read',
+        'tools/list', 'prompts/list', 'prompts/get', 'ping'
+    }
+    
+    def dispatch(self, method: str, params: Optional[Dict[str, Any]],
+                 session_id: Optional[str] = None) -> Any:
+        """
+        Route a JSON-RPC method to its handler.
+        
+        Results are dicts or MCP models; encode them with
+        src.utils.serialization rather than a plain JSON encoder. The
+        handler's latency and any failure are recorded in the request metrics.
+        
+        Args:
+            method: JSON-RPC method name
+            params: Request parameters
+            session_id: ID of the calling session, for transports that have one
+            
+        Returns:
+            Handler result
+            
+        Raises:
+            MethodNotFoundError: If the method is not supported
+        """
+        handler = self.METHODS.get(method)
+        if handler is None:
+            raise MethodNotFoundError(f"Method not found: {method}")
+        
+        start = time.perf_counter()
+        try:
+            if method in self.SESSION_METHODS:
+                return getattr(self, handler)(params or {}, session_id)
+            return getattr(self, handler)(params or {})
+        except Exception:
+            REQUEST_ERRORS.inc(method)
+            raise
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method)
+    
+    def get_catalog(self, method: str) -> Optional[Catalog]:
+        """
+        Get the pre-serialized result for a catalog method.
+        
+        Returns:
+            Catalog, or None if the method is not served from one (or the
+            server is not initialized yet)
+        """
+        name = self.CATALOG_METHODS.get(method)
+        if name is None or not self.initialized:
+            return None
+        start = time.perf_counter()
+        catalog = getattr(self, name)()
+        REQUEST_SECONDS.observe(time.perf_counter() - start, method)
+        return catalog
+    
+    def tools_catalog(self) -> Catalog:
+        """Get the tools/list catalog, rebuilt only when the tool set changed."""
+        if not self.tool_manager:
+            raise RuntimeError("Tool manager not initialized")
+        return self._catalog('tools', self.tool_manager.list_tools, self.tool_manager.catalog_version)
+    
+    def prompts_catalog(self) -> Catalog:
+        """Get the prompts/list catalog, rebuilt only when the prompt set changed."""
+        if not self.prompt_manager:
+            raise RuntimeError("Prompt manager not initialized")
+        return self._catalog('prompts', self.prompt_manager.list_prompts, self.prompt_manager.catalog_version)
+    
+    def _catalog(self, key: str, list_items, version: int) -> Catalog:
+        """Return the cached catalog for key, rebuilding it if its version is stale."""
+        with self._catalog_lock:
+            catalog = self._catalogs.get(key)
+            if catalog is None or catalog.version != version:
+                catalog = Catalog(key, list_items(), version)
+                self._catalogs[key] = catalog
+                logger.info(f"Built {key} catalog ({len(catalog.body)} bytes, ETag {catalog.etag})")
+            return catalog
+    
+    def is_read_only(self, message: Any) -> bool:
+        """Whether a JSON-RPC message can run concurrently with other reads."""
+        if not isinstance(message, dict):
+            return True
+        method = message.get('method')
+        if method == 'tools/call':
+            params = message.get('params') or {}
+            return isinstance(params, dict) and params.get('name') in ToolManager.READ_ONLY_TOOLS
+        return method in self.READ_ONLY_METHODS
+    
+    def handle_message(self, message: Any, session_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Handle one JSON-RPC message from a batch.
+        
+        Args:
+            message: Decoded JSON-RPC message
+            session_id: ID of the calling session, if any
+            
+        Returns:
+            JSON-RPC response, or None for a notification (a valid request
+            without an "id" member), which never gets a response
+        """
+        if (not isinstance(message, dict) or message.get('jsonrpc') != '2.0'
+                or not isinstance(message.get('method'), str)):
+            return {
+                'jsonrpc': '2.0',
+                'id': message.get('id') if isinstance(message, dict) else None,
+                'error': {'code': -32600, 'message': 'Invalid Request'}
+            }
+        
+        method = message['method']
+        request_id = message.get('id')
+        notification = 'id' not in message
+        
+        try:
+            result = self.dispatch(method, message.get('params', {}), session_id)
+            response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except MethodNotFoundError as e:
+            response = {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': -32601, 'message': str(e)}}
+        except Exception as e:
+            logger.error(f"Error handling MCP request {method}: {e}")
+            response = {'jsonrpc': '2.0', 'id': request_id,
+                        'error': {'code': -32603, 'message': f"Internal error: {str(e)}"}}
+        
+        return None if notification else response
+    
+    def batch_stages(self, messages: List[Any]) -> List[List[Tuple[int, Any]]]:
+        """
+        Split a JSON-RPC batch into stages that run one after another.
+        
+        Consecutive read-only calls form one stage and may run concurrently;
+        every other call is a stage of its own. Writes therefore run in
+        batch order, and each sees the effect of everything before it.
+        
+        Args:
+            messages: Batch entries
+            
+        Returns:
+            Stages of (position in batch, message)
+        """
+        stages: List[List[Tuple[int, Any]]] = []
+        reads: List[Tuple[int, Any]] = []
+        for index, message in enumerate(messages):
+            if self.is_read_only(message):
+                reads.append((index, message))
+                continue
+            if reads:
+                stages.append(reads)
+                reads = []
+            stages.append([(index, message)])
+        if reads:
+            stages.append(reads)
+        return stages
+    
+    def handle_batch(self, messages: List[Any], session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Handle a JSON-RPC batch, running independent reads on a worker pool.
+        
+        Args:
+            messages: Non-empty list of batch entries
+            session_id: ID of the calling session, if any
+            
+        Returns:
+            Responses in batch order, without entries for notifications
+        """
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+        for stage in self.batch_stages(messages):
+            if len(stage) == 1:
+                index, message = stage[0]
+                responses[index] = self.handle_message(message, session_id)
+                continue
+            
+            executor = self._get_batch_executor()
+            futures = [(index, executor.submit(self.handle_message, message, session_id))
+                       for index, message in stage]
+            for index, future in futures:
+                responses[index] = future.result()
+        
+        return [response for response in responses if response is not None]
+    
+    def _get_batch_executor(self) -> ThreadPoolExecutor:
+        """Create the batch worker pool on first use."""
+        with self._batch_executor_lock:
+            if self._batch_executor is None:
+                self._batch_executor = ThreadPoolExecutor(max_workers=self.config.WORKER_THREADS,
+                                                          thread_name_prefix='mcp-batch')
+            return self._batch_executor
+    
+    def handle_ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle MCP ping request."""
+        return {'status': 'pong', 'timestamp': str(datetime.utcnow())}
+    
     def handle_initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Handle MCP initialize request."""
         logger.info("Handling MCP initialize request")
@@ -139,7 +427,7 @@ class MCPServer:
         
         return self.get_capabilities()
     
-    def handle_list_resources(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def handle_list_resources(self, params: Dict[str, Any]) -> types.ListResourcesResult:
         """Handle MCP resources/list request."""
         logger.debug("Handling resources/list request")
         
@@ -147,14 +435,22 @@ class MCPServer:
             raise RuntimeError("Resource manager not initialized")
         
         try:
-            resources = self.resource_manager.list_resources()
-            return {
-                'resources': [self._convert_to_dict(resource) for resource in resources]
-            }
+            resources, next_cursor = self.resource_manager.list_resources_page(params.get('cursor'))
+            return types.ListResourcesResult(resources=resources, nextCursor=next_cursor)
         except Exception as e:
             logger.error(f"Error listing resources: {e}")
             raise
     
+    def handle_list_resource_templates(self, params: Dict[str, Any]) -> types.ListResourceTemplatesResult:
+        """Handle MCP resources/templates/list request."""
+        logger.debug("Handling resources/templates/list request")
+        
+        if not self.resource_manager:
+            raise RuntimeError("Resource manager not initialized")
+        
+        templates = self.resource_manager.list_resource_templates()
+        return types.ListResourceTemplatesResult(resourceTemplates=templates)
+    
     def handle_read_resource(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Handle MCP resources/read request."""
         uri = params.get('uri')
@@ -181,19 +477,30 @@ class MCPServer:
             logger.error(f"Error reading resource {uri}: {e}")
             raise
     
-    def handle_subscribe_resource(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle MCP resources/subscribe request."""
+    def handle_subscribe_resource(self, params: Dict[str, Any], session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Handle MCP resources/subscribe request.
+        
+        Subscriptions belong to a session: changes to the resource are pushed
+        to it as notifications/resources/updated. Without a session there is
+        nowhere to push them, so nothing is subscribed.
+        """
         uri = params.get('uri')
         if not uri:
             raise ValueError("URI parameter is required")
         
         logger.debug(f"Handling resources/subscribe request for URI: {uri}")
         
-        # For now, just acknowledge the subscription
-        # In a full implementation, this would set up change notifications
+        if not str(uri).startswith(f"{ResourceManager.OVERLEAF_SCHEME}:"):
+            raise ValueError(f"Unsupported URI: {uri}")
+        
+        if session_id is None:
+            return {'subscribed': False}
+        
+        self.subscriptions.subscribe(session_id, str(uri))
         return {'subscribed': True}
     
-    def handle_unsubscribe_resource(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def handle_unsubscribe_resource(self, params: Dict[str, Any], session_id: Optional[str] = None) -> Dict[str, Any]:
         """Handle MCP resources/unsubscribe request."""
         uri = params.get('uri')
         if not uri:
@@ -201,26 +508,21 @@ class MCPServer:
         
         logger.debug(f"Handling resources/unsubscribe request for URI: {uri}")
         
-        # For now, just acknowledge the unsubscription
+        if session_id is not None:
+            self.subscriptions.unsubscribe(session_id, str(uri))
         return {'unsubscribed': True}
     
     def handle_list_tools(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Handle MCP tools/list request."""
         logger.debug("Handling tools/list request")
         
-        if not self.tool_manager:
-            raise RuntimeError("Tool manager not initialized")
-        
         try:
-            tools = self.tool_manager.list_tools()
-            return {
-                'tools': [self._convert_to_dict(tool) for tool in tools]
-            }
+            return self.tools_catalog().result
         except Exception as e:
             logger.error(f"Error listing tools: {e}")
             raise
     
-    def handle_call_tool(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def handle_call_tool(self, params: Dict[str, Any]) -> types.CallToolResult:
         """Handle MCP tools/call request."""
         name = params.get('name')
         arguments = params.get('arguments', {})
@@ -235,9 +537,7 @@ class MCPServer:
         
         try:
             result = self.tool_manager.call_tool(name, arguments)
-            return {
-                'content': [self._convert_to_dict(content) for content in result]
-            }
+            return types.CallToolResult(content=result)
         except Exception as e:
             logger.error(f"Error calling tool {name}: {e}")
             raise
@@ -246,14 +546,8 @@ class MCPServer:
         """Handle MCP prompts/list request."""
         logger.debug("Handling prompts/list request")
         
-        if not self.prompt_manager:
-            raise RuntimeError("Prompt manager not initialized")
-        
         try:
-            prompts = self.prompt_manager.list_prompts()
-            return {
-                'prompts': [self._convert_to_dict(prompt) for prompt in prompts]
-            }
+            return self.prompts_catalog().result
         except Exception as e:
             logger.error(f"Error listing prompts: {e}")
             raise
@@ -293,43 +587,25 @@ class MCPServer:
         except AttributeError:
             raise ValueError(f"Invalid log level: {level}")
     
-    def _convert_to_dict(self, obj) -> Dict[str, Any]:
-        """
-        Convert MCP types to dictionaries.
-        
-        Args:
-            obj: Object to convert
-            
-        Returns:
-            Dictionary representation
-        """
-        if hasattr(obj, '__dict__'):
-            # For objects with __dict__, convert to dict
-            result = {}
-            for key, value in obj.__dict__.items():
-                if not key.startswith('_'):
-                    if hasattr(value, '__dict__'):
-                        result[key] = self._convert_to_dict(value)
-                    elif isinstance(value, list):
-                        result[key] = [self._convert_to_dict(item) if hasattr(item, '__dict__') else item for item in value]
-                    else:
-                        result[key] = value
-            return result
-        else:
-            # For simple types, return as-is
-            return obj
-    
     def shutdown(self) -> None:
         """Shutdown the MCP server and cleanup resources."""
         logger.info("Shutting down MCP Server...")
         
         try:
+            if self.tool_manager:
+                self.tool_manager.sync_queue.shutdown()
+            
             if self.document_service:
                 self.document_service.shutdown()
             
             if self.overleaf_service:
                 self.overleaf_service.shutdown()
             
+            with self._batch_executor_lock:
+                if self._batch_executor is not None:
+                    self._batch_executor.shutdown(wait=True)
+                    self._batch_executor = None
+            
             self.initialized = False
             logger.info("MCP Server shutdown completed")
             
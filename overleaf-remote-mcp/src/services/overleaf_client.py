@@ -0,0 +1,449 @@
+"""
+Overleaf Client
+
+This module provides the HTTP transport to the Overleaf API. One
+httpx.AsyncClient with a bounded, keep-alive connection pool serves every
+request, so a sync reuses warm connections instead of paying a TCP (and TLS)
+handshake per file. The client runs on its own event loop in a daemon
+thread; synchronous callers submit coroutines with run().
+
+Failed requests are retried with exponential backoff and full jitter,
+honouring Retry-After. Non-idempotent requests (POST) are only retried when
+the server certainly did not process them. A circuit breaker stops calling
+an Overleaf that keeps failing and lets a single trial request through once
+the reset timeout has passed. Batch transfers run with bounded parallelism,
+and large downloads such as compiled PDFs can be streamed to disk.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from urllib.parse import quote
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Methods that may be retried after any failure
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'})
+
+# Status codes that mean the request was not processed and may be retried
+RETRY_ALWAYS_STATUS = frozenset({429, 503})
+
+# Bytes written at a time when streaming a download to disk
+STREAM_CHUNK_SIZE = 65536
+
+class OverleafError(Exception):
+    """A request to Overleaf failed."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+class CircuitOpenError(OverleafError):
+    """Overleaf is not called because the circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Circuit breaker over consecutive request failures.
+
+    Closed: requests pass. After failure_threshold consecutive failures the
+    breaker opens and requests fail fast. Once reset_timeout seconds have
+    passed it is half-open: one trial request passes, and its outcome closes
+    or re-opens the breaker.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to stay open before a trial request
+            clock: Monotonic time source
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._trial_pending = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        """
+        Admit a request.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with the
+                trial request already in flight
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.reset_timeout - self.clock()
+                if remaining > 0:
+                    raise CircuitOpenError(f"Overleaf circuit breaker is open; retry in {remaining:.1f}s")
+                self.state = self.HALF_OPEN
+                self._trial_pending = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_pending:
+                    raise CircuitOpenError("Overleaf circuit breaker is half-open; trial request in flight")
+                self._trial_pending = True
+
+    def record_success(self) -> None:
+        """Record a request that Overleaf answered."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Overleaf circuit breaker closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_pending = False
+
+    def record_failure(self) -> None:
+        """Record a request that failed in transport or with a server error."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opens += 1
+                    logger.warning(f"Overleaf circuit breaker opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self._trial_pending = False
+
+    def release_trial(self) -> None:
+        """
+        Give up a trial request that ended without an outcome.
+
+        A request that was cancelled or failed for a reason other than
+        Overleaf's answer neither closes nor re-opens the breaker; the next
+        request becomes the trial instead.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_pending = False
+
+class OverleafClient:
+    """Pooled, retrying HTTP client for the Overleaf API."""
+
+    def __init__(self, base_url: str, auth: Optional[Tuple[str, str]] = None, timeout: float = 30.0,
+                 max_connections: int = 10, concurrency: int = 8, max_retries: int = 3,
+                 backoff_base: float = 0.25, backoff_max: float = 10.0,
+                 breaker: Optional[CircuitBreaker] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialize the client and start its event loop.
+
+        Args:
+            base_url: Overleaf API URL
+            auth: (email, password) for HTTP Basic authentication
+            timeout: Seconds before a request times out
+            max_connections: Size of the connection pool
+            concurrency: Transfers run at once by the batch helpers
+            max_retries: Retries after the first attempt of a request
+            backoff_base: Backoff before the first retry, in seconds
+            backoff_max: Upper bound of a backoff, in seconds
+            breaker: Circuit breaker (default: 5 failures, 30 seconds)
+            transport: httpx transport, e.g. for tests
+        """
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._random = random.Random()
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.inflight = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='overleaf-client', daemon=True)
+        self._thread.start()
+
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            auth=httpx.BasicAuth(*auth) if auth else None,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 10.0)),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections,
+                                keepalive_expiry=60.0),
+            headers={'User-Agent': 'Overleaf-MCP-Server/1.0.0', 'Accept': 'application/json'},
+            transport=transport
+        )
+
+    def run(self, coro: Awaitable[Any]) -> Any:
+        """
+        Run a coroutine on the client's event loop and wait for its result.
+
+        Args:
+            coro: Coroutine using this client
+
+        Returns:
+            The coroutine's result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Get the delay before a retry: Retry-After if given, else full jitter."""
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), self.backoff_max)
+            except ValueError:
+                pass
+        return self._random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(self, method: str, path: str, stream_to: Optional[str] = None,
+                      **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying transient failures.
+
+        Args:
+            method: HTTP method
+            path: Path below the API URL
+            stream_to: File to stream a successful response body into,
+                instead of reading it into memory
+            **kwargs: Passed to httpx (json, content, params, headers)
+
+        Returns:
+            The successful (2xx/3xx) response
+
+        Raises:
+            CircuitOpenError: If the circuit breaker rejects the request
+            OverleafError: If the request failed; status is set for HTTP errors
+        """
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            self.breaker.before_request()
+            self.requests += 1
+            self.inflight += 1
+            recorded = False
+            try:
+                response = await self._http.send(self._http.build_request(method, path, **kwargs), stream=True)
+                try:
+                    if stream_to is not None and response.status_code < 400:
+                        await self._stream_to_file(response, stream_to)
+                    else:
+                        await response.aread()
+                finally:
+                    await response.aclose()
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                recorded = True
+                # A request that never connected was not processed
+                retryable = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if not retryable or attempt >= self.max_retries:
+                    self.failures += 1
+                    raise OverleafError(f"{method} {path} failed: {e!r}") from e
+                delay = self._backoff(attempt)
+            else:
+                status = response.status_code
+                if status >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                recorded = True
+                if status < 400:
+                    return response
+                retryable = status in RETRY_ALWAYS_STATUS or (idempotent and status >= 500)
+                if not retryable or attempt >= self.max_retries:
+                    self.failures += 1
+                    raise OverleafError(f"{method} {path} returned {status}: {response.text[:200]}", status)
+                delay = self._backoff(attempt, response.headers.get('Retry-After'))
+            finally:
+                self.inflight -= 1
+                if not recorded:
+                    # Cancelled, or failed other than in transport: do not
+                    # leave a half-open breaker waiting for this trial forever
+                    self.breaker.release_trial()
+
+            attempt += 1
+            self.retries += 1
+            logger.debug(f"Retrying {method} {path} in {delay:.2f}s (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+
+    async def _stream_to_file(self, response: httpx.Response, path: str) -> None:
+        """Write a response body to a file, doing the file I/O off the event loop."""
+        loop = asyncio.get_running_loop()
+        # A retry rewrites the file from the start
+        f = await loop.run_in_executor(None, open, path, 'wb')
+        try:
+            async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                await loop.run_in_executor(None, f.write, chunk)
+        finally:
+            await loop.run_in_executor(None, f.close)
+
+    # API operations
+
+    @staticmethod
+    def file_path(project_id: str, path: str) -> str:
+        """Get the API path of a file in a project."""
+        return f"/api/projects/{quote(project_id, safe='')}/files/{quote(path, safe='/')}"
+
+    async def get_user(self) -> Dict[str, Any]:
+        """Get the authenticated user."""
+        return (await self.request('GET', '/api/user')).json()
+
+    async def list_projects(self) -> List[Dict[str, Any]]:
+        """List the user's projects."""
+        return (await self.request('GET', '/api/projects')).json()['projects']
+
+    async def get_project(self, project_id: str) -> Dict[str, Any]:
+        """Get a project with its file list."""
+        return (await self.request('GET', f"/api/projects/{quote(project_id, safe='')}")).json()
+
+    async def create_project(self, name: str, template: Optional[str] = None) -> Dict[str, Any]:
+        """Create a project."""
+        return (await self.request('POST', '/api/projects', json={'name': name, 'template': template})).json()
+
+    async def get_file(self, project_id: str, path: str) -> str:
+        """Download a file's content."""
+        return (await self.request('GET', self.file_path(project_id, path))).text
+
+    async def download_file(self, project_id: str, path: str, destination: str) -> Optional[str]:
+        """
+        Stream a file's content to disk.
+
+        Returns:
+            The revision that was downloaded, from the ETag; None if not sent
+        """
+        response = await self.request('GET', self.file_path(project_id, path), stream_to=destination)
+        etag = response.headers.get('ETag')
+        return etag.strip('"') if etag else None
+
+    async def put_file(self, project_id: str, path: str, content: str) -> str:
+        """Upload a file and return its new remote revision."""
+        response = await self.request('PUT', self.file_path(project_id, path), content=content.encode('utf-8'),
+                                      headers={'Content-Type': 'text/plain; charset=utf-8'})
+        return str(response.json()['revision'])
+
+    async def delete_file(self, project_id: str, path: str) -> None:
+        """Delete a file."""
+        await self.request('DELETE', self.file_path(project_id, path))
+
+    async def compile(self, project_id: str) -> Dict[str, Any]:
+        """Compile a project and return the result with its output files."""
+        return (await self.request('POST', f"/api/projects/{quote(project_id, safe='')}/compile")).json()
+
+    async def get_compile_status(self, project_id: str) -> Dict[str, Any]:
+        """Get the status of a project's last compile."""
+        return (await self.request('GET', f"/api/projects/{quote(project_id, safe='')}/compile")).json()
+
+    @staticmethod
+    def output_path(project_id: str, name: str) -> str:
+        """Get the API path of a compile output file."""
+        return f"/api/projects/{quote(project_id, safe='')}/output/{quote(name, safe='')}"
+
+    async def get_output(self, project_id: str, name: str) -> bytes:
+        """Download a compile output file (e.g. output.log) into memory."""
+        return (await self.request('GET', self.output_path(project_id, name))).content
+
+    async def download_output(self, project_id: str, name: str, destination: str) -> int:
+        """
+        Stream a compile output file (e.g. output.pdf) to disk.
+
+        Returns:
+            Bytes written
+        """
+        response = await self.request('GET', self.output_path(project_id, name), stream_to=destination)
+        return response.num_bytes_downloaded
+
+    # Batch transfers
+
+    async def _bounded(self, items: Iterable[Any], func: Callable[[Any], Awaitable[Any]]) -> List[Any]:
+        """Apply func to every item, at most concurrency at a time; exceptions are returned."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(item):
+            async with semaphore:
+                return await func(item)
+
+        return await asyncio.gather(*(one(item) for item in items), return_exceptions=True)
+
+    async def put_files(self, project_id: str, files: Dict[str, str]) -> Dict[str, Union[str, Exception]]:
+        """
+        Upload files in parallel.
+
+        Args:
+            project_id: Overleaf project ID
+            files: Content by path
+
+        Returns:
+            The new revision, or the exception that failed the upload, by path
+        """
+        paths = list(files)
+        results = await self._bounded(paths, lambda path: self.put_file(project_id, path, files[path]))
+        return dict(zip(paths, results))
+
+    async def get_files(self, project_id: str, paths: Iterable[str]) -> Dict[str, Union[str, Exception]]:
+        """
+        Download files in parallel.
+
+        Returns:
+            The content, or the exception that failed the download, by path
+        """
+        paths = list(paths)
+        results = await self._bounded(paths, lambda path: self.get_file(project_id, path))
+        return dict(zip(paths, results))
+
+    async def download_files(self, project_id: str,
+                             destinations: Dict[str, str]) -> Dict[str, Union[Optional[str], Exception]]:
+        """
+        Stream files to disk in parallel.
+
+        Args:
+            project_id: Overleaf project ID
+            destinations: File to write by path
+
+        Returns:
+            The revision downloaded, or the exception that failed the download, by path
+        """
+        paths = list(destinations)
+        results = await self._bounded(paths, lambda path: self.download_file(project_id, path, destinations[path]))
+        return dict(zip(paths, results))
+
+    async def delete_files(self, project_id: str, paths: Iterable[str]) -> Dict[str, Optional[Exception]]:
+        """
+        Delete files in parallel.
+
+        Returns:
+            None, or the exception that failed the deletion, by path
+        """
+        paths = list(paths)
+        results = await self._bounded(paths, lambda path: self.delete_file(project_id, path))
+        return dict(zip(paths, results))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get transport statistics."""
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'failures': self.failures,
+            'inflight': self.inflight,
+            'circuit_open': self.breaker.state != CircuitBreaker.CLOSED,
+            'circuit_opens': self.breaker.opens
+        }
+
+    def close(self) -> None:
+        """Close the connection pool and stop the event loop."""
+        if not self._loop.is_running():
+            return
+        try:
+            self.run(self._http.aclose())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
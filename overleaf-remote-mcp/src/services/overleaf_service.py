@@ -2,17 +2,21 @@
 Overleaf Service
 
 This module provides integration with Overleaf for the Remote MCP Server.
-It handles synchronization, project management, and compilation.
+It handles synchronization, project management, and compilation. Requests
+go to the REST API at OVERLEAF_API_URL through a pooled, retrying client
+(see src.services.overleaf_client).
 """
 
 import os
 import logging
-import requests
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+import threading
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
 
 from src.utils.config import Config
 
+if TYPE_CHECKING:
+    from src.services.overleaf_client import OverleafClient
+
 logger = logging.getLogger(__name__)
 
 class OverleafService:
@@ -31,27 +35,48 @@ class OverleafService:
             config: Configuration instance
         """
         self.config = config
-        self.session = requests.Session()
+        # HTTP client and authentication are set up on first use
+        self.client: Optional['OverleafClient'] = None
         self.authenticated = False
         self.user_info = None
+        self.initialized = False
+        self._init_lock = threading.Lock()
         
         logger.info("Overleaf Service initialized")
     
     def initialize(self) -> None:
-        """Initialize the Overleaf service."""
+        """
+        Initialize the Overleaf service.
+        
+        Called on first use rather than at server startup, so that launching
+        the server neither imports the HTTP stack nor authenticates.
+        """
+        with self._init_lock:
+            if self.initialized:
+                return
+            self._initialize()
+            self.initialized = True
+    
+    def _initialize(self) -> None:
+        """Create the HTTP client and authenticate if configured."""
         try:
-            # Set up session headers
-            self.session.headers.update({
-                'User-Agent': 'Overleaf-MCP-Server/1.0.0',
-                'Accept': 'application/json',
-                'Content-Type': 'application/json'
-            })
-            
-            # Attempt authentication if credentials are provided
-            if self.config.is_overleaf_configured():
-                self._authenticate()
-            else:
+            if not self.config.is_overleaf_configured():
                 logger.info("Overleaf credentials not configured - running in offline mode")
+                return
+            
+            from src.services.overleaf_client import OverleafClient, CircuitBreaker
+            
+            self.client = OverleafClient(
+                self.config.OVERLEAF_API_URL,
+                auth=(self.config.OVERLEAF_EMAIL, self.config.OVERLEAF_PASSWORD),
+                timeout=self.config.OVERLEAF_TIMEOUT,
+                max_connections=self.config.OVERLEAF_MAX_CONNECTIONS,
+                concurrency=self.config.OVERLEAF_CONCURRENCY,
+                max_retries=self.config.OVERLEAF_MAX_RETRIES,
+                breaker=CircuitBreaker(self.config.OVERLEAF_BREAKER_THRESHOLD,
+                                       self.config.OVERLEAF_BREAKER_RESET)
+            )
+            self._authenticate()
             
             logger.info("Overleaf Service initialized")
             
@@ -63,43 +88,69 @@ class OverleafService:
         """
         Authenticate with Overleaf.
         
+        The client sends the configured credentials with every request;
+        fetching the user verifies them.
+        
         Returns:
             True if authentication successful, False otherwise
         """
         try:
-            # Note: This is a placeholder implementation
-            # In a real implementation, you would need to handle Overleaf's
-            # authentication mechanism, which may involve:
-            # 1. OAuth flow
-            # 2. Session cookies
-            # 3. API tokens
-            # 4. Web scraping (if no official API)
-            
-            logger.warning("Overleaf authentication not implemented - using mock authentication")
-            
-            # Mock authentication for development
+            self.user_info = self.client.run(self.client.get_user())
             self.authenticated = True
-            self.user_info = {
-                'email': self.config.overleaf_email,
-                'name': 'Mock User',
-                'id': 'mock_user_id'
-            }
-            
-            logger.info("Mock Overleaf authentication successful")
+            logger.info(f"Authenticated with Overleaf as {self.user_info.get('email')}")
             return True
             
         except Exception as e:
             logger.error(f"Overleaf authentication failed: {e}")
             return False
     
+    def _connect(self) -> bool:
+        """
+        Initialize on first use and make sure the service is authenticated.
+        
+        An authentication that failed, e.g. while Overleaf was briefly
+        unreachable, is attempted again rather than leaving the service
+        offline until restart.
+        
+        Returns:
+            True if authenticated
+        """
+        self.initialize()
+        if not self.authenticated and self.client is not None:
+            with self._init_lock:
+                if not self.authenticated:
+                    self._authenticate()
+        return self.authenticated
+    
     def is_available(self) -> bool:
-        """Check if Overleaf service is available."""
-        return True  # Always available in mock mode
+        """Check if Overleaf is configured and its circuit breaker is not open."""
+        if not self.config.is_overleaf_configured():
+            return False
+        return self.client is None or self.client.breaker.state != self.client.breaker.OPEN
     
     def get_user_info(self) -> Optional[Dict[str, Any]]:
         """Get current user information."""
+        self.initialize()
         return self.user_info
     
+    def _call(self, coro_factory: Callable[['OverleafClient'], Awaitable[Any]]) -> Any:
+        """
+        Run a client operation.
+        
+        Args:
+            coro_factory: Function of the client returning the coroutine to run
+            
+        Returns:
+            The operation's result
+            
+        Raises:
+            RuntimeError: If not authenticated with Overleaf
+            OverleafError: If the operation failed
+        """
+        if not self._connect():
+            raise RuntimeError("Not authenticated with Overleaf")
+        return self.client.run(coro_factory(self.client))
+    
     # Project operations
     
     def list_projects(self) -> List[Dict[str, Any]]:
@@ -110,30 +161,7 @@ class OverleafService:
             List of project information
         """
         try:
-            if not self.authenticated:
-                logger.warning("Not authenticated with Overleaf")
-                return []
-            
-            # Mock implementation - return sample projects
-            projects = [
-                {
-                    'id': 'overleaf_project_1',
-                    'name': 'Research Paper Draft',
-                    'created': '2024-01-15T10:30:00Z',
-                    'modified': '2024-01-20T15:45:00Z',
-                    'owner': self.user_info['id'],
-                    'collaborators': []
-                },
-                {
-                    'id': 'overleaf_project_2',
-                    'name': 'Conference Presentation',
-                    'created': '2024-01-10T09:00:00Z',
-                    'modified': '2024-01-18T14:20:00Z',
-                    'owner': self.user_info['id'],
-                    'collaborators': ['collaborator_1']
-                }
-            ]
-            
+            projects = self._call(lambda client: client.list_projects())
             logger.debug(f"Listed {len(projects)} Overleaf projects")
             return projects
             
@@ -152,30 +180,11 @@ class OverleafService:
             Project information or None if not found
         """
         try:
-            if not self.authenticated:
-                logger.warning("Not authenticated with Overleaf")
-                return None
-            
-            # Mock implementation
-            if project_id == 'overleaf_project_1':
-                return {
-                    'id': project_id,
-                    'name': 'Research Paper Draft',
-                    'created': '2024-01-15T10:30:00Z',
-                    'modified': '2024-01-20T15:45:00Z',
-                    'owner': self.user_info['id'],
-                    'collaborators': [],
-                    'files': [
-                        {'name': 'main.tex', 'type': 'tex'},
-                        {'name': 'references.bib', 'type': 'bib'},
-                        {'name': 'figure1.png', 'type': 'image'}
-                    ]
-                }
-            
-            return None
+            return self._call(lambda client: client.get_project(project_id))
             
         except Exception as e:
-            logger.error(f"Error getting Overleaf project {project_id}: {e}")
+            if getattr(e, 'status', None) != 404:
+                logger.error(f"Error getting Overleaf project {project_id}: {e}")
             return None
     
     def create_project(self, name: str, template: Optional[str] = None) -> Optional[Dict[str, Any]]:
@@ -190,24 +199,8 @@ class OverleafService:
             Created project information or None if failed
         """
         try:
-            if not self.authenticated:
-                logger.warning("Not authenticated with Overleaf")
-                return None
-            
-            # Mock implementation
-            project_id = f"overleaf_project_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
-            
-            project = {
-                'id': project_id,
-                'name': name,
-                'created': datetime.utcnow().isoformat(),
-                'modified': datetime.utcnow().isoformat(),
-                'owner': self.user_info['id'],
-                'collaborators': [],
-                'template': template
-            }
-            
-            logger.info(f"Created Overleaf project: {project_id} - {name}")
+            project = self._call(lambda client: client.create_project(name, template))
+            logger.info(f"Created Overleaf project: {project['id']} - {name}")
             return project
             
         except Exception as e:
@@ -228,41 +221,11 @@ class OverleafService:
             File content or None if not found
         """
         try:
-            if not self.authenticated:
-                logger.warning("Not authenticated with Overleaf")
-                return None
-            
-            # Mock implementation
-            if filename == 'main.tex':
-                return '''\\documentclass{article}
-\\usepackage[utf8]{inputenc}
-
-\\title{Research Paper Draft}
-\\author{Author Name}
-\\date{January 2024}
-
-\\begin{document}
-
-\\maketitle
-
-\\section{Introduction}
-This is the introduction section.
-
-\\section{Methodology}
-This is the methodology section.
-
-\\section{Results}
-This is the results section.
-
-\\section{Conclusion}
-This is the conclusion section.
-
-\\end{document}'''
-            
-            return None
+            return self._call(lambda client: client.get_file(project_id, filename))
             
         except Exception as e:
-            logger.error(f"Error getting file content {filename} from project {project_id}: {e}")
+            if getattr(e, 'status', None) != 404:
+                logger.error(f"Error getting file content {filename} from project {project_id}: {e}")
             return None
     
     def update_file_content(self, project_id: str, filename: str, content: str) -> bool:
@@ -277,75 +240,117 @@ This is the conclusion section.
         Returns:
             True if successful, False otherwise
         """
-        try:
-            if not self.authenticated:
-                logger.warning("Not authenticated with Overleaf")
-                return False
+        return self.upload_file(project_id, filename, content) is not None
+    
+    def upload_file(self, project_id: str, filename: str, content: str) -> Optional[str]:
+        """
+        Create or replace a file in an Overleaf project.
+        
+        Args:
+            project_id: Overleaf project ID
+            filename: File path within the project
+            content: File content
             
-            # Mock implementation
+        Returns:
+            Remote revision of the file, or None if the upload failed
+        """
+        try:
+            revision = self._call(lambda client: client.put_file(project_id, filename, content))
             logger.info(f"Updated file {filename} in Overleaf project {project_id}")
-            return True
+            return revision
             
         except Exception as e:
             logger.error(f"Error updating file {filename} in project {project_id}: {e}")
+            return None
+    
+    def delete_file(self, project_id: str, filename: str) -> bool:
+        """
+        Delete a file from an Overleaf project.
+        
+        Args:
+            project_id: Overleaf project ID
+            filename: File path within the project
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            self._call(lambda client: client.delete_file(project_id, filename))
+            logger.info(f"Deleted file {filename} from Overleaf project {project_id}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error deleting file {filename} from project {project_id}: {e}")
             return False
     
     # Synchronization operations
     
-    def sync_project_to_overleaf(self, local_project: Dict[str, Any], documents: List[Dict[str, Any]]) -> Optional[str]:
+    def sync_project_to_overleaf(self, local_project: Dict[str, Any], documents: List[Dict[str, Any]],
+                                 deleted: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
         """
         Synchronize local project to Overleaf.
         
+        Only the given files are transferred: callers pass the documents that
+        were added or changed since the last push, and the paths deleted
+        since (see src.services.sync_manifest). A project without an
+        overleaf_id gets a new Overleaf project. Uploads and deletions run in
+        parallel, up to OVERLEAF_CONCURRENCY at a time.
+        
         Args:
             local_project: Local project information
-            documents: List of documents to sync
+            documents: Documents ({'filename', 'content'}) to upload
+            deleted: Paths to delete from the Overleaf project
             
         Returns:
-            Overleaf project ID if successful, None otherwise
+            The 'overleaf_id', whether the project was 'created', the remote
+            revision of each 'uploaded' file, the paths 'deleted' and the
+            paths that 'failed'; None if the project could not be synced
         """
         try:
-            if not self.authenticated:
+            if not self._connect():
                 logger.warning("Not authenticated with Overleaf - cannot sync to Overleaf")
                 return None
             
             # Check if project already exists on Overleaf
             overleaf_id = local_project.get('overleaf_id')
+            created = False
             
             if overleaf_id:
-                # Update existing project
                 logger.info(f"Updating existing Overleaf project: {overleaf_id}")
-                
-                for doc in documents:
-                    success = self.update_file_content(
-                        overleaf_id,
-                        doc['filename'],
-                        doc['content']
-                    )
-                    if not success:
-                        logger.warning(f"Failed to update file {doc['filename']}")
-                
-                return overleaf_id
             else:
-                # Create new project
                 overleaf_project = self.create_project(local_project['title'])
-                
-                if overleaf_project:
-                    overleaf_id = overleaf_project['id']
-                    
-                    # Upload documents
-                    for doc in documents:
-                        success = self.update_file_content(
-                            overleaf_id,
-                            doc['filename'],
-                            doc['content']
-                        )
-                        if not success:
-                            logger.warning(f"Failed to upload file {doc['filename']}")
-                    
-                    logger.info(f"Created new Overleaf project: {overleaf_id}")
-                    return overleaf_id
-                
-                return None
+                if not overleaf_project:
+                    return None
+                overleaf_id = overleaf_project['id']
+                created = True
+                # A new project has nothing to delete
+                deleted = []
+                logger.info(f"Created new Overleaf project: {overleaf_id}")
+            
+            files = {doc['filename']: doc['content'] for doc in documents}
+            uploads = self.client.run(self.client.put_files(overleaf_id, files))
+            deletions = self.client.run(self.client.delete_files(overleaf_id, deleted or []))
+            
+            result = {'overleaf_id': overleaf_id, 'created': created, 'uploaded': {}, 'deleted': [], 'failed': []}
+            
+            for filename, outcome in uploads.items():
+                if isinstance(outcome, Exception):
+                    logger.warning(f"Failed to upload file {filename}: {outcome}")
+                    result['failed'].append(filename)
+                else:
+                    result['uploaded'][filename] = outcome
+            
+            for filename, error in deletions.items():
+                # A file that is already gone remotely counts as deleted
+                if error is None or getattr(error, 'status', None) == 404:
+                    result['deleted'].append(filename)
+                else:
+                    logger.warning(f"Failed to delete file {filename}: {error}")
+                    result['failed'].append(filename)
+            
+            logger.info(f"Synced project to Overleaf {overleaf_id}: {len(result['uploaded'])} uploaded, "
+                        f"{len(result['deleted'])} deleted, {len(result['failed'])} failed")
+            return result
             
         except Exception as e:
             logger.error(f"Error syncing project to Overleaf: {e}")
@@ -355,14 +360,18 @@ This is the conclusion section.
         """
         Synchronize Overleaf project to local storage.
         
+        Text files are downloaded in parallel, up to OVERLEAF_CONCURRENCY at
+        a time.
+        
         Args:
             overleaf_id: Overleaf project ID
             
         Returns:
-            Project information with documents or None if failed
+            Project information with documents and the paths that 'failed'
+            to download, or None if failed
         """
         try:
-            if not self.authenticated:
+            if not self._connect():
                 logger.warning("Not authenticated with Overleaf - cannot sync from Overleaf")
                 return None
             
@@ -372,20 +381,26 @@ This is the conclusion section.
                 logger.error(f"Overleaf project {overleaf_id} not found")
                 return None
             
-            # Get file contents
+            paths = [file_info['name'] for file_info in project.get('files', [])
+                     if file_info['type'] in ['tex', 'bib', 'txt']]
+            contents = self.client.run(self.client.get_files(overleaf_id, paths))
+            
             documents = []
-            for file_info in project.get('files', []):
-                if file_info['type'] in ['tex', 'bib', 'txt']:
-                    content = self.get_file_content(overleaf_id, file_info['name'])
-                    if content:
-                        documents.append({
-                            'filename': file_info['name'],
-                            'content': content
-                        })
+            failed = []
+            for filename, content in contents.items():
+                if isinstance(content, Exception):
+                    logger.warning(f"Failed to download file {filename}: {content}")
+                    failed.append(filename)
+                else:
+                    documents.append({
+                        'filename': filename,
+                        'content': content
+                    })
             
             result = {
                 'project': project,
-                'documents': documents
+                'documents': documents,
+                'failed': failed
             }
             
             logger.info(f"Synced Overleaf project {overleaf_id} with {len(documents)} documents")
@@ -395,6 +410,74 @@ This is the conclusion section.
             logger.error(f"Error syncing project from Overleaf: {e}")
             return None
     
+    def download_project(self, overleaf_id: str, destination: str,
+                         known_revisions: Optional[Dict[str, Optional[str]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Stream an Overleaf project's text files to disk.
+        
+        Files are downloaded in parallel, up to OVERLEAF_CONCURRENCY at a
+        time, each straight into its own file in destination, so a project
+        is never held in memory. Files whose remote revision equals the one
+        in known_revisions have not changed since and are not downloaded.
+        
+        Args:
+            overleaf_id: Overleaf project ID
+            destination: Existing directory to download into
+            known_revisions: Remote revision last synced, by path
+        
+        Returns:
+            The remote 'project', the downloaded 'files' as (local file,
+            revision) by path, and the paths 'skipped' and 'failed'; None if
+            the project could not be read
+        """
+        known_revisions = known_revisions or {}
+        try:
+            if not self._connect():
+                logger.warning("Not authenticated with Overleaf - cannot download from Overleaf")
+                return None
+            
+            project = self.get_project(overleaf_id)
+            if not project:
+                logger.error(f"Overleaf project {overleaf_id} not found")
+                return None
+            
+            listed = {file_info['name']: file_info.get('revision') for file_info in project.get('files', [])
+                      if file_info['type'] in ['tex', 'bib', 'txt']}
+            skipped = sorted(path for path, revision in listed.items()
+                             if revision is not None and known_revisions.get(path) == revision)
+            # Local names are positional so remote paths never touch the file system
+            wanted = sorted(path for path in listed if path not in skipped)
+            destinations = {path: os.path.join(destination, f'{i:06d}.part') for i, path in enumerate(wanted)}
+            revisions = self.client.run(self.client.download_files(overleaf_id, destinations))
+        except Exception as e:
+            logger.error(f"Error downloading project from Overleaf: {e}")
+            return None
+        
+        files = {}
+        failed = []
+        for path, revision in revisions.items():
+            if isinstance(revision, Exception):
+                logger.warning(f"Failed to download file {path}: {revision}")
+                failed.append(path)
+            else:
+                files[path] = (destinations[path], revision or listed[path])
+        
+        logger.info(f"Downloaded {len(files)} files of Overleaf project {overleaf_id}, "
+                    f"{len(skipped)} unchanged, {len(failed)} failed")
+        return {
+            'project': project,
+            'files': files,
+            'skipped': skipped,
+            'failed': failed
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get Overleaf transport statistics."""
+        stats = {'authenticated': self.authenticated}
+        if self.client is not None:
+            stats.update(self.client.stats())
+        return stats
+    
     # Compilation operations
     
     def compile_project(self, project_id: str) -> Dict[str, Any]:
@@ -405,26 +488,29 @@ This is the conclusion section.
             project_id: Overleaf project ID
             
         Returns:
-            Compilation result
+            Compilation result: 'success', 'pdf_url', 'log', 'warnings',
+            'errors' and 'output_files', or 'success' False with an 'error'
         """
         try:
-            if not self.authenticated:
-                logger.warning("Not authenticated with Overleaf - cannot compile")
-                return {
-                    'success': False,
-                    'error': 'Not authenticated with Overleaf'
-                }
-            
-            # Mock compilation
             logger.info(f"Compiling Overleaf project: {project_id}")
-            
-            return {
-                'success': True,
-                'pdf_url': f'https://www.overleaf.com/project/{project_id}/output.pdf',
-                'log': 'Compilation successful',
-                'warnings': [],
-                'errors': []
+            result = self._call(lambda client: client.compile(project_id))
+            outputs = {output['name']: output for output in result.get('output_files', [])}
+            
+            log = 'Compilation successful' if result['status'] == 'success' else 'Compilation failed'
+            if 'output.log' in outputs:
+                log = self._call(lambda client: client.get_output(project_id, 'output.log')).decode('utf-8', 'replace')
+            
+            compilation = {
+                'success': result['status'] == 'success',
+                'pdf_url': self._output_url(outputs['output.pdf']['url']) if 'output.pdf' in outputs else None,
+                'log': log,
+                'warnings': result.get('warnings', []),
+                'errors': result.get('errors', []),
+                'output_files': list(outputs)
             }
+            if not compilation['success']:
+                compilation['error'] = '; '.join(compilation['errors']) or 'Compilation failed'
+            return compilation
             
         except Exception as e:
             logger.error(f"Error compiling project {project_id}: {e}")
@@ -433,6 +519,31 @@ This is the conclusion section.
                 'error': str(e)
             }
     
+    def _output_url(self, path: str) -> str:
+        """Get the absolute URL of a compile output."""
+        return f"{self.config.OVERLEAF_API_URL.rstrip('/')}{path}"
+    
+    def download_output(self, project_id: str, destination: str, name: str = 'output.pdf') -> Optional[int]:
+        """
+        Download a file produced by the last compile, streaming it to disk.
+        
+        Args:
+            project_id: Overleaf project ID
+            destination: Local file path to write
+            name: Output file name, e.g. output.pdf or output.log
+            
+        Returns:
+            Bytes written, or None if the download failed
+        """
+        try:
+            size = self._call(lambda client: client.download_output(project_id, name, destination))
+            logger.info(f"Downloaded {name} of Overleaf project {project_id} ({size} bytes)")
+            return size
+            
+        except Exception as e:
+            logger.error(f"Error downloading {name} of project {project_id}: {e}")
+            return None
+    
     def get_compilation_status(self, project_id: str) -> Dict[str, Any]:
         """
         Get compilation status for Overleaf project.
@@ -444,12 +555,12 @@ This is the conclusion section.
             Compilation status
         """
         try:
-            # Mock status
+            status = self._call(lambda client: client.get_compile_status(project_id))
             return {
-                'status': 'success',
-                'last_compiled': datetime.utcnow().isoformat(),
-                'pdf_available': True,
-                'log_available': True
+                'status': status['status'],
+                'last_compiled': status.get('compiled_at'),
+                'pdf_available': status.get('pdf_available', False),
+                'log_available': status.get('log_available', False)
             }
             
         except Exception as e:
@@ -462,8 +573,8 @@ This is the conclusion section.
     def shutdown(self) -> None:
         """Shutdown the Overleaf service."""
         try:
-            if self.session:
-                self.session.close()
+            if self.client:
+                self.client.close()
             
             logger.info("Overleaf Service shutdown completed")
             
@@ -0,0 +1,187 @@
+"""
+Document Patching
+
+This module applies range edits and unified-diff hunks to document content.
+Edits are expressed against the base content, so a client only sends the
+part of a document that changes.
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+class PatchError(ValueError):
+    """Raised when a patch is malformed or does not apply to the base content."""
+
+class PatchConflictError(PatchError):
+    """Raised when the base content no longer matches what the patch expects."""
+
+def _line_starts(content: str) -> List[int]:
+    """Offsets of the first character of every line (plus the end offset)."""
+    starts = [0]
+    index = content.find('\n')
+    while index != -1:
+        starts.append(index + 1)
+        index = content.find('\n', index + 1)
+    if starts[-1] != len(content):
+        starts.append(len(content))
+    return starts
+
+def _line_span(starts: List[int], start_line: int, end_line: int) -> Tuple[int, int]:
+    """Character span covering 1-based lines start_line..end_line inclusive."""
+    line_count = len(starts) - 1
+    if start_line < 1 or start_line > line_count + 1:
+        raise PatchError(f"start_line {start_line} is outside the document (1-{line_count + 1})")
+    if end_line < start_line - 1 or end_line > line_count:
+        raise PatchError(f"end_line {end_line} is outside the document or before start_line")
+    return starts[start_line - 1], starts[end_line]
+
+def _char_offset(data: bytes, offset: int) -> int:
+    """Convert a UTF-8 byte offset into data to a character offset."""
+    try:
+        return len(data[:offset].decode('utf-8'))
+    except UnicodeDecodeError:
+        raise PatchError(f"Offset {offset} is inside a UTF-8 character")
+
+def apply_edits(content: str, edits: List[Dict[str, Any]]) -> str:
+    """
+    Apply range edits to content.
+
+    Each edit is either a line edit {'start_line', 'end_line', 'text'}
+    replacing 1-based lines start_line..end_line (use end_line =
+    start_line - 1 to insert before start_line), or an offset edit
+    {'offset', 'length', 'text'} replacing bytes of the UTF-8 encoded
+    content, as counted by byte range reads. All positions refer to the
+    original content and edits may not overlap. Line edit text gets a
+    trailing newline if it lacks one.
+
+    Args:
+        content: Base content
+        edits: Edits to apply
+
+    Returns:
+        Patched content
+    """
+    if not edits:
+        raise PatchError("At least one edit is required")
+
+    starts = None
+    data = None
+    spans = []
+    for edit in edits:
+        text = edit.get('text', '')
+        if 'start_line' in edit:
+            if starts is None:
+                starts = _line_starts(content)
+            start_line = int(edit['start_line'])
+            end_line = int(edit.get('end_line', start_line))
+            start, end = _line_span(starts, start_line, end_line)
+            if text and not text.endswith('\n'):
+                text += '\n'
+            if start == len(content) and content and not content.endswith('\n'):
+                # Appending after a final line without a newline
+                text = '\n' + text.rstrip('\n')
+        elif 'offset' in edit:
+            if data is None:
+                data = content.encode('utf-8')
+            start = int(edit['offset'])
+            end = start + int(edit.get('length', 0))
+            if start < 0 or end < start or end > len(data):
+                raise PatchError(f"Byte range {start}-{end} is outside the document (0-{len(data)})")
+            start, end = _char_offset(data, start), _char_offset(data, end)
+        else:
+            raise PatchError("Each edit needs either start_line or offset")
+        spans.append((start, end, text))
+
+    spans.sort(key=lambda span: (span[0], span[1]))
+    for previous, current in zip(spans, spans[1:]):
+        if current[0] < previous[1]:
+            raise PatchError("Edits overlap")
+
+    parts = []
+    position = 0
+    for start, end, text in spans:
+        parts.append(content[position:start])
+        parts.append(text)
+        position = end
+    parts.append(content[position:])
+    return ''.join(parts)
+
+def apply_unified_diff(content: str, diff: str) -> str:
+    """
+    Apply unified-diff hunks to content.
+
+    File headers (---/+++) are ignored. Context and removed lines must match
+    the base content exactly at the positions given in the hunk headers.
+
+    Args:
+        content: Base content
+        diff: Unified diff text
+
+    Returns:
+        Patched content
+    """
+    lines = content.splitlines(keepends=True)
+    diff_lines = diff.splitlines(keepends=True)
+
+    hunks = []
+    index = 0
+    while index < len(diff_lines):
+        match = HUNK_HEADER.match(diff_lines[index])
+        index += 1
+        if not match:
+            continue
+
+        old_start = int(match.group(1))
+        old_count = int(match.group(2)) if match.group(2) is not None else 1
+        old_lines, new_lines = [], []
+        last_tag = None
+        while index < len(diff_lines) and not HUNK_HEADER.match(diff_lines[index]):
+            line = diff_lines[index]
+            index += 1
+            if line.startswith('\\'):
+                # "\ No newline at end of file" applies to the previous line
+                if last_tag in (' ', '-'):
+                    old_lines[-1] = old_lines[-1].rstrip('\n')
+                if last_tag in (' ', '+'):
+                    new_lines[-1] = new_lines[-1].rstrip('\n')
+                continue
+            tag, text = line[:1], line[1:]
+            if line in ('\n', '\r\n'):
+                # Some tools strip the leading space from empty context lines
+                tag, text = ' ', line
+            if tag not in (' ', '-', '+'):
+                break
+            if tag in (' ', '-'):
+                old_lines.append(text)
+            if tag in (' ', '+'):
+                new_lines.append(text)
+            last_tag = tag
+
+        if len(old_lines) != old_count:
+            raise PatchError(f"Hunk at line {old_start} expects {old_count} lines but has {len(old_lines)}")
+
+        # A zero-length hunk inserts after old_start
+        first = old_start if old_count == 0 else old_start - 1
+        hunks.append((first, old_lines, new_lines))
+
+    if not hunks:
+        raise PatchError("Diff contains no hunks")
+
+    result = []
+    position = 0
+    for first, old_lines, new_lines in hunks:
+        if first < position:
+            raise PatchError("Hunks overlap or are out of order")
+        if lines[first:first + len(old_lines)] != old_lines:
+            raise PatchConflictError(f"Hunk at line {first + 1} does not match the document")
+        result.extend(lines[position:first])
+        result.extend(new_lines)
+        position = first + len(old_lines)
+    result.extend(lines[position:])
+    return ''.join(result)
+
+def count_lines(content: str) -> int:
+    """Number of lines in content (a final line without newline counts)."""
+    return len(_line_starts(content)) - 1 if content else 0
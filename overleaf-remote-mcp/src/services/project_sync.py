@@ -0,0 +1,185 @@
+"""
+Project Sync
+
+This module pushes local projects to Overleaf incrementally. The project's
+document hashes are compared against its sync manifest without loading any
+content; only added and changed documents are loaded and uploaded, deleted
+paths are removed remotely, and the manifest is updated with the revisions
+the remote returned. Files that fail to transfer stay out of the manifest,
+so the next push retries them.
+
+Pulls go the other way: files whose remote revision is the one in the
+manifest are not downloaded, the rest are streamed to disk concurrently and
+imported in one transaction, and the manifest is updated so that the next
+push does not send them back.
+"""
+
+import os
+import shutil
+import logging
+import tempfile
+from typing import Any, Dict, Optional
+
+from src.services.document_service import DocumentService
+from src.services.overleaf_service import OverleafService
+from src.services.sync_manifest import plan_sync
+
+logger = logging.getLogger(__name__)
+
+class ProjectSync:
+    """Incremental synchronization between local projects and Overleaf."""
+
+    def __init__(self, document_service: DocumentService, overleaf_service: OverleafService):
+        """
+        Initialize the project sync.
+
+        Args:
+            document_service: Document service instance
+            overleaf_service: Overleaf service instance
+        """
+        self.document_service = document_service
+        self.overleaf_service = overleaf_service
+
+    def push(self, project_id: str, full: bool = False) -> Dict[str, Any]:
+        """
+        Push a project's changes since its last sync to Overleaf.
+
+        Args:
+            project_id: Local project ID
+            full: Upload every document, ignoring the manifest
+
+        Returns:
+            Sync report: 'overleaf_id', whether the remote project was
+            'created', the paths 'added', 'changed', 'deleted' and 'failed',
+            the 'unchanged' count, 'bytes_sent' and 'bytes_saved'
+
+        Raises:
+            ValueError: If the project does not exist
+            RuntimeError: If the project could not be synced at all
+        """
+        state = self.document_service.get_sync_state(project_id)
+        if state is None:
+            raise ValueError(f"Project not found: {project_id}")
+
+        documents = state['documents']
+        plan = plan_sync(documents, {} if full else state['manifest'])
+        report = {
+            'project_id': project_id,
+            'overleaf_id': state['overleaf_id'],
+            'created': False,
+            'added': plan.added,
+            'changed': plan.changed,
+            'deleted': plan.deleted,
+            'unchanged': len(plan.unchanged),
+            'failed': [],
+            'bytes_sent': 0,
+            'bytes_saved': plan.bytes_unchanged
+        }
+
+        if state['overleaf_id'] and plan.is_empty():
+            logger.info(f"Project {project_id} is already in sync with Overleaf {state['overleaf_id']}")
+            return report
+
+        project = self.document_service.get_project(project_id)
+        contents = self.document_service.get_document_contents(project_id, plan.uploads)
+        uploads = [{'filename': filename, 'content': contents[filename]}
+                   for filename in plan.uploads if filename in contents]
+
+        result = self.overleaf_service.sync_project_to_overleaf(project, uploads, plan.deleted)
+        if result is None:
+            raise RuntimeError("Failed to sync project to Overleaf. Check Overleaf service configuration.")
+
+        uploaded = {filename: (documents[filename][0], revision)
+                    for filename, revision in result['uploaded'].items()}
+        self.document_service.record_sync(project_id, result['overleaf_id'], uploaded, result['deleted'])
+
+        failed = set(result['failed'])
+        report.update({
+            'overleaf_id': result['overleaf_id'],
+            'created': result['created'],
+            'added': [filename for filename in plan.added if filename not in failed],
+            'changed': [filename for filename in plan.changed if filename not in failed],
+            'deleted': result['deleted'],
+            'failed': result['failed'],
+            'bytes_sent': sum(documents[filename][1] for filename in uploaded)
+        })
+
+        logger.info(f"Pushed project {project_id} to Overleaf {result['overleaf_id']}: "
+                    f"{len(report['added'])} added, {len(report['changed'])} changed, "
+                    f"{len(report['deleted'])} deleted, {report['unchanged']} unchanged, "
+                    f"{report['bytes_saved']} bytes not sent")
+        return report
+
+    def pull(self, overleaf_id: str, project_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Pull an Overleaf project's text files into a local project.
+
+        Args:
+            overleaf_id: Overleaf project ID
+            project_id: Local project to pull into; defaults to the project
+                linked to overleaf_id, or a new project if there is none
+
+        Returns:
+            Pull report: 'project_id', whether the local project was
+            'created', the paths 'added', 'changed' and 'failed', the
+            'unchanged' count (including files not downloaded because their
+            remote revision was already synced) and 'bytes_received'
+
+        Raises:
+            ValueError: If project_id does not exist
+            RuntimeError: If the Overleaf project could not be read
+        """
+        documents = self.document_service
+        if project_id is None:
+            linked = documents.get_project_by_overleaf_id(overleaf_id)
+            if linked:
+                project_id = linked['id']
+
+        known_revisions = {}
+        if project_id is not None:
+            state = documents.get_sync_state(project_id)
+            if state is None:
+                raise ValueError(f"Project not found: {project_id}")
+            if state['overleaf_id'] == overleaf_id:
+                known_revisions = {path: entry['remote_revision'] for path, entry in state['manifest'].items()}
+
+        # Staged under the storage path, so imported files are moved rather than copied
+        staging = tempfile.mkdtemp(prefix='pull-', dir=documents.storage_path)
+        try:
+            download = self.overleaf_service.download_project(overleaf_id, staging, known_revisions)
+            if download is None:
+                raise RuntimeError("Failed to pull project from Overleaf. Check Overleaf service configuration.")
+
+            created = project_id is None
+            if created:
+                # Without a placeholder main.tex, which the next push would upload
+                project_id = documents.create_project(download['project'].get('name') or overleaf_id, 'article',
+                                                      main_document=False)['id']
+
+            files = download['files']
+            bytes_received = sum(os.path.getsize(path) for path, _ in files.values())
+            result = documents.import_documents(
+                project_id,
+                {filename: path for filename, (path, _) in files.items()},
+                commit_message=f"Pulled from Overleaf {overleaf_id}",
+                overleaf_id=overleaf_id,
+                revisions={filename: revision for filename, (_, revision) in files.items()}
+            )
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        report = {
+            'project_id': project_id,
+            'overleaf_id': overleaf_id,
+            'created': created,
+            'added': result['created'],
+            'changed': result['updated'],
+            'unchanged': len(result['unchanged']) + len(download['skipped']),
+            'failed': sorted(download['failed'] + result['failed']),
+            'bytes_received': bytes_received
+        }
+
+        logger.info(f"Pulled Overleaf project {overleaf_id} into {project_id}: "
+                    f"{len(report['added'])} added, {len(report['changed'])} changed, "
+                    f"{report['unchanged']} unchanged, {len(report['failed'])} failed")
+        return report
@@ -0,0 +1,186 @@
+"""
+Range Reader
+
+This module serves line and byte ranges of documents from the on-disk
+project mirror. Files are memory-mapped and a line-offset index is kept per
+file, so a range read touches only the requested bytes instead of loading
+and decompressing the whole document.
+"""
+
+import os
+import re
+import mmap
+import hashlib
+import logging
+import threading
+from array import array
+from typing import Any, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+NEWLINE = re.compile(b'\n')
+
+Buffer = Union[bytes, mmap.mmap]
+
+def build_line_index(data: Buffer) -> array:
+    """
+    Build the byte offset of the start of every line.
+
+    The index has one entry per line plus a final entry holding the data
+    length, so line n (1-based) spans index[n - 1]:index[n].
+
+    Args:
+        data: Document bytes or a memory map
+
+    Returns:
+        Array of line start offsets
+    """
+    starts = array('Q', [0])
+    starts.extend(match.end() for match in NEWLINE.finditer(data))
+    if starts[-1] != len(data):
+        starts.append(len(data))
+    return starts
+
+def _char_boundary(data: Buffer, position: int, forward: bool = False) -> int:
+    """Move position back (or forward) to the start of a UTF-8 character."""
+    step = 1 if forward else -1
+    while 0 < position < len(data) and (data[position] & 0xC0) == 0x80:
+        position += step
+    return position
+
+def read_range(data: Buffer, line_index: array, start_line: Optional[int] = None,
+               end_line: Optional[int] = None, offset: Optional[int] = None,
+               length: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Slice a line range or byte range out of document data.
+
+    Line ranges are 1-based and inclusive; end_line defaults to the last
+    line. Byte ranges are widened to whole UTF-8 characters and hold at
+    least one character unless they start at the end. When both are given
+    the line range wins.
+
+    Args:
+        data: Document bytes or a memory map
+        line_index: Index from build_line_index
+        start_line: First line to return
+        end_line: Last line to return
+        offset: First byte to return
+        length: Number of bytes to return (default: to the end)
+
+    Returns:
+        Range content, its bounds, totals and continuation parameters
+    """
+    total_lines = len(line_index) - 1
+    total_bytes = len(data)
+
+    if start_line is not None or end_line is not None:
+        start_line = max(1, int(start_line or 1))
+        end_line = total_lines if end_line is None else min(int(end_line), total_lines)
+        if start_line > max(total_lines, 1) or end_line < start_line - 1:
+            raise ValueError(f"Line range {start_line}-{end_line} is outside the document (1-{total_lines})")
+        start = line_index[start_line - 1] if total_lines else 0
+        end = line_index[end_line] if end_line >= 1 else start
+        result = {
+            'start_line': start_line,
+            'end_line': end_line,
+            'next': {'start_line': end_line + 1} if end_line < total_lines else None
+        }
+    else:
+        offset = max(0, int(offset or 0))
+        if offset > total_bytes:
+            raise ValueError(f"Offset {offset} is outside the document (0-{total_bytes})")
+        end = total_bytes if length is None else min(total_bytes, offset + max(0, int(length)))
+        start = _char_boundary(data, offset)
+        # Rounding the end forward keeps a short range from coming back
+        # empty, which would leave next pointing at the same offset
+        end = _char_boundary(data, max(end, start + 1) if start < total_bytes else end, forward=True)
+        result = {
+            'offset': start,
+            'length': end - start,
+            'next': {'offset': end} if end < total_bytes else None
+        }
+
+    result.update({
+        'content': bytes(data[start:end]).decode('utf-8'),
+        'total_lines': total_lines,
+        'total_bytes': total_bytes
+    })
+    return result
+
+class MirrorIndex:
+    """
+    Memory-mapped access to the on-disk project mirror.
+
+    For each file the index remembers which content hash it holds (checked
+    against the file's size and modification time) and its line index, so
+    repeated range reads neither re-hash nor re-scan the file.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Initialize the mirror index.
+
+        Args:
+            max_entries: Number of files whose line index is kept
+        """
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[str, int, int, array]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, path: str, content_hash: str) -> None:
+        """Note that path was just written with content_hash."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.forget(path)
+            return
+        with self._lock:
+            self._store(path, (content_hash, stat.st_size, stat.st_mtime_ns, None))
+
+    def forget(self, path: str) -> None:
+        """Drop any cached state for path."""
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def read(self, path: str, content_hash: str, size: int, **range_args) -> Optional[Dict[str, Any]]:
+        """
+        Read a range from the mirror file if it holds the expected content.
+
+        Args:
+            path: Mirror file path
+            content_hash: Hash of the current document content
+            size: Byte size of the current document content
+            **range_args: Range parameters for read_range
+
+        Returns:
+            Range result, or None if the mirror is missing or stale
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if stat.st_size != size:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+        known = entry is not None and entry[:3] == (content_hash, stat.st_size, stat.st_mtime_ns)
+
+        with open(path, 'rb') as f:
+            if size == 0:
+                return read_range(b'', array('Q', [0]), **range_args)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if not known and hashlib.sha256(data).hexdigest() != content_hash:
+                    return None
+
+                line_index = entry[3] if known and entry[3] is not None else build_line_index(data)
+                with self._lock:
+                    self._store(path, (content_hash, stat.st_size, stat.st_mtime_ns, line_index))
+                return read_range(data, line_index, **range_args)
+
+    def _store(self, path: str, entry: Tuple[str, int, int, Optional[array]]) -> None:
+        """Insert an entry, evicting the oldest when full. Caller holds the lock."""
+        self._entries.pop(path, None)
+        self._entries[path] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
@@ -0,0 +1,296 @@
+"""
+Search Index
+
+This module maintains an SQLite FTS5 full-text index over document content.
+The index is updated in the same transaction as document writes and answers
+ranked, paged queries with highlighted snippets.
+
+The index is contentless: it holds the tokens, not a copy of the text, which
+stays deduplicated in the blob store. Snippets are cut from the text loaded
+from there.
+"""
+
+import re
+import sqlite3
+import logging
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Supported query modes
+MATCH_MODES = ('all', 'any', 'phrase', 'raw')
+
+# Column weights for bm25 ranking (filename, content)
+FILENAME_WEIGHT = 5.0
+CONTENT_WEIGHT = 1.0
+
+# Maximum number of results returned per page
+MAX_PAGE_SIZE = 100
+
+# Tokens shown in a snippet
+SNIPPET_TOKENS = 24
+
+# Tokens as split by the unicode61 tokenizer
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+# Words with a meaning in FTS5 query syntax
+QUERY_OPERATORS = frozenset({'AND', 'OR', 'NOT', 'NEAR'})
+
+def build_match_query(query: str, mode: str = 'all') -> str:
+    """
+    Turn user input into an FTS5 MATCH expression.
+
+    Terms are quoted so that LaTeX punctuation (labels such as eq:energy,
+    backslashes, braces) is treated as text rather than FTS5 syntax.
+
+    Args:
+        query: User search text
+        mode: 'all' (every term), 'any' (at least one term),
+              'phrase' (exact phrase) or 'raw' (FTS5 syntax as given)
+
+    Returns:
+        MATCH expression
+    """
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Invalid match mode: {mode}")
+
+    query = (query or '').strip()
+    if not query:
+        raise ValueError("Search query is required")
+
+    if mode == 'raw':
+        return query
+
+    quote = lambda text: '"' + text.replace('"', '""') + '"'
+    if mode == 'phrase':
+        return quote(query)
+
+    terms = [quote(term) for term in query.split()]
+    return (' OR ' if mode == 'any' else ' AND ').join(terms)
+
+def _fold(token: str) -> str:
+    """Fold a token the way unicode61 does: case and diacritics are ignored."""
+    decomposed = unicodedata.normalize('NFKD', token.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+def query_terms(query: str, mode: str = 'all') -> List[Tuple[str, bool]]:
+    """
+    Get the folded terms of a query, for highlighting.
+
+    Args:
+        query: User search text
+        mode: Query mode (see build_match_query)
+
+    Returns:
+        (term, is_prefix) pairs
+    """
+    terms = []
+    for match in re.finditer(r'([^\W_]+)(\*?)', query or ''):
+        word, star = match.groups()
+        if mode == 'raw' and word in QUERY_OPERATORS:
+            continue
+        terms.append((_fold(word), mode == 'raw' and bool(star)))
+    return terms
+
+def make_snippet(content: str, terms: List[Tuple[str, bool]], highlight: Tuple[str, str],
+                 size: int = SNIPPET_TOKENS) -> str:
+    """
+    Cut the passage of a document that best matches the query terms.
+
+    Like the FTS5 snippet() function: the window of size tokens holding the
+    most distinct terms is shown, runs of matched tokens are wrapped in the
+    highlight markers, and '...' marks text left out.
+
+    Args:
+        content: Document text
+        terms: Folded query terms (see query_terms)
+        highlight: Markers placed around matched terms
+        size: Tokens in the snippet
+
+    Returns:
+        Snippet text
+    """
+    tokens = list(TOKEN_PATTERN.finditer(content))
+    if not tokens:
+        return ''
+
+    def matched(token: str) -> Optional[str]:
+        folded = _fold(token)
+        for term, prefix in terms:
+            if folded == term or (prefix and folded.startswith(term)):
+                return term
+        return None
+
+    hits = [matched(token.group()) for token in tokens]
+    start = 0
+    best = 0
+    for i, hit in enumerate(hits):
+        if hit is None:
+            continue
+        candidate = max(0, min(i - 2, len(tokens) - size))
+        found = len({term for term in hits[candidate:candidate + size] if term})
+        if found > best:
+            start, best = candidate, found
+    end = min(start + size, len(tokens))
+
+    parts = ['...' if start > 0 else '']
+    position = tokens[start].start()
+    i = start
+    while i < end:
+        if hits[i] is None:
+            i += 1
+            continue
+        run_end = i
+        while run_end + 1 < end and hits[run_end + 1] is not None:
+            run_end += 1
+        parts.append(content[position:tokens[i].start()])
+        parts.append(highlight[0] + content[tokens[i].start():tokens[run_end].end()] + highlight[1])
+        position = tokens[run_end].end()
+        i = run_end + 1
+    parts.append(content[position:tokens[end - 1].end()])
+    if end < len(tokens):
+        parts.append('...')
+    return ''.join(parts)
+
+class SearchIndex:
+    """
+    FTS5 index over documents.
+
+    Index rows are keyed by documents.search_id, which is stored with the
+    document: the implicit rowid of documents is not stable (VACUUM may
+    renumber it, as the table has a TEXT primary key), so it cannot be used
+    to join the index back to its documents. As the table is contentless,
+    removing a row needs the values it was indexed with. All methods take an
+    open connection so they join the caller's transaction.
+    """
+
+    def create(self, conn: sqlite3.Connection) -> None:
+        """Create the index table if it does not exist."""
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                filename,
+                content,
+                content = '',
+                tokenize = 'unicode61'
+            )
+        ''')
+
+    def index(self, conn: sqlite3.Connection, search_id: Optional[int], filename: str, content: str,
+              old_content: Optional[str] = None) -> int:
+        """
+        Add or replace a document in the index.
+
+        Args:
+            conn: Connection inside a write transaction
+            search_id: The document's search_id, or None for a new document
+            filename: Document filename
+            content: Document content
+            old_content: Content the document was indexed with, when replacing
+
+        Returns:
+            The search_id to store with the document
+        """
+        if search_id is not None:
+            self.remove(conn, search_id, filename, old_content)
+        cursor = conn.execute('''
+            INSERT INTO documents_fts (rowid, filename, content)
+            VALUES (?, ?, ?)
+        ''', (search_id, filename, content or ''))
+        return cursor.lastrowid
+
+    def remove(self, conn: sqlite3.Connection, search_id: int, filename: str, content: Optional[str]) -> None:
+        """Remove a document, as indexed with filename and content, from the index."""
+        conn.execute('''
+            INSERT INTO documents_fts (documents_fts, rowid, filename, content)
+            VALUES ('delete', ?, ?, ?)
+        ''', (search_id, filename, content or ''))
+
+    def search(self, conn: sqlite3.Connection, query: str, project_ids: Optional[List[str]] = None,
+               mode: str = 'all', limit: int = 20, offset: int = 0,
+               highlight: Tuple[str, str] = ('**', '**'),
+               load_content: Optional[Callable[[str], str]] = None) -> Dict[str, Any]:
+        """
+        Run a ranked full-text query.
+
+        Args:
+            conn: Open connection
+            query: Search text
+            project_ids: Optional list of project IDs to restrict the search to
+            mode: Query mode (see build_match_query)
+            limit: Page size
+            offset: Number of ranked results to skip
+            highlight: Markers placed around matched terms in snippets
+            load_content: Callable mapping a content hash to its text, for
+                the snippets; without it results have no snippet
+
+        Returns:
+            Page of results with a next_offset when more results exist
+        """
+        match = build_match_query(query, mode)
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+
+        sql = '''
+            SELECT d.project_id, p.title, d.filename, d.content_hash,
+                   bm25(documents_fts, ?, ?) AS rank
+            FROM documents_fts
+            JOIN documents d ON d.search_id = documents_fts.rowid
+            JOIN projects p ON p.id = d.project_id
+            WHERE documents_fts MATCH ?
+        '''
+        params: List[Any] = [FILENAME_WEIGHT, CONTENT_WEIGHT, match]
+
+        if project_ids:
+            sql += f" AND d.project_id IN ({','.join('?' * len(project_ids))})"
+            params.extend(project_ids)
+
+        # Fetch one extra row to know whether another page exists
+        sql += ' ORDER BY rank LIMIT ? OFFSET ?'
+        params.extend([limit + 1, offset])
+
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query: {e}")
+
+        terms = query_terms(query, mode)
+        results = [
+            {
+                'project_id': row[0],
+                'project_title': row[1],
+                'filename': row[2],
+                'snippet': make_snippet(load_content(row[3]), terms, highlight) if load_content else None,
+                'score': round(-row[4], 4)
+            }
+            for row in rows[:limit]
+        ]
+
+        return {
+            'query': query,
+            'results': results,
+            'offset': offset,
+            'next_offset': offset + limit if len(rows) > limit else None
+        }
+
+    def rebuild(self, conn: sqlite3.Connection, load_content) -> int:
+        """
+        Rebuild the index from the documents table, assigning every
+        document a new search_id.
+
+        Args:
+            conn: Connection inside a write transaction
+            load_content: Callable mapping a content hash to its text
+
+        Returns:
+            Number of documents indexed
+        """
+        conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('delete-all')")
+        conn.execute('UPDATE documents SET search_id = NULL')
+        rows = conn.execute('SELECT id, filename, content_hash FROM documents').fetchall()
+        for document_id, filename, content_hash in rows:
+            search_id = self.index(conn, None, filename, load_content(content_hash))
+            conn.execute('UPDATE documents SET search_id = ? WHERE id = ?', (search_id, document_id))
+
+        logger.info(f"Indexed {len(rows)} documents for full-text search")
+        return len(rows)
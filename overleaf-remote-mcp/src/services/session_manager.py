@@ -0,0 +1,249 @@
+"""
+SSE Session Manager
+
+This module tracks SSE transport sessions for the ASGI server. Each session
+owns a bounded asyncio queue of outbound JSON-RPC messages that its stream
+drains; responses to messages POSTed for the session are routed onto it.
+A full queue applies backpressure to producers, a consumer that stays full
+past the send timeout is disconnected, and idle sessions are reaped.
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class SessionClosedError(Exception):
+    """Raised when sending to a session that has been closed."""
+
+class SessionLimitError(Exception):
+    """Raised when the maximum number of sessions is open."""
+
+# Queued after a session closes to wake and stop its stream
+CLOSED = object()
+
+class Session:
+    """A single SSE session and its outbound message queue."""
+
+    def __init__(self, session_id: str, queue_size: int, send_timeout: float):
+        """
+        Initialize a session.
+
+        Args:
+            session_id: Unique session ID
+            queue_size: Maximum number of queued outbound messages
+            send_timeout: Seconds a producer may wait for queue space
+        """
+        self.id = session_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.send_timeout = send_timeout
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.tasks: Set[asyncio.Task] = set()
+        # Bounds requests accepted but not yet answered on the stream
+        self.inflight = asyncio.Semaphore(queue_size)
+
+    def touch(self) -> None:
+        """Record client activity: a message from the client, or one delivered on its stream."""
+        self.last_active = time.monotonic()
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """
+        Queue a message for the session's stream, waiting for space.
+
+        Args:
+            message: JSON-RPC message to deliver
+
+        Raises:
+            SessionClosedError: If the session is closed, or its stream did
+                not make room within the send timeout (the session is then
+                closed as a slow consumer)
+        """
+        if self.closed:
+            raise SessionClosedError(f"Session {self.id} is closed")
+
+        try:
+            await asyncio.wait_for(self.queue.put(message), self.send_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"SSE session {self.id} did not drain its queue in {self.send_timeout}s")
+            self.close("slow consumer")
+            raise SessionClosedError(f"Session {self.id} closed as a slow consumer")
+
+        if self.closed:
+            raise SessionClosedError(f"Session {self.id} is closed")
+
+    def offer(self, message: Dict[str, Any]) -> bool:
+        """
+        Queue a message without waiting.
+
+        Returns:
+            False if the queue is full; True once queued, or if the session
+            is closed and the message was dropped
+        """
+        if self.closed:
+            return True
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def receive(self, timeout: float) -> Any:
+        """
+        Wait for the next outbound message.
+
+        Args:
+            timeout: Seconds to wait
+
+        Returns:
+            The next message, or CLOSED once the session is closed
+
+        Raises:
+            asyncio.TimeoutError: If nothing arrived within the timeout
+        """
+        if self.closed:
+            return CLOSED
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def track(self, task: asyncio.Task) -> None:
+        """Keep a reference to a request task so closing can cancel it."""
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def close(self, reason: str) -> None:
+        """
+        Close the session: drop queued messages, cancel in-flight requests
+        and wake the stream so it ends.
+
+        Args:
+            reason: Why the session closed (for logs and stats)
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+
+        for task in list(self.tasks):
+            task.cancel()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(CLOSED)
+
+class SessionManager:
+    """Registry of open SSE sessions."""
+
+    def __init__(self, queue_size: int = 64, send_timeout: float = 10.0,
+                 idle_timeout: float = 1800.0, max_sessions: int = 10000):
+        """
+        Initialize the session manager.
+
+        Args:
+            queue_size: Outbound queue size per session
+            send_timeout: Seconds a producer may wait for queue space
+            idle_timeout: Seconds without client activity (requests or events
+                delivered on the stream) before a session is reaped
+            max_sessions: Maximum number of open sessions
+        """
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions: Dict[str, Session] = {}
+        self._closed_counts: Dict[str, int] = {}
+        # Called with the session ID whenever a session closes
+        self.on_close: List[Callable[[str], None]] = []
+
+    def create(self) -> Session:
+        """
+        Open a new session.
+
+        Returns:
+            The new session
+
+        Raises:
+            SessionLimitError: If max_sessions are already open
+        """
+        if len(self.sessions) >= self.max_sessions:
+            raise SessionLimitError(f"Too many open sessions ({self.max_sessions})")
+
+        session = Session(uuid.uuid4().hex, self.queue_size, self.send_timeout)
+        self.sessions[session.id] = session
+        logger.debug(f"Opened SSE session {session.id}")
+        return session
+
+    def get(self, session_id: Optional[str]) -> Optional[Session]:
+        """Look up an open session by ID."""
+        session = self.sessions.get(session_id) if session_id else None
+        if session is not None and session.closed:
+            return None
+        return session
+
+    def close(self, session_id: str, reason: str) -> None:
+        """
+        Close and forget a session.
+
+        Args:
+            session_id: Session ID
+            reason: Why the session closed
+        """
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return
+        session.close(reason)
+        for callback in self.on_close:
+            callback(session_id)
+        reason = session.close_reason
+        self._closed_counts[reason] = self._closed_counts.get(reason, 0) + 1
+        logger.debug(f"Closed SSE session {session_id}: {reason}")
+
+    def reap_idle(self) -> int:
+        """
+        Close sessions with no client activity within the idle timeout, and
+        forget sessions that were closed elsewhere (e.g. slow consumers).
+
+        Returns:
+            Number of idle sessions reaped
+        """
+        deadline = time.monotonic() - self.idle_timeout
+        reaped = 0
+        for session in list(self.sessions.values()):
+            if session.closed:
+                self.close(session.id, session.close_reason)
+            elif session.last_active < deadline:
+                self.close(session.id, "idle")
+                reaped += 1
+
+        if reaped:
+            logger.info(f"Reaped {reaped} idle SSE sessions")
+        return reaped
+
+    async def run_reaper(self, interval: float) -> None:
+        """Reap idle sessions every interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            self.reap_idle()
+
+    def close_all(self) -> None:
+        """Close every session (on shutdown)."""
+        for session_id in list(self.sessions):
+            self.close(session_id, "shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get session statistics.
+
+        Returns:
+            Open session count, queued messages and close counts by reason
+        """
+        return {
+            'open': len(self.sessions),
+            'max_sessions': self.max_sessions,
+            'queued_messages': sum(s.queue.qsize() for s in self.sessions.values()),
+            'queue_size': self.queue_size,
+            'closed': dict(self._closed_counts)
+        }
@@ -0,0 +1,221 @@
+"""
+Resource Subscriptions
+
+This module keeps track of which sessions subscribed to which resource URIs
+and turns change events into notifications/resources/updated messages.
+
+Notifications are coalesced and debounced: while an agent makes a burst of
+edits, each subscribed URI is notified at most once per quiet period of
+`debounce` seconds, and never later than `max_delay` seconds after the first
+change in the burst.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+def base_uri(uri: str) -> str:
+    """Strip the query string, so range URIs match changes to their document."""
+    return uri.split('?', 1)[0]
+
+class SubscriptionRegistry:
+    """Thread-safe map of resource URIs to subscribed sessions."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        # base URI -> {(session_id, subscribed URI)}
+        self._by_uri: Dict[str, Set[Tuple[str, str]]] = {}
+        # session_id -> {subscribed URI}
+        self._by_session: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_id: str, uri: str) -> None:
+        """Subscribe a session to a resource URI."""
+        with self._lock:
+            self._by_uri.setdefault(base_uri(uri), set()).add((session_id, uri))
+            self._by_session.setdefault(session_id, set()).add(uri)
+
+    def unsubscribe(self, session_id: str, uri: str) -> bool:
+        """
+        Remove one subscription.
+
+        Returns:
+            True if the session was subscribed to the URI
+        """
+        with self._lock:
+            uris = self._by_session.get(session_id)
+            if not uris or uri not in uris:
+                return False
+            uris.discard(uri)
+            if not uris:
+                del self._by_session[session_id]
+            self._discard(base_uri(uri), (session_id, uri))
+            return True
+
+    def remove_session(self, session_id: str) -> None:
+        """Drop every subscription held by a session."""
+        with self._lock:
+            for uri in self._by_session.pop(session_id, ()):
+                self._discard(base_uri(uri), (session_id, uri))
+
+    def _discard(self, key: str, entry: Tuple[str, str]) -> None:
+        subscribers = self._by_uri.get(key)
+        if subscribers is not None:
+            subscribers.discard(entry)
+            if not subscribers:
+                del self._by_uri[key]
+
+    def subscribers(self, uri: str) -> List[Tuple[str, str]]:
+        """
+        Find subscriptions affected by a change to a resource.
+
+        Args:
+            uri: Changed resource URI (without query)
+
+        Returns:
+            List of (session_id, subscribed URI)
+        """
+        with self._lock:
+            return list(self._by_uri.get(uri, ()))
+
+    def stats(self) -> Dict[str, int]:
+        """Get subscription counts."""
+        with self._lock:
+            return {
+                'sessions': len(self._by_session),
+                'subscriptions': sum(len(uris) for uris in self._by_session.values())
+            }
+
+class ResourceNotifier:
+    """
+    Deliver resources/updated notifications for change events.
+
+    Change events may arrive on any thread; they are handed to the event
+    loop the notifier was started on, which owns all pending state.
+    """
+
+    def __init__(self, registry: SubscriptionRegistry, resolve: Callable[[Tuple], Iterable[str]],
+                 deliver: Callable[[str, Dict[str, Any]], bool],
+                 debounce: float = 0.2, max_delay: float = 2.0):
+        """
+        Initialize the notifier.
+
+        Args:
+            registry: Subscription registry
+            resolve: Maps a change key to the resource URIs it affects
+            deliver: Sends a notification to a session without blocking;
+                returns False if the session cannot take it yet, in which
+                case it is retried after the next quiet period
+            debounce: Quiet period in seconds before notifying
+            max_delay: Longest a pending notification is held back
+        """
+        self.registry = registry
+        self.resolve = resolve
+        self.deliver = deliver
+        self.debounce = debounce
+        self.max_delay = max_delay
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[Tuple[str, str], None] = {}
+        self._first_pending: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self._changes = 0
+        self._coalesced = 0
+        self._sent = 0
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Bind the notifier to the event loop that delivers notifications."""
+        self._loop = loop
+
+    def stop(self) -> None:
+        """Cancel the pending flush and drop pending notifications."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending.clear()
+        self._loop = None
+
+    def on_change(self, events: List[Tuple]) -> None:
+        """
+        Event bus listener; safe to call from any thread.
+
+        Args:
+            events: Change keys
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._enqueue, events)
+        except RuntimeError:
+            # Loop closed between the check and the call
+            pass
+
+    def _enqueue(self, events: List[Tuple]) -> None:
+        """Mark subscriptions affected by events as pending and schedule a flush."""
+        uris = set()
+        for event in events:
+            uris.update(self.resolve(event))
+
+        for uri in uris:
+            for entry in self.registry.subscribers(uri):
+                self._changes += 1
+                if entry in self._pending:
+                    self._coalesced += 1
+                else:
+                    self._pending[entry] = None
+
+        if self._pending:
+            if self._first_pending is None:
+                self._first_pending = time.monotonic()
+            self._schedule()
+
+    def _schedule(self) -> None:
+        """(Re)arm the flush timer: after the quiet period, capped by max_delay."""
+        if self._loop is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        deadline = self._first_pending + self.max_delay
+        delay = max(0.0, min(self.debounce, deadline - time.monotonic()))
+        self._timer = self._loop.call_later(delay, self._flush)
+
+    def _flush(self) -> None:
+        """Send pending notifications; ones a session cannot take yet stay pending."""
+        self._timer = None
+        self._first_pending = None
+
+        for entry in list(self._pending):
+            session_id, uri = entry
+            message = {
+                'jsonrpc': '2.0',
+                'method': 'notifications/resources/updated',
+                'params': {'uri': uri}
+            }
+            if self.deliver(session_id, message):
+                del self._pending[entry]
+                self._sent += 1
+
+        if self._pending:
+            self._first_pending = time.monotonic()
+            self._schedule()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get notification counters.
+
+        Returns:
+            Changes matched to subscriptions, how many were coalesced into
+            an already pending notification, notifications sent, and pending
+        """
+        return {
+            'changes': self._changes,
+            'coalesced': self._coalesced,
+            'sent': self._sent,
+            'pending': len(self._pending)
+        }
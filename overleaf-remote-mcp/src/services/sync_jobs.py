@@ -0,0 +1,259 @@
+"""
+Sync Jobs
+
+This module stores the background syncs to Overleaf run by
+src.services.sync_queue. Jobs live in the database rather than in memory so
+they survive restarts and are shared by every server process; claiming a
+job happens inside a write transaction, so each job runs once. A claim
+leases the job to the claiming queue for that attempt; the worker renews
+the lease while the job runs, and only the holder may record the outcome.
+"""
+
+import json
+import uuid
+import sqlite3
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columns of a job, in the order _row_to_job expects them
+JOB_COLUMNS = ('id, project_id, full, status, attempts, max_attempts, coalesced, run_after, '
+               'error, result, created_at, started_at, finished_at')
+
+class SyncJobStore:
+    """
+    Sync jobs on top of the sync_jobs table.
+
+    Status moves from 'queued' to 'running' and on to 'succeeded', 'failed',
+    or back to 'queued' for a retry. All methods take an open connection so
+    they join the caller's transaction.
+    """
+
+    def create(self, conn: sqlite3.Connection) -> None:
+        """Create the jobs table."""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_jobs (
+                id TEXT PRIMARY KEY,
+                project_id TEXT NOT NULL,
+                full INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                coalesced INTEGER NOT NULL DEFAULT 0,
+                run_after REAL NOT NULL,
+                lease_owner TEXT,
+                lease_until REAL,
+                error TEXT,
+                result TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sync_jobs_status
+            ON sync_jobs (status, run_after)
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sync_jobs_project
+            ON sync_jobs (project_id, status)
+        ''')
+
+    def _row_to_job(self, row: Tuple) -> Dict[str, Any]:
+        """Convert a row of JOB_COLUMNS to a job dictionary."""
+        return {
+            'id': row[0],
+            'project_id': row[1],
+            'full': bool(row[2]),
+            'status': row[3],
+            'attempts': row[4],
+            'max_attempts': row[5],
+            'coalesced': row[6],
+            'next_attempt_at': row[7] if row[3] == 'queued' else None,
+            'error': row[8],
+            'result': json.loads(row[9]) if row[9] else None,
+            'created_at': row[10],
+            'started_at': row[11],
+            'finished_at': row[12]
+        }
+
+    def submit(self, conn: sqlite3.Connection, project_id: str, full: bool, max_attempts: int,
+               now: float) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a sync of a project, or coalesce it into one already queued.
+
+        Args:
+            conn: Connection inside a write transaction
+            project_id: Local project ID
+            full: Upload every document, ignoring the manifest
+            max_attempts: Attempts before the job fails for good
+            now: Current time (epoch seconds)
+
+        Returns:
+            The job, and whether the request was coalesced into it
+        """
+        row = conn.execute('''
+            SELECT id FROM sync_jobs
+            WHERE project_id = ? AND status = 'queued'
+        ''', (project_id,)).fetchone()
+
+        if row:
+            job_id = row[0]
+            conn.execute('''
+                UPDATE sync_jobs SET coalesced = coalesced + 1, full = MAX(full, ?)
+                WHERE id = ?
+            ''', (int(full), job_id))
+        else:
+            job_id = uuid.uuid4().hex
+            conn.execute('''
+                INSERT INTO sync_jobs (id, project_id, full, status, max_attempts, run_after)
+                VALUES (?, ?, ?, 'queued', ?, ?)
+            ''', (job_id, project_id, int(full), max_attempts, now))
+
+        return self.get(conn, job_id), bool(row)
+
+    def has_due(self, conn: sqlite3.Connection, now: float) -> bool:
+        """Whether a job may be claimable, so idle workers only take the write lock when needed."""
+        return conn.execute('''
+            SELECT 1 FROM sync_jobs
+            WHERE (status = 'queued' AND run_after <= ?) OR (status = 'running' AND lease_until < ?)
+            LIMIT 1
+        ''', (now, now)).fetchone() is not None
+
+    def claim(self, conn: sqlite3.Connection, owner: str, now: float,
+              lease: float) -> Optional[Dict[str, Any]]:
+        """
+        Claim the next due job whose project has no other job running.
+
+        Running jobs whose lease expired are claimed again, as their worker
+        is gone.
+
+        Args:
+            conn: Connection inside a write transaction
+            owner: ID of the claiming queue
+            now: Current time (epoch seconds)
+            lease: Seconds the job is leased for
+
+        Returns:
+            The claimed job, or None if nothing is due
+        """
+        row = conn.execute('''
+            SELECT j.id FROM sync_jobs j
+            WHERE ((j.status = 'queued' AND j.run_after <= ?) OR (j.status = 'running' AND j.lease_until < ?))
+              AND NOT EXISTS (
+                  SELECT 1 FROM sync_jobs r
+                  WHERE r.project_id = j.project_id AND r.id != j.id
+                    AND r.status = 'running' AND r.lease_until >= ?
+              )
+            ORDER BY j.run_after, j.rowid
+            LIMIT 1
+        ''', (now, now, now)).fetchone()
+        if not row:
+            return None
+
+        conn.execute('''
+            UPDATE sync_jobs
+            SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_until = ?,
+                started_at = CURRENT_TIMESTAMP, finished_at = NULL
+            WHERE id = ?
+        ''', (owner, now + lease, row[0]))
+        return self.get(conn, row[0])
+
+    def extend(self, conn: sqlite3.Connection, job_id: str, owner: str, attempt: int, now: float,
+               lease: float) -> bool:
+        """
+        Extend the lease of a running job, as a heartbeat of its worker.
+
+        Args:
+            conn: Connection inside a write transaction
+            job_id: Job ID
+            owner: ID of the queue that claimed the job
+            attempt: Attempt number the job was claimed with
+            now: Current time (epoch seconds)
+            lease: Seconds the job is leased for from now
+
+        Returns:
+            Whether the lease was extended; False if the job was reclaimed
+            or finished in the meantime
+        """
+        return conn.execute('''
+            UPDATE sync_jobs SET lease_until = ?
+            WHERE id = ? AND status = 'running' AND lease_owner = ? AND attempts = ?
+        ''', (now + lease, job_id, owner, attempt)).rowcount > 0
+
+    def finish(self, conn: sqlite3.Connection, job_id: str, owner: str, attempt: int, status: str,
+               error: Optional[str] = None, result: Optional[Dict[str, Any]] = None,
+               run_after: Optional[float] = None) -> bool:
+        """
+        Record the outcome of an attempt, if its worker still holds the lease.
+
+        Args:
+            conn: Connection inside a write transaction
+            job_id: Job ID
+            owner: ID of the queue that claimed the job
+            attempt: Attempt number the job was claimed with
+            status: 'succeeded', 'failed', or 'queued' to retry at run_after
+            error: Error of the attempt
+            result: Sync report of the attempt
+            run_after: When to retry (epoch seconds), for status 'queued'
+
+        Returns:
+            Whether the outcome was recorded; False if the lease was lost
+            and the job reclaimed
+        """
+        return conn.execute('''
+            UPDATE sync_jobs
+            SET status = ?, error = ?, result = ?, run_after = COALESCE(?, run_after),
+                lease_owner = NULL, lease_until = NULL,
+                finished_at = CASE WHEN ? = 'queued' THEN NULL ELSE CURRENT_TIMESTAMP END
+            WHERE id = ? AND status = 'running' AND lease_owner = ? AND attempts = ?
+        ''', (status, error, json.dumps(result) if result is not None else None, run_after, status,
+              job_id, owner, attempt)).rowcount > 0
+
+    def release(self, conn: sqlite3.Connection, owner: str) -> int:
+        """
+        Put the running jobs of a queue back in the queue, e.g. on shutdown.
+
+        Returns:
+            Number of jobs released
+        """
+        return conn.execute('''
+            UPDATE sync_jobs
+            SET status = 'queued', attempts = MAX(attempts - 1, 0), lease_owner = NULL, lease_until = NULL
+            WHERE status = 'running' AND lease_owner = ?
+        ''', (owner,)).rowcount
+
+    def get(self, conn: sqlite3.Connection, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID."""
+        row = conn.execute(f'SELECT {JOB_COLUMNS} FROM sync_jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_for_project(self, conn: sqlite3.Connection, project_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the most recent jobs of a project, newest first."""
+        rows = conn.execute(f'''
+            SELECT {JOB_COLUMNS} FROM sync_jobs
+            WHERE project_id = ?
+            ORDER BY rowid DESC
+            LIMIT ?
+        ''', (project_id, limit)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def counts(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        """Get the number of jobs by status."""
+        counts = {status: 0 for status in ('queued', 'running', 'succeeded', 'failed')}
+        counts.update(conn.execute('SELECT status, COUNT(*) FROM sync_jobs GROUP BY status').fetchall())
+        return counts
+
+    def prune(self, conn: sqlite3.Connection, keep_seconds: float) -> int:
+        """
+        Delete finished jobs older than keep_seconds.
+
+        Returns:
+            Number of jobs deleted
+        """
+        return conn.execute('''
+            DELETE FROM sync_jobs
+            WHERE status IN ('succeeded', 'failed')
+              AND finished_at < datetime('now', ?)
+        ''', (f'-{int(keep_seconds)} seconds',)).rowcount
@@ -0,0 +1,143 @@
+"""
+Sync Manifest
+
+This module records what was last pushed to Overleaf for each project: for
+every path, the hash of the content that was uploaded and the revision the
+remote assigned to it. A push compares the project's current document
+hashes against the manifest and transfers only files that were added,
+changed or deleted since, so an unchanged file costs nothing to sync.
+"""
+
+import sqlite3
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class SyncPlan(NamedTuple):
+    """Paths to transfer in a push, and what skipping the rest saves."""
+    added: List[str]
+    changed: List[str]
+    deleted: List[str]
+    unchanged: List[str]
+    bytes_unchanged: int
+
+    @property
+    def uploads(self) -> List[str]:
+        """Paths whose content has to be sent."""
+        return self.added + self.changed
+
+    def is_empty(self) -> bool:
+        """Whether nothing needs to be transferred."""
+        return not (self.added or self.changed or self.deleted)
+
+def plan_sync(documents: Dict[str, Tuple[str, int]], manifest: Dict[str, Dict[str, str]]) -> SyncPlan:
+    """
+    Compare a project's documents against its sync manifest.
+
+    Args:
+        documents: (content hash, size in bytes) by filename
+        manifest: Manifest entries by path, from SyncManifestStore.load()
+
+    Returns:
+        Sorted paths by outcome, and the bytes not sent for unchanged files
+    """
+    added, changed, unchanged = [], [], []
+    bytes_unchanged = 0
+    for filename in sorted(documents):
+        content_hash, size = documents[filename]
+        entry = manifest.get(filename)
+        if entry is None:
+            added.append(filename)
+        elif entry['content_hash'] != content_hash:
+            changed.append(filename)
+        else:
+            unchanged.append(filename)
+            bytes_unchanged += size
+    deleted = sorted(path for path in manifest if path not in documents)
+    return SyncPlan(added, changed, deleted, unchanged, bytes_unchanged)
+
+class SyncManifestStore:
+    """
+    Per-project sync manifests on top of the sync_manifest table.
+
+    Entries belong to the remote project they were synced to, so a project
+    linked to a new Overleaf project starts from an empty manifest. All
+    methods take an open connection so they join the caller's transaction.
+    """
+
+    def create(self, conn: sqlite3.Connection) -> None:
+        """Create the manifest table."""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_manifest (
+                project_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                overleaf_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                remote_revision TEXT,
+                synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (project_id, path)
+            )
+        ''')
+
+    def load(self, conn: sqlite3.Connection, project_id: str,
+             overleaf_id: Optional[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Load the manifest of a project.
+
+        Args:
+            conn: Open connection
+            project_id: Local project ID
+            overleaf_id: Remote project the entries must belong to
+
+        Returns:
+            {'content_hash', 'remote_revision', 'synced_at'} by path; empty
+            if the project was never synced to overleaf_id
+        """
+        if not overleaf_id:
+            return {}
+
+        rows = conn.execute('''
+            SELECT path, content_hash, remote_revision, synced_at
+            FROM sync_manifest
+            WHERE project_id = ? AND overleaf_id = ?
+        ''', (project_id, overleaf_id)).fetchall()
+
+        return {
+            row[0]: {'content_hash': row[1], 'remote_revision': row[2], 'synced_at': row[3]}
+            for row in rows
+        }
+
+    def record(self, conn: sqlite3.Connection, project_id: str, overleaf_id: str,
+               uploaded: Dict[str, Tuple[str, Optional[str]]], deleted: Iterable[str]) -> None:
+        """
+        Record the outcome of a push.
+
+        Args:
+            conn: Connection inside a write transaction
+            project_id: Local project ID
+            overleaf_id: Remote project the files were pushed to
+            uploaded: (content hash, remote revision) by path, for files sent
+            deleted: Paths deleted from the remote project
+        """
+        # Entries for a previously linked remote project no longer apply
+        conn.execute('''
+            DELETE FROM sync_manifest
+            WHERE project_id = ? AND overleaf_id != ?
+        ''', (project_id, overleaf_id))
+
+        conn.executemany('''
+            INSERT INTO sync_manifest (project_id, path, overleaf_id, content_hash, remote_revision)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (project_id, path) DO UPDATE SET
+                overleaf_id = excluded.overleaf_id,
+                content_hash = excluded.content_hash,
+                remote_revision = excluded.remote_revision,
+                synced_at = CURRENT_TIMESTAMP
+        ''', [(project_id, path, overleaf_id, content_hash, revision)
+              for path, (content_hash, revision) in uploaded.items()])
+
+        conn.executemany('''
+            DELETE FROM sync_manifest
+            WHERE project_id = ? AND path = ?
+        ''', [(project_id, path) for path in deleted])
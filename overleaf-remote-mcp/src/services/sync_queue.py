@@ -0,0 +1,286 @@
+"""
+Sync Queue
+
+This module runs pushes to Overleaf in the background. Jobs are rows in the
+sync_jobs table (see src.services.sync_jobs), so they survive restarts and
+are shared by every server process using the database.
+
+Submitting a sync while another one for the same project is still queued
+does not add a job: the request is coalesced into the queued one, which
+pushes whatever has changed by the time it runs. At most one job per
+project runs at a time. Jobs that fail with a transient error, or that
+leave files unsynced, are retried with jittered exponential backoff. A
+running job is leased to its worker, which renews the lease while the push
+runs; if the process dies, the job is picked up again once the lease
+expires.
+"""
+
+import time
+import uuid
+import random
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.services.document_service import DocumentService
+from src.services.project_sync import ProjectSync
+
+logger = logging.getLogger(__name__)
+
+class SyncQueue:
+    """Background workers that run queued syncs to Overleaf."""
+
+    def __init__(self, document_service: DocumentService, project_sync: ProjectSync, workers: int = 2,
+                 max_attempts: int = 5, backoff_base: float = 2.0, backoff_max: float = 300.0,
+                 lease: float = 600.0, poll_interval: float = 2.0, keep_seconds: float = 7 * 86400):
+        """
+        Initialize the queue. Workers start with start().
+
+        Args:
+            document_service: Document service whose database holds the jobs
+            project_sync: Runs the pushes
+            workers: Number of worker threads
+            max_attempts: Attempts before a job fails for good
+            backoff_base: Delay before the first retry, in seconds
+            backoff_max: Upper bound of a retry delay, in seconds
+            lease: Seconds a running job is leased to its worker
+            poll_interval: Seconds between checks for due jobs when idle
+            keep_seconds: How long finished jobs are kept
+        """
+        self.document_service = document_service
+        self.project_sync = project_sync
+        self.store = document_service.sync_jobs
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.keep_seconds = keep_seconds
+        self.owner = uuid.uuid4().hex
+
+        self._threads: List[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+        # Counters since start, for metrics
+        self.submitted = 0
+        self.coalesced = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the worker threads, picking up jobs left queued by earlier runs."""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            with self.document_service.db.writer() as conn:
+                pruned = self.store.prune(conn, self.keep_seconds)
+            if pruned:
+                logger.info(f"Pruned {pruned} finished sync jobs")
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'sync-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"Sync queue started with {self.workers} workers")
+
+    def resume(self) -> None:
+        """Start the workers if jobs are waiting, e.g. from before a restart."""
+        with self.document_service.db.reader() as conn:
+            counts = self.store.counts(conn)
+        if counts['queued'] or counts['running']:
+            self.start()
+
+    def submit(self, project_id: str, full: bool = False) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a sync of a project to Overleaf.
+
+        Args:
+            project_id: Local project ID
+            full: Upload every document, ignoring the manifest
+
+        Returns:
+            The job, and whether the request was coalesced into a queued job
+
+        Raises:
+            ValueError: If the project does not exist
+        """
+        if not self.document_service.get_project(project_id):
+            raise ValueError(f"Project not found: {project_id}")
+
+        with self.document_service.db.writer() as conn:
+            job, coalesced = self.store.submit(conn, project_id, full, self.max_attempts, time.time())
+            self._publish(project_id)
+
+        self.submitted += 1
+        if coalesced:
+            self.coalesced += 1
+            logger.info(f"Coalesced sync of project {project_id} into queued job {job['id']}")
+        else:
+            logger.info(f"Queued sync job {job['id']} for project {project_id}")
+
+        self.start()
+        self._wakeup.set()
+        return job, coalesced
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID."""
+        with self.document_service.db.reader() as conn:
+            return self.store.get(conn, job_id)
+
+    def list_jobs(self, project_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the most recent jobs of a project, newest first."""
+        with self.document_service.db.reader() as conn:
+            return self.store.list_for_project(conn, project_id, limit)
+
+    def wait(self, job_id: str, timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+        """
+        Wait until a job has succeeded or failed.
+
+        Returns:
+            The job as last seen; still queued or running on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get_job(job_id)
+            if job is None or job['status'] in ('succeeded', 'failed') or time.monotonic() >= deadline:
+                return job
+            time.sleep(0.02)
+
+    def _publish(self, project_id: str) -> None:
+        """Publish a change of the project's sync jobs once the transaction commits."""
+        events = self.document_service.events
+        self.document_service.db.after_transaction(
+            lambda: events.publish([('sync', project_id)]), commit_only=True)
+
+    def _backoff(self, attempts: int) -> float:
+        """Get the delay before the next attempt: exponential, with jitter."""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * (0.5 + self._random.random() / 2)
+
+    def _work(self) -> None:
+        """Worker loop: claim a due job and run it, or wait for one."""
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                logger.error(f"Failed to claim sync job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Claim the next due job."""
+        now = time.time()
+        with self.document_service.db.reader() as conn:
+            if not self.store.has_due(conn, now):
+                return None
+        with self.document_service.db.writer() as conn:
+            job = self.store.claim(conn, self.owner, now, self.lease)
+            if job:
+                self._publish(job['project_id'])
+            return job
+
+    def _heartbeat(self, job: Dict[str, Any], done: threading.Event) -> None:
+        """Renew the lease of a running job until done is set or the lease is lost."""
+        while not done.wait(self.lease / 3):
+            try:
+                with self.document_service.db.writer() as conn:
+                    extended = self.store.extend(conn, job['id'], self.owner, job['attempts'],
+                                                 time.time(), self.lease)
+            except Exception as e:
+                logger.error(f"Failed to renew the lease of sync job {job['id']}: {e}")
+                continue
+            if not extended:
+                logger.warning(f"Sync job {job['id']} lost its lease while running")
+                return
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        """Run one attempt of a job, renewing its lease, and record its outcome."""
+        project_id = job['project_id']
+        logger.info(f"Running sync job {job['id']} for project {project_id} (attempt {job['attempts']})")
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, done),
+                                     name=f"sync-lease-{job['id'][:8]}", daemon=True)
+        heartbeat.start()
+
+        report, error, retryable = None, None, True
+        try:
+            report = self.project_sync.push(project_id, full=job['full'])
+            if report['failed']:
+                error = f"{len(report['failed'])} files failed to sync"
+        except ValueError as e:
+            # The project is gone; retrying cannot help
+            error, retryable = str(e), False
+        except Exception as e:
+            error = str(e)
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if error is None:
+            status, run_after = 'succeeded', None
+        elif retryable and job['attempts'] < job['max_attempts']:
+            status, run_after = 'queued', time.time() + self._backoff(job['attempts'])
+        else:
+            status, run_after = 'failed', None
+
+        try:
+            with self.document_service.db.writer() as conn:
+                recorded = self.store.finish(conn, job['id'], self.owner, job['attempts'], status,
+                                             error, report, run_after)
+                if recorded:
+                    self._publish(project_id)
+        except Exception as e:
+            logger.error(f"Failed to record outcome of sync job {job['id']}: {e}")
+            return
+
+        if not recorded:
+            # Another worker reclaimed the job; its attempt's outcome counts
+            logger.warning(f"Sync job {job['id']} was reclaimed; discarding the outcome of attempt {job['attempts']}")
+        elif status == 'succeeded':
+            self.succeeded += 1
+        elif status == 'queued':
+            self.retried += 1
+            logger.warning(f"Sync job {job['id']} failed ({error}); retrying in {run_after - time.time():.1f}s")
+        else:
+            self.failed += 1
+            logger.error(f"Sync job {job['id']} failed after {job['attempts']} attempts: {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue statistics."""
+        with self.document_service.db.reader() as conn:
+            jobs = self.store.counts(conn)
+        return {
+            'workers': len(self._threads),
+            'jobs': jobs,
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'succeeded': self.succeeded,
+            'retried': self.retried,
+            'failed': self.failed
+        }
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Stop the workers and put jobs they could not finish back in the queue."""
+        with self._lock:
+            if not self._threads:
+                return
+            self._stopping.set()
+            self._wakeup.set()
+            for thread in self._threads:
+                thread.join(timeout=timeout)
+            self._threads = []
+        with self.document_service.db.writer() as conn:
+            released = self.store.release(conn, self.owner)
+        if released:
+            logger.info(f"Released {released} unfinished sync jobs")
+        logger.info("Sync queue shutdown completed")
@@ -0,0 +1,265 @@
+"""
+Version Store
+
+This module stores document version history as reverse deltas.
+Each version row holds a compressed line delta that rebuilds it from the next
+newer version (or from the current document content for the newest row).
+Every Nth version is stored in full as a keyframe in the blob store, so
+reconstructing any version applies at most N deltas.
+"""
+
+import json
+import uuid
+import zlib
+import sqlite3
+import logging
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Union
+
+from src.services.blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+# Default number of versions between full keyframes
+DEFAULT_KEYFRAME_INTERVAL = 50
+
+# Delta operations are either [start, end] (copy base lines) or a string (insert)
+DeltaOp = Union[List[int], str]
+
+def make_delta(base: str, target: str) -> bytes:
+    """
+    Compute a compressed line delta that rebuilds target from base.
+
+    Args:
+        base: Content the delta is applied to
+        target: Content the delta produces
+
+    Returns:
+        Compressed delta bytes
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+
+    # Trim the common prefix and suffix so single edits diff in linear time
+    prefix = 0
+    limit = min(len(base_lines), len(target_lines))
+    while prefix < limit and base_lines[prefix] == target_lines[prefix]:
+        prefix += 1
+
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and base_lines[-1 - suffix] == target_lines[-1 - suffix]:
+        suffix += 1
+
+    ops: List[DeltaOp] = []
+    if prefix:
+        ops.append([0, prefix])
+
+    base_mid = base_lines[prefix:len(base_lines) - suffix]
+    target_mid = target_lines[prefix:len(target_lines) - suffix]
+    matcher = SequenceMatcher(None, base_mid, target_mid)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([prefix + i1, prefix + i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(''.join(target_mid[j1:j2]))
+
+    if suffix:
+        ops.append([len(base_lines) - suffix, len(base_lines)])
+
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'))
+
+def apply_delta(base: str, delta: bytes) -> str:
+    """
+    Apply a delta produced by make_delta.
+
+    Args:
+        base: Content to apply the delta to
+        delta: Compressed delta bytes
+
+    Returns:
+        Rebuilt content
+    """
+    base_lines = base.splitlines(keepends=True)
+    ops: List[DeltaOp] = json.loads(zlib.decompress(delta).decode('utf-8'))
+
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return ''.join(parts)
+
+class VersionStore:
+    """
+    Reverse-delta version history on top of the versions table.
+
+    All methods take an open connection so they join the caller's
+    transaction.
+    """
+
+    def __init__(self, blobs: BlobStore, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        """
+        Initialize the version store.
+
+        Args:
+            blobs: Blob store holding keyframe content
+            keyframe_interval: Store every Nth version in full
+        """
+        self.blobs = blobs
+        self.keyframe_interval = max(1, keyframe_interval)
+
+    def record(self, conn: sqlite3.Connection, document_id: str, old_content: str,
+               new_content: str, commit_message: str = '', old_hash: Optional[str] = None) -> int:
+        """
+        Record old_content as a new version before a document is overwritten.
+
+        Args:
+            conn: Connection inside a write transaction
+            document_id: Document ID
+            old_content: Content being replaced
+            new_content: Content that replaces it
+            commit_message: Commit message for the version
+            old_hash: Blob hash of old_content, if known
+
+        Returns:
+            The new version number
+        """
+        cursor = conn.execute('''
+            SELECT COALESCE(MAX(version_number), 0) + 1
+            FROM versions
+            WHERE document_id = ?
+        ''', (document_id,))
+        version_number = cursor.fetchone()[0]
+
+        old_content = old_content or ''
+        if version_number % self.keyframe_interval == 0:
+            content_hash, delta, is_keyframe = self.blobs.put(conn, old_content, old_hash), None, 1
+        else:
+            content_hash, delta, is_keyframe = None, make_delta(new_content or '', old_content), 0
+
+        conn.execute('''
+            INSERT INTO versions (id, document_id, version_number, content_hash, delta, is_keyframe, commit_message)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (str(uuid.uuid4()), document_id, version_number, content_hash, delta, is_keyframe, commit_message))
+
+        return version_number
+
+    def list_versions(self, conn: sqlite3.Connection, document_id: str) -> List[Dict[str, Any]]:
+        """List version metadata for a document, newest first."""
+        cursor = conn.execute('''
+            SELECT version_number, commit_message, created_at, is_keyframe
+            FROM versions
+            WHERE document_id = ?
+            ORDER BY version_number DESC
+        ''', (document_id,))
+
+        return [
+            {
+                'version': row[0],
+                'commit_message': row[1],
+                'created_at': row[2],
+                'keyframe': bool(row[3])
+            }
+            for row in cursor.fetchall()
+        ]
+
+    def reconstruct(self, conn: sqlite3.Connection, document_id: str, version_number: int,
+                    current_content: str) -> Optional[str]:
+        """
+        Rebuild the content of a version.
+
+        Args:
+            conn: Open connection
+            document_id: Document ID
+            version_number: Version to rebuild
+            current_content: Current document content (base of the newest delta)
+
+        Returns:
+            Version content, or None if the version does not exist
+        """
+        cursor = conn.execute('''
+            SELECT version_number, content, content_hash, delta, is_keyframe
+            FROM versions
+            WHERE document_id = ? AND version_number >= ?
+            ORDER BY version_number ASC
+        ''', (document_id, version_number))
+
+        chain = []
+        for row in cursor:
+            chain.append(row)
+            if row[4]:
+                break
+
+        if not chain or chain[0][0] != version_number:
+            return None
+
+        # Start from the keyframe, or from the current content if none is above
+        if chain[-1][4]:
+            _, content, content_hash, _, _ = chain.pop()
+            if content_hash:
+                content = self.blobs.get(conn, content_hash)
+            content = content or ''
+        else:
+            content = current_content or ''
+
+        for _, _, _, delta, _ in reversed(chain):
+            content = apply_delta(content, delta)
+
+        return content
+
+    def migrate(self, conn: sqlite3.Connection) -> int:
+        """
+        Convert full-copy version rows into reverse deltas.
+
+        Rows written before delta storage hold their full content with no
+        delta. Each is re-encoded against the next newer version, keeping
+        keyframes at the configured interval.
+
+        Args:
+            conn: Connection inside a write transaction
+
+        Returns:
+            Number of rows converted
+        """
+        documents = conn.execute('''
+            SELECT DISTINCT v.document_id, d.content
+            FROM versions v
+            LEFT JOIN documents d ON d.id = v.document_id
+            WHERE v.delta IS NULL AND v.is_keyframe = 0
+        ''').fetchall()
+
+        converted = 0
+        for document_id, current_content in documents:
+            rows = conn.execute('''
+                SELECT id, version_number, content, delta, is_keyframe
+                FROM versions
+                WHERE document_id = ?
+                ORDER BY version_number DESC
+            ''', (document_id,)).fetchall()
+
+            newer = current_content or ''
+            for row_id, version_number, content, delta, is_keyframe in rows:
+                if delta is not None or is_keyframe:
+                    # Already converted; later rows rebuild from it
+                    newer = self.reconstruct(conn, document_id, version_number, current_content)
+                    continue
+
+                content = content or ''
+                if version_number % self.keyframe_interval == 0:
+                    conn.execute('''
+                        UPDATE versions SET content = NULL, content_hash = ?, is_keyframe = 1
+                        WHERE id = ?
+                    ''', (self.blobs.put(conn, content), row_id))
+                else:
+                    conn.execute('''
+                        UPDATE versions SET content = NULL, delta = ?, is_keyframe = 0
+                        WHERE id = ?
+                    ''', (make_delta(newer, content), row_id))
+                newer = content
+                converted += 1
+
+        if converted:
+            logger.info(f"Migrated {converted} version rows to delta storage")
+        return converted
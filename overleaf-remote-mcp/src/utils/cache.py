@@ -0,0 +1,157 @@
+"""
+LRU Cache
+
+This module provides a thread-safe, byte-bounded LRU cache used as a
+read-through cache in front of database reads. Entries are evicted least
+recently used first once their estimated size exceeds the byte budget.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+# Returned by get() when a key is not cached, so None can be cached too
+MISSING = object()
+
+# Rough per-object overhead added to size estimates
+OBJECT_OVERHEAD = 64
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory held by a cached value.
+
+    Strings and bytes count their length; containers count their items.
+    The estimate only needs to be proportional, not exact.
+
+    Args:
+        value: Value to measure
+
+    Returns:
+        Approximate size in bytes
+    """
+    if isinstance(value, (str, bytes)):
+        return OBJECT_OVERHEAD + len(value)
+    if isinstance(value, dict):
+        return OBJECT_OVERHEAD + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return OBJECT_OVERHEAD + sum(estimate_size(item) for item in value)
+    return OBJECT_OVERHEAD
+
+class LRUCache:
+    """
+    Byte-bounded LRU cache with invalidation-safe fills.
+
+    A read-through caller takes a token with begin() before loading a
+    value and passes it to put(). Any invalidation in between bumps the
+    cache epoch and the fill is dropped, so a value loaded before a write
+    committed can never be stored after that write invalidated its key.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Byte budget for cached values; 0 disables caching
+        """
+        self.max_bytes = max(0, max_bytes)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Look up a key and mark it recently used.
+
+        Returns:
+            Cached value, or MISSING
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def begin(self) -> int:
+        """Take a fill token before loading a value."""
+        with self._lock:
+            return self._epoch
+
+    def put(self, key: Hashable, value: Any, token: int, size: int = None) -> bool:
+        """
+        Store a loaded value.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            token: Token from begin() taken before the value was loaded
+            size: Size of the value in bytes (estimated if omitted)
+
+        Returns:
+            True if the value was stored
+        """
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            if token != self._epoch:
+                return False
+
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+            return True
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """Drop keys and reject fills that started before this call."""
+        with self._lock:
+            self._epoch += 1
+            self._invalidations += 1
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[1]
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Entry count, byte usage and hit/miss/eviction counters
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations
+            }
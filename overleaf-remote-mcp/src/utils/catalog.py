@@ -0,0 +1,60 @@
+"""
+Catalog
+
+This module provides pre-serialized listings for static MCP catalogs such as
+tools/list and prompts/list. A catalog is encoded to JSON once, and carries a
+content hash that HTTP routes use as an ETag, so unchanged listings are
+answered with 304 Not Modified or with the stored bytes.
+"""
+
+import json
+import hashlib
+from typing import Any, List, Optional
+
+from pydantic import BaseModel
+
+class Catalog:
+    """A listing result built once: its dict form, JSON bytes and ETag."""
+
+    def __init__(self, key: str, items: List[BaseModel], version: int = 0):
+        """
+        Serialize a listing.
+
+        Args:
+            key: Result key, e.g. 'tools' for {"tools": [...]}
+            items: MCP models to list
+            version: Version of the registry the items came from
+        """
+        self.key = key
+        self.version = version
+        self.result = {key: [item.model_dump(mode='json', by_alias=True, exclude_none=True) for item in items]}
+        self.body = json.dumps(self.result, separators=(',', ':')).encode('utf-8')
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+    def response_bytes(self, request_id: Optional[Any]) -> bytes:
+        """Encode a JSON-RPC response for this catalog without re-serializing it."""
+        return b''.join((
+            b'{"jsonrpc":"2.0","id":',
+            json.dumps(request_id).encode('utf-8'),
+            b',"result":',
+            self.body,
+            b'}'
+        ))
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """
+        Check an If-None-Match header against the ETag.
+
+        Args:
+            if_none_match: Header value (comma-separated, possibly weak, or *)
+
+        Returns:
+            True if the client's copy is current
+        """
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*' or tag.removeprefix('W/') == self.etag:
+                return True
+        return False
@@ -10,6 +10,7 @@ class Config:
         self.SERVER_PORT = int(os.getenv("MCP_SERVER_PORT", 5000))
         self.DEBUG = os.getenv("MCP_DEBUG", "False").lower() == "true"
         self.SECRET_KEY = os.getenv("MCP_SECRET_KEY", "super-secret-key")
+        self.WORKER_THREADS = int(os.getenv("MCP_WORKER_THREADS", 16))
 
         # Logging
         self.LOG_LEVEL = os.getenv("MCP_LOG_LEVEL", "INFO").upper()
@@ -18,18 +19,40 @@ class Config:
         # Storage
         self.STORAGE_PATH = os.getenv("MCP_STORAGE_PATH", "data/projects")
         self.DATABASE_PATH = os.getenv("MCP_DATABASE_PATH", "src/database/app.db")
+        self.VERSION_KEYFRAME_INTERVAL = int(os.getenv("MCP_VERSION_KEYFRAME_INTERVAL", 50))
+        self.CACHE_MAX_BYTES = int(os.getenv("MCP_CACHE_MAX_BYTES", 67108864))
 
         # Overleaf Integration (Optional)
         self.OVERLEAF_EMAIL = os.getenv("OVERLEAF_EMAIL")
         self.OVERLEAF_PASSWORD = os.getenv("OVERLEAF_PASSWORD")
         self.OVERLEAF_API_URL = os.getenv("OVERLEAF_API_URL", "https://www.overleaf.com" )
+        self.OVERLEAF_TIMEOUT = float(os.getenv("OVERLEAF_TIMEOUT", 30))
+        self.OVERLEAF_MAX_CONNECTIONS = int(os.getenv("OVERLEAF_MAX_CONNECTIONS", 10))
+        self.OVERLEAF_CONCURRENCY = int(os.getenv("OVERLEAF_CONCURRENCY", 8))
+        self.OVERLEAF_MAX_RETRIES = int(os.getenv("OVERLEAF_MAX_RETRIES", 3))
+        self.OVERLEAF_BREAKER_THRESHOLD = int(os.getenv("OVERLEAF_BREAKER_THRESHOLD", 5))
+        self.OVERLEAF_BREAKER_RESET = float(os.getenv("OVERLEAF_BREAKER_RESET", 30))
+        self.OVERLEAF_SYNC_WORKERS = int(os.getenv("OVERLEAF_SYNC_WORKERS", 2))
+        self.OVERLEAF_SYNC_MAX_ATTEMPTS = int(os.getenv("OVERLEAF_SYNC_MAX_ATTEMPTS", 5))
+        self.OVERLEAF_SYNC_RETRY_BACKOFF = float(os.getenv("OVERLEAF_SYNC_RETRY_BACKOFF", 2))
 
         # Security
         self.ALLOWED_ORIGINS = os.getenv("MCP_ALLOWED_ORIGINS", "*")
         self.MAX_REQUEST_SIZE = int(os.getenv("MCP_MAX_REQUEST_SIZE", 10485760))
         self.RATE_LIMIT = int(os.getenv("MCP_RATE_LIMIT", 100))
+        self.METHOD_RATE_LIMITS = os.getenv("MCP_METHOD_RATE_LIMITS", "")
+        self.MAX_INFLIGHT = int(os.getenv("MCP_MAX_INFLIGHT", 64))
 
         # MCP Protocol
+        self.RESOURCE_PAGE_SIZE = int(os.getenv("MCP_RESOURCE_PAGE_SIZE", 200))
+        self.SSE_QUEUE_SIZE = int(os.getenv("MCP_SSE_QUEUE_SIZE", 64))
+        self.SSE_SEND_TIMEOUT = float(os.getenv("MCP_SSE_SEND_TIMEOUT", 10))
+        self.SSE_IDLE_TIMEOUT = float(os.getenv("MCP_SSE_IDLE_TIMEOUT", 1800))
+        self.SSE_MAX_SESSIONS = int(os.getenv("MCP_SSE_MAX_SESSIONS", 10000))
+        self.EVENT_BUS_URL = os.getenv("MCP_EVENT_BUS_URL", "")
+        self.NOTIFY_DEBOUNCE_MS = int(os.getenv("MCP_NOTIFY_DEBOUNCE_MS", 200))
+        self.NOTIFY_MAX_DELAY_MS = int(os.getenv("MCP_NOTIFY_MAX_DELAY_MS", 2000))
+
         self.protocol_version = "1.1.0"
         self.mcp_server_name = "overleaf-remote-mcp"
         self.mcp_server_version = "1.0.0"
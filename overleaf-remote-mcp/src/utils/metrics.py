@@ -0,0 +1,364 @@
+"""
+Metrics
+
+This module provides a small, dependency-free metrics registry that renders
+the Prometheus text exposition format. Counters and histograms are labelled;
+callers bind the label values once with labels() and keep the child, so
+recording a sample on the hot path costs a lock and a bisect.
+
+Statistics that services already keep as dicts (cache, subscriptions,
+admission, sessions) are exported as gauges at render time with
+render_stats() instead of being mirrored into metrics.
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Latency buckets in seconds, from cache hits to syncs with Overleaf
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Payload size buckets in characters
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects."""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names: Iterable[str], values: Iterable[str]) -> str:
+    """Format a label set, e.g. '{method="ping"}', or '' when there are none."""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class _CounterChild:
+    """One labelled series of a counter."""
+
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the counter."""
+        with self._lock:
+            self.value += amount
+
+class _HistogramChild:
+    """One labelled series of a histogram."""
+
+    __slots__ = ('buckets', 'counts', 'sum', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record a sample."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Get the per-bucket counts and the sum."""
+        with self._lock:
+            return list(self.counts), self.sum
+
+class _Metric:
+    """Base class for labelled metrics."""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        """
+        Initialize the metric.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels every series carries
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """
+        Get the series for a set of label values, creating it on first use.
+
+        Args:
+            *values: One value per label name, in order
+
+        Returns:
+            Series with inc() or observe()
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def series(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        """Get (label values, series) pairs sorted by label values."""
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> List[str]:
+        """Render the metric in the text exposition format."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. of errors."""
+
+    kind = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, *values: str, amount: float = 1) -> None:
+        """Increase the series for the given label values."""
+        self.labels(*values).inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [f'{self.name}{_labels(self.labelnames, key)} {_format_value(child.value)}'
+                for key, child in self.series()]
+
+class Histogram(_Metric):
+    """Distribution of samples over fixed buckets, e.g. of latencies."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels every series carries
+            buckets: Upper bounds of the buckets, ascending (+Inf is implied)
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float, *values: str) -> None:
+        """Record a sample in the series for the given label values."""
+        self.labels(*values).observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        bucket_labels = self.labelnames + ('le',)
+        for key, child in self.series():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = _format_value(bound)
+                lines.append(f'{self.name}_bucket{_labels(bucket_labels, key + (le,))} {cumulative}')
+            labels = _labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class Registry:
+    """A set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        Add a metric to the registry.
+
+        Returns:
+            The metric, so definitions can be written as assignments
+
+        Raises:
+            ValueError: If a metric with the same name is registered
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        """Create and register a histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """Get a registered metric by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the text exposition format."""
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return '\n'.join(lines) + '\n' if lines else ''
+
+def render_stats(prefix: str, stats: Dict[str, Any]) -> str:
+    """
+    Render a statistics dict as gauges.
+
+    Numbers and booleans become '<prefix>_<key>' gauges. A nested dict of
+    numbers becomes one gauge with a 'key' label per entry; anything else
+    (strings, None) is skipped.
+
+    Args:
+        prefix: Metric name prefix, e.g. 'mcp_cache'
+        stats: Statistics, e.g. from LRUCache.stats()
+
+    Returns:
+        Gauges in the text exposition format
+    """
+    lines = []
+    for key, value in stats.items():
+        name = f'{prefix}_{key}'
+        if isinstance(value, (bool, int, float)):
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {_format_value(float(value))}')
+        elif isinstance(value, dict):
+            samples = [(str(k), v) for k, v in value.items() if isinstance(v, (bool, int, float))]
+            if samples:
+                lines.append(f'# TYPE {name} gauge')
+                lines.extend(f'{name}{_labels(("key",), (k,))} {_format_value(float(v))}'
+                             for k, v in samples)
+    return '\n'.join(lines) + '\n' if lines else ''
+
+def timed(histogram: Histogram, errors: Counter, label: Optional[str] = None) -> Callable:
+    """
+    Decorate a function to record its latency and failures.
+
+    The series are bound when the function is decorated, so a call only pays
+    for two perf_counter() reads and one observe().
+
+    Args:
+        histogram: Latency histogram with a single label
+        errors: Error counter with the same label
+        label: Label value (default: the function's name)
+
+    Returns:
+        Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        name = label or func.__name__
+        latency = histogram.labels(name)
+        failures = errors.labels(name)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                failures.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def async_timed(histogram: Histogram, errors: Counter, label: str) -> Callable:
+    """
+    Decorate a coroutine function to record its latency and failures.
+
+    Args:
+        histogram: Latency histogram with a single label
+        errors: Error counter with the same label
+        label: Label value
+
+    Returns:
+        Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        latency = histogram.labels(label)
+        failures = errors.labels(label)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                failures.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+# Metrics of the MCP server, shared by every transport
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'mcp_request_duration_seconds', 'Time spent handling JSON-RPC requests, by method', ['method'])
+REQUEST_ERRORS = REGISTRY.counter(
+    'mcp_request_errors_total', 'JSON-RPC requests that failed, by method', ['method'])
+
+TOOL_SECONDS = REGISTRY.histogram(
+    'mcp_tool_duration_seconds', 'Time spent in tool calls, by tool', ['tool'])
+TOOL_ERRORS = REGISTRY.counter(
+    'mcp_tool_errors_total', 'Tool calls that failed, by tool', ['tool'])
+TOOL_RESULT_SIZE = REGISTRY.histogram(
+    'mcp_tool_result_characters', 'Size of tool call results in characters, by tool', ['tool'],
+    buckets=SIZE_BUCKETS)
+
+RESOURCE_SECONDS = REGISTRY.histogram(
+    'mcp_resource_read_duration_seconds', 'Time spent reading resources, by resource kind', ['kind'])
+RESOURCE_ERRORS = REGISTRY.counter(
+    'mcp_resource_read_errors_total', 'Resource reads that failed, by resource kind', ['kind'])
+RESOURCE_SIZE = REGISTRY.histogram(
+    'mcp_resource_read_characters', 'Size of resource contents in characters, by resource kind', ['kind'],
+    buckets=SIZE_BUCKETS)
+
+QUERY_SECONDS = REGISTRY.histogram(
+    'mcp_document_service_duration_seconds', 'Time spent in Document Service operations', ['operation'])
+QUERY_ERRORS = REGISTRY.counter(
+    'mcp_document_service_errors_total', 'Document Service operations that failed', ['operation'])
+
+SQLITE_SECONDS = REGISTRY.histogram(
+    'mcp_sqlite_connection_seconds', 'Time SQLite connections are held, by mode (read or write)', ['mode'])
+SQLITE_WAIT_SECONDS = REGISTRY.histogram(
+    'mcp_sqlite_writer_wait_seconds', 'Time spent waiting for the SQLite writer connection')
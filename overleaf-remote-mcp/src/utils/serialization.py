@@ -0,0 +1,65 @@
+"""
+Serialization
+
+This module encodes JSON-RPC messages straight to UTF-8 bytes for the HTTP
+and SSE routes. Results that are MCP (pydantic) models are encoded by
+pydantic's compiled serializer, which honours field aliases and omits unset
+optional fields; everything else goes through json.dumps. Either way the
+response is encoded exactly once.
+"""
+
+import json
+from typing import Any, Dict, List
+
+from pydantic import BaseModel
+
+JSON_SEPARATORS = (',', ':')
+
+def dump(value: Any) -> Any:
+    """
+    Convert a result to plain JSON types.
+
+    Args:
+        value: MCP model or JSON-compatible value
+
+    Returns:
+        JSON-compatible value
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json', by_alias=True, exclude_none=True)
+    return value
+
+def encode_json(value: Any) -> bytes:
+    """Encode a JSON-compatible value or MCP model as UTF-8 bytes."""
+    if isinstance(value, BaseModel):
+        return value.model_dump_json(by_alias=True, exclude_none=True).encode('utf-8')
+    return json.dumps(value, separators=JSON_SEPARATORS, ensure_ascii=False).encode('utf-8')
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """
+    Encode a JSON-RPC message.
+
+    A model result is serialized by pydantic and spliced into the envelope,
+    so large results (listings, document contents) are never converted to
+    intermediate dicts.
+
+    Args:
+        message: JSON-RPC message; its 'result' may be an MCP model
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    result = message.get('result')
+    if not isinstance(result, BaseModel):
+        return encode_json(message)
+
+    envelope = encode_json({key: value for key, value in message.items() if key != 'result'})
+    return b''.join((envelope[:-1], b',"result":', encode_json(result), b'}'))
+
+def encode_batch(messages: List[Dict[str, Any]]) -> bytes:
+    """Encode a list of JSON-RPC messages as a batch response."""
+    return b'[' + b','.join(encode_message(message) for message in messages) + b']'
+
+def encode_response(request_id: Any, result: Any) -> bytes:
+    """Encode a JSON-RPC success response."""
+    return encode_message({'jsonrpc': '2.0', 'id': request_id, 'result': result})
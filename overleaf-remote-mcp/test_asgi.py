@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Tests for the ASGI transport
+
+These tests drive src/main_asgi.py in-process through Starlette's test
+client, with the database and storage redirected to a temporary directory.
+"""
+
+import json
+import time
+import socket
+import asyncio
+import threading
+
+import httpx
+import pytest
+import uvicorn
+from sse_starlette.sse import AppStatus
+from starlette.testclient import TestClient
+
+from src import main_asgi
+from src.services.session_manager import CLOSED, SessionClosedError, SessionManager
+
+@pytest.fixture
+def client(tmp_path):
+    """Start the ASGI app (including its lifespan) against a temporary database."""
+    main_asgi.config.DATABASE_PATH = str(tmp_path / "app.db")
+    main_asgi.config.STORAGE_PATH = str(tmp_path / "projects")
+
+    with TestClient(main_asgi.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def live_server(tmp_path):
+    """Serve the ASGI app on a local port, for tests that read SSE streams."""
+    main_asgi.config.DATABASE_PATH = str(tmp_path / "app.db")
+    main_asgi.config.STORAGE_PATH = str(tmp_path / "projects")
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    # sse-starlette binds its shutdown event to the first server's loop
+    AppStatus.should_exit_event = None
+
+    server = uvicorn.Server(uvicorn.Config(main_asgi.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    yield f"http://127.0.0.1:{port}"
+
+    server.should_exit = True
+    thread.join(timeout=10)
+
+def rpc(client, method, params=None, path="/rpc/jsonrpc"):
+    """Send a JSON-RPC request."""
+    return client.post(path, json={"jsonrpc": "2.0", "id": 7, "method": method, "params": params or {}})
+
+def test_health(client):
+    assert client.get("/health").json()["status"] == "ok"
+
+def test_jsonrpc_runs_tools_on_the_worker_pool(client):
+    """Tool calls round-trip through the async handler and the thread pool."""
+    response = rpc(client, "tools/call", {
+        "name": "create_project",
+        "arguments": {"title": "ASGI", "document_type": "article"}
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["id"] == 7
+    text = body["result"]["content"][0]["text"]
+    project_id = json.loads(text[text.index("{"):])["id"]
+
+    read = rpc(client, "resources/read", {
+        "uri": f"overleaf-remote:///projects/{project_id}/documents/main.tex"
+    }).json()
+    assert read["result"]["contents"][0]["text"] == "% Main document\n"
+
+def test_jsonrpc_errors(client):
+    """Errors use the same JSON-RPC codes and HTTP statuses as the Flask routes."""
+    assert rpc(client, "no/such/method").json()["error"]["code"] == -32601
+    assert client.post("/rpc/jsonrpc", content=b"not json").json()["error"]["code"] == -32700
+    assert rpc(client, "resources/read", {}).json()["error"]["code"] == -32603
+
+    response = rpc(client, "no/such/method", path="/sse")
+    assert response.status_code == 404
+    assert response.json()["error"]["code"] == -32601
+    assert rpc(client, "ping", path="/sse/").json()["result"]["status"] == "pong"
+
+def read_event(lines):
+    """Read the next SSE event from a line iterator as (event, data)."""
+    event, data = "message", None
+    for line in lines:
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data = line[5:].strip()
+        elif not line and data is not None:
+            return event, data
+
+def test_sse_session_routes_responses_onto_the_stream(live_server):
+    """A message POSTed for a session is answered on that session's stream."""
+    with httpx.Client(base_url=live_server, timeout=10) as client:
+        with client.stream("GET", "/sse/") as stream:
+            lines = stream.iter_lines()
+            event, endpoint = read_event(lines)
+            assert event == "endpoint"
+            assert endpoint.startswith("/sse/messages?session_id=")
+            read_event(lines)  # notifications/initialized
+
+            response = client.post(endpoint, json={"jsonrpc": "2.0", "id": 41, "method": "ping"})
+            assert response.status_code == 202
+            assert response.content == b""
+
+            # Notifications are accepted without a response
+            assert client.post(endpoint, json={"jsonrpc": "2.0", "method": "notifications/initialized"}).status_code == 202
+
+            response = client.post(endpoint, json={"jsonrpc": "2.0", "id": 42, "method": "no/such/method"})
+            assert response.status_code == 202
+
+            first = json.loads(read_event(lines)[1])
+            second = json.loads(read_event(lines)[1])
+            assert first["id"] == 41 and first["result"]["status"] == "pong"
+            assert second["id"] == 42 and second["error"]["code"] == -32601
+
+            status = client.get("/rpc/status").json()
+            assert status["sse_sessions"]["open"] == 1
+
+        unknown = client.post("/sse/messages?session_id=nope", json={"jsonrpc": "2.0", "id": 1, "method": "ping"})
+        assert unknown.status_code == 404
+
+def test_session_requests_count_against_the_inflight_limit(live_server, monkeypatch):
+    """A session message holds its admission slot until its response is queued, not just until the 202."""
+    admission = main_asgi.app.state.admission
+    tool_manager = main_asgi.app.state.mcp_server.tool_manager
+    release = threading.Event()
+    monkeypatch.setattr(admission, 'max_inflight', 1)
+    monkeypatch.setattr(tool_manager, 'call_tool', lambda name, arguments: release.wait(10) and [])
+
+    with httpx.Client(base_url=live_server, timeout=10) as client:
+        with client.stream("GET", "/sse/") as stream:
+            lines = stream.iter_lines()
+            endpoint = read_event(lines)[1]
+            read_event(lines)  # notifications/initialized
+
+            response = client.post(endpoint, json={"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                                   "params": {"name": "slow", "arguments": {}}})
+            assert response.status_code == 202
+            assert admission.stats()["inflight"] == 1
+
+            # The session's work is still running, so the server is at its limit
+            shed = rpc(client, "ping")
+            assert shed.status_code == 503
+
+            release.set()
+            assert json.loads(read_event(lines)[1])["id"] == 1
+            deadline = time.monotonic() + 5
+            while admission.stats()["inflight"] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert admission.stats()["inflight"] == 0
+            assert rpc(client, "ping").status_code == 200
+
+def test_subscribed_sessions_are_notified_of_changes(live_server):
+    """A write to a subscribed document pushes one coalesced resources/updated."""
+    with httpx.Client(base_url=live_server, timeout=10) as client:
+        created = rpc(client, "tools/call", {
+            "name": "create_project",
+            "arguments": {"title": "Subscribed", "document_type": "article"}
+        }).json()
+        text = created["result"]["content"][0]["text"]
+        project_id = json.loads(text[text.index("{"):])["id"]
+        uri = f"overleaf-remote:///projects/{project_id}/documents/main.tex"
+
+        with client.stream("GET", "/sse/") as stream:
+            lines = stream.iter_lines()
+            endpoint = read_event(lines)[1]
+            read_event(lines)  # notifications/initialized
+
+            client.post(endpoint, json={"jsonrpc": "2.0", "id": 1, "method": "resources/subscribe",
+                                        "params": {"uri": uri}})
+            assert json.loads(read_event(lines)[1])["result"] == {"subscribed": True}
+
+            # A burst of edits from another client
+            for i in range(5):
+                rpc(client, "tools/call", {
+                    "name": "update_document",
+                    "arguments": {"project_id": project_id, "filename": "main.tex", "content": f"v{i}"}
+                })
+
+            notification = json.loads(read_event(lines)[1])
+            assert notification == {
+                "jsonrpc": "2.0",
+                "method": "notifications/resources/updated",
+                "params": {"uri": uri}
+            }
+
+            # The burst was coalesced into that single notification
+            stats = client.get("/rpc/status").json()
+            assert stats["notifications"]["sent"] == 1
+            assert stats["notifications"]["coalesced"] == 4
+            assert stats["subscriptions"] == {"sessions": 1, "subscriptions": 1}
+
+def test_listening_sessions_are_not_reaped(live_server, monkeypatch):
+    """A session that only listens stays open while events are delivered on its stream."""
+    from src.routes import asgi
+    monkeypatch.setattr(asgi, 'HEARTBEAT_INTERVAL', 0.1)
+    sessions = main_asgi.app.state.sessions
+
+    with httpx.Client(base_url=live_server, timeout=10) as client:
+        with client.stream("GET", "/sse/") as stream:
+            lines = stream.iter_lines()
+            endpoint = read_event(lines)[1]
+            read_event(lines)  # notifications/initialized
+            session = sessions.get(endpoint.split("session_id=")[1])
+
+            # No request for longer than the idle timeout, but heartbeats arrive;
+            # the second one is only sent after the first was counted
+            session.last_active -= sessions.idle_timeout + 60
+            for _ in range(2):
+                assert json.loads(read_event(lines)[1])["method"] == "notifications/heartbeat"
+            assert sessions.reap_idle() == 0
+            assert sessions.get(session.id) is session
+
+def test_session_backpressure_drops_slow_consumers():
+    """A session whose queue stays full past the send timeout is closed."""
+    async def scenario():
+        manager = SessionManager(queue_size=2, send_timeout=0.05, idle_timeout=3600)
+        session = manager.create()
+
+        await session.send({"n": 1})
+        await session.send({"n": 2})
+
+        # A producer waits for room while the stream drains...
+        pending = asyncio.create_task(session.send({"n": 3}))
+        await asyncio.sleep(0)
+        assert (await session.receive(1))["n"] == 1
+        await pending
+
+        # ...and gives up on a stream that never does
+        with pytest.raises(SessionClosedError):
+            await session.send({"n": 4})
+        assert session.closed
+        assert await session.receive(1) is CLOSED
+        assert manager.get(session.id) is None
+
+        manager.reap_idle()
+        assert manager.stats()["open"] == 0
+        assert manager.stats()["closed"] == {"slow consumer": 1}
+
+    asyncio.run(scenario())
+
+def test_idle_sessions_are_reaped():
+    """Sessions without client activity for the idle timeout are closed."""
+    async def scenario():
+        manager = SessionManager(idle_timeout=60)
+        idle = manager.create()
+        active = manager.create()
+
+        idle.last_active -= 120
+        active.touch()
+
+        assert manager.reap_idle() == 1
+        assert idle.closed and not active.closed
+        assert await idle.receive(1) is CLOSED
+        assert list(manager.sessions) == [active.id]
+
+    asyncio.run(scenario())
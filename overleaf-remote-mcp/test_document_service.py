@@ -0,0 +1,777 @@
+#!/usr/bin/env python3
+"""
+Tests for the Document Service
+
+These tests run the document service against a temporary database and
+storage directory, so they do not touch src/database/app.db.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.utils.config import Config
+from src.services.document_service import DocumentService
+from src.services.overleaf_service import OverleafService
+from src.services.project_sync import ProjectSync
+from src.fake_overleaf import FakeOverleafServer
+from src.services.patching import PatchError, PatchConflictError
+from src.utils.cache import LRUCache
+
+@pytest.fixture
+def service(tmp_path):
+    """Create an initialized document service backed by a temporary database."""
+    config = Config()
+    config.STORAGE_PATH = str(tmp_path / "projects")
+
+    svc = DocumentService(config)
+    svc.db_path = str(tmp_path / "app.db")
+    svc.initialize()
+    yield svc
+    svc.shutdown()
+
+def test_database_uses_wal_mode(service):
+    """The pooled connections run the database in WAL mode."""
+    with service.db.reader() as conn:
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+def test_create_and_update_document(service):
+    """Documents round-trip through create, update and get."""
+    project = service.create_project("Test Project", "article", "article_basic")
+
+    document = service.get_document(project['id'], 'main.tex')
+    assert document is not None
+    assert "\\documentclass{article}" in document['content']
+
+    assert service.update_document(project['id'], 'main.tex', 'new content', 'edit')
+    assert service.get_document(project['id'], 'main.tex')['content'] == 'new content'
+
+    file_path = os.path.join(service.storage_path, project['id'], 'documents', 'main.tex')
+    with open(file_path, encoding='utf-8') as f:
+        assert f.read() == 'new content'
+
+def test_reader_connections_are_reused(service):
+    """Sequential reads on one thread reuse the same pooled connection."""
+    with service.db.reader() as first:
+        pass
+    with service.db.reader() as second:
+        pass
+    assert first is second
+
+def test_failed_write_rolls_back(service):
+    """An exception inside a write transaction leaves the database untouched."""
+    with pytest.raises(RuntimeError):
+        with service.db.writer() as conn:
+            conn.execute("INSERT INTO projects (id, title, type) VALUES ('p1', 'T', 'article')")
+            raise RuntimeError("boom")
+
+    assert service.get_project('p1') is None
+
+def test_failed_begin_leaves_no_transaction_behind(service):
+    """A writer whose BEGIN fails does not mark the thread as inside a transaction."""
+    with service.db.writer() as conn:
+        conn.execute('PRAGMA busy_timeout = 10')
+    other = sqlite3.connect(service.db_path, isolation_level=None)
+    other.execute('BEGIN IMMEDIATE')
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            with service.db.writer():
+                pass
+        assert not service.db.in_write_transaction()
+    finally:
+        other.execute('ROLLBACK')
+        other.close()
+
+def test_concurrent_updates(service):
+    """Concurrent writers from several threads are serialized without errors."""
+    project = service.create_project("Concurrent", "article")
+    for i in range(4):
+        service.create_document(project['id'], f"part{i}.tex", "")
+
+    errors = []
+
+    def worker(index: int) -> None:
+        for n in range(20):
+            if not service.update_document(project['id'], f"part{index}.tex", f"rev {n}"):
+                errors.append(index)
+            service.get_document(project['id'], f"part{index}.tex")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    for i in range(4):
+        assert service.get_document(project['id'], f"part{i}.tex")['content'] == "rev 19"
+
+def test_version_history_reconstruction(service):
+    """Every stored version rebuilds exactly, across keyframe boundaries."""
+    service.versions.keyframe_interval = 5
+    project = service.create_project("History", "article")
+
+    contents = ["% Main document\n"]
+    for i in range(1, 13):
+        lines = contents[-1].splitlines(keepends=True)
+        lines.insert(i % len(lines), f"line {i}\n")
+        contents.append("".join(lines))
+        assert service.update_document(project['id'], 'main.tex', contents[-1], f"edit {i}")
+
+    versions = service.list_versions(project['id'], 'main.tex')
+    assert [v['version'] for v in versions] == list(range(12, 0, -1))
+    assert [v['version'] for v in versions if v['keyframe']] == [10, 5]
+
+    for number in range(1, 13):
+        assert service.get_version(project['id'], 'main.tex', number) == contents[number - 1]
+    assert service.get_version(project['id'], 'main.tex', 13) is None
+
+def test_legacy_versions_are_migrated(tmp_path):
+    """Full-copy version rows from the old schema are converted to deltas."""
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript('''
+        CREATE TABLE documents (
+            id TEXT PRIMARY KEY, project_id TEXT NOT NULL, filename TEXT NOT NULL,
+            content TEXT, created_at TIMESTAMP, updated_at TIMESTAMP
+        );
+        CREATE TABLE versions (
+            id TEXT PRIMARY KEY, document_id TEXT NOT NULL, version_number INTEGER NOT NULL,
+            content TEXT, commit_message TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    history = [f"v{n}\n" + "shared line\n" * 20 for n in range(1, 8)]
+    conn.execute("INSERT INTO documents (id, project_id, filename, content) VALUES ('d1', 'p1', 'main.tex', 'current\n')")
+    for number, content in enumerate(history, start=1):
+        conn.execute(
+            "INSERT INTO versions (id, document_id, version_number, content) VALUES (?, 'd1', ?, ?)",
+            (f"v{number}", number, content)
+        )
+    conn.commit()
+    conn.close()
+
+    config = Config()
+    config.STORAGE_PATH = str(tmp_path / "projects")
+    config.VERSION_KEYFRAME_INTERVAL = 3
+    svc = DocumentService(config)
+    svc.db_path = db_path
+    svc.initialize()
+
+    try:
+        with svc.db.reader() as conn:
+            rows = conn.execute(
+                "SELECT version_number, delta IS NOT NULL, content_hash IS NOT NULL "
+                "FROM versions ORDER BY version_number"
+            ).fetchall()
+        assert rows == [(1, 1, 0), (2, 1, 0), (3, 0, 1), (4, 1, 0), (5, 1, 0), (6, 0, 1), (7, 1, 0)]
+        assert svc.get_document('p1', 'main.tex')['content'] == 'current\n'
+
+        for number, content in enumerate(history, start=1):
+            assert svc.get_version('p1', 'main.tex', number) == content
+    finally:
+        svc.shutdown()
+
+def test_current_schema_is_opened_without_writes(service):
+    """Another process opening an up-to-date database runs no DDL and takes no write lock."""
+    project = service.create_project("Restart", "article", "article_basic")
+
+    svc = DocumentService(service.config)
+    svc.db_path = service.db_path
+    svc.initialize()
+    try:
+        assert svc.db._writer is None
+        assert svc.get_document(project['id'], 'main.tex') is not None
+        assert {t['id'] for t in svc.list_templates()} >= {'article_basic', 'report_basic'}
+    finally:
+        svc.shutdown()
+
+def test_identical_content_is_stored_once(service):
+    """Projects created from the same template share one content blob."""
+    before = service.get_storage_stats()
+    first = service.create_project("First", "article", "article_basic")
+    second = service.create_project("Second", "article", "article_basic")
+
+    stats = service.get_storage_stats()
+    assert stats['blobs'] == before['blobs']
+    assert stats['references'] == before['references'] + 2
+    assert (service.get_document(first['id'], 'main.tex')['content_hash'] ==
+            service.get_document(second['id'], 'main.tex')['content_hash'])
+
+def test_unreferenced_blobs_are_collected(service):
+    """Replaced content is released and reclaimed by garbage collection."""
+    project = service.create_project("GC", "article")
+    service.create_document(project['id'], 'notes.tex', 'draft one\n')
+    before = service.get_storage_stats()
+
+    assert service.update_document(project['id'], 'notes.tex', 'draft two\n')
+    assert service.get_storage_stats()['blobs'] == before['blobs'] + 1
+
+    reclaimed = service.collect_garbage()
+    assert reclaimed['blobs'] == 1
+    assert service.get_storage_stats()['blobs'] == before['blobs']
+    assert service.get_version(project['id'], 'notes.tex', 1) == 'draft one\n'
+
+def test_unchanged_update_is_a_no_op(service):
+    """Saving identical content does not create a version."""
+    project = service.create_project("Same", "article")
+    assert service.update_document(project['id'], 'main.tex', '% Main document\n')
+    assert service.list_versions(project['id'], 'main.tex') == []
+
+def test_search_documents(service):
+    """Full-text search follows writes and honours filters and paging."""
+    first = service.create_project("Energy Paper", "article")
+    second = service.create_project("Other Paper", "article")
+    service.create_document(first['id'], 'intro.tex', 'We derive \\label{eq:energy} the energy bound.\n')
+    service.create_document(second['id'], 'notes.tex', 'Energy appears here too.\n')
+
+    page = service.search_documents('eq:energy')
+    assert [r['filename'] for r in page['results']] == ['intro.tex']
+    assert '**eq:energy**' in page['results'][0]['snippet']
+
+    page = service.search_documents('energy', project_ids=[second['id']])
+    assert [r['project_id'] for r in page['results']] == [second['id']]
+
+    service.update_document(second['id'], 'notes.tex', 'Nothing relevant.\n')
+    assert service.search_documents('energy', project_ids=[second['id']])['results'] == []
+
+    for i in range(5):
+        service.create_document(first['id'], f'part{i}.tex', f'energy section {i}\n')
+    page = service.search_documents('energy', limit=4)
+    assert len(page['results']) == 4 and page['next_offset'] == 4
+    page = service.search_documents('energy', limit=4, offset=4)
+    assert len(page['results']) == 2 and page['next_offset'] is None
+
+    with pytest.raises(ValueError):
+        service.search_documents('"unbalanced', mode='raw')
+
+def test_search_index_keeps_no_copy_of_the_text(service):
+    """The index is contentless; snippets are cut from the deduplicated blobs."""
+    project = service.create_project("Contentless", "article")
+    filler = ' '.join(f'w{i}' for i in range(40))
+    service.create_document(project['id'], 'long.tex', f'Opening words. {filler} Le résumé du café.\n')
+
+    with service.db.reader() as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'documents_fts%'")}
+    assert 'documents_fts_content' not in tables
+
+    snippet = service.search_documents('resume cafe')['results'][0]['snippet']
+    assert snippet.startswith('...') and snippet.endswith('**résumé** du **café**')
+    snippet = service.search_documents('open*', mode='raw')['results'][0]['snippet']
+    assert snippet.startswith('**Opening** words.') and snippet.endswith('...')
+
+    # Replacing a document removes the tokens it was indexed with
+    service.update_document(project['id'], 'long.tex', 'Closing words.\n')
+    assert service.search_documents('opening')['results'] == []
+    assert service.search_documents('closing')['results'][0]['snippet'] == '**Closing** words'
+
+def test_search_survives_rowid_renumbering(service):
+    """The index is not keyed by the documents rowid, which VACUUM may renumber."""
+    project = service.create_project("Renumbered", "article")
+    service.create_document(project['id'], 'alpha.tex', 'first words\n')
+    service.create_document(project['id'], 'beta.tex', 'second words\n')
+
+    with service.db.writer() as conn:
+        conn.execute('UPDATE documents SET rowid = 1000 - rowid')
+    vacuum = sqlite3.connect(service.db_path, isolation_level=None)
+    vacuum.execute('VACUUM')
+    vacuum.close()
+
+    assert [r['filename'] for r in service.search_documents('second')['results']] == ['beta.tex']
+    service.update_document(project['id'], 'alpha.tex', 'gamma words\n')
+    assert service.search_documents('first')['results'] == []
+    assert [r['filename'] for r in service.search_documents('gamma')['results']] == ['alpha.tex']
+
+def test_update_documents_batch(service):
+    """A batch applies creates and updates together with one timestamp bump."""
+    project = service.create_project("Batch", "article")
+    service.create_document(project['id'], 'intro.tex', 'old intro\n')
+
+    result = service.update_documents(project['id'], [
+        {'filename': 'intro.tex', 'content': 'new intro\n'},
+        {'filename': 'main.tex', 'content': '% Main document\n'},
+        {'filename': 'chapters/method.tex', 'content': 'method\n', 'commit_message': 'add method'}
+    ], commit_message='restructure')
+
+    assert result['updated'] == ['intro.tex']
+    assert result['unchanged'] == ['main.tex']
+    assert result['created'] == ['chapters/method.tex']
+    assert service.get_document(project['id'], 'intro.tex')['content'] == 'new intro\n'
+    assert service.list_versions(project['id'], 'intro.tex')[0]['commit_message'] == 'restructure'
+
+    file_path = os.path.join(service.storage_path, project['id'], 'documents', 'chapters', 'method.tex')
+    with open(file_path, encoding='utf-8') as f:
+        assert f.read() == 'method\n'
+
+def test_update_documents_is_atomic(service):
+    """A failing change rolls back every change in the batch."""
+    project = service.create_project("Atomic", "article")
+
+    with pytest.raises(ValueError):
+        service.update_documents(project['id'], [
+            {'filename': 'main.tex', 'content': 'changed\n'},
+            {'filename': 'missing.tex', 'content': 'x'}
+        ], create_missing=False)
+
+    assert service.get_document(project['id'], 'main.tex')['content'] == '% Main document\n'
+    assert service.list_versions(project['id'], 'main.tex') == []
+
+def test_patch_document_line_and_offset_edits(service):
+    """Range edits rewrite only the addressed lines and characters."""
+    project = service.create_project("Patch", "article")
+    service.create_document(project['id'], 'body.tex', 'one\ntwo\nthree\nfour\n')
+    base = service.get_document(project['id'], 'body.tex')['content_hash']
+
+    result = service.patch_document(project['id'], 'body.tex', edits=[
+        {'start_line': 2, 'end_line': 3, 'text': 'TWO-THREE'},
+        {'start_line': 5, 'end_line': 4, 'text': 'five'}
+    ], base_hash=base)
+    assert result['status'] == 'updated'
+    assert result['total_lines'] == 4
+    assert service.get_document(project['id'], 'body.tex')['content'] == 'one\nTWO-THREE\nfour\nfive\n'
+
+    service.patch_document(project['id'], 'body.tex', edits=[{'offset': 0, 'length': 3, 'text': 'ONE'}])
+    assert service.get_document(project['id'], 'body.tex')['content'].startswith('ONE\nTWO-THREE')
+    assert service.get_version(project['id'], 'body.tex', 1) == 'one\ntwo\nthree\nfour\n'
+
+    with pytest.raises(PatchError):
+        service.patch_document(project['id'], 'body.tex', edits=[
+            {'start_line': 1, 'end_line': 2, 'text': 'a'},
+            {'start_line': 2, 'end_line': 2, 'text': 'b'}
+        ])
+
+def test_patch_offsets_match_byte_range_reads(service):
+    """Offset edits count UTF-8 bytes, so a span from a byte range read patches that span."""
+    project = service.create_project("Bytes", "article")
+    service.create_document(project['id'], 'body.tex', 'Résumé über café\n')
+
+    part = service.read_document_range(project['id'], 'body.tex', offset=9, length=5)
+    assert part['content'] == 'über'
+    service.patch_document(project['id'], 'body.tex', edits=[
+        {'offset': part['offset'], 'length': part['length'], 'text': 'ÜBER'}
+    ])
+    assert service.get_document(project['id'], 'body.tex')['content'] == 'Résumé ÜBER café\n'
+
+    with pytest.raises(PatchError):
+        service.patch_document(project['id'], 'body.tex', edits=[{'offset': 2, 'length': 1, 'text': 'e'}])
+
+def test_patch_document_unified_diff(service):
+    """Unified diffs apply, and stale bases or mismatched hunks are rejected."""
+    project = service.create_project("Diff", "article")
+    service.create_document(project['id'], 'body.tex', 'a\nb\nc\nd\ne\n')
+    base = service.get_document(project['id'], 'body.tex')['content_hash']
+
+    diff = '--- body.tex\n+++ body.tex\n@@ -1,3 +1,3 @@\n a\n-b\n+B\n c\n@@ -5 +5,2 @@\n e\n+f\n'
+    service.patch_document(project['id'], 'body.tex', diff=diff, base_hash=base)
+    assert service.get_document(project['id'], 'body.tex')['content'] == 'a\nB\nc\nd\ne\nf\n'
+
+    with pytest.raises(PatchConflictError):
+        service.patch_document(project['id'], 'body.tex', diff=diff, base_hash=base)
+    with pytest.raises(PatchConflictError):
+        service.patch_document(project['id'], 'body.tex', diff=diff)
+    assert len(service.list_versions(project['id'], 'body.tex')) == 1
+
+def test_read_document_range(service):
+    """Line and byte ranges come from the mirror and fall back to the blob."""
+    project = service.create_project("Ranges", "article")
+    lines = [f"line {i} é\n" for i in range(1, 101)]
+    service.create_document(project['id'], 'thesis.tex', ''.join(lines))
+
+    part = service.read_document_range(project['id'], 'thesis.tex', start_line=40, end_line=45)
+    assert part['content'] == ''.join(lines[39:45])
+    assert part['total_lines'] == 100
+    assert part['next'] == {'start_line': 46}
+
+    tail = service.read_document_range(project['id'], 'thesis.tex', start_line=99)
+    assert tail['content'] == ''.join(lines[98:]) and tail['next'] is None
+
+    # Byte ranges never split a UTF-8 character
+    part = service.read_document_range(project['id'], 'thesis.tex', offset=0, length=8)
+    assert part['content'] == 'line 1 é'
+    assert part['next'] == {'offset': 9}
+
+    # A stale or missing mirror falls back to the stored content
+    file_path = os.path.join(service.storage_path, project['id'], 'documents', 'thesis.tex')
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(''.join(lines).replace('line', 'LINE'))
+    assert service.read_document_range(project['id'], 'thesis.tex', start_line=1, end_line=1)['content'] == lines[0]
+    os.remove(file_path)
+    assert service.read_document_range(project['id'], 'thesis.tex', start_line=2, end_line=2)['content'] == lines[1]
+
+    assert service.read_document_range(project['id'], 'missing.tex', start_line=1) is None
+    with pytest.raises(ValueError):
+        service.read_document_range(project['id'], 'thesis.tex', start_line=500)
+
+def test_byte_ranges_always_make_progress(service):
+    """Following next through short byte ranges of multibyte text reads every character once."""
+    project = service.create_project("Multibyte", "article")
+    content = 'é€𝄞a\n' * 5
+    service.create_document(project['id'], 'music.tex', content)
+
+    for length in (0, 1, 2, 3, 5):
+        pages, offset = [], 0
+        while offset is not None:
+            part = service.read_document_range(project['id'], 'music.tex', offset=offset, length=length)
+            assert part['length'] > 0
+            pages.append(part['content'])
+            offset = part['next']['offset'] if part['next'] else None
+        assert ''.join(pages) == content
+
+    # An offset inside a character starts at that character
+    part = service.read_document_range(project['id'], 'music.tex', offset=3, length=1)
+    assert part['offset'] == 2 and part['content'] == '€'
+
+def test_resources_are_listed_in_cursor_pages(service):
+    """resources/list pages through every project once; documents come from templates."""
+    from src.mcp_components.resources.manager import ResourceManager
+
+    for i in range(5):
+        project = service.create_project(f"Paged {i}", "article")
+        service.create_document(project['id'], 'chapters/intro.tex', 'intro\n')
+
+    manager = ResourceManager(service, None)
+    everything = [str(r.uri) for r in manager.list_resources()]
+
+    uris, cursor, pages = [], None, 0
+    while True:
+        page, cursor = manager.list_resources_page(cursor, limit=2)
+        uris.extend(str(r.uri) for r in page)
+        pages += 1
+        if not cursor:
+            break
+
+    templates = len(service.list_templates())
+    assert len(uris) == templates + 5
+    assert uris == everything
+    assert len(set(uris)) == len(uris)
+    assert pages == 3
+    assert all('/documents/' not in uri for uri in uris)
+
+    uri_templates = [t.uriTemplate for t in manager.list_resource_templates()]
+    documents = [t for t in uri_templates if '/documents/' in t]
+    assert documents == ['overleaf-remote:///projects/{project_id}/documents/{filename}'
+                         '{?start_line,end_line,offset,length}']
+
+    with pytest.raises(ValueError):
+        manager.list_resources_page('not-a-cursor')
+
+def test_read_cache_hits_and_invalidation(service):
+    """Repeated reads are served from the cache until a write invalidates them."""
+    project = service.create_project("Cached", "article")
+    service.get_document(project['id'], 'main.tex')
+    service.get_document(project['id'], 'main.tex')['content'] = 'mutated'
+    before = service.cache.stats()
+
+    assert service.get_document(project['id'], 'main.tex')['content'] == '% Main document\n'
+    assert service.cache.stats()['hits'] == before['hits'] + 1
+
+    service.update_document(project['id'], 'main.tex', 'changed\n')
+    assert service.get_document(project['id'], 'main.tex')['content'] == 'changed\n'
+    service.create_document(project['id'], 'extra.tex', '')
+    assert [d['filename'] for d in service.list_documents(project['id'])] == ['extra.tex', 'main.tex']
+
+    # A rolled-back write still evicts what it read inside the transaction
+    with pytest.raises(RuntimeError):
+        with service.db.writer() as conn:
+            service._apply_change(conn, project['id'], 'main.tex', 'rolled back\n')
+            assert service.get_document(project['id'], 'main.tex')['content'] == 'rolled back\n'
+            raise RuntimeError("boom")
+    assert service.get_document(project['id'], 'main.tex')['content'] == 'changed\n'
+
+def test_lru_cache_is_bounded_by_bytes():
+    """Least recently used entries are evicted once the byte budget is exceeded."""
+    cache = LRUCache(max_bytes=300)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, 'x' * 100, cache.begin(), size=100)
+    cache.get('a')
+    cache.put('d', 'x' * 100, cache.begin(), size=100)
+
+    assert cache.get('b') is not None and cache.stats()['evictions'] == 1
+    assert [key for key in ('a', 'c', 'd') if cache.get(key) == 'x' * 100] == ['a', 'c', 'd']
+
+    # A fill that started before an invalidation is dropped
+    token = cache.begin()
+    cache.invalidate('a')
+    assert not cache.put('a', 'stale', token, size=10)
+    assert cache.put('big', 'x', cache.begin(), size=301) is False
+
+def test_cache_stays_consistent_under_concurrent_writes(service):
+    """Readers racing a writer never leave a value older than the last commit cached."""
+    project = service.create_project("Race", "article")
+    service.create_document(project['id'], 'race.tex', 'rev -1')
+    stop = threading.Event()
+    stale = []
+
+    def reader() -> None:
+        while not stop.is_set():
+            service.get_document(project['id'], 'race.tex')
+            service.list_documents(project['id'])
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    try:
+        for n in range(200):
+            service.update_document(project['id'], 'race.tex', f"rev {n}")
+            if service.get_document(project['id'], 'race.tex')['content'] != f"rev {n}":
+                stale.append(n)
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+    assert not stale
+    assert service.cache.stats()['hits'] > 0
+
+def test_writes_publish_change_events_on_commit(service):
+    """Committed writes publish their change keys; rolled back writes publish nothing."""
+    project = service.create_project("Events", "article")
+    events = []
+    service.events.subscribe(events.extend)
+
+    service.update_document(project['id'], 'main.tex', 'changed', 'edit')
+    assert ('document', project['id'], 'main.tex') in events
+    assert ('project', project['id']) in events
+
+    events.clear()
+    with pytest.raises(RuntimeError):
+        with service.db.writer() as conn:
+            service._apply_change(conn, project['id'], 'main.tex', 'rolled back')
+            raise RuntimeError("abort")
+    assert events == []
+    assert service.get_document(project['id'], 'main.tex')['content'] == 'changed'
+
+@pytest.fixture
+def overleaf():
+    """Overleaf service connected to a fake Overleaf server."""
+    with FakeOverleafServer() as server:
+        config = Config()
+        config.OVERLEAF_EMAIL = "author@example.com"
+        config.OVERLEAF_PASSWORD = "secret"
+        config.OVERLEAF_API_URL = server.url
+        overleaf = OverleafService(config)
+        overleaf.fake = server.fake
+        yield overleaf
+        overleaf.shutdown()
+
+def test_push_transfers_only_changed_files(service, overleaf):
+    """After the first push, only added, changed and deleted files are transferred."""
+    fake = overleaf.fake
+    sync = ProjectSync(service, overleaf)
+
+    project = service.create_project("Thesis", "article")
+    service.update_documents(project['id'], [
+        {'filename': f'chapters/ch{i:02}.tex', 'content': f'Chapter {i}\n' * 200} for i in range(40)
+    ])
+    total = len(service.list_documents(project['id']))
+
+    first = sync.push(project['id'])
+    assert first['created'] and len(first['added']) == total
+    assert fake.request_count('PUT') == total
+    assert service.get_project(project['id'])['overleaf_id'] == first['overleaf_id']
+    remote = fake.projects[first['overleaf_id']]['files']
+    assert remote['chapters/ch03.tex']['content'] == 'Chapter 3\n' * 200
+
+    # A one-line edit is a single upload
+    service.update_document(project['id'], 'chapters/ch07.tex', 'Chapter 7, revised\n' * 200)
+    second = sync.push(project['id'])
+    assert fake.request_count('PUT') == total + 1
+    assert remote['chapters/ch07.tex']['content'] == 'Chapter 7, revised\n' * 200
+    assert second['changed'] == ['chapters/ch07.tex'] and not second['added']
+    assert second['unchanged'] == total - 1
+    assert second['bytes_sent'] == len('Chapter 7, revised\n'.encode('utf-8')) * 200
+    assert second['bytes_saved'] == sum(size for filename, (_, size) in
+                                        service.get_sync_state(project['id'])['documents'].items()
+                                        if filename != 'chapters/ch07.tex')
+
+    # Nothing changed: Overleaf is not contacted at all
+    requests = fake.request_count()
+    assert sync.push(project['id'])['bytes_sent'] == 0
+    assert fake.request_count() == requests
+
+    # A path in the manifest that no longer exists locally is deleted remotely
+    remote['old.tex'] = {'content': 'old', 'revision': '0'}
+    service.record_sync(project['id'], first['overleaf_id'], {'old.tex': ('0' * 64, None)}, [])
+    third = sync.push(project['id'])
+    assert third['deleted'] == ['old.tex'] and fake.request_count('DELETE') == 1
+    assert 'old.tex' not in remote
+    assert 'old.tex' not in service.get_sync_state(project['id'])['manifest']
+
+    # A full push ignores the manifest
+    assert len(sync.push(project['id'], full=True)['added']) == total
+
+    with pytest.raises(ValueError):
+        sync.push('missing')
+
+def test_pull_imports_only_changed_files(service, overleaf):
+    """A pull imports in one go, skips what is unchanged and versions what it overwrites."""
+    fake = overleaf.fake
+    sync = ProjectSync(service, overleaf)
+    remote = fake.seed_projects(1, files=200, file_size=2000)[0]
+
+    first = sync.pull(remote['id'])
+    project_id = first['project_id']
+    assert first['created'] and len(first['added']) == 201 and not first['failed']
+    assert not first['changed']
+    assert fake.request_count('GET') == 203  # login, file list and each file
+    assert service.get_project(project_id)['overleaf_id'] == remote['id']
+    content = remote['files']['sections/s0042.tex']['content']
+    assert service.get_document(project_id, 'sections/s0042.tex')['content'] == content
+    with open(os.path.join(service.storage_path, project_id, 'documents', 'sections', 's0042.tex')) as f:
+        assert f.read() == content
+
+    # Only the file whose revision changed is downloaded; the local edit is kept as a version
+    service.update_document(project_id, 'sections/s0007.tex', 'Local edit\n')
+    remote['files']['sections/s0007.tex'] = {'content': 'Remote edit\n', 'revision': fake.next_revision()}
+    requests = fake.request_count('GET')
+    second = sync.pull(remote['id'])
+    assert second['project_id'] == project_id and not second['created']
+    assert second['changed'] == ['sections/s0007.tex'] and second['unchanged'] == 200
+    assert fake.request_count('GET') == requests + 2
+    assert service.get_document(project_id, 'sections/s0007.tex')['content'] == 'Remote edit\n'
+    versions = service.list_versions(project_id, 'sections/s0007.tex')
+    assert service.get_version(project_id, 'sections/s0007.tex', versions[0]['version']) == 'Local edit\n'
+
+    # Pulled files are in the manifest, so pushing sends nothing back
+    assert sync.push(project_id)['bytes_sent'] == 0 and fake.request_count('PUT') == 0
+
+    # Without remote revisions to compare, identical content is skipped by hash
+    service.record_sync(project_id, remote['id'], {'main.tex': ('0' * 64, None)}, [])
+    third = sync.pull(remote['id'], project_id)
+    assert not third['added'] and not third['changed'] and third['unchanged'] == 201
+    assert not [name for name in os.listdir(service.storage_path) if name.startswith('pull-')]
+
+    # Paths escaping the project and undecodable files are refused
+    staged = {}
+    for name, data in (('../../escape.tex', b'x'), ('binary.tex', b'\xff\xfe'), ('ok.tex', b'y')):
+        staged[name] = os.path.join(service.storage_path, f'staged{len(staged)}')
+        with open(staged[name], 'wb') as f:
+            f.write(data)
+    imported = service.import_documents(project_id, staged)
+    assert imported['failed'] == ['../../escape.tex', 'binary.tex'] and imported['created'] == ['ok.tex']
+
+    with pytest.raises(ValueError):
+        sync.pull(remote['id'], 'missing')
+
+    # A project without main.tex is imported as it is, so a push sends nothing back
+    bare = fake.add_project('Bare', {'paper.tex': 'Paper\n'})
+    pulled = sync.pull(bare['id'])
+    assert pulled['added'] == ['paper.tex']
+    assert [d['filename'] for d in service.list_documents(pulled['project_id'])] == ['paper.tex']
+    assert sync.push(pulled['project_id'])['bytes_sent'] == 0
+    assert sync.pull(bare['id'])['project_id'] == pulled['project_id']
+
+    # The tool reports a missing project, and other errors with their own message
+    from src.mcp_components.tools.manager import ToolManager
+    tools = ToolManager(service, overleaf)
+    result = tools.call_tool('pull_from_overleaf', {'overleaf_id': remote['id'], 'project_id': 'missing'})
+    assert result[0].text == 'Project not found: missing'
+
+    def refuse(overleaf_id, project_id=None):
+        raise ValueError("Unsafe path: ../../escape.tex")
+
+    tools.project_sync.pull = refuse
+    result = tools.call_tool('pull_from_overleaf', {'overleaf_id': remote['id'], 'project_id': project_id})
+    assert result[0].text == 'Error: Unsafe path: ../../escape.tex'
+
+def test_sync_queue_coalesces_and_retries(service, overleaf):
+    """Syncs queued while one runs collapse into one job; transient failures are retried."""
+    from src.services.sync_queue import SyncQueue
+
+    fake = overleaf.fake
+    overleaf.config.OVERLEAF_MAX_RETRIES = 0
+    queue = SyncQueue(service, ProjectSync(service, overleaf), workers=2, backoff_base=0.05, poll_interval=0.05)
+    project = service.create_project("Queued", "article")
+    service.update_documents(project['id'], [
+        {'filename': f'chapters/ch{i:02}.tex', 'content': f'Chapter {i}\n'} for i in range(20)
+    ])
+
+    # Creating the Overleaf project fails once, so the first job needs a retry
+    overleaf.initialize()
+    fake.fail_next = 1
+    first, coalesced = queue.submit(project['id'])
+    assert not coalesced and first['status'] == 'queued'
+    first = queue.wait(first['id'])
+    assert first['status'] == 'succeeded' and first['attempts'] == 2
+    assert first['error'] is None
+    assert len(first['result']['added']) == 21
+
+    # While a sync runs, further requests for the project merge into one queued job
+    fake.latency = 0.05
+    service.update_document(project['id'], 'chapters/ch01.tex', 'revised\n')
+    running, _ = queue.submit(project['id'])
+    deadline = time.monotonic() + 10
+    while queue.get_job(running['id'])['status'] == 'queued' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    service.update_document(project['id'], 'chapters/ch02.tex', 'revised\n')
+    merged = [queue.submit(project['id']) for _ in range(4)]
+    assert [coalesced for _, coalesced in merged] == [False, True, True, True]
+    assert len({job['id'] for job, _ in merged}) == 1
+
+    last = queue.wait(merged[0][0]['id'])
+    assert last['status'] == 'succeeded' and last['coalesced'] == 3
+    assert queue.wait(running['id'])['status'] == 'succeeded'
+    assert fake.projects[first['result']['overleaf_id']]['files']['chapters/ch02.tex']['content'] == 'revised\n'
+    assert [job['id'] for job in queue.list_jobs(project['id'])] == [merged[0][0]['id'], running['id'], first['id']]
+    assert queue.stats()['jobs']['succeeded'] == 3
+
+    with pytest.raises(ValueError):
+        queue.submit('missing')
+    queue.shutdown()
+
+def test_sync_jobs_survive_restarts(service, overleaf):
+    """Jobs queued or left running by an earlier process are run by the next one."""
+    from src.services.sync_queue import SyncQueue
+
+    project = service.create_project("Durable", "article")
+    with service.db.writer() as conn:
+        job, _ = service.sync_jobs.submit(conn, project['id'], False, 5, time.time())
+        # A worker of a process that died holds an expired lease
+        orphan, _ = service.sync_jobs.submit(conn, service.create_project("Orphan", "article")['id'],
+                                             False, 5, time.time())
+        service.sync_jobs.claim(conn, 'dead-process', time.time() - 700, lease=600)
+
+    queue = SyncQueue(service, ProjectSync(service, overleaf), poll_interval=0.05)
+    queue.resume()
+    assert queue.wait(job['id'])['status'] == 'succeeded'
+    assert queue.wait(orphan['id'])['status'] == 'succeeded'
+    assert service.get_project(project['id'])['overleaf_id']
+    queue.shutdown()
+
+def test_sync_job_lease_is_renewed_while_it_runs(service, overleaf):
+    """A push outlasting the lease is not run again, and a stale worker cannot record an outcome."""
+    from src.services.sync_queue import SyncQueue
+
+    project = service.create_project("Slow", "article")
+    project_sync = ProjectSync(service, overleaf)
+    pushes = []
+
+    def slow_push(project_id, full=False):
+        pushes.append(project_id)
+        time.sleep(1.0)
+        return ProjectSync.push(project_sync, project_id, full=full)
+
+    project_sync.push = slow_push
+    # Two processes share the database; the lease is a fraction of the push
+    first = SyncQueue(service, project_sync, workers=1, lease=0.3, poll_interval=0.05)
+    second = SyncQueue(service, project_sync, workers=1, lease=0.3, poll_interval=0.05)
+    second.start()
+    job, _ = first.submit(project['id'])
+    job = first.wait(job['id'])
+    assert job['status'] == 'succeeded' and job['attempts'] == 1
+    assert pushes == [project['id']]
+    first.shutdown()
+    second.shutdown()
+
+    with service.db.writer() as conn:
+        job, _ = service.sync_jobs.submit(conn, project['id'], False, 5, time.time() - 700)
+        stale = service.sync_jobs.claim(conn, 'stale', time.time() - 700, lease=600)
+        current = service.sync_jobs.claim(conn, 'current', time.time(), lease=600)
+        assert current['id'] == job['id'] and current['attempts'] == 2
+        assert not service.sync_jobs.finish(conn, job['id'], 'stale', stale['attempts'], 'failed', 'late')
+        assert service.sync_jobs.extend(conn, job['id'], 'current', current['attempts'], time.time(), 600)
+        assert service.sync_jobs.finish(conn, job['id'], 'current', current['attempts'], 'succeeded')
+        assert service.sync_jobs.get(conn, job['id'])['status'] == 'succeeded'
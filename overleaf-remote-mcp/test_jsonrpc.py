@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Tests for the JSON-RPC routes: batches, cached catalogs, result encoding,
+admission control and metrics
+
+Each transport test runs against both the Flask app (src/main.py) and the ASGI app
+(src/main_asgi.py), on /rpc/jsonrpc and on the sessionless /sse POST.
+"""
+
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from src import main as flask_main
+from src import main_asgi
+from src.services.admission import (
+    OVERLOADED, RATE_LIMITED, REQUEST_TOO_LARGE, AdmissionController, TokenBucket
+)
+from src.utils.metrics import Histogram, render_stats
+
+@pytest.fixture(params=["flask", "asgi"])
+def client(request, tmp_path):
+    """An HTTP test client for one of the two transports."""
+    for module in (flask_main, main_asgi):
+        module.config.DATABASE_PATH = str(tmp_path / "app.db")
+        module.config.STORAGE_PATH = str(tmp_path / "projects")
+
+    if request.param == "flask":
+        flask_main.app.admission = AdmissionController.from_config(flask_main.config)
+        flask_main.mcp_server.initialize()
+        yield flask_main.app.test_client()
+        flask_main.mcp_server.shutdown()
+    else:
+        with TestClient(main_asgi.app) as test_client:
+            yield test_client
+
+def post(client, path, body):
+    """POST a JSON body and return (status, decoded JSON or None)."""
+    response = client.post(path, data=json.dumps(body), headers={"Content-Type": "application/json"})
+    content = response.data if hasattr(response, "data") else response.content
+    return response.status_code, json.loads(content) if content else None
+
+def admission(client):
+    """The admission controller of the app behind a test client."""
+    if isinstance(client, TestClient):
+        return main_asgi.app.state.admission
+    return flask_main.app.admission
+
+def call(request_id, name, **arguments):
+    message = {"jsonrpc": "2.0", "method": "tools/call", "params": {"name": name, "arguments": arguments}}
+    if request_id is not None:
+        message["id"] = request_id
+    return message
+
+def create_project(client):
+    _, body = post(client, "/rpc/jsonrpc", call(1, "create_project", title="Batch", document_type="article"))
+    text = body["result"]["content"][0]["text"]
+    return json.loads(text[text.index("{"):])["id"]
+
+@pytest.mark.parametrize("path", ["/rpc/jsonrpc", "/sse/"])
+def test_batch_runs_writes_in_order(client, path):
+    """Reads after a write in the same batch see it; responses keep batch order."""
+    project_id = create_project(client)
+    status, responses = post(client, path, [
+        call("a", "get_document", project_id=project_id, filename="main.tex"),
+        call("b", "update_document", project_id=project_id, filename="main.tex", content="second"),
+        call("c", "get_document", project_id=project_id, filename="main.tex"),
+        call("d", "list_documents", project_id=project_id),
+        {"jsonrpc": "2.0", "id": "e", "method": "ping"},
+    ])
+
+    assert status == 200
+    assert [r["id"] for r in responses] == ["a", "b", "c", "d", "e"]
+    assert "% Main document" in responses[0]["result"]["content"][0]["text"]
+    assert "second" in responses[2]["result"]["content"][0]["text"]
+    assert responses[4]["result"]["status"] == "pong"
+
+@pytest.mark.parametrize("path", ["/rpc/jsonrpc", "/sse/"])
+def test_batch_errors_and_notifications(client, path):
+    """Invalid entries get their own errors and notifications get no response."""
+    status, responses = post(client, path, [
+        1,
+        {"jsonrpc": "2.0", "id": 2, "method": "no/such/method"},
+        {"jsonrpc": "2.0", "method": "ping"},
+        {"jsonrpc": "1.0", "id": 3, "method": "ping"},
+    ])
+    assert status == 200
+    assert responses == [
+        {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}},
+        {"jsonrpc": "2.0", "id": 2, "error": {"code": -32601, "message": "Method not found: no/such/method"}},
+        {"jsonrpc": "2.0", "id": 3, "error": {"code": -32600, "message": "Invalid Request"}},
+    ]
+
+    # A batch of notifications only, and a single notification: no body at all
+    assert post(client, path, [{"jsonrpc": "2.0", "method": "notifications/initialized"}]) == (202, None)
+    assert post(client, path, {"jsonrpc": "2.0", "method": "notifications/initialized"}) == (202, None)
+
+    # An empty batch is a single Invalid Request error
+    _, body = post(client, "/rpc/jsonrpc", [])
+    assert body["error"]["code"] == -32600
+
+@pytest.mark.parametrize("path", ["/rpc/jsonrpc", "/sse/"])
+def test_model_results_are_encoded_with_aliases(client, path):
+    """Resource URIs serialize as strings and tool results carry isError."""
+    project_id = create_project(client)
+
+    status, body = post(client, path, {"jsonrpc": "2.0", "id": 1, "method": "resources/list"})
+    assert status == 200
+    uris = [resource["uri"] for resource in body["result"]["resources"]]
+    assert f"overleaf-remote:///projects/{project_id}/metadata" in uris
+    assert all(resource["mimeType"] for resource in body["result"]["resources"])
+
+    status, body = post(client, path, call(2, "get_document", project_id=project_id, filename="main.tex"))
+    assert status == 200
+    assert body["result"]["isError"] is False
+    assert body["result"]["content"][0]["type"] == "text"
+
+@pytest.mark.parametrize("method,key", [("tools/list", "tools"), ("prompts/list", "prompts")])
+@pytest.mark.parametrize("path", ["/rpc/jsonrpc", "/sse/"])
+def test_catalogs_are_served_with_etags(client, path, method, key):
+    """Static listings carry an ETag and answer If-None-Match with 304."""
+    first = client.post(path, json={"jsonrpc": "2.0", "id": 1, "method": method})
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    body = first.get_json() if hasattr(first, "get_json") else first.json()
+    assert body["id"] == 1
+    names = [item["name"] for item in body["result"][key]]
+    assert names and len(names) == len(set(names))
+
+    # The same catalog bytes are reused for any request ID
+    second = client.post(path, json={"jsonrpc": "2.0", "id": "two", "method": method})
+    assert second.headers["ETag"] == etag
+    assert (second.get_json() if hasattr(second, "get_json") else second.json())["id"] == "two"
+
+    cached = client.post(path, json={"jsonrpc": "2.0", "id": 3, "method": method},
+                         headers={"If-None-Match": f'"stale", {etag}'})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+def test_catalog_is_rebuilt_only_when_the_registry_changes(tmp_path):
+    """The tools catalog keeps its bytes until the tool manager is invalidated."""
+    server = flask_main.mcp_server
+    flask_main.config.DATABASE_PATH = str(tmp_path / "app.db")
+    flask_main.config.STORAGE_PATH = str(tmp_path / "projects")
+    server.initialize()
+    try:
+        catalog = server.tools_catalog()
+        assert server.tools_catalog() is catalog
+        assert server.handle_list_tools({}) is catalog.result
+
+        # Tools are serialized with pydantic: aliases kept, unset fields omitted
+        tool = catalog.result["tools"][0]
+        assert "inputSchema" in tool and "annotations" not in tool
+
+        tools = server.tool_manager.list_tools()
+        server.tool_manager._build_tools = lambda: tools[:3]
+        server.tool_manager.invalidate_tools()
+
+        rebuilt = server.tools_catalog()
+        assert rebuilt is not catalog
+        assert rebuilt.etag != catalog.etag
+        assert len(rebuilt.result["tools"]) == 3
+    finally:
+        server.shutdown()
+
+def test_batch_stages_group_reads_between_writes():
+    """Consecutive reads share a stage; each write is a stage of its own."""
+    server = flask_main.mcp_server
+    messages = [
+        {"method": "resources/read"},
+        call(None, "get_document"),
+        call(None, "update_document"),
+        {"method": "tools/list"},
+        {"method": "ping"},
+        {"method": "initialize"},
+    ]
+    stages = server.batch_stages(messages)
+    assert [[index for index, _ in stage] for stage in stages] == [[0, 1], [2], [3, 4], [5]]
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2.0, capacity=2, now=0.0)
+    for _ in range(2):
+        assert bucket.wait_time(0.0, 1) == 0.0
+        bucket.take(1)
+    assert bucket.wait_time(0.0, 1) == 0.5
+    assert bucket.wait_time(0.25, 1) == 0.25
+    assert bucket.wait_time(0.5, 1) == 0.0
+    # Batches larger than the bucket cost a full bucket rather than never fitting
+    assert bucket.wait_time(10.0, 50) == 0.0
+
+@pytest.mark.parametrize("path", ["/rpc/jsonrpc", "/sse/"])
+def test_oversized_bodies_are_refused(client, path):
+    admission(client).max_request_size = 200
+    response = client.post(path, data=json.dumps(call(1, "update_document", content="x" * 500)),
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+    body = response.get_json() if hasattr(response, "get_json") else response.json()
+    assert body["error"]["code"] == REQUEST_TOO_LARGE
+
+    status, body = post(client, path, {"jsonrpc": "2.0", "id": 2, "method": "ping"})
+    assert status == 200
+    assert admission(client).stats()["too_large"] == 1
+
+@pytest.mark.parametrize("path", ["/rpc/jsonrpc", "/sse/"])
+def test_method_rate_limit_returns_retry_after(client, path):
+    """A client over a method's limit gets 429 for that method only."""
+    limiter = admission(client)
+    limiter.rate_limit = 0
+    limiter.method_limits = {"tools/call:list_projects": 2}
+
+    for request_id in (1, 2):
+        status, body = post(client, path, call(request_id, "list_projects"))
+        assert status == 200 and "result" in body
+
+    response = client.post(path, json=call(3, "list_projects"))
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    body = response.get_json() if hasattr(response, "get_json") else response.json()
+    assert body == {"jsonrpc": "2.0", "id": 3, "error": {"code": RATE_LIMITED, "message": "Rate limit exceeded"}}
+
+    status, _ = post(client, path, {"jsonrpc": "2.0", "id": 4, "method": "ping"})
+    assert status == 200
+
+    # Each message of a batch counts against the client's overall limit
+    limiter.rate_limit = 3
+    status, _ = post(client, path, [{"jsonrpc": "2.0", "id": i, "method": "ping"} for i in range(3)])
+    assert status == 200
+    status, _ = post(client, path, {"jsonrpc": "2.0", "id": 5, "method": "ping"})
+    assert status == 429
+
+def test_load_is_shed_past_the_inflight_limit(client):
+    """Requests beyond the in-flight limit are refused with 503 until work drains."""
+    limiter = admission(client)
+    limiter.max_inflight = 1
+    assert limiter.admit("another-client", []) is None
+
+    response = client.post("/rpc/jsonrpc", json={"jsonrpc": "2.0", "id": 1, "method": "ping"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    body = response.get_json() if hasattr(response, "get_json") else response.json()
+    assert body["error"]["code"] == OVERLOADED
+
+    limiter.release()
+    status, _ = post(client, "/rpc/jsonrpc", {"jsonrpc": "2.0", "id": 2, "method": "ping"})
+    assert status == 200
+
+    stats = client.get("/rpc/status")
+    stats = stats.get_json() if hasattr(stats, "get_json") else stats.json()
+    assert stats["admission"]["shed"] == 1
+    assert stats["admission"]["inflight"] == 0
+
+def sample(text, series):
+    """The value of one series in a metrics exposition, or 0 if it is absent."""
+    for line in text.splitlines():
+        name, _, value = line.rpartition(' ')
+        if name == series:
+            return float(value)
+    return 0.0
+
+def test_histogram_renders_cumulative_buckets():
+    """Buckets count every sample at or below their bound; sum and count follow."""
+    histogram = Histogram("test_seconds", "Test latency", ["method"], buckets=[0.1, 1])
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value, "ping")
+
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP test_seconds Test latency", "# TYPE test_seconds histogram"]
+    assert lines[2:] == [
+        'test_seconds_bucket{method="ping",le="0.1"} 2',
+        'test_seconds_bucket{method="ping",le="1"} 3',
+        'test_seconds_bucket{method="ping",le="+Inf"} 4',
+        'test_seconds_sum{method="ping"} 2.65',
+        'test_seconds_count{method="ping"} 4',
+    ]
+
+    with pytest.raises(ValueError):
+        histogram.labels("ping", "extra")
+
+    gauges = render_stats("test_cache", {"hits": 3, "hit_rate": 0.5, "closed": {"idle": 1}, "path": "x"})
+    assert gauges.splitlines() == [
+        "# TYPE test_cache_hits gauge", "test_cache_hits 3",
+        "# TYPE test_cache_hit_rate gauge", "test_cache_hit_rate 0.5",
+        "# TYPE test_cache_closed gauge", 'test_cache_closed{key="idle"} 1',
+    ]
+
+def test_metrics_are_exported(client):
+    """Requests, tools, Document Service and SQLite time show up on /metrics and as a resource."""
+    def metrics():
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        return (response.data if hasattr(response, "data") else response.content).decode("utf-8")
+
+    before = metrics()
+    create_project(client)
+    post(client, "/rpc/jsonrpc", call(2, "no_such_tool"))
+    post(client, "/rpc/jsonrpc", {"jsonrpc": "2.0", "id": 3, "method": "resources/read",
+                                  "params": {"uri": "overleaf-remote:///projects/missing/metadata"}})
+    after = metrics()
+
+    def delta(series):
+        return sample(after, series) - sample(before, series)
+
+    assert delta('mcp_request_duration_seconds_count{method="tools/call"}') == 2
+    assert delta('mcp_request_errors_total{method="resources/read"}') == 1
+    assert delta('mcp_tool_duration_seconds_count{tool="create_project"}') == 1
+    assert delta('mcp_tool_result_characters_count{tool="create_project"}') == 1
+    assert delta('mcp_tool_errors_total{tool="unknown"}') == 1
+    assert delta('mcp_resource_read_errors_total{kind="metadata"}') == 1
+    assert delta('mcp_document_service_duration_seconds_count{operation="create_project"}') == 1
+    assert delta('mcp_sqlite_connection_seconds_count{mode="write"}') >= 1
+    assert sample(after, "mcp_admission_admitted") >= 3
+    assert sample(after, "mcp_server_initialized") == 1
+
+    # The same exposition is readable as an MCP resource
+    status, body = post(client, "/rpc/jsonrpc", {"jsonrpc": "2.0", "id": 4, "method": "resources/read",
+                                                 "params": {"uri": "overleaf-remote:///metrics"}})
+    assert status == 200
+    content = body["result"]["contents"][0]
+    assert content["mimeType"] == "text/plain"
+    assert sample(content["text"], 'mcp_resource_read_duration_seconds_count{kind="metadata"}') >= 1
@@ -122,6 +122,39 @@ def test_resources_list(base_url: str) -> bool:
         print(f"✗ Resources list error: {e}")
         return False
 
+def test_resource_templates_list(base_url: str) -> bool:
+    """Test resources/templates/list endpoint."""
+    try:
+        request_data = {
+            "jsonrpc": "2.0",
+            "id": 2,
+            "method": "resources/templates/list",
+            "params": {}
+        }
+        
+        response = requests.post(
+            f"{base_url}/mcp/jsonrpc",
+            json=request_data,
+            headers={"Content-Type": "application/json"},
+            timeout=10
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            if "result" in data and "resourceTemplates" in data["result"]:
+                templates = data["result"]["resourceTemplates"]
+                print(f"✓ Resource templates list successful: {len(templates)} templates")
+                return True
+            else:
+                print(f"✗ Resource templates list failed: {data}")
+                return False
+        else:
+            print(f"✗ Resource templates list failed: {response.status_code}")
+            return False
+    except Exception as e:
+        print(f"✗ Resource templates list error: {e}")
+        return False
+
 def test_tools_list(base_url: str) -> bool:
     """Test tools/list endpoint."""
     try:
@@ -383,6 +416,7 @@ def main():
             ("Server Capabilities", lambda: test_capabilities(base_url)),
             ("MCP JSON-RPC Initialize", lambda: test_mcp_jsonrpc(base_url)),
             ("Resources List", lambda: test_resources_list(base_url)),
+            ("Resource Templates List", lambda: test_resource_templates_list(base_url)),
             ("Tools List", lambda: test_tools_list(base_url)),
             ("Prompts List", lambda: test_prompts_list(base_url)),
             ("Create Project Tool", lambda: test_create_project_tool(base_url) is not None),
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Tests for the Overleaf HTTP client and service against a fake Overleaf server.
+
+Run with: python -m pytest test_overleaf_client.py
+"""
+
+import time
+
+import pytest
+
+from src.utils.config import Config
+from src.fake_overleaf import FakeOverleaf, FakeOverleafServer
+from src.services.overleaf_client import CircuitBreaker, CircuitOpenError, OverleafClient, OverleafError
+from src.services.overleaf_service import OverleafService
+
+@pytest.fixture
+def server():
+    with FakeOverleafServer() as server:
+        yield server
+
+def make_client(server, **kwargs):
+    kwargs.setdefault('backoff_base', 0.01)
+    return OverleafClient(server.url, auth=('author@example.com', 'secret'), **kwargs)
+
+def test_sync_round_trip_runs_in_parallel(server):
+    """A push and a pull through the service transfer files concurrently, within the limit."""
+    server.fake.latency = 0.02
+    config = Config()
+    config.OVERLEAF_EMAIL = "author@example.com"
+    config.OVERLEAF_PASSWORD = "secret"
+    config.OVERLEAF_API_URL = server.url
+    config.OVERLEAF_CONCURRENCY = 4
+    overleaf = OverleafService(config)
+
+    documents = [{'filename': f'sections/s{i:02}.tex', 'content': f'Section {i}\n'} for i in range(12)]
+    pushed = overleaf.sync_project_to_overleaf({'title': 'Paper', 'overleaf_id': None}, documents)
+    assert pushed['created'] and not pushed['failed']
+    assert sorted(pushed['uploaded']) == [doc['filename'] for doc in documents]
+    assert 1 < server.fake.max_inflight <= 4
+
+    pulled = overleaf.sync_project_from_overleaf(pushed['overleaf_id'])
+    assert sorted(pulled['documents'], key=lambda doc: doc['filename']) == documents
+    assert overleaf.get_file_content(pushed['overleaf_id'], 'missing.tex') is None
+
+    stats = overleaf.stats()
+    assert stats['authenticated'] and stats['failures'] == 1 and not stats['circuit_open']
+    overleaf.shutdown()
+
+def test_compile_and_download_output(server, tmp_path):
+    config = Config()
+    config.OVERLEAF_EMAIL = "author@example.com"
+    config.OVERLEAF_PASSWORD = "secret"
+    config.OVERLEAF_API_URL = server.url
+    overleaf = OverleafService(config)
+    project = server.fake.seed_projects(1, files=10, file_size=3000)[0]
+
+    assert overleaf.get_compilation_status(project['id'])['status'] == 'never_compiled'
+    result = overleaf.compile_project(project['id'])
+    assert result['success'] and result['pdf_url'].startswith(server.url)
+    assert 'Output written on output.pdf' in result['log']
+
+    status = overleaf.get_compilation_status(project['id'])
+    assert status['status'] == 'success' and status['pdf_available'] and status['last_compiled']
+
+    pdf = tmp_path / 'output.pdf'
+    size = overleaf.download_output(project['id'], str(pdf))
+    assert size == pdf.stat().st_size and pdf.read_bytes().startswith(b'%PDF')
+
+    # A broken document fails to compile and has no PDF
+    broken = server.fake.add_project('Broken', {'main.tex': '\\documentclass{article}\n'})
+    result = overleaf.compile_project(broken['id'])
+    assert not result['success'] and 'begin{document}' in result['error'] and result['pdf_url'] is None
+    assert overleaf.download_output(broken['id'], str(tmp_path / 'broken.pdf')) is None
+    overleaf.shutdown()
+
+def test_bandwidth_limits_transfers(server):
+    server.fake.bandwidth = 200_000
+    client = make_client(server)
+    project = server.fake.add_project('Paper')
+    start = time.perf_counter()
+    client.run(client.put_file(project['id'], 'big.tex', 'x' * 100_000))
+    assert time.perf_counter() - start >= 0.45
+    assert server.fake.bytes_received == 100_000
+    client.close()
+
+def test_requests_without_credentials_are_rejected(server):
+    client = OverleafClient(server.url, max_retries=0)
+    with pytest.raises(OverleafError) as error:
+        client.run(client.get_user())
+    assert error.value.status == 401
+    client.close()
+
+def test_transient_failures_are_retried(server):
+    client = make_client(server, max_retries=3)
+    server.fake.fail_next = 2
+    assert client.run(client.get_user())['email'] == 'author@example.com'
+    assert client.retries == 2 and client.failures == 0
+
+    # Retries are bounded
+    server.fake.fail_next = 10
+    with pytest.raises(OverleafError) as error:
+        client.run(client.list_projects())
+    assert error.value.status == 503
+    assert server.fake.fail_next == 6
+    client.close()
+
+def test_batch_transfers_report_each_failure(server):
+    """A file that keeps failing is reported without failing the rest of the batch."""
+    client = make_client(server, max_retries=0, concurrency=1,
+                         breaker=CircuitBreaker(failure_threshold=100))
+    project = server.fake.add_project('Paper')
+    server.fake.fail_next = 1
+    results = client.run(client.put_files(project['id'], {'a.tex': 'a', 'b.tex': 'b', 'c.tex': 'c'}))
+    assert isinstance(results['a.tex'], OverleafError)
+    assert sorted(project['files']) == ['b.tex', 'c.tex']
+    client.close()
+
+def test_circuit_breaker_fails_fast_and_recovers(server):
+    now = [1000.0]
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=lambda: now[0])
+    client = make_client(server, max_retries=0, breaker=breaker)
+
+    server.fake.fail_next = 3
+    for _ in range(3):
+        with pytest.raises(OverleafError):
+            client.run(client.get_user())
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # While open, Overleaf is not contacted
+    requests = server.fake.request_count()
+    with pytest.raises(CircuitOpenError):
+        client.run(client.get_user())
+    assert server.fake.request_count() == requests
+
+    # After the reset timeout a trial request is let through and closes it
+    now[0] += 31
+    assert client.run(client.get_user())['id'] == 'fake_user'
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.opens == 1
+
+    # A failed trial re-opens it at once
+    server.fake.fail_next = 3
+    for _ in range(3):
+        with pytest.raises(OverleafError):
+            client.run(client.get_user())
+    now[0] += 31
+    server.fake.fail_next = 1
+    with pytest.raises(OverleafError):
+        client.run(client.get_user())
+    assert breaker.state == CircuitBreaker.OPEN and breaker.opens == 3
+    client.close()
+
+def test_trial_request_that_raises_does_not_wedge_the_breaker(server, tmp_path):
+    now = [1000.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+    client = make_client(server, max_retries=0, breaker=breaker)
+
+    server.fake.fail_next = 1
+    with pytest.raises(OverleafError):
+        client.run(client.get_user())
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # The trial fails writing to disk, which says nothing about Overleaf
+    now[0] += 31
+    with pytest.raises(OSError):
+        client.run(client.request('GET', '/api/user', stream_to=str(tmp_path / 'missing' / 'user.json')))
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # The next request becomes the trial instead of being rejected forever
+    assert client.run(client.get_user())['id'] == 'fake_user'
+    assert breaker.state == CircuitBreaker.CLOSED
+    client.close()
+
+def test_parallel_transfers_beat_serial_under_latency():
+    fake = FakeOverleaf(latency=0.05)
+    with FakeOverleafServer(fake) as server:
+        project = fake.add_project('Paper', {f'f{i:02}.tex': str(i) for i in range(16)})
+        timings = {}
+        for concurrency in (1, 8):
+            client = make_client(server, concurrency=concurrency)
+            start = time.perf_counter()
+            contents = client.run(client.get_files(project['id'], sorted(project['files'])))
+            timings[concurrency] = time.perf_counter() - start
+            assert contents['f07.tex'] == '7'
+            client.close()
+    assert timings[8] < timings[1] / 3
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent request handling in the stdio transport
+
+Runs the stdio server (src/main_stdio.py) against an in-memory MCP client
+session and checks that blocking tool calls are offloaded to worker threads:
+a slow call does not hold up other requests, and a queued call cancelled with
+notifications/cancelled never runs.
+"""
+
+import os
+import sys
+import asyncio
+import inspect
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import anyio
+import pytest
+from mcp import types
+from mcp.shared.exceptions import McpError
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from src import main_stdio
+
+@pytest.fixture
+def stdio(tmp_path, monkeypatch):
+    """The stdio server with a throwaway database and a controllable 'slow' tool."""
+    main_stdio.config.DATABASE_PATH = str(tmp_path / "app.db")
+    main_stdio.config.STORAGE_PATH = str(tmp_path / "projects")
+    mcp_server = main_stdio.load_services()
+
+    release = threading.Event()
+    started = []
+    call_tool = mcp_server.tool_manager.call_tool
+
+    def patched_call_tool(name, arguments):
+        if name in ('slow', 'queued'):
+            started.append(name)
+            release.wait(10)
+            return [{'type': 'text', 'text': name}]
+        return call_tool(name, arguments)
+
+    monkeypatch.setattr(mcp_server.tool_manager, 'call_tool', patched_call_tool)
+    yield release, started
+    release.set()
+    mcp_server.shutdown()
+    main_stdio.mcp_server = None
+
+async def wait_until(condition, timeout=5.0):
+    with anyio.fail_after(timeout):
+        while not condition():
+            await anyio.sleep(0.01)
+
+def test_slow_tool_does_not_block_other_requests(stdio):
+    """Listing and reading resources complete while a tool call is blocked."""
+    release, started = stdio
+
+    async def scenario():
+        async with create_connected_server_and_client_session(main_stdio.server) as client:
+            results = {}
+
+            async def slow():
+                results['slow'] = await client.call_tool('slow', {})
+
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(slow)
+                await wait_until(lambda: started == ['slow'])
+
+                with anyio.fail_after(5):
+                    resources = await client.list_resources()
+                    templates = await client.read_resource("overleaf-remote:///templates/article_basic")
+                assert resources.resources
+                assert templates.contents
+                assert 'slow' not in results
+
+                release.set()
+
+            assert results['slow'].content[0].text == 'slow'
+
+    asyncio.run(scenario())
+
+def test_cancelled_request_never_runs(stdio, monkeypatch):
+    """A call waiting for a worker thread is dropped when the client cancels it."""
+    release, started = stdio
+    monkeypatch.setattr(main_stdio, 'executor', ThreadPoolExecutor(max_workers=1))
+
+    async def scenario():
+        async with create_connected_server_and_client_session(main_stdio.server) as client:
+            errors = []
+
+            async def call(name):
+                try:
+                    await client.call_tool(name, {})
+                except McpError as e:
+                    errors.append((name, e.error.message))
+
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(call, 'slow')
+                await wait_until(lambda: started == ['slow'])
+
+                # The only worker is busy, so this call is queued
+                queued_id = client._request_id
+                tg.start_soon(call, 'queued')
+                await wait_until(lambda: client._request_id > queued_id)
+
+                await client.send_notification(types.ClientNotification(types.CancelledNotification(
+                    method='notifications/cancelled',
+                    params=types.CancelledNotificationParams(requestId=queued_id, reason='test')
+                )))
+                await wait_until(lambda: errors)
+                release.set()
+
+            assert errors == [('queued', 'Request cancelled')]
+
+    asyncio.run(scenario())
+
+    # Once the worker is free, the cancelled call still does not run
+    main_stdio.executor.shutdown(wait=True)
+    assert started == ['slow']
+
+def test_handshake_does_not_wait_for_the_server_components(tmp_path):
+    """The components are neither imported nor set up until the handshake is done."""
+    code = ("import sys; from src import main_stdio; "
+            "print(main_stdio.mcp_server is None, 'src.services.document_service' in sys.modules)")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert output.stdout.split() == ['True', 'False']
+
+    main_stdio.config.DATABASE_PATH = str(tmp_path / "app.db")
+    main_stdio.config.STORAGE_PATH = str(tmp_path / "projects")
+
+    async def scenario():
+        async with create_connected_server_and_client_session(main_stdio.server) as client:
+            # initialize has been answered and notifications/initialized sent
+            await wait_until(lambda: main_stdio.mcp_server is not None)
+            assert (await client.list_tools()).tools
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        main_stdio.mcp_server.shutdown()
+        main_stdio.mcp_server = None
+
+def test_cancellation_override_matches_the_sdk():
+    """CancellableServer overrides a private SDK method; fail loudly if the SDK changes it."""
+    from mcp.server import Server
+    from mcp.shared.session import RequestResponder
+
+    sdk_method = getattr(Server, '_handle_message', None)
+    assert sdk_method is not None, "mcp.server.Server._handle_message is gone; revisit CancellableServer"
+    assert list(inspect.signature(sdk_method).parameters) == list(
+        inspect.signature(main_stdio.CancellableServer._handle_message).parameters)
+    assert 'self._handle_message' in inspect.getsource(Server.run)
+    assert isinstance(inspect.getattr_static(RequestResponder, 'cancelled'), property)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Tests for resource subscriptions
+
+Covers notification coalescing and debouncing, and relaying change events
+between processes through redis. redis-server is not needed: a minimal
+in-process stand-in speaks enough of the protocol for pub/sub.
+"""
+
+import time
+import asyncio
+import threading
+import socketserver
+
+import pytest
+
+from src.services.event_bus import LocalEventBus, RedisEventBus, create_event_bus
+from src.services.subscriptions import ResourceNotifier, SubscriptionRegistry
+
+DOC = "overleaf-remote:///projects/p1/documents/main.tex"
+
+def resolve(change):
+    """Map ('document', project_id, filename) changes to document URIs."""
+    if change[0] == 'document':
+        return [f"overleaf-remote:///projects/{change[1]}/documents/{change[2]}"]
+    return []
+
+def make_notifier(registry, sent, **kwargs):
+    def deliver(session_id, message):
+        sent.append((session_id, message['params']['uri'], time.monotonic()))
+        return True
+    return ResourceNotifier(registry, resolve, deliver, **kwargs)
+
+def test_bursts_are_coalesced_into_one_notification():
+    """Fifty changes from worker threads produce one notification per subscription."""
+    async def scenario():
+        registry = SubscriptionRegistry()
+        registry.subscribe("s1", DOC)
+        registry.subscribe("s2", DOC + "?start_line=1&end_line=10")
+        registry.subscribe("s3", "overleaf-remote:///projects/p1/documents/other.tex")
+
+        sent = []
+        notifier = make_notifier(registry, sent, debounce=0.05, max_delay=1.0)
+        notifier.start(asyncio.get_running_loop())
+
+        writers = [
+            threading.Thread(target=lambda: [notifier.on_change([('document', 'p1', 'main.tex')]) for _ in range(25)])
+            for _ in range(2)
+        ]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        await asyncio.sleep(0.2)
+
+        assert sorted((s, uri) for s, uri, _ in sent) == [
+            ("s1", DOC),
+            ("s2", DOC + "?start_line=1&end_line=10")
+        ]
+        assert notifier.stats() == {'changes': 100, 'coalesced': 98, 'sent': 2, 'pending': 0}
+        notifier.stop()
+
+    asyncio.run(scenario())
+
+def test_debounce_is_capped_by_max_delay():
+    """A continuous stream of changes still notifies every max_delay."""
+    async def scenario():
+        registry = SubscriptionRegistry()
+        registry.subscribe("s1", DOC)
+
+        sent = []
+        notifier = make_notifier(registry, sent, debounce=0.1, max_delay=0.2)
+        notifier.start(asyncio.get_running_loop())
+
+        started = time.monotonic()
+        while time.monotonic() - started < 0.7:
+            notifier.on_change([('document', 'p1', 'main.tex')])
+            await asyncio.sleep(0.02)
+
+        # Changes never paused for the debounce period, yet notifications went out
+        assert 2 <= len(sent) <= 4
+        assert sent[0][2] - started < 0.35
+        notifier.stop()
+
+    asyncio.run(scenario())
+
+def test_full_sessions_are_retried_and_closed_sessions_dropped():
+    """Notifications a session cannot take yet stay pending until it can."""
+    async def scenario():
+        registry = SubscriptionRegistry()
+        registry.subscribe("s1", DOC)
+        accepting = []
+
+        def deliver(session_id, message):
+            return bool(accepting)
+
+        notifier = ResourceNotifier(registry, resolve, deliver, debounce=0.02, max_delay=0.1)
+        notifier.start(asyncio.get_running_loop())
+        notifier.on_change([('document', 'p1', 'main.tex')])
+
+        await asyncio.sleep(0.1)
+        assert notifier.stats()['pending'] == 1
+
+        accepting.append(True)
+        await asyncio.sleep(0.1)
+        assert notifier.stats()['pending'] == 0
+        assert notifier.stats()['sent'] == 1
+
+        registry.remove_session("s1")
+        notifier.on_change([('document', 'p1', 'main.tex')])
+        await asyncio.sleep(0.1)
+        assert notifier.stats()['sent'] == 1
+        notifier.stop()
+
+    asyncio.run(scenario())
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Serve SUBSCRIBE/PUBLISH over RESP; every other command answers OK."""
+
+    def read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        count = int(header[1:])
+        parts = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:])
+            parts.append(self.rfile.read(length + 2)[:-2])
+        return parts
+
+    def send(self, data: bytes):
+        with self.server.lock:
+            self.wfile.write(data)
+
+    def handle(self):
+        subscribed = set()
+        try:
+            while True:
+                command = self.read_command()
+                if command is None:
+                    break
+                name = command[0].upper()
+                if name == b'SUBSCRIBE':
+                    for channel in command[1:]:
+                        subscribed.add(channel)
+                        self.server.subscribers.setdefault(channel, []).append(self)
+                        self.send(b'*3\r\n$9\r\nsubscribe\r\n' + bulk(channel) + b':%d\r\n' % len(subscribed))
+                elif name == b'UNSUBSCRIBE':
+                    for channel in command[1:] or list(subscribed):
+                        subscribed.discard(channel)
+                        self.server.subscribers.get(channel, []).remove(self)
+                        self.send(b'*3\r\n$11\r\nunsubscribe\r\n' + bulk(channel) + b':%d\r\n' % len(subscribed))
+                elif name == b'PUBLISH':
+                    channel, payload = command[1], command[2]
+                    receivers = list(self.server.subscribers.get(channel, []))
+                    for receiver in receivers:
+                        receiver.send(b'*3\r\n$7\r\nmessage\r\n' + bulk(channel) + bulk(payload))
+                    self.send(b':%d\r\n' % len(receivers))
+                elif name == b'PING':
+                    self.send(b'+PONG\r\n')
+                else:
+                    self.send(b'+OK\r\n')
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            for channel in subscribed:
+                if self in self.server.subscribers.get(channel, []):
+                    self.server.subscribers[channel].remove(self)
+
+def bulk(value: bytes) -> bytes:
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+@pytest.fixture
+def redis_url():
+    """Run the redis stand-in on a local port."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeRedisHandler)
+    server.daemon_threads = True
+    server.subscribers = {}
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+    server.server_close()
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_redis_bus_relays_events_between_processes(redis_url):
+    """An event published by one process reaches listeners in every process once."""
+    first = create_event_bus(redis_url)
+    second = create_event_bus(redis_url)
+    assert isinstance(first, RedisEventBus)
+    try:
+        received_first, received_second = [], []
+        first.subscribe(received_first.extend)
+        second.subscribe(received_second.extend)
+
+        first.publish([('document', 'p1', 'main.tex'), ('documents', 'p1')])
+        first.publish([('project', 'p1')])
+
+        expected = [('document', 'p1', 'main.tex'), ('documents', 'p1'), ('project', 'p1')]
+        assert wait_for(lambda: len(received_second) == 3)
+        assert wait_for(lambda: len(received_first) == 3)
+        assert received_first == expected
+        assert received_second == expected
+    finally:
+        first.close()
+        second.close()
+
+def test_local_bus_is_the_default():
+    assert type(create_event_bus('')) is LocalEventBus
+    with pytest.raises(ValueError):
+        create_event_bus('amqp://localhost')